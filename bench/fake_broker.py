@@ -0,0 +1,271 @@
+from __future__ import annotations
+
+import time
+import uuid
+import asyncio
+import random
+import threading
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Tuple
+from datetime import datetime, timezone
+
+
+def _parse_iso(v: Optional[str]) -> Optional[datetime]:
+    if not v:
+        return None
+    return datetime.fromisoformat(str(v).replace("Z", "+00:00"))
+
+
+def _order_json(o: SimpleNamespace) -> Dict[str, Any]:
+    d = dict(vars(o))
+    d["id"] = str(d["id"])
+    for k in ("submitted_at", "filled_at"):
+        if d.get(k) is not None:
+            d[k] = d[k].isoformat().replace("+00:00", "Z")
+    return d
+
+
+class FakeBrokerError(Exception):
+    def __init__(self, message: str, status_code: int = 500, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class FakeTradingClient:
+    """
+    In-process stand-in for alpaca-py's TradingClient.
+
+    Every call sleeps latency_ms (+/- jitter_ms), fails with
+    probability error_rate (500) and is throttled with probability
+    throttle_rate (429 + Retry-After). Submitted orders are recorded (with
+    the time they were accepted) so the harness can measure
+    claim-to-submit latency.
+    """
+
+    def __init__(
+        self,
+        *,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        error_rate: float = 0.0,
+        throttle_rate: float = 0.0,
+        retry_after_sec: float = 0.05,
+        buying_power: float = 1_000_000.0,
+        seed: Optional[int] = None,
+    ):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after_sec = retry_after_sec
+        self.buying_power = buying_power
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls: Dict[str, int] = {}
+        self.positions: Dict[str, float] = {}
+        self.orders: List[SimpleNamespace] = []
+        self.submit_times: Dict[str, float] = {}  # symbol -> perf_counter at accept
+        self.client_order_ids: Dict[str, SimpleNamespace] = {}
+
+    # --------------------------------------------------
+    # PLUMBING
+    # --------------------------------------------------
+
+    def _roll(self, name: str) -> Tuple[float, Optional[FakeBrokerError]]:
+        with self._lock:
+            self.calls[name] = self.calls.get(name, 0) + 1
+            delay = self.latency_ms + self._rng.uniform(-self.jitter_ms, self.jitter_ms)
+            fail = self._rng.random() < self.error_rate
+            throttled = self._rng.random() < self.throttle_rate
+        err = None
+        if throttled:
+            err = FakeBrokerError("too many requests", status_code=429, retry_after=self.retry_after_sec)
+        elif fail:
+            err = FakeBrokerError(f"fake_{name}_error", status_code=500)
+        return max(delay, 0.0) / 1000.0, err
+
+    def _call(self, name: str) -> None:
+        delay, err = self._roll(name)
+        if delay > 0:
+            time.sleep(delay)
+        if err is not None:
+            raise err
+
+    @staticmethod
+    def _order_ns(o: SimpleNamespace) -> SimpleNamespace:
+        return SimpleNamespace(**vars(o))
+
+    # --------------------------------------------------
+    # TradingClient SURFACE
+    # --------------------------------------------------
+
+    def get_account(self):
+        self._call("get_account")
+        return SimpleNamespace(
+            status="ACTIVE",
+            buying_power=str(self.buying_power),
+            cash=str(self.buying_power),
+        )
+
+    def get_all_positions(self):
+        self._call("get_all_positions")
+        with self._lock:
+            return [SimpleNamespace(symbol=s, qty=str(q)) for s, q in self.positions.items()]
+
+    def get_open_position(self, symbol: str):
+        self._call("get_open_position")
+        with self._lock:
+            q = self.positions.get(symbol.upper())
+        if q is None:
+            raise FakeBrokerError("position does not exist", status_code=404)
+        return SimpleNamespace(symbol=symbol.upper(), qty=str(q))
+
+    def _select(self, *, status, symbols, side, after, until, asc, limit) -> List[SimpleNamespace]:
+        status = str(status or "").lower()
+        side = str(side or "").lower().rsplit(".", 1)[-1]
+        with self._lock:
+            out = []
+            for o in self.orders:
+                is_open = o.status in ("new", "accepted", "partially_filled")
+                if status.endswith("open") and not is_open:
+                    continue
+                if status.endswith("closed") and is_open:
+                    continue
+                if symbols and o.symbol not in symbols:
+                    continue
+                if side and o.side != side:
+                    continue
+                if after is not None and o.submitted_at <= after:
+                    continue
+                if until is not None and o.submitted_at >= until:
+                    continue
+                out.append(self._order_ns(o))
+        out.sort(key=lambda o: o.submitted_at, reverse=not asc)
+        return out[: int(limit)] if limit else out
+
+    def get_orders(self, filter=None):
+        self._call("get_orders")
+        return self._select(
+            status=getattr(filter, "status", None),
+            symbols={s.upper() for s in (getattr(filter, "symbols", None) or [])},
+            side=getattr(filter, "side", None),
+            after=getattr(filter, "after", None),
+            until=getattr(filter, "until", None),
+            asc=str(getattr(filter, "direction", "") or "").lower().endswith("asc"),
+            limit=getattr(filter, "limit", None),
+        )
+
+    def get(self, path: str, data: Optional[Dict[str, Any]] = None):
+        """
+        Raw-JSON surface (RESTClient.get) used by executor.order_query.
+        """
+        self._call("get:" + path.strip("/").split("/", 1)[0])
+        data = data or {}
+
+        if path == "/orders":
+            rows = self._select(
+                status=data.get("status"),
+                symbols={s.upper() for s in str(data.get("symbols") or "").split(",") if s},
+                side=data.get("side"),
+                after=_parse_iso(data.get("after")),
+                until=_parse_iso(data.get("until")),
+                asc=str(data.get("direction") or "").lower() == "asc",
+                limit=data.get("limit"),
+            )
+            return [_order_json(o) for o in rows]
+
+        if path.startswith("/orders/"):
+            order_id = path.rsplit("/", 1)[-1]
+            with self._lock:
+                o = next((o for o in self.orders if str(o.id) == order_id), None)
+            if o is None:
+                raise FakeBrokerError("order not found", status_code=404)
+            return _order_json(self._order_ns(o))
+
+        if path == "/positions":
+            with self._lock:
+                return [{"symbol": s, "qty": str(q)} for s, q in self.positions.items()]
+
+        if path.startswith("/positions/"):
+            symbol = path.rsplit("/", 1)[-1].upper()
+            with self._lock:
+                q = self.positions.get(symbol)
+            if q is None:
+                raise FakeBrokerError("position does not exist", status_code=404)
+            return {"symbol": symbol, "qty": str(q)}
+
+        raise FakeBrokerError(f"not found: {path}", status_code=404)
+
+    def submit_order(self, order_data):
+        self._call("submit_order")
+        return self._accept(order_data)
+
+    def _accept(self, order_data) -> SimpleNamespace:
+        symbol = str(getattr(order_data, "symbol", "")).upper()
+        side = str(getattr(order_data, "side", "buy")).lower()
+        now = datetime.now(timezone.utc)
+        o = SimpleNamespace(
+            id=uuid.uuid4(),
+            symbol=symbol,
+            side="buy" if side.endswith("buy") else "sell",
+            qty=str(getattr(order_data, "qty", 0)),
+            status="accepted",
+            submitted_at=now,
+            filled_at=None,
+        )
+        coid = getattr(order_data, "client_order_id", None)
+        with self._lock:
+            # like Alpaca: a reused client_order_id is rejected (422)
+            if coid:
+                if coid in self.client_order_ids:
+                    raise FakeBrokerError("client_order_id must be unique", status_code=422)
+                self.client_order_ids[coid] = o
+            self.orders.append(o)
+            self.submit_times[symbol] = time.perf_counter()
+        return self._order_ns(o)
+
+    def get_order_by_client_id(self, client_id: str):
+        self._call("get_order_by_client_id")
+        return self._by_client_id(client_id)
+
+    def _by_client_id(self, client_id: str) -> SimpleNamespace:
+        with self._lock:
+            o = self.client_order_ids.get(client_id)
+        if o is None:
+            raise FakeBrokerError("order not found", status_code=404)
+        return self._order_ns(o)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"calls": dict(self.calls), "orders": len(self.orders)}
+
+
+class FakeAsyncTradingClient:
+    """
+    Async face of a FakeTradingClient (same orders, positions and
+    counters): latency is awaited instead of slept, so many submits
+    overlap on one event loop. Stands in for AsyncBrokerClient.
+    """
+
+    def __init__(self, broker: FakeTradingClient):
+        self.broker = broker
+
+    async def _call(self, name: str) -> None:
+        delay, err = self.broker._roll(name)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if err is not None:
+            raise err
+
+    async def submit_order(self, order_data):
+        await self._call("submit_order")
+        return self.broker._accept(order_data)
+
+    async def get_account(self):
+        await self._call("get_account")
+        return SimpleNamespace(status="ACTIVE", buying_power=str(self.broker.buying_power))
+
+    async def get_order_by_client_id(self, client_id: str):
+        await self._call("get_order_by_client_id")
+        return self.broker._by_client_id(client_id)
@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import os
+import sys
+import argparse
+import subprocess
+from typing import Dict, List, Tuple
+
+
+# =========================================================
+# IMPORT-TIME BUDGET
+#
+#   python -m bench.importtime                  # default entry points
+#   python -m bench.importtime --budget-ms 80 executor.runners.stocks_runner
+#
+# Imports each module in a fresh interpreter under
+# `python -X importtime` and fails (exit 1) when
+#   - its cumulative import time is over --budget-ms, or
+#   - it pulls in a module that must stay lazy (alpaca-py,
+#     pandas, psycopg, httpx, asyncio, ...): those load on first
+#     use, after the worker has logged and parsed its config.
+# Best of --repeat runs, so one slow disk read does not fail it.
+# =========================================================
+
+DEFAULT_MODULES = [
+    "executor.runners.stocks_runner",
+    "executor.runners.penny_runner",
+    "executor.supervisor",
+]
+
+# top-level packages that must not be imported by the entry points
+LAZY = (
+    "alpaca",
+    "pandas",
+    "numpy",
+    "psycopg",
+    "psycopg_pool",
+    "httpx",
+    "websockets",
+    "asyncio",
+    "http.server",
+)
+
+
+def _import_profile(module: str) -> Tuple[float, Dict[str, float]]:
+    """
+    -> (cumulative ms for `module`, {imported module: cumulative ms})
+    """
+    env = dict(os.environ)
+    # importing must not need real settings; these are never used
+    env.setdefault("DATABASE_URL", "postgresql://importtime@localhost/importtime")
+    env.pop("PYTHONPROFILEIMPORTTIME", None)
+
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise SystemExit(f"❌ import {module} failed:\n{proc.stderr[-2000:]}")
+
+    cumulative: Dict[str, float] = {}
+    for line in proc.stderr.splitlines():
+        # "import time:  self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        try:
+            _, cum, name = line[len("import time:"):].split("|", 2)
+            cumulative[name.strip()] = int(cum) / 1000.0
+        except ValueError:
+            continue
+
+    return cumulative.get(module, 0.0), cumulative
+
+
+def check(modules: List[str], *, budget_ms: float, repeat: int) -> int:
+    failures = 0
+
+    for module in modules:
+        best = None
+        loaded: Dict[str, float] = {}
+        for _ in range(max(1, repeat)):
+            ms, loaded = _import_profile(module)
+            best = ms if best is None else min(best, ms)
+
+        eager = sorted(
+            name for name in loaded
+            if any(name == lazy or name.startswith(lazy + ".") for lazy in LAZY)
+        )
+        over = best > budget_ms
+        ok = not over and not eager
+        failures += 0 if ok else 1
+
+        print(
+            f"[IMPORTTIME] {'✅' if ok else '❌'} {module} {best:.1f}ms "
+            f"(budget {budget_ms:.0f}ms)",
+            flush=True,
+        )
+        if eager:
+            top = sorted({n.split(".")[0] for n in eager})
+            print(f"[IMPORTTIME]    eager heavy imports: {', '.join(top)}", flush=True)
+
+    return 1 if failures else 0
+
+
+def main(argv: List[str]) -> int:
+    ap = argparse.ArgumentParser(description="Fail when entry-point imports get slow or eager")
+    ap.add_argument("modules", nargs="*", default=DEFAULT_MODULES)
+    ap.add_argument("--budget-ms", type=float, default=100.0)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args(argv)
+
+    return check(args.modules, budget_ms=args.budget_ms, repeat=args.repeat)
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,389 @@
+from __future__ import annotations
+
+import os
+import sys
+import json
+import time
+import uuid
+import argparse
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from bench.run import _reset_schema
+
+
+# =========================================================
+# OFFLINE REPLAY OF A HISTORICAL RUN
+#
+# Copies one run_id's strategy_intents from a source database
+# (opened read-only) into a scratch schema and drains them
+# through the real handlers (execute_stocks_intent,
+# execute_penny_intent, via the registry) against SimulatedBroker:
+#
+#   REPLAY_SOURCE_URL=postgresql://readonly@prod/db \
+#   BENCH_DATABASE_URL=postgresql://localhost/postgres \
+#   python -m bench.replay --run-id <uuid> --max-stocks-positions 8 \
+#       --state account.json --label caps8
+#
+# The live account is never touched: the Alpaca credentials are
+# replaced before the settings load and the trading client is
+# the simulator. --state is a JSON file with the account before
+# the run:
+#   {"buying_power": 25000, "positions": {"AAPL": 10},
+#    "open_buys": ["MSFT"], "filled_buys_today": ["NVDA"]}
+#
+# Reports guard decisions (and which ones differ from the source
+# run), the orders that would have been sent, and throughput;
+# JSON lands in bench_results/ (see --out).
+# =========================================================
+
+# cap flags -> env (unset flags keep the environment's values)
+CAP_FLAGS = {
+    "max_stocks_positions": "MAX_STOCKS_POSITIONS",
+    "max_stocks_trades_per_day": "MAX_STOCKS_TRADES_PER_DAY",
+    "max_penny_positions": "MAX_PENNY_POSITIONS",
+    "max_penny_trades_per_day": "MAX_PENNY_TRADES_PER_DAY",
+}
+
+
+def _setup_env(args) -> str:
+    from psycopg.conninfo import make_conninfo
+
+    dsn = args.database_url or os.getenv("BENCH_DATABASE_URL")
+    if not dsn:
+        raise SystemExit("❌ --database-url or BENCH_DATABASE_URL required (scratch Postgres)")
+
+    os.environ["DATABASE_URL"] = make_conninfo(dsn, options=f"-c search_path={args.schema}")
+
+    # never the real account: overwrite, do not setdefault
+    os.environ["APCA_API_KEY_ID"] = "replay"
+    os.environ["APCA_API_SECRET_KEY"] = "replay"
+    for name in ("ALPACA_API_KEY", "ALPACA_SECRET_KEY"):
+        os.environ.pop(name, None)
+    os.environ["TRADE_STREAM_ENABLED"] = "0"
+    os.environ["EXECUTOR_METRICS_PORT"] = "0"
+    os.environ["EXECUTOR_WAKE_MODE"] = "poll"
+    os.environ["EXECUTOR_WORKERS"] = str(args.workers)
+    os.environ["EXECUTOR_CLAIM_BATCH"] = str(args.batch)
+    os.environ["EXECUTOR_ASYNC_SUBMIT"] = "1" if args.use_async else "0"
+    os.environ["BROKER_RATE_LIMIT_ENABLED"] = "0"
+
+    for attr, env_name in CAP_FLAGS.items():
+        v = getattr(args, attr)
+        if v is not None:
+            os.environ[env_name] = str(v)
+    return dsn
+
+
+def _detail_obj(v: Any) -> Optional[Dict[str, Any]]:
+    # source rows may predate migration v5 (text details)
+    if v is None or isinstance(v, dict):
+        return v
+    from common.serialization import loads
+
+    try:
+        out = loads(v)
+    except ValueError:
+        return {"legacy_text": str(v)}
+    return out if isinstance(out, dict) else {"value": out}
+
+
+def _outcome(ok: Optional[bool], detail: Optional[Dict[str, Any]]) -> Optional[str]:
+    if ok is None:
+        return None
+    if ok:
+        return "submitted"
+    return str((detail or {}).get("reason") or "unknown")
+
+
+def _load_source(source_url: str, run_id: str, executors: List[str]) -> List[Dict[str, Any]]:
+    import psycopg
+    from psycopg.conninfo import conninfo_to_dict, make_conninfo
+    from psycopg.rows import dict_row
+
+    # keep the DSN's own options (e.g. a search_path)
+    opts = conninfo_to_dict(source_url).get("options") or ""
+    ro = make_conninfo(source_url, options=f"{opts} -c default_transaction_read_only=on".strip())
+    with psycopg.connect(ro, row_factory=dict_row) as conn:
+        rows = conn.execute(
+            """
+            SELECT intent_id, ts, run_id, executor, symbol, strategy, priority,
+                   source_facts, dispatched_ok, dispatched_detail
+            FROM strategy_intents
+            WHERE run_id = %s
+              AND executor = ANY(%s)
+            ORDER BY ts, intent_id
+            """,
+            (run_id, executors),
+        ).fetchall()
+    return rows
+
+
+def _copy_run(rows: List[Dict[str, Any]], job_type_of: Dict[str, str]) -> List[str]:
+    """
+    Insert the intents (undispatched) and one queued job per
+    executor; returns the job types queued.
+    """
+    from psycopg.types.json import Jsonb
+    from common.db import get_conn
+
+    with get_conn() as conn, conn.cursor() as cur:
+        cur.executemany(
+            """
+            INSERT INTO strategy_intents
+                (intent_id, ts, run_id, executor, symbol, strategy, priority, source_facts)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+            """,
+            [
+                (
+                    r["intent_id"],
+                    r["ts"],
+                    r["run_id"],
+                    r["executor"],
+                    r["symbol"],
+                    r["strategy"],
+                    r["priority"],
+                    Jsonb(r["source_facts"]) if r["source_facts"] is not None else None,
+                )
+                for r in rows
+            ],
+        )
+
+        queued: List[str] = []
+        for executor in sorted({r["executor"] for r in rows}):
+            job_type = job_type_of[executor]
+            cur.execute(
+                """
+                INSERT INTO job_dispatch (dispatch_id, job_type, run_id, payload)
+                VALUES (%s, %s, %s, '{"replay": true}'::jsonb)
+                """,
+                (str(uuid.uuid4()), job_type, rows[0]["run_id"]),
+            )
+            queued.append(job_type)
+    return queued
+
+
+def _decisions(source: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+    from common.db import get_conn
+
+    with get_conn() as conn:
+        rows = conn.execute(
+            """
+            SELECT intent_id, executor, symbol, dispatched_ok, dispatched_detail
+            FROM strategy_intents
+            ORDER BY dispatched_ts NULLS LAST, ts, intent_id
+            """
+        ).fetchall()
+
+    out = []
+    for r in rows:
+        iid = str(r["intent_id"])
+        detail = _detail_obj(r["dispatched_detail"])
+        src = source.get(iid) or {}
+        out.append(
+            {
+                "intent_id": iid,
+                "executor": r["executor"],
+                "symbol": r["symbol"],
+                "outcome": _outcome(r["dispatched_ok"], detail),
+                "stage": (detail or {}).get("stage"),
+                "source_outcome": _outcome(src.get("dispatched_ok"), _detail_obj(src.get("dispatched_detail"))),
+            }
+        )
+    return out
+
+
+def _summarize(decisions: List[Dict[str, Any]]) -> Dict[str, Dict[str, int]]:
+    by_exec: Dict[str, Dict[str, int]] = {}
+    for d in decisions:
+        counts = by_exec.setdefault(d["executor"], {})
+        key = d["outcome"] or "not_dispatched"
+        counts[key] = counts.get(key, 0) + 1
+    return by_exec
+
+
+def run(args) -> Dict[str, Any]:
+    source_url = args.source_url or os.getenv("REPLAY_SOURCE_URL")
+    if not source_url:
+        raise SystemExit("❌ --source-url or REPLAY_SOURCE_URL required (database holding the run)")
+
+    dsn = _setup_env(args)
+
+    # executor imports AFTER env is in place (config is read from env)
+    from executor.config import reload_settings
+    from executor.alpaca_client import set_trading_client, set_async_broker
+    from executor.registry import get_handler, job_types
+    from bench.fake_broker import FakeAsyncTradingClient
+    from bench.sim_broker import SimulatedBroker
+
+    # the simulator is installed before anything could build a real client
+    broker = SimulatedBroker(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        fill_latency_ms=None if args.fill_latency_ms < 0 else args.fill_latency_ms,
+        fill_rate=args.fill_rate,
+        buying_power=args.buying_power,
+        seed=args.seed,
+    )
+    set_trading_client(broker)
+    set_async_broker(FakeAsyncTradingClient(broker) if args.use_async else None)
+    cfg = reload_settings()
+
+    if args.state:
+        with open(args.state) as f:
+            state = json.load(f)
+        if state.get("buying_power") is not None:
+            broker.buying_power = float(state["buying_power"])
+        broker.seed_state(
+            positions=state.get("positions") or {},
+            open_buys=state.get("open_buys") or [],
+            filled_buys_today=state.get("filled_buys_today") or [],
+        )
+
+    job_type_of = {get_handler(jt).executor: jt for jt in job_types()}
+    executors = [e for e in (args.executors.split(",") if args.executors else job_type_of) if e]
+    unknown = [e for e in executors if e not in job_type_of]
+    if unknown:
+        raise SystemExit(f"❌ no handler registered for executor(s): {', '.join(unknown)}")
+
+    rows = _load_source(source_url, args.run_id, executors)
+    if not rows:
+        raise SystemExit(f"❌ no intents for run_id={args.run_id} executors={executors}")
+    source = {str(r["intent_id"]): r for r in rows}
+
+    _reset_schema(dsn, args.schema)
+
+    from common.db import counting_cursor_class, db_roundtrips, set_cursor_factory
+    from common.migrations import apply_migrations
+    from common.logging import flush_trade_events
+    from common.job_claim import claim_job
+    from executor.runners.intent_runner import drain_dispatch
+
+    # statement counting is bench-only (production uses the plain cursor)
+    set_cursor_factory(counting_cursor_class())
+    apply_migrations()
+    queued = _copy_run(rows, job_type_of)
+
+    pool = None
+    if args.workers > 1:
+        from concurrent.futures import ThreadPoolExecutor
+
+        pool = ThreadPoolExecutor(max_workers=args.workers)
+
+    # a real worker has alpaca-py loaded before its first claim
+    import alpaca.trading.requests  # noqa: F401
+
+    rt0 = db_roundtrips()
+    t0 = time.perf_counter()
+    summaries = []
+    try:
+        while True:
+            job = claim_job(job_types=queued, claimed_by="replay", lease_sec=cfg.lease_sec)
+            if not job:
+                break
+            summaries.append(drain_dispatch(job, pool=pool))
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=True)
+
+    flush_trade_events()
+    wall = time.perf_counter() - t0
+    roundtrips = db_roundtrips() - rt0
+    broker.settle()
+
+    decisions = _decisions(source)
+    changed = [
+        d for d in decisions
+        if d["source_outcome"] is not None and d["outcome"] != d["source_outcome"]
+    ]
+    total = len(rows)
+
+    return {
+        "label": args.label,
+        "ts": datetime.now(timezone.utc).isoformat(),
+        "params": {
+            "run_id": args.run_id,
+            "executors": executors,
+            "workers": args.workers,
+            "async": args.use_async,
+            "batch": args.batch,
+            "latency_ms": args.latency_ms,
+            "jitter_ms": args.jitter_ms,
+            "fill_latency_ms": args.fill_latency_ms,
+            "fill_rate": args.fill_rate,
+            "buying_power": args.buying_power,
+            "state": args.state,
+            "caps": {attr: getattr(cfg, attr) for attr in CAP_FLAGS},
+            "seed": args.seed,
+        },
+        "results": {
+            "intents": total,
+            "decisions_by_executor": _summarize(decisions),
+            "source_by_executor": _summarize(
+                [{"executor": d["executor"], "outcome": d["source_outcome"]} for d in decisions]
+            ),
+            "changed_vs_source": len(changed),
+            "orders_sent": len(broker.sent),
+            "wall_sec": round(wall, 4),
+            "intents_per_sec": round(total / wall, 2) if wall > 0 else None,
+            "db_roundtrips_per_intent": round(roundtrips / total, 3) if total else None,
+            "broker": broker.stats(),
+            "broker_end_state": broker.state(),
+            "dispatches": [s for s in summaries if s],
+        },
+        "orders": broker.sent,
+        "changed": changed,
+        "decisions": decisions,
+    }
+
+
+def main(argv: List[str]) -> int:
+    ap = argparse.ArgumentParser(description="Replay a historical run_id offline against a simulated broker")
+    ap.add_argument("--run-id", required=True)
+    ap.add_argument("--source-url", default=None, help="database holding the run (default REPLAY_SOURCE_URL; opened read-only)")
+    ap.add_argument("--database-url", default=None, help="scratch Postgres (default BENCH_DATABASE_URL)")
+    ap.add_argument("--schema", default="executor_replay")
+    ap.add_argument("--executors", default=None, help="comma list (default: every registered executor)")
+    ap.add_argument("--state", default=None, help="JSON file: account state before the run")
+    for attr in CAP_FLAGS:
+        ap.add_argument("--" + attr.replace("_", "-"), dest=attr, type=int, default=None)
+    ap.add_argument("--buying-power", type=float, default=1_000_000.0, help="starting buying power (--state overrides)")
+    ap.add_argument("--workers", type=int, default=1)
+    ap.add_argument("--async", dest="use_async", action="store_true", help="submit via the async broker path")
+    ap.add_argument("--batch", type=int, default=20)
+    ap.add_argument("--latency-ms", type=float, default=0.0, help="broker call latency")
+    ap.add_argument("--jitter-ms", type=float, default=0.0)
+    ap.add_argument("--fill-latency-ms", type=float, default=50.0, help="accept -> fill delay (<0: orders never fill)")
+    ap.add_argument("--fill-rate", type=float, default=1.0, help="fraction of orders that fill")
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--label", default="")
+    ap.add_argument("--out", default=None, help="JSON output (default bench_results/replay_<ts>.json)")
+    args = ap.parse_args(argv)
+
+    report = run(args)
+
+    out = args.out or os.path.join(
+        "bench_results",
+        "replay_"
+        + datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        + (f"_{args.label}" if args.label else "")
+        + ".json",
+    )
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2, default=str)
+
+    r = report["results"]
+    print(
+        f"[REPLAY] run_id={args.run_id} intents={r['intents']} orders={r['orders_sent']} "
+        f"changed_vs_source={r['changed_vs_source']} wall={r['wall_sec']}s "
+        f"throughput={r['intents_per_sec']}/s -> {out}",
+        flush=True,
+    )
+    for executor, counts in r["decisions_by_executor"].items():
+        print(f"[REPLAY]   {executor}: {json.dumps(counts, sort_keys=True)}", flush=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
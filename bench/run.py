@@ -0,0 +1,403 @@
+from __future__ import annotations
+
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import argparse
+import statistics
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+
+
+# =========================================================
+# OFFLINE END-TO-END BENCHMARK
+#
+# Runs the real stocks_runner drain loop + execute_stocks_intent
+# against FakeTradingClient and a local Postgres (scratch schema):
+#
+#   BENCH_DATABASE_URL=postgresql://localhost/bench \
+#   python -m bench.run --intents 200 --latency-ms 40 --workers 8
+#
+# Results are written as JSON (see --out) so runs can be diffed.
+# =========================================================
+
+BENCH_SCHEMA_SQL = """
+CREATE TABLE job_dispatch (
+    dispatch_id  uuid PRIMARY KEY,
+    ts           timestamptz NOT NULL DEFAULT now(),
+    job_type     text NOT NULL,
+    run_id       uuid,
+    status       text NOT NULL DEFAULT 'queued',
+    allowed      boolean NOT NULL DEFAULT true,
+    payload      jsonb
+);
+
+CREATE TABLE strategy_intents (
+    intent_id          uuid PRIMARY KEY,
+    ts                 timestamptz NOT NULL DEFAULT now(),
+    run_id             uuid NOT NULL,
+    executor           text NOT NULL,
+    symbol             text NOT NULL,
+    strategy           text,
+    priority           numeric NOT NULL DEFAULT 0,
+    source_facts       jsonb,
+    dispatched_ts      timestamptz,
+    dispatched_ok      boolean,
+    dispatched_detail  text
+);
+CREATE INDEX strategy_intents_claim_idx
+    ON strategy_intents (run_id, executor, priority DESC, ts)
+    WHERE dispatched_ts IS NULL;
+
+CREATE TABLE trades (
+    id           bigserial PRIMARY KEY,
+    run_id       uuid,
+    symbol       text,
+    strategy     text,
+    side         text,
+    qty          numeric,
+    entry_price  numeric,
+    entry_time   timestamptz,
+    status       text,
+    opened_by    text,
+    metadata     jsonb
+);
+
+CREATE TABLE trade_events (
+    id          bigserial PRIMARY KEY,
+    ts          timestamptz NOT NULL DEFAULT now(),
+    trade_id    bigint,
+    run_id      uuid,
+    symbol      text,
+    event_type  text,
+    source      text,
+    reason      text,
+    raw         jsonb
+);
+"""
+
+
+def _percentile(xs: List[float], p: float) -> float:
+    if not xs:
+        return 0.0
+    xs = sorted(xs)
+    k = (len(xs) - 1) * p
+    lo = int(k)
+    hi = min(lo + 1, len(xs) - 1)
+    return xs[lo] + (xs[hi] - xs[lo]) * (k - lo)
+
+
+def _setup_env(args) -> str:
+    from psycopg.conninfo import make_conninfo
+
+    dsn = args.database_url or os.getenv("BENCH_DATABASE_URL")
+    if not dsn:
+        raise SystemExit("❌ --database-url or BENCH_DATABASE_URL required (local Postgres)")
+
+    scoped = make_conninfo(dsn, options=f"-c search_path={args.schema}")
+
+    os.environ["DATABASE_URL"] = scoped
+    os.environ.setdefault("APCA_API_KEY_ID", "bench")
+    os.environ.setdefault("APCA_API_SECRET_KEY", "bench")
+    os.environ["EXECUTOR_WORKERS"] = str(args.workers)
+    os.environ["EXECUTOR_CLAIM_BATCH"] = str(args.batch)
+    os.environ["EXECUTOR_PIPELINE_DEPTH"] = str(args.pipeline_depth)
+    os.environ["EXECUTOR_MAX_DISPATCHES"] = str(args.max_dispatches)
+    os.environ["EXECUTOR_WAKE_MODE"] = "poll"
+    os.environ["EXECUTOR_ASYNC_SUBMIT"] = "1" if args.use_async else "0"
+    os.environ["BROKER_RATE_PER_MIN"] = str(args.rate_per_min)
+    os.environ["TRADE_STREAM_ENABLED"] = "0"
+    os.environ.setdefault("MAX_STOCKS_POSITIONS", str(10 ** 6))
+    os.environ.setdefault("MAX_STOCKS_TRADES_PER_DAY", str(10 ** 6))
+    return dsn
+
+
+def _reset_schema(dsn: str, schema: str) -> None:
+    import psycopg
+
+    with psycopg.connect(dsn, autocommit=True) as conn:
+        conn.execute(f"DROP SCHEMA IF EXISTS {schema} CASCADE")
+        conn.execute(f"CREATE SCHEMA {schema}")
+        conn.execute(f"SET search_path = {schema}")
+        conn.execute(BENCH_SCHEMA_SQL)
+
+
+def _seed(*, sizes: List[int], seed: int, bad_rate: float = 0.0) -> List[str]:
+    from psycopg.types.json import Jsonb
+    from common.db import get_conn
+
+    rng = random.Random(seed)
+    run_ids: List[str] = []
+
+    with get_conn() as conn, conn.cursor() as cur:
+        for r, intents in enumerate(sizes):
+            run_id = str(uuid.uuid4())
+            run_ids.append(run_id)
+
+            rows = []
+            for i in range(intents):
+                px = round(rng.uniform(5, 500), 2)
+                pc = {
+                    "side": "buy",
+                    "entry_type": "limit",
+                    "time_in_force": "day",
+                    "limit_price": px,
+                    "qty": rng.randint(1, 50),
+                    "meta": {"entry_price_hint": px},
+                }
+                symbol = f"B{r:02d}{i:05d}"
+                if rng.random() < bad_rate:
+                    # half malformed contracts, half duplicate symbols
+                    if rng.random() < 0.5:
+                        pc.pop("side")
+                    elif i:
+                        symbol = f"B{r:02d}{i - 1:05d}"
+                rows.append(
+                    (
+                        str(uuid.uuid4()),
+                        run_id,
+                        "stocks",
+                        symbol,
+                        "bench",
+                        rng.randint(0, 100),
+                        Jsonb({"planning_context": pc}),
+                    )
+                )
+
+            cur.executemany(
+                """
+                INSERT INTO strategy_intents
+                    (intent_id, run_id, executor, symbol, strategy, priority, source_facts)
+                VALUES (%s, %s, %s, %s, %s, %s, %s)
+                """,
+                rows,
+            )
+            cur.execute(
+                """
+                INSERT INTO job_dispatch (dispatch_id, job_type, run_id, payload)
+                VALUES (%s, 'stocks', %s, '{}'::jsonb)
+                """,
+                (str(uuid.uuid4()), run_id),
+            )
+
+    return run_ids
+
+
+def _run_sizes(args) -> List[int]:
+    if args.run_sizes:
+        return [int(n) for n in args.run_sizes.split(",") if n.strip()]
+    return [args.intents] * args.runs
+
+
+def run(args) -> Dict[str, Any]:
+    dsn = _setup_env(args)
+    _reset_schema(dsn, args.schema)
+
+    # executor imports AFTER env is in place (config is read from env)
+    from common.db import counting_cursor_class, db_roundtrips, set_cursor_factory
+    from common.migrations import apply_migrations
+    from common.logging import flush_trade_events, trade_event_stats
+    from common.job_claim import claim_job
+    from executor.alpaca_client import set_trading_client, set_async_broker, wrap_rate_limited
+    from executor.runners import intent_runner, stocks_runner
+    from bench.fake_broker import FakeTradingClient, FakeAsyncTradingClient
+
+    # statement counting is bench-only (production uses the plain cursor)
+    set_cursor_factory(counting_cursor_class())
+    apply_migrations()
+
+    if args.partitioned:
+        from common.partitions import TABLES, convert_table
+        from executor.config import get_settings
+
+        for spec in TABLES.values():
+            convert_table(spec, settings=get_settings().partition_settings())
+
+    broker = FakeTradingClient(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        buying_power=args.buying_power,
+        seed=args.seed,
+    )
+    set_trading_client(wrap_rate_limited(broker) if args.rate_per_min > 0 else broker)
+    if args.use_async:
+        set_async_broker(FakeAsyncTradingClient(broker))
+
+    sizes = _run_sizes(args)
+    run_ids = _seed(sizes=sizes, seed=args.seed, bad_rate=args.bad_rate)
+
+    # claim time per symbol (symbols are unique per intent)
+    claimed_at: Dict[str, float] = {}
+    real_claim = intent_runner.claim_next_intents
+    real_write = intent_runner.set_intent_results
+    db_delay = args.db_latency_ms / 1000.0
+
+    def _claim_and_stamp(**kw):
+        if db_delay:
+            time.sleep(db_delay)
+        rows = real_claim(**kw)
+        now = time.perf_counter()
+        for r in rows:
+            claimed_at[str(r["symbol"]).upper()] = now
+        return rows
+
+    def _write(results):
+        # remote-DB round trip on the write-back too
+        if db_delay:
+            time.sleep(db_delay)
+        return real_write(results)
+
+    # completion time per dispatch (seconds since the first claim)
+    done_at: Dict[str, float] = {}
+    real_done = intent_runner.mark_done
+
+    def _done(dispatch_id, **kw):
+        done_at[str(dispatch_id)] = time.perf_counter() - t0
+        return real_done(dispatch_id, **kw)
+
+    intent_runner.claim_next_intents = _claim_and_stamp
+    intent_runner.set_intent_results = _write
+    intent_runner.mark_done = _done
+
+    pool = None
+    if args.workers > 1:
+        from concurrent.futures import ThreadPoolExecutor
+
+        pool = ThreadPoolExecutor(max_workers=args.workers)
+
+    # a real worker loads alpaca-py during its startup account check,
+    # before the first claim; do the same so the first order is not
+    # timed with the import
+    import alpaca.trading.requests  # noqa: F401
+
+    rt0 = db_roundtrips()
+    t0 = time.perf_counter()
+
+    summaries = []
+    try:
+        while True:
+            job = claim_job(job_types=stocks_runner.JOB_TYPES, claimed_by="bench")
+            if not job:
+                break
+            if args.max_dispatches > 1:
+                from executor.fair import FairDrainer
+
+                summaries.extend(FairDrainer(stocks_runner.JOB_TYPES, claimed_by="bench", pool=pool).run(job))
+            else:
+                summaries.append(stocks_runner.drain_dispatch(job, pool=pool))
+    finally:
+        intent_runner.claim_next_intents = real_claim
+        intent_runner.set_intent_results = real_write
+        intent_runner.mark_done = real_done
+        if pool is not None:
+            pool.shutdown(wait=True)
+
+    flush_trade_events()
+    wall = time.perf_counter() - t0
+    roundtrips = db_roundtrips() - rt0
+
+    total = sum(sizes)
+    lat_ms = [
+        (broker.submit_times[s] - claimed_at[s]) * 1000.0
+        for s in broker.submit_times
+        if s in claimed_at
+    ]
+
+    return {
+        "label": args.label,
+        "ts": datetime.now(timezone.utc).isoformat(),
+        "params": {
+            "run_sizes": sizes,
+            "max_dispatches": args.max_dispatches,
+            "partitioned": args.partitioned,
+            "workers": args.workers,
+            "async": args.use_async,
+            "batch": args.batch,
+            "pipeline_depth": args.pipeline_depth,
+            "db_latency_ms": args.db_latency_ms,
+            "latency_ms": args.latency_ms,
+            "jitter_ms": args.jitter_ms,
+            "error_rate": args.error_rate,
+            "throttle_rate": args.throttle_rate,
+            "rate_per_min": args.rate_per_min,
+            "buying_power": args.buying_power,
+            "bad_rate": args.bad_rate,
+            "seed": args.seed,
+        },
+        "results": {
+            "intents": total,
+            "submitted": len(lat_ms),
+            "wall_sec": round(wall, 4),
+            "intents_per_sec": round(total / wall, 2) if wall > 0 else None,
+            "claim_to_submit_ms": {
+                "p50": round(_percentile(lat_ms, 0.50), 3),
+                "p99": round(_percentile(lat_ms, 0.99), 3),
+                "mean": round(statistics.fmean(lat_ms), 3) if lat_ms else 0.0,
+            },
+            "db_roundtrips": roundtrips,
+            "db_roundtrips_per_intent": round(roundtrips / total, 3) if total else None,
+            "broker": broker.stats(),
+            "trade_events": trade_event_stats(),
+            "dispatches": [
+                dict(s, intents=sizes[run_ids.index(s["run_id"])], done_at_sec=round(done_at.get(s["dispatch_id"], 0.0), 4))
+                for s in summaries
+                if s
+            ],
+        },
+    }
+
+
+def main(argv: List[str]) -> int:
+    ap = argparse.ArgumentParser(description="Offline executor benchmark")
+    ap.add_argument("--database-url", default=None)
+    ap.add_argument("--schema", default="executor_bench")
+    ap.add_argument("--runs", type=int, default=1)
+    ap.add_argument("--intents", type=int, default=200)
+    ap.add_argument("--run-sizes", default="", help="intents per run, e.g. 2000,20 (overrides --runs/--intents)")
+    ap.add_argument("--max-dispatches", type=int, default=1, help=">1: interleave that many runs (executor.fair)")
+    ap.add_argument("--workers", type=int, default=1)
+    ap.add_argument("--async", dest="use_async", action="store_true", help="submit via the async broker path")
+    ap.add_argument("--batch", type=int, default=20)
+    ap.add_argument("--pipeline-depth", type=int, default=1, help="0: serial claim -> execute -> write loop")
+    ap.add_argument("--db-latency-ms", type=float, default=0.0, help="added to each claim / result write-back (remote DB)")
+    ap.add_argument("--latency-ms", type=float, default=20.0)
+    ap.add_argument("--jitter-ms", type=float, default=5.0)
+    ap.add_argument("--error-rate", type=float, default=0.0)
+    ap.add_argument("--throttle-rate", type=float, default=0.0, help="fraction of broker calls answered 429")
+    ap.add_argument("--rate-per-min", type=float, default=0.0, help=">0: put the fake broker behind the rate limiter")
+    ap.add_argument("--buying-power", type=float, default=1e9, help="fake account buying power (sizing funds buys from it)")
+    ap.add_argument("--partitioned", action="store_true", help="convert the scratch tables to time-range partitions first")
+    ap.add_argument("--bad-rate", type=float, default=0.0, help="fraction of malformed/duplicate intents")
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--label", default="")
+    ap.add_argument("--out", default=None, help="JSON output (default bench_results/<ts>.json)")
+    args = ap.parse_args(argv)
+
+    report = run(args)
+
+    out = args.out or os.path.join(
+        "bench_results",
+        datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ") + (f"_{args.label}" if args.label else "") + ".json",
+    )
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2, default=str)
+
+    r = report["results"]
+    print(
+        f"[BENCH] intents={r['intents']} wall={r['wall_sec']}s "
+        f"throughput={r['intents_per_sec']}/s "
+        f"p50={r['claim_to_submit_ms']['p50']}ms p99={r['claim_to_submit_ms']['p99']}ms "
+        f"db_rt/intent={r['db_roundtrips_per_intent']} -> {out}",
+        flush=True,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,199 @@
+from __future__ import annotations
+
+import time
+import uuid
+from types import SimpleNamespace
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Union
+from datetime import datetime, timedelta, timezone
+
+from bench.fake_broker import FakeTradingClient
+
+
+# =========================================================
+# SIMULATED BROKER (replays)
+#
+# A FakeTradingClient that also models what the guards read:
+#   - open orders: accepted orders fill after fill_latency_ms
+#     (a fill_rate fraction of them; the rest stay open)
+#   - positions: a filled buy opens/grows one, a sell shrinks it
+#   - today's fills: filled orders carry filled_at, so the daily
+#     fill counter sees them like real ones
+#   - buying power: an accepted buy with a price spends qty * price
+# Starting state (positions, open buys, buys filled earlier
+# today) comes from seed_state(). Every submit is recorded with
+# its full request in `sent`: the orders a replay would have sent.
+# =========================================================
+
+
+def _enum_str(v: Any) -> Optional[str]:
+    if v is None:
+        return None
+    return str(getattr(v, "value", v)).lower()
+
+
+def _leg(v: Any) -> Optional[Dict[str, Any]]:
+    if v is None:
+        return None
+    return {
+        k: getattr(v, k)
+        for k in ("limit_price", "stop_price")
+        if getattr(v, k, None) is not None
+    }
+
+
+def describe_order(order_data: Any) -> Dict[str, Any]:
+    """
+    The fields of an alpaca-py order request that matter when
+    comparing replays (plain JSON types).
+    """
+    return {
+        "client_order_id": getattr(order_data, "client_order_id", None),
+        "symbol": str(getattr(order_data, "symbol", "")).upper(),
+        "side": _enum_str(getattr(order_data, "side", None)),
+        "qty": getattr(order_data, "qty", None),
+        "type": _enum_str(getattr(order_data, "type", None)),
+        "time_in_force": _enum_str(getattr(order_data, "time_in_force", None)),
+        "limit_price": getattr(order_data, "limit_price", None),
+        "stop_price": getattr(order_data, "stop_price", None),
+        "order_class": _enum_str(getattr(order_data, "order_class", None)),
+        "take_profit": _leg(getattr(order_data, "take_profit", None)),
+        "stop_loss": _leg(getattr(order_data, "stop_loss", None)),
+    }
+
+
+class SimulatedBroker(FakeTradingClient):
+    """
+    FakeTradingClient with fills, positions and a sent-order log.
+
+    fill_latency_ms=None keeps every order open (nothing fills).
+    Fills are applied lazily, on the next broker call after they
+    are due, so no background thread is needed.
+    """
+
+    def __init__(
+        self,
+        *,
+        fill_latency_ms: Optional[float] = 50.0,
+        fill_rate: float = 1.0,
+        **kw: Any,
+    ):
+        super().__init__(**kw)
+        self.fill_latency_ms = fill_latency_ms
+        self.fill_rate = fill_rate
+        self.sent: List[Dict[str, Any]] = []
+        self.fills = 0
+        self._fill_due: Dict[str, float] = {}  # order id -> perf_counter due
+
+    # --------------------------------------------------
+    # STARTING STATE
+    # --------------------------------------------------
+
+    def seed_state(
+        self,
+        *,
+        positions: Optional[Mapping[str, float]] = None,
+        open_buys: Iterable[str] = (),
+        filled_buys_today: Union[int, Iterable[str]] = (),
+    ) -> None:
+        """
+        Account state before the replayed run: held positions, buy
+        orders still open, and buys already filled today (symbols,
+        or just a count).
+        """
+        now = datetime.now(timezone.utc)
+        earlier = now - timedelta(seconds=1)
+
+        if isinstance(filled_buys_today, int):
+            filled_buys_today = [f"SEEDFILL{i}" for i in range(filled_buys_today)]
+
+        with self._lock:
+            for sym, qty in (positions or {}).items():
+                if float(qty):
+                    self.positions[sym.upper()] = float(qty)
+            for sym in open_buys:
+                self.orders.append(self._seed_order(sym, earlier, status="accepted"))
+            for sym in filled_buys_today:
+                self.orders.append(self._seed_order(sym, earlier, status="filled", filled_at=earlier))
+
+    @staticmethod
+    def _seed_order(symbol: str, ts: datetime, *, status: str, filled_at: Optional[datetime] = None) -> SimpleNamespace:
+        return SimpleNamespace(
+            id=uuid.uuid4(),
+            symbol=symbol.upper(),
+            side="buy",
+            qty="1",
+            status=status,
+            submitted_at=ts,
+            filled_at=filled_at,
+        )
+
+    # --------------------------------------------------
+    # FILLS
+    # --------------------------------------------------
+
+    def _call(self, name: str) -> None:
+        self._advance()
+        super()._call(name)
+
+    def _advance(self) -> None:
+        if not self._fill_due:
+            return
+        now_pc = time.perf_counter()
+        now = datetime.now(timezone.utc)
+        with self._lock:
+            due = [oid for oid, t in self._fill_due.items() if t <= now_pc]
+            if not due:
+                return
+            due_ids = set(due)
+            for oid in due:
+                del self._fill_due[oid]
+            for o in self.orders:
+                if str(o.id) in due_ids and o.status in ("new", "accepted", "partially_filled"):
+                    self._fill(o, now)
+
+    def _fill(self, o: SimpleNamespace, now: datetime) -> None:
+        qty = float(o.qty or 0)
+        o.status = "filled"
+        o.filled_at = now
+        held = self.positions.get(o.symbol, 0.0) + (qty if o.side == "buy" else -qty)
+        if held:
+            self.positions[o.symbol] = held
+        else:
+            self.positions.pop(o.symbol, None)
+        self.fills += 1
+
+    def _accept(self, order_data) -> SimpleNamespace:
+        o = super()._accept(order_data)
+        sent = describe_order(order_data)
+        px = sent["limit_price"] or sent["stop_price"]
+        with self._lock:
+            self.sent.append(dict(sent, accepted_at=o.submitted_at.isoformat()))
+            if sent["side"] == "buy" and px:
+                self.buying_power -= float(sent["qty"] or 0) * float(px)
+            if self.fill_latency_ms is not None and self._rng.random() < self.fill_rate:
+                self._fill_due[str(o.id)] = time.perf_counter() + self.fill_latency_ms / 1000.0
+        return o
+
+    def settle(self) -> None:
+        """
+        Apply every pending fill now (end of a replay).
+        """
+        now = datetime.now(timezone.utc)
+        with self._lock:
+            due_ids = set(self._fill_due)
+            self._fill_due.clear()
+            for o in self.orders:
+                if str(o.id) in due_ids and o.status in ("new", "accepted", "partially_filled"):
+                    self._fill(o, now)
+
+    def state(self) -> Dict[str, Any]:
+        with self._lock:
+            open_orders = [o for o in self.orders if o.status in ("new", "accepted", "partially_filled")]
+            return {
+                "positions": dict(self.positions),
+                "open_orders": len(open_orders),
+                "open_buy_symbols": sorted({o.symbol for o in open_orders if o.side == "buy"}),
+                "filled_orders": sum(1 for o in self.orders if o.status == "filled"),
+                "fills_during_replay": self.fills,
+                "buying_power": round(self.buying_power, 2),
+            }
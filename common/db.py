@@ -1,10 +1,14 @@
 from __future__ import annotations
 
 import os
+import atexit
+import threading
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Optional
 from urllib.parse import urlparse, urlunparse
 
-import psycopg
-from psycopg.rows import dict_row
+if TYPE_CHECKING:
+    from psycopg_pool import ConnectionPool
 
 
 RAW_DATABASE_URL = os.getenv("DATABASE_URL")
@@ -22,10 +26,175 @@ def _normalized_dsn(dsn: str) -> str:
 
 DATABASE_URL = _normalized_dsn(RAW_DATABASE_URL)
 
+# ---------------------------------------------------------
+# PROCESS-WIDE CONNECTION POOL
+# - one pool per process (created lazily, so forked workers
+#   never inherit a parent's sockets)
+# - connections are health-checked on checkout
+# - sized by DB_POOL_*, parsed and validated with the executor
+#   config (get_settings() hands them over via configure_pool());
+#   importing this module reads none of them
+# ---------------------------------------------------------
+
+
+@dataclass(frozen=True)
+class PoolSettings:
+    # defaults as in executor.config
+    min_size: int = 1
+    max_size: int = 10
+    max_idle_sec: float = 300.0
+    max_lifetime_sec: float = 1800.0
+    timeout_sec: float = 10.0
+
+
+_pool_settings = PoolSettings()
+
+
+def configure_pool(settings: PoolSettings) -> None:
+    """
+    Size / limits for pools opened from now on in this process (an
+    already open pool keeps its own until close_pool()).
+    """
+    global _pool_settings
+    _pool_settings = settings
+
+
+_cursor_class = None
+# None: psycopg's default cursor (production)
+_cursor_factory = None
+
+
+def counting_cursor_class():
+    """
+    psycopg.Cursor subclass that counts statements sent to the server
+    (round trips) per process. Read with db_roundtrips(). Benchmark
+    only (every statement takes a process-wide lock): install it with
+    set_cursor_factory(). Built on first use so importing this module
+    does not import psycopg.
+    """
+    global _cursor_class
+    if _cursor_class is not None:
+        return _cursor_class
+
+    import psycopg
+
+    class _CountingCursor(psycopg.Cursor):
+        def execute(self, *args, **kwargs):
+            _count_roundtrip()
+            return super().execute(*args, **kwargs)
+
+        def executemany(self, *args, **kwargs):
+            _count_roundtrip()
+            return super().executemany(*args, **kwargs)
+
+        def copy(self, *args, **kwargs):
+            _count_roundtrip()
+            return super().copy(*args, **kwargs)
+
+    _cursor_class = _CountingCursor
+    return _cursor_class
+
+
+_roundtrips = 0
+_roundtrips_lock = threading.Lock()
+
+
+def _count_roundtrip() -> None:
+    global _roundtrips
+    with _roundtrips_lock:
+        _roundtrips += 1
+
+
+def db_roundtrips() -> int:
+    # stays 0 unless counting_cursor_class() was installed
+    return _roundtrips
+
+
+def set_cursor_factory(factory) -> None:
+    """
+    Cursor class for pooled connections (None: psycopg's default).
+    Closes this process's pool, so every connection opened from now
+    on uses it.
+    """
+    global _cursor_factory
+    _cursor_factory = factory
+    close_pool()
+
+
+_pool: Optional[ConnectionPool] = None
+_pool_pid: Optional[int] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    global _pool, _pool_pid
+
+    pid = os.getpid()
+    if _pool is not None and _pool_pid == pid:
+        return _pool
+
+    with _pool_lock:
+        if _pool is not None and _pool_pid == pid:
+            return _pool
+
+        from psycopg.rows import dict_row
+        from psycopg_pool import ConnectionPool
+        from common.serialization import register_psycopg
+
+        # json/jsonb (Jsonb(...) params, jsonb columns) via common.serialization
+        register_psycopg()
+
+        kwargs = {"autocommit": True, "row_factory": dict_row}
+        if _cursor_factory is not None:
+            kwargs["cursor_factory"] = _cursor_factory
+
+        ps = _pool_settings
+        _pool = ConnectionPool(
+            DATABASE_URL,
+            min_size=ps.min_size,
+            max_size=max(ps.max_size, ps.min_size),
+            max_idle=ps.max_idle_sec,
+            max_lifetime=ps.max_lifetime_sec,
+            timeout=ps.timeout_sec,
+            check=ConnectionPool.check_connection,
+            kwargs=kwargs,
+            name="executor",
+            open=False,
+        )
+        _pool.open()
+        _pool_pid = pid
+
+        print(
+            f"[DB] pool opened min={ps.min_size} max={ps.max_size} "
+            f"max_idle={ps.max_idle_sec}s",
+            flush=True,
+        )
+
+    return _pool
+
+
+def close_pool() -> None:
+    global _pool, _pool_pid
+
+    with _pool_lock:
+        if _pool is not None and _pool_pid == os.getpid():
+            try:
+                _pool.close()
+            except Exception:
+                pass
+        _pool = None
+        _pool_pid = None
+
+
+atexit.register(close_pool)
+
 
 def get_conn():
-    return psycopg.connect(
-        DATABASE_URL,
-        autocommit=True,
-        row_factory=dict_row,
-    )
+    """
+    Borrow a pooled connection.
+
+    Usage is unchanged for callers:
+        with get_conn() as conn, conn.cursor() as cur: ...
+    The connection goes back to the pool when the block exits.
+    """
+    return get_pool().connection()
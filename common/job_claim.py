@@ -3,11 +3,16 @@ from __future__ import annotations
 from typing import Optional, List, Dict, Any
 from datetime import datetime, timezone
 
-from psycopg.types.json import Jsonb
-
 from common.db import get_conn
 
 
+def _jsonb(obj: Any):
+    # psycopg's Jsonb wrapper, imported on first use (keeps import cheap)
+    from psycopg.types.json import Jsonb
+
+    return Jsonb(obj)
+
+
 def _row_get(row: Any, key: str, idx: int):
     # psycopg dict_row returns a dict-like; normal cursor returns tuple
     if row is None:
@@ -20,7 +25,19 @@ def _row_get(row: Any, key: str, idx: int):
         return None
 
 
-def claim_job(*, job_types: List[str], claimed_by: str) -> Optional[Dict[str, Any]]:
+def claim_job(
+    *,
+    job_types: List[str],
+    claimed_by: str,
+    lease_sec: int = 60,
+) -> Optional[Dict[str, Any]]:
+    """
+    Claim the oldest queued job and take a lease on it: the claimer
+    must extend_lease() before lease_expires_at or the reaper hands
+    the job to someone else. A job requeued with to_back / delay_sec
+    counts as queued at requeued_at, not ts, and is not claimed
+    before then.
+    """
     if not job_types:
         return None
 
@@ -36,13 +53,16 @@ def claim_job(*, job_types: List[str], claimed_by: str) -> Optional[Dict[str, An
                     WHERE status = 'queued'
                       AND allowed = true
                       AND job_type = ANY(%s::text[])
-                    ORDER BY ts ASC
+                      AND (requeued_at IS NULL OR requeued_at <= now())
+                    ORDER BY COALESCE(requeued_at, ts) ASC
                     LIMIT 1
                     FOR UPDATE SKIP LOCKED
                 )
                 UPDATE job_dispatch
                 SET
                     status = 'running',
+                    claimed_by = %s,
+                    lease_expires_at = now() + make_interval(secs => %s),
                     payload = COALESCE(payload,'{}'::jsonb)
                               || %s::jsonb
                 WHERE dispatch_id IN (SELECT dispatch_id FROM candidate)
@@ -50,11 +70,14 @@ def claim_job(*, job_types: List[str], claimed_by: str) -> Optional[Dict[str, An
                     dispatch_id,
                     job_type,
                     run_id,
-                    payload
+                    payload,
+                    EXTRACT(EPOCH FROM now() - COALESCE(requeued_at, ts))::float8 AS queue_wait_sec
                 """,
                 (
                     job_types,
-                    Jsonb({"claimed_at": now, "claimed_by": claimed_by}),
+                    claimed_by,
+                    float(lease_sec),
+                    _jsonb({"claimed_at": now, "claimed_by": claimed_by}),
                 ),
             )
             row = cur.fetchone()
@@ -65,20 +88,33 @@ def claim_job(*, job_types: List[str], claimed_by: str) -> Optional[Dict[str, An
             job_type = _row_get(row, "job_type", 1)
             run_id = _row_get(row, "run_id", 2)
             payload = _row_get(row, "payload", 3)
+            queue_wait_sec = _row_get(row, "queue_wait_sec", 4)
 
             return {
                 "dispatch_id": str(dispatch_id) if dispatch_id else None,
                 "job_type": str(job_type) if job_type else None,
                 "run_id": str(run_id) if run_id else None,
                 "payload": payload or {},
+                "claimed_by": claimed_by,
+                "lease_sec": lease_sec,
+                "queue_wait_sec": float(queue_wait_sec or 0.0),
             }
 
     except Exception as e:
+        # schema errors (SQLSTATE class 42: missing column/table) do not
+        # heal on retry; surface them instead of idling forever
+        if str(getattr(e, "sqlstate", "") or "").startswith("42"):
+            raise
         print(f"[JOB_CLAIM] claim failed err={e}", flush=True)
         return None
 
 
-def mark_done(dispatch_id: str, *, extra: Optional[dict] = None) -> None:
+def mark_done(
+    dispatch_id: str,
+    *,
+    extra: Optional[dict] = None,
+    claimed_by: Optional[str] = None,
+) -> None:
     if not dispatch_id or dispatch_id in ("dispatch_id",):
         print(f"[JOB_CLAIM] mark_done invalid dispatch_id={dispatch_id}", flush=True)
         return
@@ -90,25 +126,41 @@ def mark_done(dispatch_id: str, *, extra: Optional[dict] = None) -> None:
                 UPDATE job_dispatch
                 SET
                     status = 'done',
+                    lease_expires_at = NULL,
                     payload = COALESCE(payload,'{}'::jsonb)
                               || %s::jsonb
                 WHERE dispatch_id = %s::uuid
+                  AND (%s::text IS NULL OR claimed_by = %s::text)
                 """,
                 (
-                    Jsonb(
+                    _jsonb(
                         {
                             "done_at": datetime.now(timezone.utc).isoformat(),
                             **(extra or {}),
                         }
                     ),
                     dispatch_id,
+                    claimed_by,
+                    claimed_by,
                 ),
             )
+            if claimed_by and not cur.rowcount:
+                print(
+                    f"[JOB_CLAIM] mark_done skipped dispatch_id={dispatch_id} "
+                    f"(no longer claimed by {claimed_by})",
+                    flush=True,
+                )
     except Exception as e:
         print(f"[JOB_CLAIM] mark_done failed dispatch_id={dispatch_id} err={e}", flush=True)
 
 
-def mark_error(dispatch_id: str, error: str, *, extra: Optional[dict] = None) -> None:
+def mark_error(
+    dispatch_id: str,
+    error: str,
+    *,
+    extra: Optional[dict] = None,
+    claimed_by: Optional[str] = None,
+) -> None:
     if not dispatch_id or dispatch_id in ("dispatch_id",):
         print(f"[JOB_CLAIM] mark_error invalid dispatch_id={dispatch_id}", flush=True)
         return
@@ -120,12 +172,14 @@ def mark_error(dispatch_id: str, error: str, *, extra: Optional[dict] = None) ->
                 UPDATE job_dispatch
                 SET
                     status = 'error',
+                    lease_expires_at = NULL,
                     payload = COALESCE(payload,'{}'::jsonb)
                               || %s::jsonb
                 WHERE dispatch_id = %s::uuid
+                  AND (%s::text IS NULL OR claimed_by = %s::text)
                 """,
                 (
-                    Jsonb(
+                    _jsonb(
                         {
                             "error_at": datetime.now(timezone.utc).isoformat(),
                             "error": str(error)[:500],
@@ -133,7 +187,98 @@ def mark_error(dispatch_id: str, error: str, *, extra: Optional[dict] = None) ->
                         }
                     ),
                     dispatch_id,
+                    claimed_by,
+                    claimed_by,
                 ),
             )
+            if claimed_by and not cur.rowcount:
+                print(
+                    f"[JOB_CLAIM] mark_error skipped dispatch_id={dispatch_id} "
+                    f"(no longer claimed by {claimed_by})",
+                    flush=True,
+                )
     except Exception as e:
         print(f"[JOB_CLAIM] mark_error failed dispatch_id={dispatch_id} err={e}", flush=True)
+
+
+def requeue_job(
+    dispatch_id: str,
+    *,
+    reason: str,
+    extra: Optional[dict] = None,
+    claimed_by: Optional[str] = None,
+    to_back: bool = False,
+    delay_sec: float = 0.0,
+) -> None:
+    """
+    Hand a running job back to the queue (e.g. worker shutting down
+    mid-drain). Intents already dispatched stay dispatched; the next
+    claimer drains the rest. to_back: claimed after every job queued
+    before now (a yielded slot), instead of first again. delay_sec:
+    not claimable before now + delay_sec (retry backoff; implies
+    to_back).
+    """
+    if not dispatch_id or dispatch_id in ("dispatch_id",):
+        print(f"[JOB_CLAIM] requeue_job invalid dispatch_id={dispatch_id}", flush=True)
+        return
+
+    try:
+        with get_conn() as conn, conn.cursor() as cur:
+            cur.execute(
+                """
+                UPDATE job_dispatch
+                SET
+                    status = 'queued',
+                    lease_expires_at = NULL,
+                    claimed_by = NULL,
+                    requeued_at = CASE
+                        WHEN %s THEN now() + make_interval(secs => %s)
+                        ELSE requeued_at
+                    END,
+                    payload = COALESCE(payload,'{}'::jsonb)
+                              || %s::jsonb
+                WHERE dispatch_id = %s::uuid
+                  AND status = 'running'
+                  AND (%s::text IS NULL OR claimed_by = %s::text)
+                """,
+                (
+                    bool(to_back or delay_sec > 0),
+                    float(max(delay_sec, 0.0)),
+                    _jsonb(
+                        {
+                            "requeued_at": datetime.now(timezone.utc).isoformat(),
+                            "requeue_reason": str(reason)[:200],
+                            **(extra or {}),
+                        }
+                    ),
+                    dispatch_id,
+                    claimed_by,
+                    claimed_by,
+                ),
+            )
+    except Exception as e:
+        print(f"[JOB_CLAIM] requeue_job failed dispatch_id={dispatch_id} err={e}", flush=True)
+
+
+def extend_lease(dispatch_id: str, *, claimed_by: str, lease_sec: int) -> Optional[bool]:
+    """
+    Heartbeat: push lease_expires_at to now() + lease_sec.
+    True = still ours, False = lease lost (reaped / re-claimed),
+    None = could not reach the DB (unknown; try again).
+    """
+    try:
+        with get_conn() as conn, conn.cursor() as cur:
+            cur.execute(
+                """
+                UPDATE job_dispatch
+                SET lease_expires_at = now() + make_interval(secs => %s)
+                WHERE dispatch_id = %s::uuid
+                  AND status = 'running'
+                  AND claimed_by = %s
+                """,
+                (float(lease_sec), dispatch_id, claimed_by),
+            )
+            return bool(cur.rowcount)
+    except Exception as e:
+        print(f"[JOB_CLAIM] extend_lease failed dispatch_id={dispatch_id} err={e}", flush=True)
+        return None
@@ -1,28 +1,240 @@
 from __future__ import annotations
 
 import os
-import json
-from typing import Optional, Dict, Any
+import time
+import queue
+import atexit
+import threading
+from typing import Optional, Dict, Any, List, Tuple
 
-import psycopg
-from psycopg.types.json import Jsonb
+from common.metrics import REGISTRY, inc
+from common.serialization import dumps_str
+
+
+# ---------------------------------------------------------
+# trade_events WRITER
+# - log_trade_event() only enqueues (microseconds on the submit path)
+# - a background thread flushes batches with COPY
+# - bounded queue: when full, events are dropped and counted
+# ---------------------------------------------------------
+
+REGISTRY.describe("executor_trade_events_dropped_total", "trade_events rows dropped (writer queue full)")
+REGISTRY.describe("executor_trade_events_failed_total", "trade_events rows the writer could not write")
+
+TRADE_EVENTS_ASYNC = os.getenv("TRADE_EVENTS_ASYNC", "1").strip().lower() in ("1", "true", "yes")
+TRADE_EVENTS_FLUSH_SEC = float(os.getenv("TRADE_EVENTS_FLUSH_SEC", "0.5"))
+TRADE_EVENTS_BATCH_SIZE = int(os.getenv("TRADE_EVENTS_BATCH_SIZE", "200"))
+TRADE_EVENTS_QUEUE_MAX = int(os.getenv("TRADE_EVENTS_QUEUE_MAX", "10000"))
+
+_COLUMNS = "trade_id, run_id, symbol, event_type, source, reason, raw"
+
+EventRow = Tuple[Optional[int], Optional[str], str, str, str, Optional[str], Any]
 
 
 def _get_conn():
-    dsn = os.getenv("DATABASE_URL")
-    if not dsn:
+    """
+    Borrow a connection from the shared pool (common.db).
+    Returns None when the DB is not configured / reachable so
+    event logging can never break the executor.
+    """
+    if not os.getenv("DATABASE_URL"):
         return None
     try:
-        return psycopg.connect(dsn, autocommit=True)
+        from common.db import get_conn
+
+        return get_conn()
     except Exception:
         return None
 
 
-def _safe_json(x: Any) -> Dict[str, Any]:
+def _json_text(x: Any) -> str:
     try:
-        return json.loads(json.dumps(x or {}, default=str))
+        return dumps_str(x or {})
     except Exception:
-        return {}
+        return "{}"
+
+
+def _write_rows(rows: List[EventRow]) -> int:
+    """
+    COPY the batch in one round trip. If COPY rejects the batch
+    for its data (one bad row fails all of it), retry row by row so
+    only the bad rows are lost. Any other error (connection lost,
+    pool timeout) would fail every row the same way: the batch is
+    given up instead. Returns the number of rows written.
+    """
+    ctx = _get_conn()
+    if ctx is None:
+        return 0
+
+    import psycopg
+
+    encoded = [r[:6] + (_json_text(r[6]),) for r in rows]
+
+    try:
+        with ctx as conn, conn.cursor() as cur:
+            with cur.copy(f"COPY trade_events ({_COLUMNS}) FROM STDIN") as cp:
+                for row in encoded:
+                    cp.write_row(row)
+        return len(encoded)
+    except (psycopg.DataError, psycopg.IntegrityError) as e:
+        print(f"[TRADE_EVENTS] copy rejected rows={len(encoded)} err={e}", flush=True)
+    except Exception as e:
+        print(f"[TRADE_EVENTS] copy failed, batch dropped rows={len(encoded)} err={e}", flush=True)
+        return 0
+
+    written = 0
+    for row in encoded:
+        ctx = _get_conn()
+        if ctx is None:
+            break
+        try:
+            with ctx as conn, conn.cursor() as cur:
+                cur.execute(
+                    f"INSERT INTO trade_events ({_COLUMNS}) VALUES (%s,%s,%s,%s,%s,%s,%s::jsonb)",
+                    row,
+                )
+            written += 1
+        except (psycopg.DataError, psycopg.IntegrityError):
+            continue
+        except Exception as e:
+            print(f"[TRADE_EVENTS] row insert failed, batch dropped err={e}", flush=True)
+            break
+    return written
+
+
+class TradeEventWriter:
+    def __init__(self, *, flush_sec: float, batch_size: int, queue_max: int):
+        self.flush_sec = max(flush_sec, 0.01)
+        self.batch_size = max(batch_size, 1)
+        self._q: "queue.Queue[EventRow]" = queue.Queue(maxsize=max(queue_max, 1))
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="trade-events-writer", daemon=True)
+            self._thread.start()
+
+    def put(self, row: EventRow) -> bool:
+        try:
+            self._q.put_nowait(row)
+            ok = True
+        except queue.Full:
+            ok = False
+        with self._lock:
+            if ok:
+                self.enqueued += 1
+            else:
+                self.dropped += 1
+        if not ok:
+            inc("executor_trade_events_dropped_total")
+        return ok
+
+    def _fill(self, batch: List[EventRow]) -> List[EventRow]:
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._q.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _flush(self, batch: List[EventRow]) -> None:
+        if not batch:
+            return
+        n = _write_rows(batch)
+        with self._lock:
+            self.written += n
+            self.failed += len(batch) - n
+        if n < len(batch):
+            inc("executor_trade_events_failed_total", float(len(batch) - n))
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                first = self._q.get(timeout=self.flush_sec)
+            except queue.Empty:
+                continue
+
+            # let a batch accumulate for up to flush_sec
+            deadline = time.monotonic() + self.flush_sec
+            batch = self._fill([first])
+            while len(batch) < self.batch_size and not self._stop.is_set():
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    break
+                try:
+                    batch.append(self._q.get(timeout=left))
+                except queue.Empty:
+                    break
+                self._fill(batch)
+
+            self._flush(batch)
+
+        # shutdown: write everything still queued
+        while True:
+            batch = self._fill([])
+            if not batch:
+                break
+            self._flush(batch)
+
+    def close(self, timeout: float = 10.0) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+        self._thread = None
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "queued": self._q.qsize(),
+        }
+
+
+_writer: Optional[TradeEventWriter] = None
+_writer_lock = threading.Lock()
+
+
+def _get_writer() -> TradeEventWriter:
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = TradeEventWriter(
+                    flush_sec=TRADE_EVENTS_FLUSH_SEC,
+                    batch_size=TRADE_EVENTS_BATCH_SIZE,
+                    queue_max=TRADE_EVENTS_QUEUE_MAX,
+                )
+    _writer.start()
+    return _writer
+
+
+def flush_trade_events(timeout: float = 10.0) -> None:
+    """
+    Stop the background writer after writing every queued event.
+    The next log_trade_event() call starts it again.
+    """
+    if _writer is not None:
+        _writer.close(timeout)
+
+
+atexit.register(flush_trade_events)
+
+
+def trade_event_stats() -> Dict[str, int]:
+    if _writer is None:
+        return {"enqueued": 0, "written": 0, "dropped": 0, "failed": 0, "queued": 0}
+    return _writer.stats()
 
 
 def log_trade_event(
@@ -35,29 +247,21 @@ def log_trade_event(
     reason: Optional[str] = None,
     raw: Optional[dict] = None,
 ):
-    conn = _get_conn()
-    if not conn:
+    row: EventRow = (
+        trade_id,
+        run_id,
+        symbol.upper(),
+        event_type,
+        source,
+        reason,
+        raw,
+    )
+
+    if TRADE_EVENTS_ASYNC:
+        _get_writer().put(row)
         return
+
     try:
-        with conn.cursor() as cur:
-            cur.execute(
-                """
-                INSERT INTO trade_events (
-                    trade_id, run_id, symbol, event_type, source, reason, raw
-                )
-                VALUES (%s,%s,%s,%s,%s,%s,%s::jsonb)
-                """,
-                (
-                    trade_id,
-                    run_id,
-                    symbol.upper(),
-                    event_type,
-                    source,
-                    reason,
-                    Jsonb(_safe_json(raw)),
-                ),
-            )
+        _write_rows([row])
     except Exception:
         pass
-    finally:
-        conn.close()
@@ -0,0 +1,243 @@
+from __future__ import annotations
+
+import os
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Dict, Tuple, List, Optional, Iterator
+
+if TYPE_CHECKING:
+    from http.server import ThreadingHTTPServer
+
+
+# =========================================================
+# IN-PROCESS METRICS (Prometheus text format, no dependencies)
+#
+#   with timed("submit_order"):
+#       client.submit_order(req)
+#
+#   inc("executor_intents_total", result="fail", reason="max_positions_reached")
+#
+#   start_metrics_server(9108)   # GET /metrics
+# =========================================================
+
+LATENCY_BUCKETS: Tuple[float, ...] = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+STAGE_METRIC = "executor_stage_seconds"
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _key(labels: Dict[str, str]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _fmt_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    items = list(key) + ([extra] if extra else [])
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_esc(v)}"' for k, v in items) + "}"
+
+
+def _esc(v: str) -> str:
+    return v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _fmt_num(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+class _Histogram:
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self, n_buckets: int):
+        self.counts = [0] * n_buckets
+        self.total = 0.0
+        self.count = 0
+
+
+class Registry:
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._gauges: Dict[str, Dict[LabelKey, float]] = {}
+        self._hists: Dict[str, Dict[LabelKey, _Histogram]] = {}
+        self._help: Dict[str, str] = {}
+
+    def describe(self, name: str, help_text: str) -> None:
+        self._help[name] = help_text
+
+    def inc(self, name: str, value: float = 1.0, **labels: str) -> None:
+        k = _key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[k] = series.get(k, 0.0) + value
+
+    def set(self, name: str, value: float, **labels: str) -> None:
+        k = _key(labels)
+        with self._lock:
+            self._gauges.setdefault(name, {})[k] = float(value)
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        k = _key(labels)
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._hists.setdefault(name, {})
+            h = series.get(k)
+            if h is None:
+                h = series[k] = _Histogram(len(self.buckets) + 1)
+            h.counts[idx] += 1
+            h.total += value
+            h.count += 1
+
+    def render(self) -> str:
+        out: List[str] = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                self._header(out, name, "counter")
+                for k, v in sorted(series.items()):
+                    out.append(f"{name}{_fmt_labels(k)} {_fmt_num(v)}")
+
+            for name, series in sorted(self._gauges.items()):
+                self._header(out, name, "gauge")
+                for k, v in sorted(series.items()):
+                    out.append(f"{name}{_fmt_labels(k)} {_fmt_num(v)}")
+
+            for name, series in sorted(self._hists.items()):
+                self._header(out, name, "histogram")
+                for k, h in sorted(series.items()):
+                    cum = 0
+                    for le, c in zip(self.buckets + (float("inf"),), h.counts):
+                        cum += c
+                        out.append(f"{name}_bucket{_fmt_labels(k, ('le', _fmt_num(le)))} {cum}")
+                    out.append(f"{name}_sum{_fmt_labels(k)} {_fmt_num(h.total)}")
+                    out.append(f"{name}_count{_fmt_labels(k)} {h.count}")
+        return "\n".join(out) + "\n"
+
+    def _header(self, out: List[str], name: str, kind: str) -> None:
+        if name in self._help:
+            out.append(f"# HELP {name} {self._help[name]}")
+        out.append(f"# TYPE {name} {kind}")
+
+    def snapshot_histogram(self, name: str) -> Dict[LabelKey, Tuple[int, float]]:
+        with self._lock:
+            return {k: (h.count, h.total) for k, h in self._hists.get(name, {}).items()}
+
+
+REGISTRY = Registry()
+REGISTRY.describe(STAGE_METRIC, "Wall time per executor hot-path stage")
+REGISTRY.describe("executor_intents_total", "Intents processed by result and reason")
+
+
+def inc(name: str, value: float = 1.0, **labels: str) -> None:
+    REGISTRY.inc(name, value, **labels)
+
+
+def set_gauge(name: str, value: float, **labels: str) -> None:
+    REGISTRY.set(name, value, **labels)
+
+
+def observe(name: str, value: float, **labels: str) -> None:
+    REGISTRY.observe(name, value, **labels)
+
+
+@contextmanager
+def timed(stage: str, **labels: str) -> Iterator[None]:
+    """
+    Record the block's wall time under executor_stage_seconds{stage=...}.
+    Exceptions are timed too (and re-raised).
+    """
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        REGISTRY.observe(STAGE_METRIC, time.perf_counter() - t0, stage=stage, **labels)
+
+
+def timed_fn(stage: str):
+    """
+    Decorator form of timed().
+    """
+
+    def deco(fn):
+        def wrapper(*args, **kwargs):
+            with timed(stage):
+                return fn(*args, **kwargs)
+
+        wrapper.__name__ = fn.__name__
+        wrapper.__doc__ = fn.__doc__
+        wrapper.__wrapped__ = fn
+        return wrapper
+
+    return deco
+
+
+def record_intent_result(res: Dict) -> None:
+    ok = bool(res.get("ok"))
+    inc(
+        "executor_intents_total",
+        result="ok" if ok else "fail",
+        reason="ok" if ok else str(res.get("reason") or "unknown"),
+    )
+
+
+# ---------------------------------------------------------
+# HTTP ENDPOINT (http.server is only imported when enabled)
+# ---------------------------------------------------------
+
+def _handler_class():
+    from http.server import BaseHTTPRequestHandler
+
+    class _Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] not in ("/metrics", "/"):
+                self.send_response(404)
+                self.end_headers()
+                return
+            body = REGISTRY.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *_args):
+            return
+
+    return _Handler
+
+
+_server: Optional[ThreadingHTTPServer] = None
+
+
+def start_metrics_server(port: Optional[int] = None, host: Optional[str] = None) -> Optional[ThreadingHTTPServer]:
+    """
+    Serve /metrics on a daemon thread. Port 0 / unset disables it.
+    """
+    global _server
+    if _server is not None:
+        return _server
+
+    port = int(port if port is not None else os.getenv("EXECUTOR_METRICS_PORT", "0") or 0)
+    host = host or os.getenv("EXECUTOR_METRICS_HOST", "0.0.0.0")
+    if port <= 0:
+        return None
+
+    from http.server import ThreadingHTTPServer
+
+    try:
+        _server = ThreadingHTTPServer((host, port), _handler_class())
+    except Exception as e:
+        print(f"[METRICS] failed to bind {host}:{port} err={e}", flush=True)
+        return None
+
+    threading.Thread(target=_server.serve_forever, name="metrics-http", daemon=True).start()
+    print(f"[METRICS] serving http://{host}:{port}/metrics", flush=True)
+    return _server
@@ -0,0 +1,372 @@
+from __future__ import annotations
+
+import re
+import sys
+from dataclasses import dataclass, field
+from typing import List, Optional, Set
+
+from common.db import get_conn
+
+
+# =========================================================
+# VERSIONED SCHEMA MIGRATIONS (executor-owned objects only)
+#
+#   python -m common.migrations          # apply pending
+#   python -m common.migrations --list   # show status
+#
+# Each migration runs once; applied versions are recorded in
+# executor_schema_migrations. Never edit an applied migration,
+# add a new version instead.
+# =========================================================
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    statements: List[str] = field(default_factory=list)
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    transactional: bool = True
+    # a query whose rows block this migration (e.g. duplicates a
+    # unique index would fail on), and what to tell the operator
+    precheck: Optional[str] = None
+    precheck_message: str = ""
+
+
+# v1 as applied (common.notify's definition at the time): frozen here
+# so later edits there cannot change an applied migration
+_V1_NOTIFY_TRIGGERS = [
+    """
+    CREATE OR REPLACE FUNCTION executor_notify_job_dispatch() RETURNS trigger AS $$
+    BEGIN
+        IF NEW.status = 'queued' THEN
+            PERFORM pg_notify('executor_jobs', COALESCE(NEW.job_type, ''));
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS executor_notify_job_dispatch ON job_dispatch",
+    """
+    CREATE TRIGGER executor_notify_job_dispatch
+    AFTER INSERT OR UPDATE OF status ON job_dispatch
+    FOR EACH ROW EXECUTE FUNCTION executor_notify_job_dispatch()
+    """,
+    """
+    CREATE OR REPLACE FUNCTION executor_notify_strategy_intents() RETURNS trigger AS $$
+    BEGIN
+        PERFORM pg_notify('executor_jobs', 'intents');
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS executor_notify_strategy_intents ON strategy_intents",
+    """
+    CREATE TRIGGER executor_notify_strategy_intents
+    AFTER INSERT ON strategy_intents
+    FOR EACH STATEMENT EXECUTE FUNCTION executor_notify_strategy_intents()
+    """,
+]
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(
+        version=1,
+        name="job_notify_triggers",
+        statements=_V1_NOTIFY_TRIGGERS,
+    ),
+    Migration(
+        version=2,
+        name="trades_idempotency_indexes",
+        statements=[
+            # open-trade-per-symbol lookup (partial: open rows only)
+            """
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS trades_open_symbol_idx
+            ON trades (symbol, entry_time DESC, id DESC)
+            WHERE LOWER(status) = 'open'
+            """,
+            # alpaca order id lookup (expression index on jsonb field)
+            """
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS trades_alpaca_order_id_idx
+            ON trades ((metadata->>'alpaca_order_id'))
+            """,
+        ],
+        transactional=False,
+    ),
+    Migration(
+        version=3,
+        name="job_dispatch_leases",
+        statements=[
+            """
+            ALTER TABLE job_dispatch
+                ADD COLUMN IF NOT EXISTS lease_expires_at timestamptz,
+                ADD COLUMN IF NOT EXISTS claimed_by text,
+                ADD COLUMN IF NOT EXISTS reap_count integer NOT NULL DEFAULT 0
+            """,
+        ],
+    ),
+    Migration(
+        version=4,
+        name="job_dispatch_lease_index",
+        statements=[
+            # reaper scan: expired leases among running jobs only
+            """
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS job_dispatch_lease_idx
+            ON job_dispatch (lease_expires_at)
+            WHERE status = 'running'
+            """,
+        ],
+        transactional=False,
+    ),
+    Migration(
+        version=5,
+        name="intent_detail_jsonb",
+        statements=[
+            # old rows hold json.dumps(...)[:500]: cut ones are not valid
+            # JSON and are kept as {"legacy_text": "..."}
+            """
+            CREATE OR REPLACE FUNCTION executor_detail_to_jsonb(t text) RETURNS jsonb AS $$
+            BEGIN
+                RETURN t::jsonb;
+            EXCEPTION WHEN others THEN
+                RETURN jsonb_build_object('legacy_text', t);
+            END;
+            $$ LANGUAGE plpgsql IMMUTABLE
+            """,
+            """
+            DO $$
+            BEGIN
+                IF (SELECT data_type FROM information_schema.columns
+                    WHERE table_schema = current_schema()
+                      AND table_name = 'strategy_intents'
+                      AND column_name = 'dispatched_detail') = 'text' THEN
+                    ALTER TABLE strategy_intents
+                        ALTER COLUMN dispatched_detail TYPE jsonb
+                        USING executor_detail_to_jsonb(dispatched_detail);
+                END IF;
+            END
+            $$
+            """,
+            "DROP FUNCTION executor_detail_to_jsonb(text)",
+        ],
+    ),
+    Migration(
+        version=6,
+        name="entry_ledger",
+        statements=[
+            # cross-process reservations (executor.ledger)
+            """
+            CREATE TABLE IF NOT EXISTS executor_entry_ledger (
+                id            bigserial PRIMARY KEY,
+                account       text NOT NULL,
+                owner         text NOT NULL,
+                symbol        text NOT NULL,
+                notional      double precision NOT NULL DEFAULT 0,
+                status        text NOT NULL DEFAULT 'reserved',
+                created_at    timestamptz NOT NULL DEFAULT now(),
+                submitted_at  timestamptz
+            )
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS executor_entry_ledger_account_idx
+            ON executor_entry_ledger (account, created_at)
+            """,
+        ],
+    ),
+    Migration(
+        version=7,
+        name="trades_alpaca_order_id_unique",
+        # the old SELECT-then-INSERT could write one order twice
+        precheck="""
+            SELECT metadata->>'alpaca_order_id' AS alpaca_order_id,
+                   array_agg(id ORDER BY id) AS trade_ids
+            FROM trades
+            WHERE (metadata->>'alpaca_order_id') <> ''
+            GROUP BY 1
+            HAVING count(*) > 1
+            ORDER BY 1
+            LIMIT 20
+        """,
+        precheck_message=(
+            "trades has several rows per alpaca_order_id; keep one trade per order "
+            "(delete or clear metadata.alpaca_order_id on the others), then re-run"
+        ),
+        statements=[
+            # one trade per broker order: _insert_trade_open relies on it
+            # (INSERT ... ON CONFLICT DO NOTHING) when two workers finalize
+            # the same order at once
+            """
+            CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS trades_alpaca_order_id_uniq
+            ON trades ((metadata->>'alpaca_order_id'))
+            WHERE (metadata->>'alpaca_order_id') <> ''
+            """,
+        ],
+        transactional=False,
+    ),
+    Migration(
+        version=8,
+        name="job_dispatch_requeued_at",
+        statements=[
+            # claim order key of a yielded job (executor.fair): the back
+            # of the queue, not its original ts
+            "ALTER TABLE job_dispatch ADD COLUMN IF NOT EXISTS requeued_at timestamptz",
+        ],
+    ),
+    Migration(
+        version=9,
+        name="drop_trades_alpaca_order_id_idx",
+        statements=[
+            # v7's unique index serves the alpaca order id lookups
+            "DROP INDEX CONCURRENTLY IF EXISTS trades_alpaca_order_id_idx",
+        ],
+        transactional=False,
+    ),
+]
+
+_CONCURRENT_INDEX = re.compile(r"CREATE\s+(?:UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+IF\s+NOT\s+EXISTS\s+(\w+)", re.I)
+
+
+def _ensure_table(conn) -> None:
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS executor_schema_migrations (
+            version     integer PRIMARY KEY,
+            name        text NOT NULL,
+            applied_at  timestamptz NOT NULL DEFAULT now()
+        )
+        """
+    )
+
+
+def applied_versions() -> Set[int]:
+    with get_conn() as conn:
+        _ensure_table(conn)
+        rows = conn.execute("SELECT version FROM executor_schema_migrations").fetchall()
+    return {int(r["version"]) for r in rows}
+
+
+def pending_versions() -> List[int]:
+    done = applied_versions()
+    return sorted(m.version for m in MIGRATIONS if m.version not in done)
+
+
+def require_migrations() -> None:
+    """
+    Fail fast when the schema is behind the code: the claim and
+    drain SQL reference columns and tables the migrations add.
+    """
+    pending = pending_versions()
+    if pending:
+        raise RuntimeError(
+            f"❌ schema migrations pending: {pending} "
+            "(run `python -m common.migrations` or set EXECUTOR_AUTO_MIGRATE=1)"
+        )
+
+
+def apply_migrations() -> List[int]:
+    """
+    Apply every pending migration in version order.
+    Returns the versions applied by this call.
+    """
+    done = applied_versions()
+    applied: List[int] = []
+
+    for m in sorted(MIGRATIONS, key=lambda x: x.version):
+        if m.version in done:
+            continue
+
+        print(f"[MIGRATIONS] applying v{m.version} {m.name}", flush=True)
+
+        with get_conn() as conn:
+            # serialize concurrent migrators (e.g. N replicas starting together)
+            conn.execute("SELECT pg_advisory_lock(hashtext('executor_schema_migrations'))")
+            try:
+                if conn.execute(
+                    "SELECT 1 FROM executor_schema_migrations WHERE version = %s",
+                    (m.version,),
+                ).fetchone():
+                    continue
+
+                _precheck(conn, m)
+                if m.transactional:
+                    with conn.transaction():
+                        for stmt in m.statements:
+                            conn.execute(stmt)
+                        _record(conn, m)
+                else:
+                    _drop_invalid_indexes(conn, m)
+                    try:
+                        for stmt in m.statements:
+                            conn.execute(stmt)
+                    except Exception:
+                        # leave no INVALID index behind for the next start
+                        _drop_invalid_indexes(conn, m)
+                        raise
+                    _record(conn, m)
+            finally:
+                conn.execute("SELECT pg_advisory_unlock(hashtext('executor_schema_migrations'))")
+
+        applied.append(m.version)
+
+    return applied
+
+
+class MigrationError(RuntimeError):
+    pass
+
+
+def _precheck(conn, m: Migration) -> None:
+    if not m.precheck:
+        return
+    rows = conn.execute(m.precheck).fetchall()
+    if rows:
+        sample = "; ".join(", ".join(f"{k}={v}" for k, v in r.items()) for r in rows)
+        raise MigrationError(f"❌ v{m.version} {m.name}: {m.precheck_message}. Found: {sample}")
+
+
+def _drop_invalid_indexes(conn, m: Migration) -> None:
+    """
+    A failed CREATE INDEX CONCURRENTLY leaves an INVALID index behind,
+    which IF NOT EXISTS would then skip forever: drop it first.
+    """
+    for stmt in m.statements:
+        match = _CONCURRENT_INDEX.search(stmt)
+        if not match:
+            continue
+        name = match.group(1)
+        invalid = conn.execute(
+            """
+            SELECT 1
+            FROM pg_index i
+            JOIN pg_class c ON c.oid = i.indexrelid
+            WHERE c.oid = to_regclass(%s) AND NOT i.indisvalid
+            """,
+            (name,),
+        ).fetchone()
+        if invalid:
+            print(f"[MIGRATIONS] dropping invalid index {name} (failed earlier build)", flush=True)
+            conn.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+
+
+def _record(conn, m: Migration) -> None:
+    conn.execute(
+        "INSERT INTO executor_schema_migrations (version, name) VALUES (%s, %s)",
+        (m.version, m.name),
+    )
+
+
+def main(argv: List[str]) -> int:
+    if "--list" in argv:
+        done = applied_versions()
+        for m in sorted(MIGRATIONS, key=lambda x: x.version):
+            state = "applied" if m.version in done else "pending"
+            print(f"v{m.version:04d} {m.name:<40} {state}")
+        return 0
+
+    applied = apply_migrations()
+    print(f"[MIGRATIONS] done applied={applied}", flush=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import time
+from typing import TYPE_CHECKING, Optional, List
+
+from common.db import DATABASE_URL
+
+if TYPE_CHECKING:
+    import psycopg
+
+
+JOB_CHANNEL = "executor_jobs"
+
+
+# ---------------------------------------------------------
+# TRIGGERS
+# - job_dispatch: one NOTIFY per queued row (payload = job_type)
+# - strategy_intents: one NOTIFY per statement (bulk inserts stay cheap)
+# Postgres de-duplicates identical notifications inside a transaction.
+#
+# Installed by common.migrations (v1) and on partition convert only:
+# trigger DDL takes ACCESS EXCLUSIVE on the hot tables, so workers
+# just check that they exist (check_notify_triggers). DROP IF
+# EXISTS + CREATE in one transaction (CREATE OR REPLACE TRIGGER
+# needs PG14+). v1 keeps its own copy: a changed definition here
+# ships as a new migration.
+# ---------------------------------------------------------
+
+NOTIFY_TRIGGERS_SQL: List[str] = [
+    f"""
+    CREATE OR REPLACE FUNCTION executor_notify_job_dispatch() RETURNS trigger AS $$
+    BEGIN
+        IF NEW.status = 'queued' THEN
+            PERFORM pg_notify('{JOB_CHANNEL}', COALESCE(NEW.job_type, ''));
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS executor_notify_job_dispatch ON job_dispatch",
+    """
+    CREATE TRIGGER executor_notify_job_dispatch
+    AFTER INSERT OR UPDATE OF status ON job_dispatch
+    FOR EACH ROW EXECUTE FUNCTION executor_notify_job_dispatch()
+    """,
+    f"""
+    CREATE OR REPLACE FUNCTION executor_notify_strategy_intents() RETURNS trigger AS $$
+    BEGIN
+        PERFORM pg_notify('{JOB_CHANNEL}', 'intents');
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS executor_notify_strategy_intents ON strategy_intents",
+    """
+    CREATE TRIGGER executor_notify_strategy_intents
+    AFTER INSERT ON strategy_intents
+    FOR EACH STATEMENT EXECUTE FUNCTION executor_notify_strategy_intents()
+    """,
+]
+
+
+NOTIFY_TRIGGERS = (
+    ("job_dispatch", "executor_notify_job_dispatch"),
+    ("strategy_intents", "executor_notify_strategy_intents"),
+)
+
+
+def check_notify_triggers() -> bool:
+    """
+    Read-only: warn when a NOTIFY trigger is missing (wake-ups then
+    fall back to the safety poll). Installing them is a migration.
+    """
+    from common.db import get_conn
+
+    try:
+        with get_conn() as conn:
+            rows = conn.execute(
+                """
+                SELECT c.relname AS table_name, t.tgname AS trigger_name
+                FROM pg_trigger t
+                JOIN pg_class c ON c.oid = t.tgrelid
+                WHERE NOT t.tgisinternal
+                  AND c.oid = ANY(ARRAY[to_regclass('job_dispatch'), to_regclass('strategy_intents')])
+                """
+            ).fetchall()
+    except Exception as e:
+        print(f"[NOTIFY] trigger check failed err={e}", flush=True)
+        return False
+
+    found = {(r["table_name"], r["trigger_name"]) for r in rows}
+    missing = [f"{t}.{name}" for t, name in NOTIFY_TRIGGERS if (t, name) not in found]
+    if missing:
+        print(
+            f"[NOTIFY] ⚠️ missing triggers {missing} (installed by common.migrations v1); "
+            "until they exist, jobs are picked up by the safety poll only",
+            flush=True,
+        )
+        return False
+    return True
+
+
+class JobWaiter:
+    """
+    Blocks the claim loop until a job notification arrives
+    (or the safety-net timeout expires).
+
+    Uses a dedicated, non-pooled connection: LISTEN state is
+    per-session and must not leak into pooled connections.
+    """
+
+    def __init__(self, channel: str = JOB_CHANNEL):
+        self.channel = channel
+        self._conn: Optional[psycopg.Connection] = None
+
+    def _connect(self) -> Optional[psycopg.Connection]:
+        if self._conn is not None and not self._conn.closed:
+            return self._conn
+        import psycopg
+
+        try:
+            conn = psycopg.connect(DATABASE_URL, autocommit=True)
+            conn.execute(f"LISTEN {self.channel}")
+            self._conn = conn
+            print(f"[NOTIFY] listening channel={self.channel}", flush=True)
+            return conn
+        except Exception as e:
+            print(f"[NOTIFY] listen failed err={e}", flush=True)
+            self._conn = None
+            return None
+
+    def start(self) -> bool:
+        """
+        LISTEN before the first claim so nothing queued in between is missed.
+        """
+        return self._connect() is not None
+
+    def wait(self, timeout: float, *, fallback_sleep: Optional[float] = None) -> bool:
+        """
+        Returns True if woken by a notification, False on timeout.
+        Falls back to a plain sleep (fallback_sleep, default timeout)
+        if the listener cannot connect.
+        """
+        conn = self._connect()
+        if conn is None:
+            time.sleep(timeout if fallback_sleep is None else min(timeout, fallback_sleep))
+            return False
+
+        try:
+            for _ in conn.notifies(timeout=timeout, stop_after=1):
+                return True
+            return False
+        except Exception as e:
+            print(f"[NOTIFY] listener dropped err={e}", flush=True)
+            self.close()
+            return False
+
+    def close(self) -> None:
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except Exception:
+                pass
+        self._conn = None
@@ -0,0 +1,656 @@
+from __future__ import annotations
+
+import os
+import re
+import sys
+import gzip
+import time
+import argparse
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from common.db import get_conn
+from common.metrics import REGISTRY, inc
+
+
+# =========================================================
+# TIME-RANGE PARTITIONS (strategy_intents, trade_events,
+# job_dispatch)
+#
+#   python -m common.partitions --convert all   # one-off
+#   python -m common.partitions                 # maintain once
+#   python -m common.partitions --loop          # every PARTITION_MAINT_SEC
+#   python -m common.partitions --list
+#
+# --convert turns a plain table into a RANGE (ts) partitioned
+# one without copying it: the old table becomes <t>_legacy, the
+# partition for everything before the next-but-one period
+# boundary. Its range CHECK and the (key, ts) unique index are
+# built first without blocking writers; the swap itself is one
+# short transaction. The NOTIFY triggers are then re-installed
+# on the new parent (common.notify).
+#
+# Maintenance (advisory-locked, so any number of supervisors
+# may run it):
+#   - creates PARTITION_PREMAKE periods ahead (<t>_pYYYYMMDD)
+#   - retires partitions whose range ended more than
+#     PARTITION_RETENTION_DAYS ago: DETACH, then either keep the
+#     table (detach, the default) or COPY it to
+#     PARTITION_ARCHIVE_DIR as gzip CSV and drop it (archive).
+#     archive refuses to run unless PARTITION_ARCHIVE_DIR is set
+#     to an absolute path (a mounted volume, not the container's
+#     working dir). A partition still holding queued/running
+#     jobs (or intents of such runs) is skipped.
+#
+# The hot queries need no change: with the attached set bounded
+# every per-partition index stays period-sized, so claim latency
+# and index size stay flat as history grows.
+#
+# The primary key becomes (key, ts): Postgres only enforces
+# uniqueness on a partitioned table through indexes that contain
+# the partition column. intent_id / dispatch_id / id are then
+# unique per ts, not globally; they come from gen_random_uuid()
+# / uuid4 / a sequence, and nothing upserts on them. Other
+# unique indexes without ts stay on <t>_legacy only.
+# =========================================================
+
+# PARTITION_* settings are parsed and validated by the executor
+# config (executor.config Settings.partition_settings()) and
+# passed in; arguments override them. common never imports the
+# executor.
+
+INTERVALS = ("day", "week", "month")
+RETIRE_MODES = ("archive", "detach")
+
+REGISTRY.describe("executor_partitions_created_total", "Time-range partitions created ahead")
+REGISTRY.describe("executor_partitions_retired_total", "Partitions detached / archived past retention")
+
+
+class PartitionError(RuntimeError):
+    pass
+
+
+@dataclass(frozen=True)
+class PartitionSettings:
+    # defaults as in executor.config
+    maint_sec: float = 3600.0
+    interval: str = "month"
+    premake: int = 3
+    retention_days: int = 90
+    retire: str = "detach"
+    archive_dir: str = ""
+    lock_timeout_ms: int = 2000
+
+
+DEFAULTS = PartitionSettings()
+
+
+@dataclass(frozen=True)
+class PartitionedTable:
+    name: str
+    # primary key columns before partitioning (ts is appended)
+    key: Tuple[str, ...]
+    column: str = "ts"
+    # rows that must not be retired yet ({part}: the partition)
+    busy_sql: Optional[str] = None
+
+
+TABLES: Dict[str, PartitionedTable] = {
+    t.name: t
+    for t in (
+        PartitionedTable(
+            name="strategy_intents",
+            key=("intent_id",),
+            busy_sql="""
+                SELECT 1 FROM job_dispatch jd
+                WHERE jd.status IN ('queued', 'running')
+                  AND EXISTS (SELECT 1 FROM {part} p WHERE p.run_id = jd.run_id)
+                LIMIT 1
+            """,
+        ),
+        PartitionedTable(
+            name="job_dispatch",
+            key=("dispatch_id",),
+            busy_sql="SELECT 1 FROM {part} WHERE status IN ('queued', 'running') LIMIT 1",
+        ),
+        PartitionedTable(name="trade_events", key=("id",)),
+    )
+}
+
+
+# ---------------------------------------------------------
+# PERIODS (UTC)
+# ---------------------------------------------------------
+
+def period_start(ts: datetime, interval: str = DEFAULTS.interval) -> datetime:
+    ts = ts.astimezone(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    if interval == "day":
+        return ts
+    if interval == "week":
+        return ts - timedelta(days=ts.weekday())
+    if interval == "month":
+        return ts.replace(day=1)
+    raise PartitionError(f"PARTITION_INTERVAL={interval!r} must be one of {INTERVALS}")
+
+
+def period_end(start: datetime, interval: str = DEFAULTS.interval) -> datetime:
+    if interval == "day":
+        return start + timedelta(days=1)
+    if interval == "week":
+        return start + timedelta(days=7)
+    if interval == "month":
+        y, m = (start.year + 1, 1) if start.month == 12 else (start.year, start.month + 1)
+        return start.replace(year=y, month=m)
+    raise PartitionError(f"PARTITION_INTERVAL={interval!r} must be one of {INTERVALS}")
+
+
+def partition_name(table: str, start: datetime) -> str:
+    return f"{table}_p{start:%Y%m%d}"
+
+
+# ---------------------------------------------------------
+# CATALOG
+# ---------------------------------------------------------
+
+_BOUND_RE = re.compile(r"FROM \((MINVALUE|'[^']*')\) TO \((MAXVALUE|'[^']*')\)")
+
+
+def _parse_bound(v: str) -> Optional[datetime]:
+    if v in ("MINVALUE", "MAXVALUE"):
+        return None
+    return datetime.fromisoformat(v.strip("'")).astimezone(timezone.utc)
+
+
+def _sql():
+    from psycopg import sql
+
+    return sql
+
+
+def is_partitioned(conn, table: str) -> bool:
+    row = conn.execute(
+        "SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)",
+        (table,),
+    ).fetchone()
+    if row is None:
+        raise PartitionError(f"table {table} not found")
+    return row["relkind"] == "p"
+
+
+def list_partitions(conn, table: str) -> List[Dict[str, Any]]:
+    """
+    [{name, lo, hi, default}] of the attached partitions (lo/hi None:
+    MINVALUE/MAXVALUE), ordered by range.
+    """
+    rows = conn.execute(
+        """
+        SELECT c.relname AS name, pg_get_expr(c.relpartbound, c.oid) AS bound
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass(%s)
+        """,
+        (table,),
+    ).fetchall()
+
+    out: List[Dict[str, Any]] = []
+    for r in rows:
+        bound = r["bound"] or ""
+        if bound == "DEFAULT":
+            out.append({"name": r["name"], "lo": None, "hi": None, "default": True})
+            continue
+        m = _BOUND_RE.search(bound)
+        if not m:
+            continue
+        out.append({"name": r["name"], "lo": _parse_bound(m.group(1)), "hi": _parse_bound(m.group(2)), "default": False})
+
+    far = datetime.max.replace(tzinfo=timezone.utc)
+    out.sort(key=lambda p: (p["default"], p["lo"] or datetime.min.replace(tzinfo=timezone.utc), p["hi"] or far))
+    return out
+
+
+def _detached(conn, table: str) -> List[str]:
+    # partitions detached by an earlier pass that did not finish archiving
+    rows = conn.execute(
+        """
+        SELECT c.relname AS name
+        FROM pg_class c
+        WHERE c.relkind = 'r'
+          AND NOT c.relispartition
+          AND c.relnamespace = (SELECT relnamespace FROM pg_class WHERE oid = to_regclass(%s))
+          AND (c.relname = %s OR c.relname ~ %s)
+        ORDER BY c.relname
+        """,
+        (table, f"{table}_legacy", f"^{re.escape(table)}_p[0-9]{{8}}$"),
+    ).fetchall()
+    return [r["name"] for r in rows]
+
+
+# ---------------------------------------------------------
+# CONVERT (one-off)
+# ---------------------------------------------------------
+
+def convert_table(
+    spec: PartitionedTable,
+    *,
+    settings: PartitionSettings = DEFAULTS,
+    interval: Optional[str] = None,
+    premake: Optional[int] = None,
+) -> bool:
+    """
+    Plain table -> RANGE (ts) partitioned table, keeping every row
+    in place (<t>_legacy). False if it already was partitioned.
+    """
+    interval = interval or settings.interval
+    premake = settings.premake if premake is None else premake
+    lock_ms = settings.lock_timeout_ms
+    sql = _sql()
+    t = spec.name
+    ident = sql.Identifier(t)
+    col = sql.Identifier(spec.column)
+    check = f"{t}_partition_range"
+    key_ts = f"{t}_pkey_ts"
+
+    # the legacy range ends a full period after the current one, so
+    # writes keep passing its CHECK however long the swap waits
+    upper = period_end(period_end(period_start(datetime.now(timezone.utc), interval), interval), interval)
+
+    with get_conn() as conn:
+        if is_partitioned(conn, t):
+            return False
+
+        idents = conn.execute(
+            "SELECT attname FROM pg_attribute WHERE attrelid = to_regclass(%s) AND attidentity <> ''",
+            (t,),
+        ).fetchall()
+        if idents:
+            raise PartitionError(f"{t}: identity columns are not supported ({[r['attname'] for r in idents]})")
+
+        # ---------------------------------------------------------
+        # 1) ONLINE: range CHECK + (key, ts) unique index
+        # (NOT VALID + VALIDATE and CONCURRENTLY keep writers running)
+        # ---------------------------------------------------------
+        print(f"[PARTITIONS] {t}: validating range (< {upper.isoformat()}) and building ({', '.join(spec.key)}, {spec.column})", flush=True)
+        conn.execute(sql.SQL("ALTER TABLE {} DROP CONSTRAINT IF EXISTS {}").format(ident, sql.Identifier(check)))
+        conn.execute(
+            sql.SQL("ALTER TABLE {} ADD CONSTRAINT {} CHECK ({} IS NOT NULL AND {} < {}) NOT VALID").format(
+                ident, sql.Identifier(check), col, col, sql.Literal(upper)
+            )
+        )
+        conn.execute(sql.SQL("ALTER TABLE {} VALIDATE CONSTRAINT {}").format(ident, sql.Identifier(check)))
+        conn.execute(
+            sql.SQL("CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS {} ON {} ({})").format(
+                sql.Identifier(key_ts), ident, sql.SQL(", ").join(sql.Identifier(c) for c in (*spec.key, spec.column))
+            )
+        )
+
+        # ---------------------------------------------------------
+        # 2) SWAP (one transaction, catalog-only)
+        # ---------------------------------------------------------
+        with conn.transaction():
+            conn.execute(sql.SQL("SET LOCAL lock_timeout = {}").format(sql.Literal(f"{lock_ms * 5}ms")))
+            conn.execute(sql.SQL("LOCK TABLE {} IN ACCESS EXCLUSIVE MODE").format(ident))
+
+            pkey = conn.execute(
+                "SELECT conname FROM pg_constraint WHERE conrelid = to_regclass(%s) AND contype = 'p'",
+                (t,),
+            ).fetchone()
+            indexes = conn.execute(
+                """
+                SELECT i.indexrelid::regclass::text AS name,
+                       pg_get_indexdef(i.indexrelid) AS def,
+                       i.indisunique AS is_unique
+                FROM pg_index i
+                WHERE i.indrelid = to_regclass(%s)
+                  AND NOT i.indisprimary
+                  AND i.indexrelid <> to_regclass(%s)
+                """,
+                (t, key_ts),
+            ).fetchall()
+            serials = conn.execute(
+                """
+                SELECT attname, pg_get_serial_sequence(%s, attname) AS seq
+                FROM pg_attribute
+                WHERE attrelid = to_regclass(%s) AND attnum > 0 AND NOT attisdropped
+                """,
+                (t, t),
+            ).fetchall()
+
+            legacy = f"{t}_legacy"
+            conn.execute(sql.SQL("ALTER TABLE {} RENAME TO {}").format(ident, sql.Identifier(legacy)))
+
+            # non-unique indexes move to the parent (the legacy copy is
+            # attached, not rebuilt); unique ones without ts cannot
+            recreate: List[str] = []
+            for ix in indexes:
+                if ix["is_unique"]:
+                    print(f"[PARTITIONS] ⚠️ {t}: unique index {ix['name']} kept on {legacy} only", flush=True)
+                    continue
+                name = ix["name"].split(".")[-1].strip('"')
+                conn.execute(sql.SQL("ALTER INDEX {} RENAME TO {}").format(sql.Identifier(name), sql.Identifier(f"{name[:56]}_legacy")))
+                recreate.append(ix["def"])
+
+            # (key) -> (key, ts): the prebuilt index becomes the legacy
+            # partition's primary key, the parent takes the old name
+            if pkey:
+                conn.execute(sql.SQL("ALTER TABLE {} DROP CONSTRAINT {}").format(sql.Identifier(legacy), sql.Identifier(pkey["conname"])))
+
+            conn.execute(
+                sql.SQL(
+                    "CREATE TABLE {} (LIKE {} INCLUDING DEFAULTS INCLUDING GENERATED INCLUDING STORAGE INCLUDING COMMENTS) "
+                    "PARTITION BY RANGE ({})"
+                ).format(ident, sql.Identifier(legacy), col)
+            )
+            conn.execute(
+                sql.SQL("ALTER TABLE {} ADD PRIMARY KEY ({})").format(
+                    ident, sql.SQL(", ").join(sql.Identifier(c) for c in (*spec.key, spec.column))
+                )
+            )
+
+            # serial sequences would be dropped with the legacy table
+            for s in serials:
+                if s["seq"]:
+                    conn.execute(sql.SQL("ALTER SEQUENCE {} OWNED BY {}.{}").format(sql.SQL(s["seq"]), ident, sql.Identifier(s["attname"])))
+
+            conn.execute(
+                sql.SQL("ALTER TABLE {} ADD CONSTRAINT {} PRIMARY KEY USING INDEX {}").format(
+                    sql.Identifier(legacy), sql.Identifier(f"{legacy}_pkey"), sql.Identifier(key_ts)
+                )
+            )
+
+            # the parent's triggers are cloned onto every partition
+            for trg in conn.execute(
+                "SELECT tgname FROM pg_trigger WHERE tgrelid = to_regclass(%s) AND tgname LIKE 'executor_notify_%%'",
+                (legacy,),
+            ).fetchall():
+                conn.execute(sql.SQL("DROP TRIGGER {} ON {}").format(sql.Identifier(trg["tgname"]), sql.Identifier(legacy)))
+
+            conn.execute(
+                sql.SQL("ALTER TABLE {} ATTACH PARTITION {} FOR VALUES FROM (MINVALUE) TO ({})").format(
+                    ident, sql.Identifier(legacy), sql.Literal(upper)
+                )
+            )
+            conn.execute(sql.SQL("ALTER TABLE {} DROP CONSTRAINT {}").format(sql.Identifier(legacy), sql.Identifier(check)))
+
+            for d in recreate:
+                conn.execute(d)
+
+            conn.execute(sql.SQL("CREATE TABLE {} PARTITION OF {} DEFAULT").format(sql.Identifier(f"{t}_default"), ident))
+
+            if t in ("job_dispatch", "strategy_intents"):
+                from common.notify import NOTIFY_TRIGGERS_SQL
+
+                for stmt in NOTIFY_TRIGGERS_SQL:
+                    conn.execute(stmt)
+
+        print(f"[PARTITIONS] {t}: converted (legacy rows in {legacy})", flush=True)
+
+    ensure_partitions(spec, settings=settings, interval=interval, premake=premake)
+    return True
+
+
+# ---------------------------------------------------------
+# MAINTAIN (scheduled)
+# ---------------------------------------------------------
+
+def ensure_partitions(
+    spec: PartitionedTable,
+    *,
+    settings: PartitionSettings = DEFAULTS,
+    interval: Optional[str] = None,
+    premake: Optional[int] = None,
+) -> List[str]:
+    """
+    Create the current period and `premake` periods ahead where no
+    attached partition covers them yet. Returns the new names.
+    """
+    interval = interval or settings.interval
+    premake = settings.premake if premake is None else premake
+    lock_ms = settings.lock_timeout_ms
+    sql = _sql()
+    created: List[str] = []
+    start = period_start(datetime.now(timezone.utc), interval)
+
+    with get_conn() as conn:
+        parts = [p for p in list_partitions(conn, spec.name) if not p["default"]]
+        for _ in range(max(premake, 0) + 1):
+            end = period_end(start, interval)
+            covered = any(
+                (p["lo"] is None or p["lo"] < end) and (p["hi"] is None or p["hi"] > start)
+                for p in parts
+            )
+            if not covered:
+                name = partition_name(spec.name, start)
+                try:
+                    with conn.transaction():
+                        conn.execute(sql.SQL("SET LOCAL lock_timeout = {}").format(sql.Literal(f"{lock_ms}ms")))
+                        conn.execute(
+                            sql.SQL("CREATE TABLE {} PARTITION OF {} FOR VALUES FROM ({}) TO ({})").format(
+                                sql.Identifier(name), sql.Identifier(spec.name), sql.Literal(start), sql.Literal(end)
+                            )
+                        )
+                except Exception as e:
+                    # e.g. rows for this range already sit in the default partition
+                    print(f"[PARTITIONS] ❌ create {name} failed err={e}", flush=True)
+                    break
+                parts.append({"name": name, "lo": start, "hi": end, "default": False})
+                created.append(name)
+                inc("executor_partitions_created_total", table=spec.name)
+                print(f"[PARTITIONS] created {name} [{start:%Y-%m-%d}, {end:%Y-%m-%d})", flush=True)
+            start = end
+
+    return created
+
+
+def _check_archive_dir(archive_dir: str) -> None:
+    # the DROP is only as durable as the file: never a relative
+    # (container-local, ephemeral) default
+    if not archive_dir or not os.path.isabs(archive_dir):
+        raise PartitionError(
+            f"PARTITION_ARCHIVE_DIR={archive_dir!r}: archive mode needs an absolute path "
+            "(e.g. a mounted volume); use PARTITION_RETIRE=detach to keep the tables"
+        )
+
+
+def archive_table(conn, name: str, *, archive_dir: str, table: str = "") -> Tuple[str, int]:
+    """
+    COPY a (detached) table to <archive_dir>/<table>/<name>.csv.gz,
+    then drop it. The file is written under .tmp and renamed once
+    complete, so a crash never leaves a partial archive behind a
+    dropped table. -> (path, rows)
+    """
+    _check_archive_dir(archive_dir)
+    sql = _sql()
+    folder = os.path.join(archive_dir, table or name)
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, f"{name}.csv.gz")
+    tmp = path + ".tmp"
+
+    with conn.cursor() as cur:
+        with gzip.open(tmp, "wb") as f:
+            with cur.copy(sql.SQL("COPY {} TO STDOUT (FORMAT csv, HEADER)").format(sql.Identifier(name))) as cp:
+                for chunk in cp:
+                    f.write(chunk)
+        rows = cur.rowcount
+
+    with open(tmp, "rb") as f:
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+    conn.execute(sql.SQL("DROP TABLE {}").format(sql.Identifier(name)))
+    return path, rows
+
+
+def retire_partitions(
+    spec: PartitionedTable,
+    *,
+    settings: PartitionSettings = DEFAULTS,
+    retention_days: Optional[int] = None,
+    mode: Optional[str] = None,
+    archive_dir: Optional[str] = None,
+) -> List[str]:
+    """
+    Detach every partition whose range ended more than retention_days
+    ago; in archive mode also COPY it out and drop it. Returns the
+    retired partition names.
+    """
+    retention_days = settings.retention_days if retention_days is None else retention_days
+    mode = mode or settings.retire
+    archive_dir = settings.archive_dir if archive_dir is None else archive_dir
+    lock_ms = settings.lock_timeout_ms
+
+    if retention_days <= 0:
+        return []
+    if mode not in RETIRE_MODES:
+        raise PartitionError(f"PARTITION_RETIRE={mode!r} must be one of {RETIRE_MODES}")
+    if mode == "archive":
+        _check_archive_dir(archive_dir)
+
+    sql = _sql()
+    cutoff = datetime.now(timezone.utc) - timedelta(days=retention_days)
+    retired: List[str] = []
+
+    with get_conn() as conn:
+        for p in list_partitions(conn, spec.name):
+            if p["default"] or p["hi"] is None or p["hi"] > cutoff:
+                continue
+            name = p["name"]
+            part = sql.Identifier(name)
+
+            if spec.busy_sql and conn.execute(sql.SQL(spec.busy_sql).format(part=part)).fetchone():
+                print(f"[PARTITIONS] {name}: still has active jobs, not retired", flush=True)
+                continue
+
+            try:
+                with conn.transaction():
+                    conn.execute(sql.SQL("SET LOCAL lock_timeout = {}").format(sql.Literal(f"{lock_ms}ms")))
+                    conn.execute(sql.SQL("ALTER TABLE {} DETACH PARTITION {}").format(sql.Identifier(spec.name), part))
+            except Exception as e:
+                print(f"[PARTITIONS] ❌ detach {name} failed (retried next pass) err={e}", flush=True)
+                continue
+
+            retired.append(name)
+            inc("executor_partitions_retired_total", table=spec.name, mode=mode)
+            print(f"[PARTITIONS] detached {name} (ended {p['hi']:%Y-%m-%d})", flush=True)
+
+        if mode == "archive":
+            for name in _detached(conn, spec.name):
+                try:
+                    path, rows = archive_table(conn, name, archive_dir=archive_dir, table=spec.name)
+                except Exception as e:
+                    print(f"[PARTITIONS] ❌ archive {name} failed err={e}", flush=True)
+                    continue
+                print(f"[PARTITIONS] archived {name} rows={rows} -> {path}", flush=True)
+
+    return retired
+
+
+def maintain(
+    tables: Optional[List[str]] = None,
+    *,
+    settings: PartitionSettings = DEFAULTS,
+) -> Dict[str, Dict[str, List[str]]]:
+    """
+    One maintenance pass over every partitioned table. Skipped when
+    another process holds the maintenance lock.
+    """
+    out: Dict[str, Dict[str, List[str]]] = {}
+
+    with get_conn() as conn:
+        if not conn.execute("SELECT pg_try_advisory_lock(hashtext('executor_partitions')) AS ok").fetchone()["ok"]:
+            print("[PARTITIONS] another maintainer is running, skipped", flush=True)
+            return out
+        try:
+            for name in tables or list(TABLES):
+                spec = TABLES[name]
+                try:
+                    if not is_partitioned(conn, name):
+                        continue
+                    out[name] = {
+                        "created": ensure_partitions(spec, settings=settings),
+                        "retired": retire_partitions(spec, settings=settings),
+                    }
+                except Exception as e:
+                    print(f"[PARTITIONS] ❌ {name} maintenance failed err={e}", flush=True)
+        finally:
+            conn.execute("SELECT pg_advisory_unlock(hashtext('executor_partitions'))")
+
+    return out
+
+
+class PartitionMaintainer:
+    """
+    Calls maintain() now and then every `interval` seconds on a
+    daemon thread. Errors are logged and retried on the next tick.
+    """
+
+    def __init__(self, settings: PartitionSettings = DEFAULTS, *, interval: Optional[float] = None):
+        self.settings = settings
+        self.interval = settings.maint_sec if interval is None else interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="partition-maintainer", daemon=True)
+        self._thread.start()
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def _run(self) -> None:
+        while True:
+            try:
+                maintain(settings=self.settings)
+            except Exception as e:
+                print(f"[PARTITIONS] maintenance failed err={e}", flush=True)
+            if self._stop.wait(self.interval):
+                return
+
+
+def main(argv: List[str], settings: PartitionSettings = DEFAULTS) -> int:
+    ap = argparse.ArgumentParser(description="Time-range partitions for the executor's growing tables")
+    ap.add_argument("--convert", nargs="+", metavar="TABLE", help=f"convert plain tables ({', '.join(TABLES)} or all)")
+    ap.add_argument("--list", action="store_true", help="show partitions")
+    ap.add_argument("--loop", action="store_true", help="maintain every PARTITION_MAINT_SEC")
+    args = ap.parse_args(argv)
+
+    if args.list:
+        with get_conn() as conn:
+            for name in TABLES:
+                if not is_partitioned(conn, name):
+                    print(f"{name:<20} not partitioned")
+                    continue
+                for p in list_partitions(conn, name):
+                    rng = "DEFAULT" if p["default"] else f"[{p['lo'] or '-inf'}, {p['hi'] or '+inf'})"
+                    print(f"{name:<20} {p['name']:<36} {rng}")
+        return 0
+
+    if args.convert:
+        names = list(TABLES) if args.convert == ["all"] else args.convert
+        unknown = [n for n in names if n not in TABLES]
+        if unknown:
+            print(f"[PARTITIONS] ❌ unknown table(s) {unknown}", flush=True)
+            return 2
+        for name in names:
+            if not convert_table(TABLES[name], settings=settings):
+                print(f"[PARTITIONS] {name}: already partitioned", flush=True)
+        return 0
+
+    if args.loop:
+        while True:
+            maintain(settings=settings)
+            time.sleep(settings.maint_sec or 3600)
+
+    print(f"[PARTITIONS] done {maintain(settings=settings)}", flush=True)
+    return 0
+
+
+if __name__ == "__main__":
+    # the CLI reads PARTITION_* through the executor config, like the
+    # supervisor does; importing common.partitions does not
+    from executor.config import get_settings
+
+    sys.exit(main(sys.argv[1:], get_settings().partition_settings()))
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import json
+import threading
+from typing import Any, Dict, Optional
+
+try:
+    import orjson
+except ImportError:  # optional: stdlib fallback, same output shape
+    orjson = None
+
+
+# =========================================================
+# JSON SERIALIZATION (one place for every encode/decode)
+#
+# orjson when installed (several times faster than the stdlib
+# and returns bytes, which psycopg sends as-is), stdlib json
+# otherwise. Types json cannot encode (Decimal, alpaca models,
+# ...) fall back to str(), as json.dumps(default=str) did.
+#
+# register_psycopg() makes psycopg's Json/Jsonb wrappers and
+# json/jsonb columns use these functions process-wide.
+# =========================================================
+
+BACKEND = "orjson" if orjson is not None else "json"
+
+if orjson is not None:
+    _OPTS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+    def dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj, default=str, option=_OPTS)
+
+    def loads(data: Any) -> Any:
+        return orjson.loads(data)
+
+else:
+
+    def dumps(obj: Any) -> bytes:
+        return json.dumps(obj, default=str, separators=(",", ":")).encode()
+
+    def loads(data: Any) -> Any:
+        return json.loads(data)
+
+
+def dumps_str(obj: Any) -> str:
+    return dumps(obj).decode()
+
+
+# keys kept (shortened) when a detail is over its size bound
+_CORE_KEYS = (
+    "ok",
+    "reason",
+    "stage",
+    "error",
+    "status",
+    "alpaca_order_id",
+    "trade_id",
+    "kept_intent_id",
+)
+
+
+def bounded(detail: Dict[str, Any], max_bytes: int) -> str:
+    """
+    Encode `detail` as a JSON object of at most ~max_bytes. Oversized
+    details keep their core keys (strings cut to 300 chars) plus
+    {"truncated": true, "bytes": <original size>}: always valid JSON,
+    never a cut string.
+    """
+    data = dumps(detail)
+    if max_bytes <= 0 or len(data) <= max_bytes:
+        return data.decode()
+
+    core: Dict[str, Any] = {}
+    for k in _CORE_KEYS:
+        if k in detail:
+            v = detail[k]
+            core[k] = v[:300] if isinstance(v, str) else v
+    core["truncated"] = True
+    core["bytes"] = len(data)
+    return dumps_str(core)
+
+
+_registered = False
+_register_lock = threading.Lock()
+
+
+def register_psycopg(context: Optional[Any] = None) -> None:
+    """
+    Route psycopg json/jsonb dumping and loading through dumps/loads
+    (globally when context is None; idempotent).
+    """
+    global _registered
+    from psycopg.types.json import set_json_dumps, set_json_loads
+
+    if context is not None:
+        set_json_dumps(dumps, context)
+        set_json_loads(loads, context)
+        return
+
+    with _register_lock:
+        if _registered:
+            return
+        set_json_dumps(dumps)
+        set_json_loads(loads)
+        _registered = True
@@ -1,15 +1,17 @@
 from __future__ import annotations
 
-from typing import Optional
-from alpaca.trading.client import TradingClient
+from typing import TYPE_CHECKING, Optional
 
-from executor.config import (
-    ALPACA_KEY_ID,
-    ALPACA_SECRET_KEY,
-    ALPACA_BASE_URL,
-)
+from executor.config import ALPACA_BASE_URL, get_settings
+from executor.rate_limit import BrokerBudget, RateLimitedClient, TokenBucket
+
+if TYPE_CHECKING:
+    from alpaca.trading.client import TradingClient
 
 _client: Optional[TradingClient] = None
+_bucket: Optional[TokenBucket] = None
+_budget: Optional[BrokerBudget] = None
+_async_client = None
 
 
 def get_trading_client() -> TradingClient:
@@ -17,13 +19,144 @@ def get_trading_client() -> TradingClient:
     if _client:
         return _client
 
-    _client = TradingClient(
-        api_key=ALPACA_KEY_ID,
-        secret_key=ALPACA_SECRET_KEY,
+    # alpaca-py (and the pandas it pulls in) loads on first use
+    from alpaca.trading.client import TradingClient
+
+    cfg = get_settings()
+    client = TradingClient(
+        api_key=cfg.alpaca_key_id,
+        secret_key=cfg.alpaca_secret_key,
         paper=False,  # 🔴 ignored, we use url_override
         url_override=ALPACA_BASE_URL,
     )
 
-    print(f"[EXECUTOR] TradingClient connected to {ALPACA_BASE_URL}", flush=True)
+    if cfg.broker_rate_limit_enabled:
+        disable_sdk_retry(client)
+        client = wrap_rate_limited(client)
+
+    _client = client
+
+    print(
+        f"[EXECUTOR] TradingClient connected to {ALPACA_BASE_URL} "
+        f"rate_limit={'on' if cfg.broker_rate_limit_enabled else 'off'}",
+        flush=True,
+    )
 
     return _client
+
+
+def disable_sdk_retry(client: TradingClient) -> None:
+    """
+    Retries are ours (Retry-After aware, submit-safe); alpaca-py's
+    built-in fixed-wait 429 retry would stack on top of them.
+
+    TradingClient has no public switch for it (RESTClient's
+    retry_attempts ignores 0), so this sets the attribute its request
+    loop reads. alpaca-py is pinned (requirements.txt) and
+    tests/test_alpaca_client.py fails if that loop changes.
+    """
+    if not isinstance(getattr(client, "_retry", None), int):
+        raise RuntimeError(
+            "alpaca-py TradingClient has no _retry attribute: cannot turn off its 429 retry "
+            "(check the pinned alpaca-py version)"
+        )
+    client._retry = 0
+
+
+def replica_budget() -> BrokerBudget:
+    """
+    This replica's share of the account budget (BROKER_REPLICAS).
+    """
+    cfg = get_settings()
+    account = BrokerBudget(cfg.broker_rate_per_min, cfg.broker_burst, cfg.broker_submit_reserve)
+    return account.share(cfg.broker_replicas)
+
+
+def set_broker_budget(budget: BrokerBudget) -> None:
+    """
+    This process's budget (the supervisor passes each worker its
+    share). Call before the first broker request.
+    """
+    global _budget
+    _budget = budget
+
+
+def _get_bucket() -> TokenBucket:
+    global _bucket
+    if _bucket is None:
+        b = _budget or replica_budget()
+        _bucket = TokenBucket(
+            rate_per_sec=b.rate_per_min / 60.0,
+            burst=b.burst,
+            submit_reserve=b.submit_reserve,
+        )
+    return _bucket
+
+
+def wrap_rate_limited(client):
+    """
+    Put any TradingClient-like object behind the process-wide token
+    bucket + 429/5xx retry policy (executor.rate_limit).
+    """
+    cfg = get_settings()
+    return RateLimitedClient(
+        client,
+        _get_bucket(),
+        max_retries=cfg.broker_max_retries,
+        backoff_base_sec=cfg.broker_backoff_base_sec,
+        backoff_max_sec=cfg.broker_backoff_max_sec,
+    )
+
+
+def get_async_broker():
+    """
+    Process-wide AsyncBrokerClient (same account, same token bucket
+    as the sync client). Use from the AsyncRuntime loop only.
+    """
+    global _async_client
+    if _async_client is not None:
+        return _async_client
+
+    from executor.async_broker import AsyncBrokerClient
+
+    cfg = get_settings()
+    _async_client = AsyncBrokerClient(
+        base_url=ALPACA_BASE_URL,
+        key_id=cfg.alpaca_key_id,
+        secret_key=cfg.alpaca_secret_key,
+        http2=cfg.broker_http2,
+        max_connections=cfg.broker_max_connections,
+        max_keepalive=cfg.broker_max_keepalive,
+        keepalive_expiry_sec=cfg.broker_keepalive_expiry_sec,
+        connect_timeout_sec=cfg.broker_connect_timeout_sec,
+        read_timeout_sec=cfg.broker_read_timeout_sec,
+        bucket=_get_bucket() if cfg.broker_rate_limit_enabled else None,
+        max_retries=cfg.broker_max_retries,
+        backoff_base_sec=cfg.broker_backoff_base_sec,
+        backoff_max_sec=cfg.broker_backoff_max_sec,
+    )
+
+    print(
+        f"[EXECUTOR] async broker client {ALPACA_BASE_URL} http2={_async_client.http2}",
+        flush=True,
+    )
+    return _async_client
+
+
+def set_async_broker(client) -> None:
+    """
+    Install an async broker for this process (fakes for benchmarks).
+    """
+    global _async_client
+    _async_client = client
+
+
+def set_trading_client(client) -> None:
+    """
+    Install a client for this process (fake/simulated brokers for
+    benchmarks and replays). Anything with the TradingClient methods
+    works; it is used as-is (wrap with wrap_rate_limited() to test
+    the limiter).
+    """
+    global _client
+    _client = client
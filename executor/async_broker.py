@@ -0,0 +1,269 @@
+from __future__ import annotations
+
+import os
+import enum
+import asyncio
+import threading
+from types import SimpleNamespace
+from datetime import datetime
+from typing import Any, Awaitable, Dict, List, Optional, TypeVar
+
+from executor.rate_limit import (
+    READ,
+    SUBMIT,
+    TokenBucket,
+    backoff_delay,
+    retryable,
+)
+from common.metrics import inc, observe
+
+
+# =========================================================
+# ASYNC BROKER ADAPTER (httpx, keep-alive pool, HTTP/2 when h2
+# is installed)
+#
+# Covers the calls the executor makes: get_account,
+# get_all_positions, get_open_position, get_orders, get (raw)
+# and submit_order. Results are SimpleNamespace objects with the
+# broker's JSON fields, read by the handlers via getattr() like
+# alpaca-py models. Shares the process token bucket and the
+# 429/5xx policy of executor.rate_limit.
+#
+# Sync code drives it through AsyncRuntime: one event loop on a
+# daemon thread, so the pooled connections outlive each batch.
+# =========================================================
+
+T = TypeVar("T")
+
+
+class BrokerHTTPError(Exception):
+    def __init__(self, status_code: int, message: str, retry_after: Optional[float] = None):
+        super().__init__(f"{status_code} {message}")
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+def _jsonable(v: Any) -> Any:
+    if isinstance(v, enum.Enum):
+        return v.value
+    if isinstance(v, datetime):
+        return v.isoformat()
+    if isinstance(v, dict):
+        return {k: _jsonable(x) for k, x in v.items() if x is not None}
+    if isinstance(v, (list, tuple)):
+        return [_jsonable(x) for x in v]
+    return v
+
+
+def _param(v: Any) -> Any:
+    # query-string form: lists comma-joined, lowercase booleans
+    if isinstance(v, bool):
+        return "true" if v else "false"
+    if isinstance(v, (list, tuple, set)):
+        return ",".join(str(_param(x)) for x in v)
+    return _jsonable(v)
+
+
+def _request_fields(obj: Any) -> Dict[str, Any]:
+    if obj is None:
+        return {}
+    if isinstance(obj, dict):
+        return dict(obj)
+    return obj.to_request_fields()
+
+
+def _seconds(v: Optional[str]) -> Optional[float]:
+    try:
+        return float(v) if v else None
+    except ValueError:
+        return None
+
+
+def _ns(d: Any) -> Any:
+    return SimpleNamespace(**d) if isinstance(d, dict) else d
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class AsyncBrokerClient:
+    def __init__(
+        self,
+        *,
+        base_url: str,
+        key_id: str,
+        secret_key: str,
+        http2: bool = True,
+        max_connections: int = 20,
+        max_keepalive: int = 10,
+        keepalive_expiry_sec: float = 30.0,
+        connect_timeout_sec: float = 5.0,
+        read_timeout_sec: float = 15.0,
+        bucket: Optional[TokenBucket] = None,
+        max_retries: int = 4,
+        backoff_base_sec: float = 0.25,
+        backoff_max_sec: float = 8.0,
+    ):
+        self.base_url = base_url.rstrip("/") + "/v2"
+        self._headers = {
+            "APCA-API-KEY-ID": key_id,
+            "APCA-API-SECRET-KEY": secret_key,
+        }
+        self.http2 = http2 and _http2_available()
+        self._limits = (max_connections, max_keepalive, keepalive_expiry_sec)
+        self._timeouts = (connect_timeout_sec, read_timeout_sec)
+        self._bucket = bucket
+        self._max_retries = max(0, int(max_retries))
+        self._backoff_base = backoff_base_sec
+        self._backoff_max = backoff_max_sec
+        self._http = None
+
+    def _client(self):
+        if self._http is None:
+            import httpx
+
+            max_conn, max_keepalive, expiry = self._limits
+            connect, read = self._timeouts
+            self._http = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers=self._headers,
+                http2=self.http2,
+                limits=httpx.Limits(
+                    max_connections=max_conn,
+                    max_keepalive_connections=max_keepalive,
+                    keepalive_expiry=expiry,
+                ),
+                timeout=httpx.Timeout(read, connect=connect, pool=connect),
+            )
+        return self._http
+
+    async def _request(
+        self,
+        method: str,
+        path: str,
+        *,
+        name: str,
+        params: Optional[Dict[str, Any]] = None,
+        json: Optional[Dict[str, Any]] = None,
+        priority: str = READ,
+    ) -> Any:
+        http = self._client()
+        attempt = 0
+        while True:
+            if self._bucket is not None:
+                waited = await self._bucket.acquire_async(priority)
+                observe("executor_broker_wait_seconds", waited, priority=priority)
+
+            resp = await http.request(method, path, params=params, json=json)
+            if resp.status_code < 400:
+                return resp.json() if resp.content else None
+
+            err = BrokerHTTPError(
+                resp.status_code,
+                resp.text[:300],
+                retry_after=_seconds(resp.headers.get("Retry-After")),
+            )
+            if attempt >= self._max_retries or not retryable(priority, resp.status_code):
+                raise err
+
+            attempt += 1
+            delay = backoff_delay(attempt, err, base=self._backoff_base, cap=self._backoff_max)
+            inc("executor_broker_retries_total", method=name, status=str(resp.status_code))
+            print(
+                f"[BROKER] {name} status={resp.status_code} "
+                f"retry={attempt}/{self._max_retries} in {delay:.2f}s",
+                flush=True,
+            )
+            if resp.status_code == 429 and self._bucket is not None:
+                self._bucket.penalize(delay)
+            else:
+                await asyncio.sleep(delay)
+
+    # --------------------------------------------------
+    # TradingClient SURFACE (async)
+    # --------------------------------------------------
+
+    async def get_account(self):
+        return _ns(await self._request("GET", "/account", name="get_account"))
+
+    async def get_all_positions(self) -> List[Any]:
+        rows = await self._request("GET", "/positions", name="get_all_positions")
+        return [_ns(r) for r in rows or []]
+
+    async def get_open_position(self, symbol: str):
+        return _ns(await self._request("GET", f"/positions/{symbol.upper()}", name="get_open_position"))
+
+    async def get_orders(self, filter: Any = None) -> List[Any]:
+        params = {k: _param(v) for k, v in _request_fields(filter).items() if v is not None}
+        rows = await self._request("GET", "/orders", name="get_orders", params=params)
+        return [_ns(r) for r in rows or []]
+
+    async def get(self, path: str, data: Optional[Dict[str, Any]] = None) -> Any:
+        params = {k: _param(v) for k, v in (data or {}).items() if v is not None}
+        return await self._request("GET", path, name="get", params=params)
+
+    async def submit_order(self, order_data: Any):
+        body = _jsonable(_request_fields(order_data))
+        return _ns(
+            await self._request("POST", "/orders", name="submit_order", json=body, priority=SUBMIT)
+        )
+
+    async def get_order_by_client_id(self, client_id: str):
+        return _ns(
+            await self._request(
+                "GET",
+                "/orders:by_client_order_id",
+                name="get_order_by_client_id",
+                params={"client_order_id": client_id},
+                priority=READ,
+            )
+        )
+
+    async def aclose(self) -> None:
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+
+# ---------------------------------------------------------
+# EVENT LOOP FOR SYNC CALLERS
+# ---------------------------------------------------------
+
+class AsyncRuntime:
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name="executor-async", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def run(self, coro: Awaitable[T]) -> T:
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    def close(self) -> None:
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=5)
+
+
+_runtime: Optional[AsyncRuntime] = None
+_runtime_pid: Optional[int] = None
+_runtime_lock = threading.Lock()
+
+
+def get_async_runtime() -> AsyncRuntime:
+    global _runtime, _runtime_pid
+    pid = os.getpid()
+    if _runtime is not None and _runtime_pid == pid:
+        return _runtime
+    with _runtime_lock:
+        if _runtime is None or _runtime_pid != pid:
+            _runtime = AsyncRuntime()
+            _runtime_pid = pid
+    return _runtime
@@ -1,67 +1,378 @@
 from __future__ import annotations
 
 import os
+import threading
+from dataclasses import dataclass, fields
+from typing import TYPE_CHECKING, Any, Callable, List, Mapping, Optional
+
+if TYPE_CHECKING:
+    from common.db import PoolSettings
+    from common.partitions import PartitionSettings
 
 # =========================================================
 # 🔴 LIVE-ONLY ALPACA CONFIG
+#
+# Settings are read from the environment and validated on FIRST
+# USE, not at import: importing this module is free, so a worker
+# can start (and log) before anything is parsed.
+#
+#   from executor.config import get_settings
+#   get_settings().claim_batch
+#
+# The old module constants still work (`from executor.config
+# import CLAIM_BATCH`) through the module __getattr__ below, but
+# they load the settings at that point; prefer get_settings()
+# inside functions.
 # =========================================================
 
-ALPACA_KEY_ID = (
-    os.getenv("APCA_API_KEY_ID")
-    or os.getenv("ALPACA_API_KEY")
-)
-
-ALPACA_SECRET_KEY = (
-    os.getenv("APCA_API_SECRET_KEY")
-    or os.getenv("ALPACA_SECRET_KEY")
-)
-
-if not ALPACA_KEY_ID or not ALPACA_SECRET_KEY:
-    raise RuntimeError("❌ Alpaca credentials missing")
-
 # 🔴 HARD LOCK TO LIVE
 ALPACA_PAPER = False
 ALPACA_BASE_URL = "https://api.alpaca.markets"
 
-# ---------------------------------------------------------
-# DATA / STREAM (kept for compatibility)
-# ---------------------------------------------------------
 
-ALPACA_DATA_URL = os.getenv(
-    "ALPACA_DATA_URL",
-    "https://data.alpaca.markets",
-).rstrip("/")
+class ConfigError(RuntimeError):
+    pass
 
-ALPACA_FEED = (
-    os.getenv("APCA_DATA_FEED")
-    or os.getenv("ALPACA_FEED")
-    or "iex"
-)
 
-ALPACA_STREAM_URL = os.getenv(
-    "APCA_STREAM_URL",
-    "wss://stream.data.alpaca.markets/v2/sip",
-)
+def _env(env: Mapping[str, str], *names: str, default: Optional[str] = None) -> Optional[str]:
+    for name in names:
+        v = env.get(name)
+        if v:
+            return v
+    return default
 
-# ---------------------------------------------------------
-# BACKWARD COMPATIBILITY (DO NOT REMOVE)
-# ---------------------------------------------------------
 
-ALPACA_API_KEY = ALPACA_KEY_ID
-ALPACA_API_SECRET = ALPACA_SECRET_KEY
+def _flag(env: Mapping[str, str], name: str, default: str) -> bool:
+    return (env.get(name) or default).strip().lower() in ("1", "true", "yes")
 
-# =========================================================
-# EXECUTOR GUARDS
-# =========================================================
 
-MAX_STOCKS_POSITIONS = int(os.getenv("MAX_STOCKS_POSITIONS", "5"))
-MAX_STOCKS_TRADES_PER_DAY = int(os.getenv("MAX_STOCKS_TRADES_PER_DAY", "10"))
+@dataclass(frozen=True)
+class Settings:
+    alpaca_key_id: str
+    alpaca_secret_key: str
+
+    # DATA / STREAM (kept for compatibility)
+    alpaca_data_url: str
+    alpaca_feed: str
+    alpaca_stream_url: str
+
+    # trade_updates websocket (live order/position book for the guards)
+    trade_stream_enabled: bool
+    trade_stream_url: str
+    trade_stream_stale_sec: float
+
+    # broker request budget of the ACCOUNT: split across BROKER_REPLICAS
+    # supervisors and, by each supervisor, across its worker processes
+    broker_rate_limit_enabled: bool
+    broker_rate_per_min: float
+    broker_burst: float
+    broker_replicas: int
+    # tokens read-only calls may not use (kept for order submits)
+    broker_submit_reserve: float
+    broker_max_retries: int
+    broker_backoff_base_sec: float
+    broker_backoff_max_sec: float
+
+    # async broker adapter (executor.async_broker; EXECUTOR_ASYNC_SUBMIT=1)
+    broker_http2: bool
+    broker_max_connections: int
+    broker_max_keepalive: int
+    broker_keepalive_expiry_sec: float
+    broker_connect_timeout_sec: float
+    broker_read_timeout_sec: float
+
+    # EXECUTOR GUARDS
+    max_stocks_positions: int
+    max_stocks_trades_per_day: int
+    max_penny_positions: int
+    max_penny_trades_per_day: int
+    # 1: caps / buying power are enforced across processes and replicas
+    #    sharing the account (executor.ledger, one DB lock per reservation);
+    #    the supervisor turns it on by itself for more than one process
+    shared_ledger: bool
+    # a reservation whose submit never settled stops counting after this
+    ledger_ttl_sec: float
+    allow_market_bracket: bool
+
+    # trading-day boundary for the daily trade caps (local midnight in this tz)
+    trading_day_tz: str
+
+    poll_sec: int
+    idle_heartbeat_sec: int
+
+    # intents claimed per round trip; results are flushed once per batch
+    claim_batch: int
+
+    # check every pending intent of a run in bulk before the first claim
+    prevalidate: bool
+
+    # fit the run to position slots / daily trades / buying power by
+    # priority before the first claim (executor.scheduler)
+    schedule: bool
+
+    # >1: execute a claimed batch on a thread pool (same-symbol intents stay serial)
+    workers: int
+
+    # batches claimed ahead / waiting for write-back (executor.pipeline); 0: serial
+    pipeline_depth: int
+
+    # dispatches one worker drains at once, interleaved a batch per turn
+    # (executor.fair); 1: one run at a time, to completion
+    max_dispatches: int
+    # rr: equal turns; weight: turns in proportion to payload.weight
+    dispatch_weighting: str
+    # intents one run may claim per turn when interleaving (0: CLAIM_BATCH;
+    # payload.max_inflight overrides it per run)
+    run_max_inflight: int
+    # all slots full and a job queued: a dispatch held longer than this
+    # yields its slot (requeued, resumed later); 0: never
+    dispatch_slice_sec: float
+
+    # 1: submit each batch from one event loop (async broker adapter); handlers
+    #    without prepare/finalize phases fall back to the sync path
+    async_submit: bool
+    async_inflight: int
+
+    # notify: LISTEN/NOTIFY wake-up, polling every SAFETY_POLL_SEC as a safety net
+    # poll:   legacy POLL_SEC sleep loop
+    wake_mode: str
+    safety_poll_sec: int
+
+    # supervisor applies pending migrations before spawning workers;
+    # 0: refuse to start while any are pending
+    auto_migrate: bool
+
+    # job leases: a running job whose lease is not renewed (heartbeat every
+    # LEASE_SEC/3) is requeued by the reaper, at most MAX_REAPS times
+    lease_sec: int
+    reap_sec: int
+    max_reaps: int
+
+    # strategy_intents.dispatched_detail (jsonb) size bound per intent
+    detail_max_bytes: int
+
+    # per-process DB pool (common.db)
+    db_pool_min_size: int
+    db_pool_max_size: int
+    db_pool_max_idle_sec: float
+    db_pool_max_lifetime_sec: float
+    db_pool_timeout_sec: float
+
+    # time-range partitions (common.partitions): maintenance interval
+    # (supervisor thread / --loop; 0: off), period size, periods made
+    # ahead, retention, retire mode and archive target
+    partition_maint_sec: float
+    partition_interval: str
+    partition_premake: int
+    partition_retention_days: int
+    partition_retire: str
+    partition_archive_dir: str
+    partition_lock_timeout_ms: int
+
+    def pool_settings(self) -> "PoolSettings":
+        # what common.db takes (it does not read this config)
+        from common.db import PoolSettings
+
+        return PoolSettings(
+            min_size=self.db_pool_min_size,
+            max_size=self.db_pool_max_size,
+            max_idle_sec=self.db_pool_max_idle_sec,
+            max_lifetime_sec=self.db_pool_max_lifetime_sec,
+            timeout_sec=self.db_pool_timeout_sec,
+        )
+
+    def partition_settings(self) -> "PartitionSettings":
+        # what common.partitions takes (it does not read this config)
+        from common.partitions import PartitionSettings
+
+        return PartitionSettings(
+            maint_sec=self.partition_maint_sec,
+            interval=self.partition_interval,
+            premake=self.partition_premake,
+            retention_days=self.partition_retention_days,
+            retire=self.partition_retire,
+            archive_dir=self.partition_archive_dir,
+            lock_timeout_ms=self.partition_lock_timeout_ms,
+        )
+
+
+def load_settings(env: Optional[Mapping[str, str]] = None) -> Settings:
+    """
+    Parse + validate. Every bad value is reported at once
+    (ConfigError), not just the first.
+    """
+    env = os.environ if env is None else env
+    errors: List[str] = []
+
+    def num(name: str, default: str, cast: Callable[[str], Any], lo: Optional[float] = None) -> Any:
+        raw = env.get(name) or default
+        try:
+            v = cast(raw)
+        except ValueError:
+            errors.append(f"{name}={raw!r} is not a valid {cast.__name__}")
+            return cast(default)
+        if lo is not None and v < lo:
+            errors.append(f"{name}={raw!r} must be >= {cast(lo)}")
+            return cast(default)
+        return v
+
+    key_id = _env(env, "APCA_API_KEY_ID", "ALPACA_API_KEY")
+    secret = _env(env, "APCA_API_SECRET_KEY", "ALPACA_SECRET_KEY")
+    if not key_id or not secret:
+        errors.append("Alpaca credentials missing (APCA_API_KEY_ID / APCA_API_SECRET_KEY)")
+
+    wake_mode = (env.get("EXECUTOR_WAKE_MODE") or "notify").strip().lower()
+    if wake_mode not in ("notify", "poll"):
+        errors.append(f"EXECUTOR_WAKE_MODE={wake_mode!r} must be notify or poll")
+
+    weighting = (env.get("EXECUTOR_DISPATCH_WEIGHTING") or "rr").strip().lower()
+    if weighting not in ("rr", "weight"):
+        errors.append(f"EXECUTOR_DISPATCH_WEIGHTING={weighting!r} must be rr or weight")
+
+    partition_interval = (env.get("PARTITION_INTERVAL") or "month").strip().lower()
+    if partition_interval not in ("day", "week", "month"):
+        errors.append(f"PARTITION_INTERVAL={partition_interval!r} must be day, week or month")
+
+    partition_retire = (env.get("PARTITION_RETIRE") or "detach").strip().lower()
+    partition_archive_dir = (env.get("PARTITION_ARCHIVE_DIR") or "").strip()
+    if partition_retire not in ("detach", "archive"):
+        errors.append(f"PARTITION_RETIRE={partition_retire!r} must be detach or archive")
+    elif partition_retire == "archive" and not os.path.isabs(partition_archive_dir):
+        errors.append(
+            f"PARTITION_ARCHIVE_DIR={partition_archive_dir!r} must be an absolute path "
+            "(durable storage) when PARTITION_RETIRE=archive"
+        )
+
+    trading_day_tz = (env.get("EXECUTOR_TRADING_DAY_TZ") or "UTC").strip() or "UTC"
+    if trading_day_tz.upper() != "UTC":
+        from zoneinfo import ZoneInfo
+
+        try:
+            ZoneInfo(trading_day_tz)
+        except (KeyError, ValueError):
+            # ZoneInfoNotFoundError is a KeyError
+            errors.append(f"EXECUTOR_TRADING_DAY_TZ={trading_day_tz!r} is not a known time zone")
+
+    s = Settings(
+        alpaca_key_id=key_id or "",
+        alpaca_secret_key=secret or "",
+        alpaca_data_url=(env.get("ALPACA_DATA_URL") or "https://data.alpaca.markets").rstrip("/"),
+        alpaca_feed=_env(env, "APCA_DATA_FEED", "ALPACA_FEED", default="iex"),
+        alpaca_stream_url=env.get("APCA_STREAM_URL") or "wss://stream.data.alpaca.markets/v2/sip",
+        trade_stream_enabled=_flag(env, "TRADE_STREAM_ENABLED", "0"),
+        trade_stream_url=env.get("TRADE_STREAM_URL") or "wss://api.alpaca.markets/stream",
+        trade_stream_stale_sec=num("TRADE_STREAM_STALE_SEC", "300", float),
+        broker_rate_limit_enabled=_flag(env, "BROKER_RATE_LIMIT_ENABLED", "1"),
+        broker_rate_per_min=num("BROKER_RATE_PER_MIN", "200", float),
+        broker_burst=num("BROKER_BURST", "10", float),
+        broker_replicas=num("BROKER_REPLICAS", "1", int, lo=1),
+        broker_submit_reserve=num("BROKER_SUBMIT_RESERVE", "3", float),
+        broker_max_retries=num("BROKER_MAX_RETRIES", "4", int),
+        broker_backoff_base_sec=num("BROKER_BACKOFF_BASE_SEC", "0.25", float),
+        broker_backoff_max_sec=num("BROKER_BACKOFF_MAX_SEC", "8", float),
+        broker_http2=_flag(env, "BROKER_HTTP2", "1"),
+        broker_max_connections=num("BROKER_MAX_CONNECTIONS", "20", int),
+        broker_max_keepalive=num("BROKER_MAX_KEEPALIVE", "10", int),
+        broker_keepalive_expiry_sec=num("BROKER_KEEPALIVE_EXPIRY_SEC", "30", float),
+        broker_connect_timeout_sec=num("BROKER_CONNECT_TIMEOUT_SEC", "5", float),
+        broker_read_timeout_sec=num("BROKER_READ_TIMEOUT_SEC", "15", float),
+        max_stocks_positions=num("MAX_STOCKS_POSITIONS", "5", int),
+        max_stocks_trades_per_day=num("MAX_STOCKS_TRADES_PER_DAY", "10", int),
+        max_penny_positions=num("MAX_PENNY_POSITIONS", "1", int),
+        max_penny_trades_per_day=num("MAX_PENNY_TRADES_PER_DAY", "1", int),
+        shared_ledger=_flag(env, "EXECUTOR_SHARED_LEDGER", "0"),
+        ledger_ttl_sec=num("EXECUTOR_LEDGER_TTL_SEC", "120", float, lo=5),
+        allow_market_bracket=_flag(env, "ALLOW_MARKET_BRACKET", "0"),
+        trading_day_tz=trading_day_tz,
+        poll_sec=num("EXECUTOR_POLL_SEC", "5", int),
+        idle_heartbeat_sec=num("EXECUTOR_IDLE_HEARTBEAT_SEC", "30", int),
+        claim_batch=num("EXECUTOR_CLAIM_BATCH", "20", int, lo=1),
+        prevalidate=_flag(env, "EXECUTOR_PREVALIDATE", "1"),
+        schedule=_flag(env, "EXECUTOR_SCHEDULE", "1"),
+        workers=num("EXECUTOR_WORKERS", "1", int, lo=1),
+        pipeline_depth=num("EXECUTOR_PIPELINE_DEPTH", "1", int, lo=0),
+        max_dispatches=num("EXECUTOR_MAX_DISPATCHES", "1", int, lo=1),
+        dispatch_weighting=weighting,
+        run_max_inflight=num("EXECUTOR_RUN_MAX_INFLIGHT", "0", int, lo=0),
+        dispatch_slice_sec=num("EXECUTOR_DISPATCH_SLICE_SEC", "30", float, lo=0),
+        async_submit=_flag(env, "EXECUTOR_ASYNC_SUBMIT", "0"),
+        async_inflight=num("EXECUTOR_ASYNC_INFLIGHT", "32", int, lo=1),
+        wake_mode=wake_mode,
+        safety_poll_sec=num("EXECUTOR_SAFETY_POLL_SEC", "60", int),
+        auto_migrate=_flag(env, "EXECUTOR_AUTO_MIGRATE", "1"),
+        lease_sec=num("EXECUTOR_LEASE_SEC", "60", int, lo=3),
+        reap_sec=num("EXECUTOR_REAP_SEC", "30", int, lo=1),
+        max_reaps=num("EXECUTOR_MAX_REAPS", "3", int, lo=1),
+        detail_max_bytes=num("EXECUTOR_DETAIL_MAX_BYTES", "8192", int, lo=256),
+        db_pool_min_size=num("DB_POOL_MIN_SIZE", "1", int, lo=0),
+        db_pool_max_size=num("DB_POOL_MAX_SIZE", "10", int, lo=1),
+        db_pool_max_idle_sec=num("DB_POOL_MAX_IDLE_SEC", "300", float, lo=0),
+        db_pool_max_lifetime_sec=num("DB_POOL_MAX_LIFETIME_SEC", "1800", float, lo=1),
+        db_pool_timeout_sec=num("DB_POOL_TIMEOUT_SEC", "10", float, lo=0),
+        partition_maint_sec=num("PARTITION_MAINT_SEC", "3600", float, lo=0),
+        partition_interval=partition_interval,
+        partition_premake=num("PARTITION_PREMAKE", "3", int, lo=0),
+        partition_retention_days=num("PARTITION_RETENTION_DAYS", "90", int, lo=0),
+        partition_retire=partition_retire,
+        partition_archive_dir=partition_archive_dir,
+        partition_lock_timeout_ms=num("PARTITION_LOCK_TIMEOUT_MS", "2000", int, lo=1),
+    )
+
+    if errors:
+        raise ConfigError("❌ invalid executor config: " + "; ".join(errors))
+    return s
+
+
+_settings: Optional[Settings] = None
+_settings_lock = threading.Lock()
+
+
+def get_settings() -> Settings:
+    global _settings
+    if _settings is not None:
+        return _settings
+    with _settings_lock:
+        if _settings is None:
+            _settings = load_settings()
+            _configure_pool(_settings)
+            print(f"[CONFIG] 🔴 LIVE MODE LOCKED → {ALPACA_BASE_URL}", flush=True)
+    return _settings
+
+
+def _configure_pool(s: Settings) -> None:
+    # common.db opens its pool on first use and takes its size from here
+    from common.db import configure_pool
+
+    configure_pool(s.pool_settings())
+
+
+def reload_settings() -> Settings:
+    """
+    Drop the cached settings and re-read the environment
+    (benchmarks / replays that set env after import).
+    """
+    global _settings
+    with _settings_lock:
+        _settings = None
+    return get_settings()
+
+
+# ---------------------------------------------------------
+# BACKWARD COMPATIBILITY (DO NOT REMOVE)
+# UPPER_CASE module constants -> settings fields
+# ---------------------------------------------------------
 
-ALLOW_MARKET_BRACKET = os.getenv("ALLOW_MARKET_BRACKET", "0").strip().lower() in (
-    "1", "true", "yes"
-)
+_FIELDS = frozenset(f.name for f in fields(Settings))
+_ALIASES = {
+    "ALPACA_KEY_ID": "alpaca_key_id",
+    "ALPACA_API_KEY": "alpaca_key_id",
+    "ALPACA_SECRET_KEY": "alpaca_secret_key",
+    "ALPACA_API_SECRET": "alpaca_secret_key",
+}
 
-POLL_SEC = int(os.getenv("EXECUTOR_POLL_SEC", "5"))
-IDLE_HEARTBEAT_SEC = int(os.getenv("EXECUTOR_IDLE_HEARTBEAT_SEC", "30"))
 
-print(f"[CONFIG] 🔴 LIVE MODE LOCKED → {ALPACA_BASE_URL}", flush=True)
+def __getattr__(name: str) -> Any:
+    field = _ALIASES.get(name) or (name.lower() if name.isupper() else None)
+    if field in _FIELDS:
+        return getattr(get_settings(), field)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
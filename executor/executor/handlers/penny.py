@@ -1,25 +1,32 @@
 from __future__ import annotations
 
-from typing import Dict, Any
-import math
+from typing import Dict, Any, Optional, Tuple
 
 from executor.alpaca_client import get_trading_client
 from executor.validate import validate_planning_context
-from executor.guards import (
-    count_open_positions,
-    count_open_buy_orders,   # NEW
-    has_open_position,
-    has_open_buy_order,
-    count_filled_buys_today_utc,
+from executor.snapshot import AccountSnapshot
+from executor.sizing import cap_detail, sizing_for
+from executor.orders import (
+    PreparedOrder,
+    adopt_duplicate,
+    build_order_from_planning_context,
+    submit_failed,
 )
-from executor.orders import build_order_from_planning_context
-from executor.config import MAX_PENNY_POSITIONS, MAX_PENNY_TRADES_PER_DAY
+from executor.config import get_settings
 from common.logging import log_trade_event
+from common.metrics import timed
 
 
-def execute_penny_intent(*, run_id: str, intent: dict) -> Dict[str, Any]:
-
-    client = get_trading_client()
+def prepare_penny_intent(
+    *,
+    run_id: str,
+    intent: dict,
+    snapshot: Optional[AccountSnapshot] = None,
+) -> Tuple[Optional[PreparedOrder], Optional[Dict[str, Any]]]:
+    """
+    Validation, guards (slot reserved), sizing and order build; no
+    broker submit. Returns (prepared, None) or (None, failure result).
+    """
 
     intent_id = str(intent["intent_id"])
     symbol = str(intent["symbol"]).upper().strip()
@@ -31,136 +38,117 @@ def execute_penny_intent(*, run_id: str, intent: dict) -> Dict[str, Any]:
     conviction = source_facts.get("conviction", "unknown")
     run_position_cap = source_facts.get("run_position_cap")
 
-    ok, why = validate_planning_context(pc)
+    with timed("validation"):
+        ok, why = validate_planning_context(pc)
     if not ok:
-        return {"ok": False, "reason": why}
+        return None, {"ok": False, "reason": why}
+
+    if snapshot is None:
+        with timed("guard_snapshot"):
+            snapshot = AccountSnapshot.load(get_trading_client())
 
     # ------------------------------------------------------
-    # DAILY TRADE GUARD
+    # POSITION SIZING (RISK-DISTANCE AWARE)
+    # qty as given, else floor(max_risk_usd / |entry - stop_loss|),
+    # else floor(max_notional_usd / entry); this intent's share of
+    # the batch plan (executor.sizing), funded from buying power
+    # when the slot is reserved below
     # ------------------------------------------------------
 
-    if MAX_PENNY_TRADES_PER_DAY > 0:
-        buys_today = count_filled_buys_today_utc(client)
-        if buys_today >= MAX_PENNY_TRADES_PER_DAY:
-            return {
-                "ok": False,
-                "reason": "max_trades_per_day_reached",
-                "buys_today": buys_today,
-            }
+    with timed("sizing"):
+        sized = sizing_for(intent)
+    if not sized.ok:
+        return None, {"ok": False, "reason": sized.reason}
 
     # ------------------------------------------------------
-    # GLOBAL POSITION GUARD
-    # open positions + open buy orders
+    # GUARDS (atomic check + slot reservation)
+    # - daily trade cap
+    # - global position cap: open positions + open buy orders
+    # - symbol: already in position / open buy order
     # ------------------------------------------------------
 
-    open_pos = count_open_positions(client)
-    pending_buys = count_open_buy_orders(client)
-
-    active_positions = open_pos + pending_buys
-
-    effective_cap = MAX_PENNY_POSITIONS
+    cfg = get_settings()
+    effective_cap = cfg.max_penny_positions
 
     if isinstance(run_position_cap, int) and run_position_cap > 0:
         effective_cap = min(effective_cap, run_position_cap)
 
-    if active_positions >= effective_cap:
-        return {
-            "ok": False,
-            "reason": "max_positions_reached",
-            "open_positions": open_pos,
-            "pending_buys": pending_buys,
-            "active_positions": active_positions,
-            "cap": effective_cap,
-        }
-
-    # ------------------------------------------------------
-    # SYMBOL GUARDS
-    # ------------------------------------------------------
-
-    if has_open_position(client, symbol):
-        return {"ok": False, "reason": "skip_already_in_position"}
+    with timed("guards"):
+        qty, denied = snapshot.fund_entry(
+            symbol,
+            qty=sized.qty,
+            price=sized.price,
+            fit=not sized.explicit,
+            max_trades_per_day=cfg.max_penny_trades_per_day,
+            max_positions=effective_cap,
+            pending_counts_as_position=True,
+        )
+    if denied:
+        return None, denied
 
-    if has_open_buy_order(client, symbol):
-        return {"ok": False, "reason": "skip_open_buy_order"}
+    def _release(res: Dict[str, Any]) -> Tuple[None, Dict[str, Any]]:
+        snapshot.release(symbol)
+        return None, res
 
     # ------------------------------------------------------
-    # POSITION SIZING (RISK-DISTANCE AWARE)
+    # BUILD ORDER
     # ------------------------------------------------------
 
-    qty = pc.get("qty")
-
-    if qty is None:
-        entry_hint = (pc.get("meta") or {}).get("entry_price_hint")
-        stop_loss = pc.get("stop_loss")
-        max_risk = pc.get("max_risk_usd")
-        max_notional = pc.get("max_notional_usd")
-
-        # Preferred: risk-distance sizing
-        if entry_hint is not None and stop_loss is not None and max_risk is not None:
-            try:
-                entry_price = float(entry_hint)
-                stop_price = float(stop_loss)
-                risk_per_share = abs(entry_price - stop_price)
-
-                if risk_per_share > 0:
-                    qty = math.floor(float(max_risk) / risk_per_share)
-            except Exception:
-                qty = None
-
-        # Fallback: notional sizing
-        if qty is None:
-            if not max_notional or not entry_hint:
-                return {"ok": False, "reason": "missing_qty_and_sizing_inputs"}
-
-            try:
-                qty = math.floor(float(max_notional) / float(entry_hint))
-            except Exception:
-                return {"ok": False, "reason": "sizing_error"}
-
-        if not qty or qty <= 0:
-            return {"ok": False, "reason": "qty_zero_after_sizing"}
-
-    try:
-        qty = int(qty)
-    except Exception:
-        return {"ok": False, "reason": "invalid_qty"}
+    with timed("order_build"):
+        req, status = build_order_from_planning_context(
+            symbol=symbol,
+            qty=qty,
+            planning_context=pc,
+            client_order_id=intent_id,
+        )
 
-    # ------------------------------------------------------
-    # BUILD ORDER
-    # ------------------------------------------------------
+    if status != "ok" or req is None:
+        return _release({"ok": False, "reason": status})
 
-    req, status = build_order_from_planning_context(
-        symbol=symbol,
-        qty=qty,
-        planning_context=pc,
+    return (
+        PreparedOrder(
+            intent_id=intent_id,
+            symbol=symbol,
+            strategy=strategy,
+            side=pc.get("side") or "buy",
+            qty=qty,
+            planning_context=pc,
+            request=req,
+            snapshot=snapshot,
+            extra={"conviction": conviction, **cap_detail(sized, qty)},
+        ),
+        None,
     )
 
-    if status != "ok" or req is None:
-        return {"ok": False, "reason": status}
 
-    # ------------------------------------------------------
-    # SUBMIT ORDER
-    # ------------------------------------------------------
+def finalize_penny_intent(*, run_id: str, prepared: PreparedOrder, order: Any) -> Dict[str, Any]:
+    symbol = prepared.symbol
+    qty = prepared.qty
+    conviction = prepared.extra.get("conviction", "unknown")
+    capped = {k: v for k, v in prepared.extra.items() if k in ("requested_qty", "capped")}
+
+    prepared.snapshot.confirm(symbol, prepared.side)
 
     try:
-        order = client.submit_order(req)
         alp_id = str(getattr(order, "id", "") or "")
 
-        log_trade_event(
-            run_id=run_id,
-            symbol=symbol,
-            event_type="ENTRY_SUBMITTED",
-            source="executor_penny",
-            reason="alpaca_submit_order",
-            raw={
-                "intent_id": intent_id,
-                "strategy": strategy,
-                "conviction": conviction,
-                "alpaca_order_id": alp_id,
-                "qty": qty,
-                "planning_context": pc,
-            },
-        )
+        with timed("event_log"):
+            log_trade_event(
+                run_id=run_id,
+                symbol=symbol,
+                event_type="ENTRY_SUBMITTED",
+                source="executor_penny",
+                reason="alpaca_submit_order",
+                raw={
+                    "intent_id": prepared.intent_id,
+                    "strategy": prepared.strategy,
+                    "conviction": conviction,
+                    "alpaca_order_id": alp_id,
+                    "qty": qty,
+                    "planning_context": prepared.planning_context,
+                    **capped,
+                },
+            )
 
         return {
             "ok": True,
@@ -168,11 +156,38 @@ def execute_penny_intent(*, run_id: str, intent: dict) -> Dict[str, Any]:
             "status": str(getattr(order, "status", "")),
             "qty": qty,
             "conviction": conviction,
+            **capped,
         }
 
     except Exception as e:
         return {
             "ok": False,
-            "reason": "submit_error",
+            "reason": "post_submit_error",
             "error": str(e)[:300],
         }
+
+
+def execute_penny_intent(
+    *,
+    run_id: str,
+    intent: dict,
+    snapshot: Optional[AccountSnapshot] = None,
+) -> Dict[str, Any]:
+    prepared, failed = prepare_penny_intent(run_id=run_id, intent=intent, snapshot=snapshot)
+    if prepared is None:
+        return failed
+
+    # ------------------------------------------------------
+    # SUBMIT ORDER
+    # ------------------------------------------------------
+
+    client = get_trading_client()
+    try:
+        with timed("submit_order"):
+            order = client.submit_order(prepared.request)
+    except Exception as e:
+        order = adopt_duplicate(prepared, e, client.get_order_by_client_id)
+        if order is None:
+            return submit_failed(prepared, e)
+
+    return finalize_penny_intent(run_id=run_id, prepared=prepared, order=order)
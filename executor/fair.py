@@ -0,0 +1,214 @@
+from __future__ import annotations
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from common.job_claim import claim_job
+from common.metrics import REGISTRY, inc, set_gauge, timed
+from executor.config import get_settings
+from executor.runners.intent_runner import DispatchDrain
+
+
+# =========================================================
+# FAIR MULTI-DISPATCH DRAIN
+#
+# With EXECUTOR_MAX_DISPATCHES=K > 1 a worker holds up to K
+# claimed job_dispatch rows and interleaves them one batch per
+# turn, so a small run is not stuck behind a huge one:
+#
+#   turns      smooth weighted round-robin (rr: every run
+#              weight 1; weight: payload.weight)
+#   per run    at most EXECUTOR_RUN_MAX_INFLIGHT intents per
+#              turn (payload.max_inflight overrides)
+#   top-up     a free slot is refilled right after a drain
+#              settles, otherwise the queue is probed every
+#              TOPUP_SEC
+#   yield      slots full, a job queued, and a dispatch held
+#              for more than EXECUTOR_DISPATCH_SLICE_SEC: the
+#              oldest one is requeued at the BACK of the queue
+#              (requeued_at; its remaining intents resume on a
+#              later claim) so queue wait stays bounded and two
+#              long runs do not ping-pong
+#
+# Each dispatch still settles on its own (mark_done / mark_error
+# / requeue, DispatchDrain). Concurrent drains of one executor
+# share one AccountSnapshot, so caps and buying power hold
+# across them.
+# =========================================================
+
+TOPUP_SEC = 0.5
+
+REGISTRY.describe("executor_dispatches_held", "job_dispatch rows a worker is draining at once")
+REGISTRY.describe("executor_dispatch_yields_total", "Dispatches requeued to free a slot for a queued job")
+
+
+class _Slot:
+    def __init__(self, drain: DispatchDrain, weight: float):
+        self.drain = drain
+        self.weight = weight
+        # smooth WRR credit
+        self.current = 0.0
+
+
+def _weight(job: dict, mode: str) -> float:
+    if mode != "weight":
+        return 1.0
+    payload = job.get("payload") if isinstance(job.get("payload"), dict) else {}
+    try:
+        w = float(payload.get("weight") or 1.0)
+    except (TypeError, ValueError):
+        return 1.0
+    return w if w > 0 else 1.0
+
+
+def _limit(job: dict, default: int) -> Optional[int]:
+    payload = job.get("payload") if isinstance(job.get("payload"), dict) else {}
+    try:
+        n = int(payload.get("max_inflight") or default)
+    except (TypeError, ValueError):
+        n = default
+    return n if n > 0 else None
+
+
+class FairDrainer:
+    """
+    drainer.run(first_job) returns once every held dispatch has
+    settled and no more jobs were waiting (or should_stop).
+    """
+
+    def __init__(
+        self,
+        job_types: Sequence[str],
+        *,
+        claimed_by: str,
+        pool: Optional[ThreadPoolExecutor] = None,
+        should_stop: Optional[Callable[[], bool]] = None,
+        use_async: Optional[bool] = None,
+    ):
+        cfg = get_settings()
+        self.job_types = list(job_types)
+        self.claimed_by = claimed_by
+        self.pool = pool
+        self.should_stop = should_stop
+        self.use_async = use_async
+        self.max_dispatches = cfg.max_dispatches
+        self.weighting = cfg.dispatch_weighting
+        self.run_max_inflight = cfg.run_max_inflight
+        self.slice_sec = cfg.dispatch_slice_sec
+        self.lease_sec = cfg.lease_sec
+
+        self.slots: List[_Slot] = []
+        self.summaries: List[Dict[str, Any]] = []
+        self._last_probe = 0.0
+
+    # --------------------------------------------------
+    # SLOTS
+    # --------------------------------------------------
+
+    def _claim(self) -> Optional[dict]:
+        self._last_probe = time.monotonic()
+        with timed("claim_job"):
+            return claim_job(
+                job_types=self.job_types,
+                claimed_by=self.claimed_by,
+                lease_sec=self.lease_sec,
+            )
+
+    def _add(self, job: dict) -> None:
+        job_type = job.get("job_type") or ""
+        # one snapshot per executor while its drains overlap
+        shared = next(
+            (s.drain.snapshot for s in self.slots if s.drain.job_type == job_type and s.drain.snapshot is not None),
+            None,
+        )
+        drain = DispatchDrain(
+            job,
+            pool=self.pool,
+            should_stop=self.should_stop,
+            use_async=self.use_async,
+            limit=_limit(job, self.run_max_inflight),
+            snapshot=shared,
+        )
+        try:
+            opened = drain.open()
+        except BaseException:
+            drain.close()
+            raise
+        if not opened:
+            drain.close()
+            return
+        self.slots.append(_Slot(drain, _weight(job, self.weighting)))
+        self._publish()
+
+    def _remove(self, slot: _Slot) -> None:
+        self.slots.remove(slot)
+        slot.drain.close()
+        if slot.drain.summary is not None:
+            self.summaries.append(slot.drain.summary)
+        self._publish()
+
+    def _publish(self) -> None:
+        set_gauge("executor_dispatches_held", float(len(self.slots)))
+
+    def _top_up(self, *, freed: bool) -> None:
+        if self.should_stop is not None and self.should_stop():
+            return
+        if not freed and time.monotonic() - self._last_probe < TOPUP_SEC:
+            return
+
+        if len(self.slots) < self.max_dispatches:
+            job = self._claim()
+            if job:
+                self._add(job)
+            return
+
+        # full: only look at the queue if someone is over its slice
+        if self.slice_sec <= 0:
+            return
+        oldest = max(self.slots, key=lambda s: s.drain.age())
+        if oldest.drain.age() < self.slice_sec:
+            return
+        job = self._claim()
+        if not job:
+            return
+        oldest.drain.requeue("yield_slot", to_back=True)
+        inc("executor_dispatch_yields_total", job_type=oldest.drain.job_type)
+        self._remove(oldest)
+        self._add(job)
+
+    # --------------------------------------------------
+    # TURNS
+    # --------------------------------------------------
+
+    def _next(self) -> _Slot:
+        # smooth weighted round-robin (nginx): no bursts for heavy runs
+        total = 0.0
+        best: Optional[_Slot] = None
+        for s in self.slots:
+            s.current += s.weight
+            total += s.weight
+            if best is None or s.current > best.current:
+                best = s
+        best.current -= total
+        return best
+
+    def run(self, job: dict) -> List[Dict[str, Any]]:
+        self._add(job)
+        freed = False
+        try:
+            while True:
+                self._top_up(freed=freed)
+                freed = False
+                if not self.slots:
+                    return self.summaries
+
+                slot = self._next()
+                if not slot.drain.step():
+                    self._remove(slot)
+                    freed = True
+        finally:
+            # only reached with unsettled slots on an unexpected error
+            for slot in list(self.slots):
+                slot.drain.requeue("worker_error")
+                self._remove(slot)
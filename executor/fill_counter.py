@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import threading
+from typing import TYPE_CHECKING, FrozenSet, Optional, Set, Tuple
+from datetime import datetime, timezone, timedelta
+
+from executor.order_query import CURSOR_OVERLAP, OrderRow, get_order, iter_orders, parse_ts
+
+if TYPE_CHECKING:
+    from alpaca.trading.client import TradingClient
+
+_TERMINAL = {
+    "filled", "canceled", "expired", "rejected",
+    "done_for_day", "replaced", "stopped", "suspended",
+}
+
+
+def trading_day_window(tz_name: str, now: Optional[datetime] = None) -> Tuple[datetime, datetime, str]:
+    """
+    [start, end) of the trading day containing `now`, as UTC datetimes,
+    plus a day key. The day boundary is local midnight in tz_name
+    (e.g. "UTC", "America/New_York").
+    """
+    now = now or datetime.now(timezone.utc)
+
+    if (tz_name or "UTC").upper() == "UTC":
+        tz = timezone.utc
+    else:
+        from zoneinfo import ZoneInfo
+
+        tz = ZoneInfo(tz_name)
+
+    local = now.astimezone(tz)
+    start_local = local.replace(hour=0, minute=0, second=0, microsecond=0)
+    # aware + timedelta is wall-clock arithmetic: next local midnight, DST-safe
+    end_local = start_local + timedelta(days=1)
+    return (
+        start_local.astimezone(timezone.utc),
+        end_local.astimezone(timezone.utc),
+        start_local.strftime("%Y-%m-%d"),
+    )
+
+
+class DailyFillCounter:
+    """
+    Filled BUY orders in the current trading day, maintained incrementally.
+
+    Each refresh lists only orders submitted after a high-water mark,
+    paging through all of them (no 500-order ceiling), and the mark
+    moves to the newest one. Buys still open are remembered by id and
+    re-read one by one on later refreshes, so an order filled after
+    the mark passed it is still seen, and a long-resting limit order
+    does not pin the mark. Counted order ids are kept so overlaps
+    never double count. Everything resets at the trading-day boundary.
+
+    Cost per refresh is O(orders submitted since the last refresh +
+    buys still open), instead of O(all orders today).
+    """
+
+    def __init__(self, *, tz_name: str = "UTC", page_size: int = 500):
+        self.tz_name = tz_name
+        self.page_size = page_size
+        self._lock = threading.Lock()
+        self._day_key: Optional[str] = None
+        self._day_start: Optional[datetime] = None
+        self._day_end: Optional[datetime] = None
+        self._hwm: Optional[datetime] = None
+        self._counted: Set[str] = set()
+        # buys open at the last look, behind the mark: re-read by id
+        self._open: Set[str] = set()
+
+    def _roll_day(self) -> None:
+        start, end, key = trading_day_window(self.tz_name)
+        if key != self._day_key:
+            self._day_key = key
+            self._day_start = start
+            self._day_end = end
+            self._hwm = start - CURSOR_OVERLAP
+            self._counted = set()
+            self._open = set()
+
+    def count(self, client: TradingClient) -> int:
+        return len(self.filled_ids(client))
+
+    def filled_ids(self, client: TradingClient) -> FrozenSet[str]:
+        """
+        Ids of today's filled buys (count() is its size). Lets a book
+        seeded from this de-dupe fill events it sees again.
+        """
+        with self._lock:
+            self._roll_day()
+            self._refresh(client)
+            return frozenset(self._counted)
+
+    def _refresh(self, client: TradingClient) -> None:
+        last_submitted: Optional[datetime] = None
+        listed: Set[str] = set()
+
+        for o in iter_orders(
+            client,
+            status="all",
+            after=self._hwm,
+            until=self._day_end,
+            page_size=self.page_size,
+        ):
+            listed.add(o.id)
+            submitted = parse_ts(o.submitted_at)
+            if submitted and (last_submitted is None or submitted > last_submitted):
+                last_submitted = submitted
+            self._see(o)
+
+        for order_id in sorted(self._open - listed):
+            try:
+                o = get_order(client, order_id)
+            except Exception as e:
+                if getattr(e, "status_code", None) == 404:
+                    self._open.discard(order_id)
+                # anything else: still open as far as we know, re-read next time
+                continue
+            self._see(o)
+
+        if last_submitted is not None:
+            self._hwm = max(self._hwm, last_submitted - CURSOR_OVERLAP)
+
+    def _see(self, o: OrderRow) -> None:
+        if o.side != "buy":
+            return
+        if o.status not in _TERMINAL:
+            self._open.add(o.id)
+            return
+        self._open.discard(o.id)
+
+        if o.status != "filled" or o.id in self._counted:
+            return
+        fa = parse_ts(o.filled_at)
+        if fa and self._day_start <= fa < self._day_end:
+            self._counted.add(o.id)
+
+
+# ---------------------------------------------------------
+# PROCESS-WIDE COUNTER (shared by stocks + penny handlers)
+# ---------------------------------------------------------
+
+_counter: Optional[DailyFillCounter] = None
+_counter_lock = threading.Lock()
+
+
+def get_daily_fill_counter() -> DailyFillCounter:
+    global _counter
+    if _counter is None:
+        with _counter_lock:
+            if _counter is None:
+                from executor.config import get_settings
+
+                _counter = DailyFillCounter(tz_name=get_settings().trading_day_tz)
+    return _counter
@@ -1,109 +1,84 @@
 from __future__ import annotations
 
-from typing import List
-from datetime import datetime, timezone, timedelta
+from typing import TYPE_CHECKING
 
-from alpaca.trading.client import TradingClient
-from alpaca.trading.enums import QueryOrderStatus
-from alpaca.trading.requests import GetOrdersRequest
+from executor.trade_stream import get_live_book
+from executor.fill_counter import get_daily_fill_counter
+from executor.order_query import iter_orders, iter_positions, get_position_qty
+from common.metrics import timed_fn
 
+if TYPE_CHECKING:
+    from alpaca.trading.client import TradingClient
 
+
+# Every guard reads the live trade_updates book first and only
+# falls back to REST when the stream is down or stale.
+
+
+@timed_fn("guard_count_open_positions")
 def count_open_positions(client: TradingClient) -> int:
+    book = get_live_book()
+    if book is not None:
+        return book.count_positions()
     try:
-        positions = client.get_all_positions() or []
-        return len([p for p in positions if float(getattr(p, "qty", 0) or 0) != 0])
+        return sum(1 for _sym, qty in iter_positions(client) if qty != 0)
     except Exception:
         return 0
 
 
+@timed_fn("guard_has_open_position")
 def has_open_position(client: TradingClient, symbol: str) -> bool:
+    book = get_live_book()
+    if book is not None:
+        return book.has_position(symbol)
     try:
-        pos = client.get_open_position(symbol)
-        return float(getattr(pos, "qty", 0) or 0) != 0
+        return get_position_qty(client, symbol) != 0
     except Exception:
         return False
 
 
+@timed_fn("guard_has_open_buy_order")
 def has_open_buy_order(client: TradingClient, symbol: str) -> bool:
+    book = get_live_book()
+    if book is not None:
+        return book.has_open_buy(symbol)
     try:
-        req = GetOrdersRequest(
-            status=QueryOrderStatus.OPEN,
-            symbols=[symbol],
-            limit=200,
-            nested=True,
-        )
-        for o in client.get_orders(req) or []:
-            if str(getattr(o, "side", "")).lower() == "buy":
-                return True
+        for _o in iter_orders(client, status="open", symbols=[symbol], side="buy"):
+            return True
         return False
     except Exception:
         return False
 
+@timed_fn("guard_count_open_buy_orders")
 def count_open_buy_orders(client: TradingClient) -> int:
     """
     Counts ALL open BUY orders across the account.
     These act like pending positions and prevent
     multiple trades being opened simultaneously.
     """
+    book = get_live_book()
+    if book is not None:
+        return book.count_open_buys()
     try:
-        req = GetOrdersRequest(
-            status=QueryOrderStatus.OPEN,
-            limit=500,
-            nested=True,
-        )
-
-        orders = client.get_orders(req) or []
-
-        count = 0
-
-        for o in orders:
-            side = str(getattr(o, "side", "")).lower()
-            if side == "buy":
-                count += 1
-
-        return count
-
+        return sum(1 for _o in iter_orders(client, status="open", side="buy"))
     except Exception:
         return 0
 
+@timed_fn("guard_count_filled_buys_today_utc")
 def count_filled_buys_today_utc(client: TradingClient) -> int:
     """
-    Simple UTC-day cap (good enough for kill-switch).
-    If you want ET-day, we can swap to zoneinfo.
+    Filled BUY orders in the current trading day.
+
+    Name kept for compatibility: the day boundary is
+    EXECUTOR_TRADING_DAY_TZ (default UTC). Served by the shared
+    incremental DailyFillCounter, so each call only lists orders
+    submitted since the last call.
     """
-    now = datetime.now(timezone.utc)
-    start = now.replace(hour=0, minute=0, second=0, microsecond=0)
-    end = start + timedelta(days=1)
+    book = get_live_book()
+    if book is not None:
+        return book.filled_buys_today()
 
     try:
-        req = GetOrdersRequest(
-            status=QueryOrderStatus.CLOSED,
-            limit=500,
-            nested=True,
-            after=start,
-            until=end,
-        )
-        orders = client.get_orders(req) or []
+        return get_daily_fill_counter().count(client)
     except Exception:
         return 0
-
-    cnt = 0
-    for o in orders:
-        try:
-            if str(getattr(o, "side", "")).lower() != "buy":
-                continue
-            if str(getattr(o, "status", "")).lower() != "filled":
-                continue
-            filled_at = getattr(o, "filled_at", None)
-            if not filled_at:
-                continue
-            fa = filled_at
-            if getattr(fa, "tzinfo", None) is None:
-                fa = fa.replace(tzinfo=timezone.utc)
-            fa_utc = fa.astimezone(timezone.utc)
-            if start <= fa_utc < end:
-                cnt += 1
-        except Exception:
-            continue
-
-    return cnt
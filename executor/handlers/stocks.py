@@ -1,21 +1,21 @@
 from __future__ import annotations
 
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Tuple
 from datetime import datetime, timezone
 
-from psycopg.types.json import Jsonb
-
 from executor.alpaca_client import get_trading_client
 from executor.validate import validate_planning_context
-from executor.guards import (
-    count_open_positions,
-    has_open_position,
-    has_open_buy_order,
-    count_filled_buys_today_utc,
+from executor.snapshot import AccountSnapshot
+from executor.sizing import cap_detail, sizing_for
+from executor.orders import (
+    PreparedOrder,
+    adopt_duplicate,
+    build_order_from_planning_context,
+    submit_failed,
 )
-from executor.orders import build_order_from_planning_context
-from executor.config import MAX_STOCKS_POSITIONS, MAX_STOCKS_TRADES_PER_DAY
+from executor.config import get_settings
 from common.logging import log_trade_event
+from common.metrics import timed
 from common.db import get_conn
 
 
@@ -44,102 +44,128 @@ def _insert_trade_open(
     """
     Insert an OPEN trade row so DB stays authoritative.
 
-    Idempotency:
-      - If an OPEN trade already exists for this symbol, do nothing.
-      - If an OPEN trade already exists for this alpaca_order_id, do nothing.
+    Idempotency (one statement, one round trip):
+      - If an OPEN trade already exists for this symbol, return its id.
+      - If a trade already exists for this alpaca_order_id, return its id.
+      - Otherwise INSERT and return the new id.
+
+    The lookups alone are not concurrency-safe (two workers finalizing
+    the same order both see nothing): the INSERT is ON CONFLICT DO
+    NOTHING against the unique trades_alpaca_order_id_uniq, and the
+    loser reads the winner's row in a second statement.
+
+    Backed by trades_open_symbol_idx (common.migrations v2) and
+    trades_alpaca_order_id_uniq (v7).
     """
+    from psycopg.types.json import Jsonb
+
+    meta = {
+        "intent_id": intent_id,
+        "alpaca_order_id": alpaca_order_id,
+        "planning_context": planning_context or {},
+    }
+    if extra_meta:
+        meta.update(extra_meta)
+
     try:
         with get_conn() as conn, conn.cursor() as cur:
-            # If we already have an OPEN trade for this symbol, don't insert another
             cur.execute(
                 """
-                SELECT id
-                FROM trades
-                WHERE LOWER(status)='open'
-                  AND symbol=%s
-                ORDER BY entry_time DESC NULLS LAST, id DESC
+                WITH existing AS (
+                    (
+                        SELECT id
+                        FROM trades
+                        WHERE LOWER(status)='open'
+                          AND symbol=%(symbol)s
+                        ORDER BY entry_time DESC NULLS LAST, id DESC
+                        LIMIT 1
+                    )
+                    UNION ALL
+                    (
+                        SELECT id
+                        FROM trades
+                        WHERE %(alpaca_order_id)s <> ''
+                          AND (metadata->>'alpaca_order_id') <> ''
+                          AND metadata->>'alpaca_order_id' = %(alpaca_order_id)s
+                        ORDER BY entry_time DESC NULLS LAST, id DESC
+                        LIMIT 1
+                    )
+                    LIMIT 1
+                ),
+                inserted AS (
+                    INSERT INTO trades (
+                        run_id,
+                        symbol,
+                        strategy,
+                        side,
+                        qty,
+                        entry_price,
+                        entry_time,
+                        status,
+                        opened_by,
+                        metadata
+                    )
+                    SELECT
+                        %(run_id)s::uuid,
+                        %(symbol)s,
+                        %(strategy)s,
+                        %(side)s,
+                        %(qty)s,
+                        %(entry_price)s,
+                        %(entry_time)s,
+                        'OPEN',
+                        %(opened_by)s,
+                        %(metadata)s::jsonb
+                    WHERE NOT EXISTS (SELECT 1 FROM existing)
+                    ON CONFLICT ((metadata->>'alpaca_order_id'))
+                        WHERE (metadata->>'alpaca_order_id') <> ''
+                        DO NOTHING
+                    RETURNING id
+                )
+                SELECT id FROM inserted
+                UNION ALL
+                SELECT id FROM existing
                 LIMIT 1
                 """,
-                (symbol,),
+                {
+                    "run_id": run_id,
+                    "symbol": symbol,
+                    "strategy": strategy,
+                    "side": "buy",
+                    "qty": float(qty),
+                    "entry_price": _to_float(entry_price_hint, None),
+                    "entry_time": datetime.now(timezone.utc),
+                    "opened_by": opened_by,
+                    "alpaca_order_id": alpaca_order_id or "",
+                    "metadata": Jsonb(meta),
+                },
             )
             row = cur.fetchone()
-            if row:
-                return int(row[0])
-
-            # If we already inserted by alpaca order id, don't insert again
-            if alpaca_order_id:
+            if row is None and alpaca_order_id:
+                # lost the race: the other insert committed after our snapshot
                 cur.execute(
-                    """
-                    SELECT id
-                    FROM trades
-                    WHERE metadata->>'alpaca_order_id' = %s
-                    ORDER BY entry_time DESC NULLS LAST, id DESC
-                    LIMIT 1
-                    """,
+                    "SELECT id FROM trades WHERE (metadata->>'alpaca_order_id') <> '' "
+                    "AND metadata->>'alpaca_order_id' = %s LIMIT 1",
                     (alpaca_order_id,),
                 )
-                row2 = cur.fetchone()
-                if row2:
-                    return int(row2[0])
-
-            meta = {
-                "intent_id": intent_id,
-                "alpaca_order_id": alpaca_order_id,
-                "planning_context": planning_context or {},
-            }
-            if extra_meta:
-                meta.update(extra_meta)
-
-            cur.execute(
-                """
-                INSERT INTO trades (
-                    run_id,
-                    symbol,
-                    strategy,
-                    side,
-                    qty,
-                    entry_price,
-                    entry_time,
-                    status,
-                    opened_by,
-                    metadata
-                )
-                VALUES (
-                    %s::uuid,
-                    %s,
-                    %s,
-                    %s,
-                    %s,
-                    %s,
-                    %s,
-                    'OPEN',
-                    %s,
-                    %s::jsonb
-                )
-                RETURNING id
-                """,
-                (
-                    run_id,
-                    symbol,
-                    strategy,
-                    "buy",
-                    float(qty),
-                    _to_float(entry_price_hint, None),
-                    datetime.now(timezone.utc),
-                    opened_by,
-                    Jsonb(meta),
-                ),
-            )
-            new_id = cur.fetchone()
-            return int(new_id[0]) if new_id else None
-    except Exception:
+                row = cur.fetchone()
+            return int(row["id"]) if row else None
+    except Exception as e:
         # Never fail the executor because DB insert failed; but we WANT to see it in logs.
+        print(f"[EXECUTOR-STOCKS] trade insert failed symbol={symbol} err={e}", flush=True)
         return None
 
 
-def execute_stocks_intent(*, run_id: str, intent: dict) -> Dict[str, Any]:
-    client = get_trading_client()
-
+def prepare_stocks_intent(
+    *,
+    run_id: str,
+    intent: dict,
+    snapshot: Optional[AccountSnapshot] = None,
+) -> Tuple[Optional[PreparedOrder], Optional[Dict[str, Any]]]:
+    """
+    Validation, guards (slot reserved) and order build; no broker
+    submit. Returns (prepared, None) or (None, failure result).
+    """
     intent_id = str(intent["intent_id"])
     symbol = str(intent["symbol"]).upper().strip()
     strategy = intent.get("strategy") or "unknown"
@@ -147,41 +173,78 @@ def execute_stocks_intent(*, run_id: str, intent: dict) -> Dict[str, Any]:
     source_facts = intent.get("source_facts") or {}
     pc = source_facts.get("planning_context")
 
-    ok, why = validate_planning_context(pc or {})
+    with timed("validation"):
+        ok, why = validate_planning_context(pc or {})
     if not ok:
-        return {"ok": False, "reason": why}
-
-    # Guards
-    if MAX_STOCKS_TRADES_PER_DAY > 0:
-        buys_today = count_filled_buys_today_utc(client)
-        if buys_today >= MAX_STOCKS_TRADES_PER_DAY:
-            return {
-                "ok": False,
-                "reason": "max_trades_per_day_reached",
-                "buys_today": buys_today,
-            }
-
-    open_pos = count_open_positions(client)
-    if open_pos >= MAX_STOCKS_POSITIONS:
-        return {"ok": False, "reason": "max_positions_reached", "open_positions": open_pos}
-
-    if has_open_position(client, symbol):
-        return {"ok": False, "reason": "skip_already_in_position"}
-
-    if has_open_buy_order(client, symbol):
-        return {"ok": False, "reason": "skip_open_buy_order"}
-
-    qty = pc.get("qty")
-    if qty is None:
-        return {"ok": False, "reason": "missing_qty_strict"}  # strict
-    qty = int(qty)
-
-    req, status = build_order_from_planning_context(symbol=symbol, qty=qty, planning_context=pc)
+        return None, {"ok": False, "reason": why}
+
+    # Guards (served from the per-dispatch snapshot; no REST calls).
+    # reserve_entry() checks every cap and takes a slot atomically,
+    # so concurrent workers can never overshoot them.
+    if snapshot is None:
+        with timed("guard_snapshot"):
+            snapshot = AccountSnapshot.load(get_trading_client())
+
+    # Sizing: this intent's share of the batch plan (qty as given,
+    # or risk/notional sized); funded from the snapshot's buying power
+    # when the slot is reserved.
+    with timed("sizing"):
+        sized = sizing_for(intent)
+    if not sized.ok:
+        reason = "missing_qty_strict" if sized.reason == "missing_qty_and_sizing_inputs" else sized.reason
+        return None, {"ok": False, "reason": reason}
+
+    cfg = get_settings()
+    with timed("guards"):
+        qty, denied = snapshot.fund_entry(
+            symbol,
+            qty=sized.qty,
+            price=sized.price,
+            fit=not sized.explicit,
+            max_trades_per_day=cfg.max_stocks_trades_per_day,
+            max_positions=cfg.max_stocks_positions,
+        )
+    if denied:
+        return None, denied
+
+    with timed("order_build"):
+        req, status = build_order_from_planning_context(
+            symbol=symbol,
+            qty=qty,
+            planning_context=pc,
+            client_order_id=intent_id,
+        )
     if status != "ok" or req is None:
-        return {"ok": False, "reason": status}
+        snapshot.release(symbol)
+        return None, {"ok": False, "reason": status}
+
+    return (
+        PreparedOrder(
+            intent_id=intent_id,
+            symbol=symbol,
+            strategy=strategy,
+            side=pc.get("side") or "buy",
+            qty=qty,
+            planning_context=pc,
+            request=req,
+            snapshot=snapshot,
+            extra=cap_detail(sized, qty),
+        ),
+        None,
+    )
+
+
+def finalize_stocks_intent(*, run_id: str, prepared: PreparedOrder, order: Any) -> Dict[str, Any]:
+    """
+    After a successful submit: settle the reservation, insert the
+    OPEN trade and log the event.
+    """
+    symbol = prepared.symbol
+    pc = prepared.planning_context
+
+    prepared.snapshot.confirm(symbol, prepared.side)
 
     try:
-        order = client.submit_order(req)
         alp_id = str(getattr(order, "id", "") or "")
         alp_status = str(getattr(order, "status", "") or "")
 
@@ -195,45 +258,72 @@ def execute_stocks_intent(*, run_id: str, intent: dict) -> Dict[str, Any]:
         except Exception:
             entry_price_hint = None
 
-        trade_id = _insert_trade_open(
-            run_id=str(run_id),
-            symbol=symbol,
-            strategy=strategy,
-            qty=qty,
-            entry_price_hint=_to_float(entry_price_hint, None),
-            opened_by="executor_stocks",
-            intent_id=intent_id,
-            alpaca_order_id=alp_id,
-            planning_context=pc or {},
-            extra_meta={
-                "alpaca_status": alp_status,
-                "executor": "stocks",
-            },
-        )
+        with timed("trade_insert"):
+            trade_id = _insert_trade_open(
+                run_id=str(run_id),
+                symbol=symbol,
+                strategy=prepared.strategy,
+                qty=prepared.qty,
+                entry_price_hint=_to_float(entry_price_hint, None),
+                opened_by="executor_stocks",
+                intent_id=prepared.intent_id,
+                alpaca_order_id=alp_id,
+                planning_context=pc or {},
+                extra_meta={
+                    "alpaca_status": alp_status,
+                    "executor": "stocks",
+                    **prepared.extra,
+                },
+            )
 
         # Keep your existing event log
-        log_trade_event(
-            run_id=run_id,
-            symbol=symbol,
-            event_type="ENTRY_SUBMITTED",
-            source="executor_stocks",
-            reason="alpaca_submit_order",
-            raw={
-                "intent_id": intent_id,
-                "strategy": strategy,
-                "alpaca_order_id": alp_id,
-                "alpaca_status": alp_status,
-                "trade_id": trade_id,
-                "planning_context": pc,
-            },
-        )
+        with timed("event_log"):
+            log_trade_event(
+                run_id=run_id,
+                symbol=symbol,
+                event_type="ENTRY_SUBMITTED",
+                source="executor_stocks",
+                reason="alpaca_submit_order",
+                raw={
+                    "intent_id": prepared.intent_id,
+                    "strategy": prepared.strategy,
+                    "alpaca_order_id": alp_id,
+                    "alpaca_status": alp_status,
+                    "trade_id": trade_id,
+                    "planning_context": pc,
+                    **prepared.extra,
+                },
+            )
 
         return {
             "ok": True,
             "alpaca_order_id": alp_id,
             "status": alp_status,
             "trade_id": trade_id,
+            **prepared.extra,
         }
 
     except Exception as e:
-        return {"ok": False, "reason": "submit_error", "error": str(e)[:300]}
+        return {"ok": False, "reason": "post_submit_error", "error": str(e)[:300]}
+
+
+def execute_stocks_intent(
+    *,
+    run_id: str,
+    intent: dict,
+    snapshot: Optional[AccountSnapshot] = None,
+) -> Dict[str, Any]:
+    prepared, failed = prepare_stocks_intent(run_id=run_id, intent=intent, snapshot=snapshot)
+    if prepared is None:
+        return failed
+
+    client = get_trading_client()
+    try:
+        with timed("submit_order"):
+            order = client.submit_order(prepared.request)
+    except Exception as e:
+        order = adopt_duplicate(prepared, e, client.get_order_by_client_id)
+        if order is None:
+            return submit_failed(prepared, e)
+
+    return finalize_stocks_intent(run_id=run_id, prepared=prepared, order=order)
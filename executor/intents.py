@@ -1,19 +1,32 @@
 from __future__ import annotations
 
-import json
-from typing import Optional, Dict, Any, Tuple
-from psycopg.rows import dict_row
-from psycopg.types.json import Jsonb
+from typing import Optional, Dict, Any, Tuple, List
 
-from common.db import DATABASE_URL
-import psycopg
+from common.db import get_conn
+from common.serialization import bounded
+from executor.config import get_settings
 
 
 def _conn():
-    return psycopg.connect(DATABASE_URL, autocommit=True, row_factory=dict_row)
+    return get_conn()
 
 
-def claim_next_intent(*, run_id: str, executor: str) -> Optional[dict]:
+def _encode_detail(detail: Dict[str, Any]) -> str:
+    """
+    Result detail as JSON text for a ::jsonb cast. Whole object, valid
+    JSON; over EXECUTOR_DETAIL_MAX_BYTES only its core keys are kept.
+    """
+    return bounded(detail, get_settings().detail_max_bytes)
+
+
+def claim_next_intents(*, run_id: str, executor: str, limit: int = 1) -> List[dict]:
+    """
+    Claim up to `limit` undispatched intents for a run in ONE statement.
+    Returned rows are ordered by priority DESC, ts ASC; dispatched_ts
+    is this claim's stamp (release_intents matches on it).
+    """
+    limit = max(1, int(limit))
+
     with _conn() as conn, conn.cursor() as cur:
         cur.execute(
             """
@@ -25,22 +38,34 @@ def claim_next_intent(*, run_id: str, executor: str) -> Optional[dict]:
                   AND dispatched_ts IS NULL
                 ORDER BY priority DESC, ts ASC
                 FOR UPDATE SKIP LOCKED
-                LIMIT 1
+                LIMIT %s
+            ),
+            claimed AS (
+                UPDATE strategy_intents si
+                SET dispatched_ts = now()
+                FROM picked
+                WHERE si.intent_id = picked.intent_id
+                RETURNING
+                    si.intent_id,
+                    si.symbol,
+                    si.strategy,
+                    si.priority,
+                    si.ts,
+                    si.dispatched_ts,
+                    si.source_facts
             )
-            UPDATE strategy_intents si
-            SET dispatched_ts = now()
-            FROM picked
-            WHERE si.intent_id = picked.intent_id
-            RETURNING
-                si.intent_id,
-                si.symbol,
-                si.strategy,
-                si.priority,
-                si.source_facts;
+            -- UPDATE ... RETURNING does not keep the CTE order
+            SELECT * FROM claimed
+            ORDER BY priority DESC, ts ASC;
             """,
-            (run_id, executor),
+            (run_id, executor, limit),
         )
-        return cur.fetchone()
+        return cur.fetchall() or []
+
+
+def claim_next_intent(*, run_id: str, executor: str) -> Optional[dict]:
+    rows = claim_next_intents(run_id=run_id, executor=executor, limit=1)
+    return rows[0] if rows else None
 
 
 def set_intent_result(*, intent_id: str, ok: bool, detail: Dict[str, Any]):
@@ -50,8 +75,120 @@ def set_intent_result(*, intent_id: str, ok: bool, detail: Dict[str, Any]):
             UPDATE strategy_intents
             SET
                 dispatched_ok = %s::boolean,
-                dispatched_detail = %s::text
+                dispatched_detail = %s::jsonb
             WHERE intent_id = %s::uuid;
             """,
-            (ok, json.dumps(detail, default=str)[:500], intent_id),
+            (ok, _encode_detail(detail), intent_id),
+        )
+
+
+def set_intent_results(results: List[Tuple[str, bool, Dict[str, Any]]]) -> int:
+    """
+    Bulk write-back: [(intent_id, ok, detail), ...] in one UPDATE ... FROM UNNEST.
+    """
+    if not results:
+        return 0
+
+    ids = [str(r[0]) for r in results]
+    oks = [bool(r[1]) for r in results]
+    details = [_encode_detail(r[2]) for r in results]
+
+    with _conn() as conn, conn.cursor() as cur:
+        cur.execute(
+            """
+            UPDATE strategy_intents si
+            SET
+                dispatched_ok = v.ok,
+                dispatched_detail = v.detail::jsonb
+            FROM UNNEST(%s::uuid[], %s::boolean[], %s::text[]) AS v(intent_id, ok, detail)
+            WHERE si.intent_id = v.intent_id;
+            """,
+            (ids, oks, details),
+        )
+        return cur.rowcount or 0
+
+
+def release_intents(intents: List[dict]) -> int:
+    """
+    Un-claim intents that were claimed but never executed (prefetched
+    by a drain that stopped): they go back to the run's queue.
+
+    Only this claim is undone: a row whose dispatched_ts differs was
+    released by the reaper and claimed again by someone else.
+    """
+    if not intents:
+        return 0
+
+    ids = [str(i["intent_id"]) for i in intents]
+    stamps = [i.get("dispatched_ts") for i in intents]
+
+    with _conn() as conn, conn.cursor() as cur:
+        cur.execute(
+            """
+            UPDATE strategy_intents si
+            SET dispatched_ts = NULL
+            FROM UNNEST(%s::uuid[], %s::timestamptz[]) AS v(intent_id, dispatched_ts)
+            WHERE si.intent_id = v.intent_id
+              AND si.dispatched_ts = v.dispatched_ts
+              AND si.dispatched_ok IS NULL;
+            """,
+            (ids, stamps),
+        )
+        return cur.rowcount or 0
+
+
+def load_pending_intents(*, run_id: str, executor: str) -> List[dict]:
+    """
+    Every undispatched intent of a run in ONE read (no claim), in
+    claim order. Only the planning_context and run_position_cap are
+    fetched from source_facts.
+    """
+    with _conn() as conn, conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT
+                intent_id,
+                symbol,
+                priority,
+                ts,
+                source_facts->'planning_context' AS planning_context,
+                source_facts->'run_position_cap' AS run_position_cap
+            FROM strategy_intents
+            WHERE run_id = %s::uuid
+              AND executor = %s
+              AND dispatched_ts IS NULL
+            ORDER BY priority DESC, ts ASC;
+            """,
+            (run_id, executor),
+        )
+        return cur.fetchall() or []
+
+
+def reject_intents(rejects: List[Tuple[str, Dict[str, Any]]]) -> List[str]:
+    """
+    Mark [(intent_id, detail), ...] dispatched + failed in one UPDATE.
+    Rows already claimed by someone else are left alone. Returns the
+    ids actually rejected.
+    """
+    if not rejects:
+        return []
+
+    ids = [str(r[0]) for r in rejects]
+    details = [_encode_detail(r[1]) for r in rejects]
+
+    with _conn() as conn, conn.cursor() as cur:
+        cur.execute(
+            """
+            UPDATE strategy_intents si
+            SET
+                dispatched_ts = now(),
+                dispatched_ok = false,
+                dispatched_detail = v.detail::jsonb
+            FROM UNNEST(%s::uuid[], %s::text[]) AS v(intent_id, detail)
+            WHERE si.intent_id = v.intent_id
+              AND si.dispatched_ts IS NULL
+            RETURNING si.intent_id;
+            """,
+            (ids, details),
         )
+        return [str(r["intent_id"]) for r in cur.fetchall() or []]
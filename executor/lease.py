@@ -0,0 +1,255 @@
+from __future__ import annotations
+
+import sys
+import threading
+from typing import Any, Dict, List, Optional
+
+from common.db import get_conn
+from common.job_claim import extend_lease
+from common.metrics import REGISTRY, inc
+
+
+# =========================================================
+# JOB LEASES: HEARTBEAT + REAPER
+#
+# claim_job() gives the claimer a lease (lease_expires_at).
+# While a job drains, LeaseHeartbeat renews it every lease/3.
+# A worker that dies (OOM, pod restart, kill -9) stops renewing;
+# once the lease is past, reap_expired_jobs():
+#   - requeues the job (error after max_reaps, poison jobs)
+#   - releases its orphaned intents: claimed (dispatched_ts set)
+#     but never given a result (dispatched_ok NULL). When the job
+#     goes to error instead, nobody will drain them again: they are
+#     failed (lease_expired_max_reaps) rather than released
+# in one statement. Every worker runs a Reaper thread;
+# SKIP LOCKED keeps concurrent reapers off each other's rows.
+#
+# A released intent that had already reached the broker is not
+# doubled on resubmit: orders carry client_order_id=intent_id,
+# which the broker rejects as a duplicate (422). The submit path
+# then fetches that order by client id and finalizes it like a
+# fresh submit (executor.orders.adopt_duplicate).
+# =========================================================
+
+REGISTRY.describe("executor_jobs_reaped_total", "Expired job leases reaped, by outcome")
+REGISTRY.describe("executor_intents_released_total", "Orphaned intents released by the reaper")
+REGISTRY.describe("executor_intents_reap_failed_total", "Orphaned intents failed with their errored job")
+REGISTRY.describe("executor_leases_lost_total", "Drains stopped because the job lease was lost")
+
+
+class LeaseHeartbeat:
+    """
+    Renews one job's lease on a daemon thread until stop().
+    lost() turns true once the DB says the job is no longer ours;
+    the drain must then stop without marking the job.
+    """
+
+    def __init__(self, dispatch_id: str, *, claimed_by: str, lease_sec: int):
+        self.dispatch_id = dispatch_id
+        self.claimed_by = claimed_by
+        self.lease_sec = lease_sec
+        self.interval = max(lease_sec / 3.0, 0.5)
+        self._stop = threading.Event()
+        self._lost = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run,
+            name=f"lease-{dispatch_id[:8]}",
+            daemon=True,
+        )
+
+    def start(self) -> "LeaseHeartbeat":
+        self._thread.start()
+        return self
+
+    def __enter__(self) -> "LeaseHeartbeat":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout=5)
+
+    def lost(self) -> bool:
+        return self._lost.is_set()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            ok = extend_lease(
+                self.dispatch_id,
+                claimed_by=self.claimed_by,
+                lease_sec=self.lease_sec,
+            )
+            if ok is False:
+                inc("executor_leases_lost_total")
+                print(
+                    f"[LEASE] lost dispatch_id={self.dispatch_id} "
+                    f"claimed_by={self.claimed_by}",
+                    flush=True,
+                )
+                self._lost.set()
+                return
+
+
+def _executor_map() -> Dict[str, List[str]]:
+    from executor.registry import get_handler, job_types
+
+    types = job_types()
+    return {
+        "job_types": types,
+        "executors": [get_handler(jt).executor for jt in types],
+    }
+
+
+def reap_expired_jobs(*, max_reaps: int = 3, limit: int = 100) -> List[Dict[str, Any]]:
+    """
+    Requeue (or error out) every running job whose lease expired and
+    release its orphaned intents (fail them, for an errored job).
+    Returns one row per reaped job.
+    """
+    m = _executor_map()
+
+    with get_conn() as conn, conn.cursor() as cur:
+        cur.execute(
+            """
+            WITH expired AS (
+                SELECT dispatch_id, claimed_by, reap_count
+                FROM job_dispatch
+                WHERE status = 'running'
+                  AND lease_expires_at < now()
+                ORDER BY lease_expires_at
+                LIMIT %(limit)s
+                FOR UPDATE SKIP LOCKED
+            ),
+            reaped AS (
+                UPDATE job_dispatch jd
+                SET
+                    status = CASE
+                        WHEN e.reap_count + 1 >= %(max_reaps)s THEN 'error'
+                        ELSE 'queued'
+                    END,
+                    lease_expires_at = NULL,
+                    claimed_by = NULL,
+                    reap_count = e.reap_count + 1,
+                    payload = COALESCE(jd.payload,'{}'::jsonb)
+                              || jsonb_build_object(
+                                  'reaped_at', now(),
+                                  'reaped_from', e.claimed_by,
+                                  'reap_count', e.reap_count + 1
+                              )
+                              || CASE
+                                  WHEN e.reap_count + 1 >= %(max_reaps)s
+                                  THEN jsonb_build_object(
+                                      'error_at', now(),
+                                      'error', 'lease_expired_max_reaps'
+                                  )
+                                  ELSE '{}'::jsonb
+                              END
+                FROM expired e
+                WHERE jd.dispatch_id = e.dispatch_id
+                RETURNING jd.dispatch_id, jd.job_type, jd.run_id, jd.status, e.claimed_by
+            ),
+            orphaned AS (
+                UPDATE strategy_intents si
+                SET
+                    dispatched_ts = CASE WHEN r.status = 'queued' THEN NULL ELSE si.dispatched_ts END,
+                    dispatched_ok = CASE WHEN r.status = 'queued' THEN NULL ELSE false END,
+                    dispatched_detail = CASE
+                        WHEN r.status = 'queued' THEN si.dispatched_detail
+                        ELSE jsonb_build_object(
+                            'ok', false,
+                            'reason', 'lease_expired_max_reaps',
+                            'dispatch_id', r.dispatch_id
+                        )
+                    END
+                FROM reaped r
+                JOIN UNNEST(%(job_types)s::text[], %(executors)s::text[])
+                    AS m(job_type, executor) ON m.job_type = r.job_type
+                WHERE si.run_id = r.run_id
+                  AND si.executor = m.executor
+                  AND si.dispatched_ts IS NOT NULL
+                  AND si.dispatched_ok IS NULL
+                RETURNING r.dispatch_id, r.status
+            )
+            SELECT
+                r.dispatch_id,
+                r.job_type,
+                r.run_id,
+                r.status,
+                r.claimed_by,
+                (SELECT count(*) FROM orphaned x
+                 WHERE x.dispatch_id = r.dispatch_id AND x.status = 'queued') AS released,
+                (SELECT count(*) FROM orphaned x
+                 WHERE x.dispatch_id = r.dispatch_id AND x.status <> 'queued') AS failed
+            FROM reaped r
+            """,
+            {
+                "limit": max(1, int(limit)),
+                "max_reaps": max(1, int(max_reaps)),
+                "job_types": m["job_types"],
+                "executors": m["executors"],
+            },
+        )
+        rows = cur.fetchall() or []
+
+    for r in rows:
+        inc("executor_jobs_reaped_total", outcome=str(r["status"]))
+        inc("executor_intents_released_total", float(r["released"] or 0))
+        inc("executor_intents_reap_failed_total", float(r["failed"] or 0))
+        print(
+            f"[REAPER] dispatch_id={r['dispatch_id']} job_type={r['job_type']} "
+            f"from={r['claimed_by']} → {r['status']} released_intents={r['released']} "
+            f"failed_intents={r['failed']}",
+            flush=True,
+        )
+    return rows
+
+
+class Reaper:
+    """
+    Calls reap_expired_jobs() every `interval` seconds on a daemon
+    thread. Errors are logged and retried on the next tick.
+    """
+
+    def __init__(self, *, interval: float, max_reaps: int):
+        self.interval = interval
+        self.max_reaps = max_reaps
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="executor-reaper", daemon=True)
+        self._thread.start()
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                reap_expired_jobs(max_reaps=self.max_reaps)
+            except Exception as e:
+                print(f"[REAPER] reap failed err={e}", flush=True)
+            try:
+                from executor.ledger import prune_ledger
+
+                prune_ledger()
+            except Exception as e:
+                print(f"[REAPER] ledger prune failed err={e}", flush=True)
+
+
+def main(argv: List[str]) -> int:
+    # one-shot sweep (cron / manual recovery)
+    from executor.config import get_settings
+
+    rows = reap_expired_jobs(max_reaps=get_settings().max_reaps)
+    print(f"[REAPER] done reaped={len(rows)}", flush=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
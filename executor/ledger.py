@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import threading
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from common.db import get_conn
+from executor.snapshot import Foreign
+
+
+# =========================================================
+# SHARED ENTRY LEDGER (cross-process caps)
+#
+# AccountSnapshot's reservation ledger is per process. When
+# several processes (EXECUTOR_PROCS=stocks:3, replicas) trade
+# one account, each would otherwise reserve against the full
+# MAX_*_POSITIONS / MAX_*_TRADES_PER_DAY / buying power.
+#
+# With EXECUTOR_SHARED_LEDGER=1 every reservation is also a row
+# in executor_entry_ledger (migration v6), taken under a
+# transaction-scoped advisory lock keyed by the account. The
+# snapshot's guards then also count the OTHER snapshots' rows
+# its broker state cannot contain yet:
+#   - reserved  (submit in flight; ignored after LEDGER_TTL_SEC,
+#                e.g. the process died)
+#   - submitted after this snapshot was taken
+# confirm() marks a row submitted, release() deletes it.
+#
+# Every reservation is then a DB transaction, so it is only on
+# when needed: the supervisor enables it for more than one worker
+# process or BROKER_REPLICAS > 1 (set_shared_ledger), otherwise
+# EXECUTOR_SHARED_LEDGER decides (default off).
+# =========================================================
+
+_enabled: Optional[bool] = None
+
+
+def set_shared_ledger(enabled: bool) -> None:
+    """
+    Override EXECUTOR_SHARED_LEDGER for this process (the supervisor
+    passes it to each worker).
+    """
+    global _enabled
+    _enabled = bool(enabled)
+
+
+def shared_ledger_enabled() -> bool:
+    if _enabled is not None:
+        return _enabled
+    from executor.config import get_settings
+
+    return get_settings().shared_ledger
+
+
+class SharedLedger:
+    def __init__(self, *, account: str, ttl_sec: float = 120.0):
+        self.account = account
+        self.ttl_sec = ttl_sec
+        # one owner per snapshot: its own rows are already counted locally
+        self.owner = uuid.uuid4().hex
+        self._ids: Dict[str, List[int]] = {}
+        self._lock = threading.Lock()
+
+    def reserve(
+        self,
+        symbol: str,
+        *,
+        since: Any,
+        check: Callable[[Foreign], Tuple[float, Optional[Dict[str, Any]]]],
+    ) -> Tuple[float, Optional[Dict[str, Any]]]:
+        """
+        check(foreign) runs the guards with the other snapshots'
+        entries added and returns (notional to hold, failure); on
+        success the entry is recorded. Both happen under the account
+        lock. Fails closed when the DB is unreachable.
+        """
+        try:
+            with get_conn() as conn, conn.transaction():
+                conn.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", (f"executor_ledger:{self.account}",))
+                rows = conn.execute(
+                    """
+                    SELECT symbol, notional
+                    FROM executor_entry_ledger
+                    WHERE account = %s
+                      AND owner <> %s
+                      AND (
+                            (status = 'reserved' AND created_at > now() - make_interval(secs => %s))
+                         OR (status = 'submitted' AND submitted_at > %s)
+                      )
+                    """,
+                    (self.account, self.owner, float(self.ttl_sec), since),
+                ).fetchall()
+
+                notional, denied = check(
+                    Foreign(
+                        buys=len(rows),
+                        symbols=frozenset(str(r["symbol"]) for r in rows),
+                        notional=sum(float(r["notional"] or 0) for r in rows),
+                    )
+                )
+                if denied:
+                    return 0.0, denied
+
+                row = conn.execute(
+                    """
+                    INSERT INTO executor_entry_ledger (account, owner, symbol, notional)
+                    VALUES (%s, %s, %s, %s)
+                    RETURNING id
+                    """,
+                    (self.account, self.owner, symbol, float(notional)),
+                ).fetchone()
+        except Exception as e:
+            print(f"[LEDGER] ❌ reserve failed symbol={symbol} err={e}", flush=True)
+            return 0.0, {"ok": False, "reason": "ledger_unavailable", "error": str(e)[:300]}
+
+        with self._lock:
+            self._ids.setdefault(symbol, []).append(int(row["id"]))
+        return notional, None
+
+    def _pop(self, symbol: str) -> Optional[int]:
+        with self._lock:
+            ids = self._ids.get(symbol)
+            if not ids:
+                return None
+            entry_id = ids.pop()
+            if not ids:
+                self._ids.pop(symbol, None)
+            return entry_id
+
+    def release(self, symbol: str) -> None:
+        entry_id = self._pop(symbol)
+        if entry_id is None:
+            return
+        try:
+            with get_conn() as conn:
+                conn.execute("DELETE FROM executor_entry_ledger WHERE id = %s", (entry_id,))
+        except Exception as e:
+            # the row stops counting after LEDGER_TTL_SEC
+            print(f"[LEDGER] release failed symbol={symbol} err={e}", flush=True)
+
+    def confirm(self, symbol: str) -> None:
+        entry_id = self._pop(symbol)
+        if entry_id is None:
+            return
+        try:
+            with get_conn() as conn:
+                conn.execute(
+                    "UPDATE executor_entry_ledger SET status = 'submitted', submitted_at = now() WHERE id = %s",
+                    (entry_id,),
+                )
+        except Exception as e:
+            # stays 'reserved': counted until LEDGER_TTL_SEC, i.e. conservatively
+            print(f"[LEDGER] confirm failed symbol={symbol} err={e}", flush=True)
+
+
+def prune_ledger(*, keep_days: int = 2) -> int:
+    """
+    Drop entries no snapshot can count any more (reaper tick).
+    """
+    with get_conn() as conn:
+        cur = conn.execute(
+            "DELETE FROM executor_entry_ledger WHERE created_at < now() - make_interval(days => %s)",
+            (int(keep_days),),
+        )
+        return cur.rowcount or 0
@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
+from datetime import datetime, timezone, timedelta
+
+if TYPE_CHECKING:
+    from alpaca.trading.client import TradingClient
+
+
+# =========================================================
+# PROJECTION-ONLY BROKER QUERIES
+#
+# Guards only ever read a handful of fields, so these helpers
+# call the REST endpoints directly (client.get -> raw JSON) and
+# keep just those fields instead of validating every order into
+# an alpaca-py pydantic model.
+#
+# Orders are paged with a submitted_at cursor (ascending), so
+# results are complete past the 500-per-request limit while only
+# one page is held in memory at a time. The endpoint has no page
+# token: when more than a page of orders shares one cursor
+# position, the orders tied at its end are read with an `until`
+# window and the cursor steps past them.
+# =========================================================
+
+MAX_PAGE_SIZE = 500
+
+# `after=` is exclusive and several orders can share a submitted_at:
+# every cursor re-reads a sliver; ids seen during the iteration are
+# skipped.
+CURSOR_OVERLAP = timedelta(milliseconds=1)
+
+# cursors are sent with microsecond precision
+TIE_WINDOW = timedelta(microseconds=1)
+
+
+class OrderRow(NamedTuple):
+    id: str
+    symbol: str
+    side: str
+    status: str
+    submitted_at: Optional[str]
+    filled_at: Optional[str]
+
+
+def parse_ts(v: Any) -> Optional[datetime]:
+    if not v:
+        return None
+    if isinstance(v, datetime):
+        return v if v.tzinfo else v.replace(tzinfo=timezone.utc)
+    try:
+        s = str(v).replace("Z", "+00:00")
+        # alpaca sends nanoseconds; fromisoformat takes at most micro
+        if "." in s:
+            head, tail = s.split(".", 1)
+            frac, sep, tz = tail.partition("+") if "+" in tail else tail.partition("-")
+            s = f"{head}.{frac[:6]}{sep}{tz}"
+        dt = datetime.fromisoformat(s)
+        return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+    except Exception:
+        return None
+
+
+def _iso(ts: datetime) -> str:
+    return ts.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+def _project_order(o: Dict[str, Any]) -> OrderRow:
+    return OrderRow(
+        id=str(o.get("id") or ""),
+        symbol=str(o.get("symbol") or "").upper(),
+        side=str(o.get("side") or "").lower(),
+        status=str(o.get("status") or "").lower(),
+        submitted_at=o.get("submitted_at"),
+        filled_at=o.get("filled_at"),
+    )
+
+
+def _fresh(page: List[Dict[str, Any]], seen: Set[str]) -> Tuple[List[OrderRow], Optional[datetime]]:
+    """
+    -> (rows not seen before, newest submitted_at on the whole page)
+    """
+    rows: List[OrderRow] = []
+    newest: Optional[datetime] = None
+    for raw in page:
+        row = _project_order(raw)
+        ts = parse_ts(row.submitted_at)
+        if ts is not None and (newest is None or ts > newest):
+            newest = ts
+        if row.id in seen:
+            continue
+        seen.add(row.id)
+        rows.append(row)
+    return rows, newest
+
+
+def iter_orders(
+    client: TradingClient,
+    *,
+    status: str = "open",
+    symbols: Optional[Iterable[str]] = None,
+    side: Optional[str] = None,
+    after: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    page_size: int = MAX_PAGE_SIZE,
+) -> Iterator[OrderRow]:
+    """
+    Yield every matching order, oldest first, one page at a time.
+
+    status: "open" | "closed" | "all". side ("buy"/"sell") is sent
+    to the API and re-checked locally.
+    """
+    limit = max(1, min(int(page_size), MAX_PAGE_SIZE))
+    side = side.lower() if side else None
+
+    params: Dict[str, Any] = {
+        "status": status,
+        "direction": "asc",
+        "nested": "false",
+        "limit": limit,
+    }
+    if symbols:
+        params["symbols"] = ",".join(s.upper() for s in symbols)
+    if side:
+        params["side"] = side
+    if until is not None:
+        params["until"] = _iso(until)
+
+    cursor = after
+    # ids yielded (or filtered) so far: overlaps never repeat a row
+    seen: Set[str] = set()
+
+    while True:
+        if cursor is not None:
+            params["after"] = _iso(cursor)
+
+        page = client.get("/orders", params) or []
+        rows, newest = _fresh(page, seen)
+        for row in rows:
+            if not side or row.side == side:
+                yield row
+
+        if len(page) < limit or newest is None:
+            return
+
+        if rows:
+            cursor = newest - CURSOR_OVERLAP
+            continue
+
+        # A full page of rows already seen: more than a page of orders
+        # sits inside one overlap, so the cursor cannot move back. The
+        # page is the oldest rows after the cursor, so only orders tied
+        # with its newest may be unseen: read those (`until` window; a
+        # single tie larger than a page cannot be paged by this
+        # endpoint), then step past them.
+        ties = dict(params, after=_iso(newest - TIE_WINDOW), until=_iso(newest + TIE_WINDOW))
+        rows, _ = _fresh(client.get("/orders", ties) or [], seen)
+        for row in rows:
+            if not side or row.side == side:
+                yield row
+
+        cursor = newest
+
+
+def iter_positions(client: TradingClient) -> Iterator[Tuple[str, float]]:
+    """
+    (symbol, qty) for every position. The positions endpoint is not
+    paged; this only skips model validation.
+    """
+    for p in client.get("/positions") or []:
+        try:
+            yield str(p.get("symbol") or "").upper(), float(p.get("qty") or 0)
+        except Exception:
+            continue
+
+
+def get_order(client: TradingClient, order_id: str) -> OrderRow:
+    """
+    One order by id. Raises when the broker does not know it (404).
+    """
+    return _project_order(client.get(f"/orders/{order_id}") or {})
+
+
+def get_position_qty(client: TradingClient, symbol: str) -> float:
+    """
+    Position qty for one symbol. Raises when there is no position
+    (the broker answers 404).
+    """
+    p = client.get(f"/positions/{symbol.upper()}") or {}
+    return float(p.get("qty") or 0)
@@ -1,13 +1,70 @@
 from __future__ import annotations
 
-from typing import Dict, Any, Tuple, Optional
-
-from alpaca.trading.enums import OrderSide, TimeInForce
-from alpaca.trading.requests import (
-    MarketOrderRequest,
-    LimitOrderRequest,
-    StopLimitOrderRequest,
-)
+from dataclasses import dataclass, field
+from typing import Dict, Any, Callable, Tuple, Optional
+
+
+@dataclass
+class PreparedOrder:
+    """
+    An intent that passed validation + guards and holds a reserved
+    slot in `snapshot`: handlers' prepare_* phase returns it, the
+    caller submits `request` (sync or async), then finalize_* or
+    submit_failed() settles the reservation.
+    """
+    intent_id: str
+    symbol: str
+    strategy: str
+    side: str
+    qty: int
+    planning_context: Dict[str, Any]
+    request: Any
+    snapshot: Any
+    extra: Dict[str, Any] = field(default_factory=dict)
+
+
+def submit_failed(prepared: PreparedOrder, e: BaseException) -> Dict[str, Any]:
+    prepared.snapshot.release(prepared.symbol)
+    return {"ok": False, "reason": "submit_error", "error": str(e)[:300]}
+
+
+def is_duplicate_submit(e: BaseException) -> bool:
+    """
+    The broker's 422 for a client_order_id it has already accepted:
+    a resubmit (released by the reaper, retried after a timeout) of
+    an order that did reach it. The order exists; adopt it.
+    """
+    if getattr(e, "status_code", None) != 422:
+        return False
+    return "client_order_id" in str(e).lower()
+
+
+def adopt_duplicate(
+    prepared: PreparedOrder,
+    e: BaseException,
+    fetch: Callable[[str], Any],
+) -> Optional[Any]:
+    """
+    Sync submit paths: on a duplicate submit, return the existing
+    order (fetch = client.get_order_by_client_id) for finalize_*.
+    None means submit_failed() applies.
+    """
+    if not is_duplicate_submit(e):
+        return None
+    try:
+        order = fetch(prepared.intent_id)
+    except Exception as fetch_err:
+        print(
+            f"[EXECUTOR] duplicate submit intent_id={prepared.intent_id} lookup failed err={fetch_err}",
+            flush=True,
+        )
+        return None
+    print(
+        f"[EXECUTOR] duplicate submit intent_id={prepared.intent_id} adopting "
+        f"order={getattr(order, 'id', None)}",
+        flush=True,
+    )
+    return order
 
 
 def round_price(px: float) -> float:
@@ -20,7 +77,20 @@ def build_order_from_planning_context(
     symbol: str,
     qty: int,
     planning_context: Dict[str, Any],
+    client_order_id: Optional[str] = None,
 ) -> Tuple[Optional[object], str]:
+    """
+    client_order_id (the intent_id) makes the submit idempotent: the
+    broker rejects a second order with the same id, so an intent
+    re-released by the lease reaper is never doubled.
+    """
+    # alpaca-py request models load on the first order, not at import
+    from alpaca.trading.enums import OrderSide, TimeInForce
+    from alpaca.trading.requests import (
+        MarketOrderRequest,
+        LimitOrderRequest,
+        StopLimitOrderRequest,
+    )
 
     pc = planning_context
 
@@ -45,6 +115,7 @@ def build_order_from_planning_context(
                 qty=qty,
                 side=alpaca_side,
                 time_in_force=alpaca_tif,
+                client_order_id=client_order_id,
             ),
             "ok",
         )
@@ -67,6 +138,7 @@ def build_order_from_planning_context(
                 qty=qty,
                 side=alpaca_side,
                 time_in_force=alpaca_tif,
+                client_order_id=client_order_id,
                 limit_price=lp,
             ),
             "ok",
@@ -93,6 +165,7 @@ def build_order_from_planning_context(
                 qty=qty,
                 side=alpaca_side,
                 time_in_force=alpaca_tif,
+                client_order_id=client_order_id,
                 stop_price=sp,
                 limit_price=lp,
             ),
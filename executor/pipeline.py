@@ -0,0 +1,249 @@
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from common.metrics import inc, set_gauge
+
+
+# =========================================================
+# PIPELINED DRAIN (claim -> execute -> write back)
+#
+#   claim    thread: claims the next batch while the current one
+#                    is at the broker (prefetch)
+#   execute  caller: sizing, guards, submit (sync or async)
+#   write    thread: bulk result write of the previous batch
+#
+# Stages hand batches over through bounded queues (depth
+# batches each): a slow broker stops the claimer from claiming
+# further ahead, a slow DB stops execute from running ahead of
+# its write-backs. depth=0 runs the three stages inline, one
+# after the other (the old loop).
+#
+# Metrics: executor_pipeline_occupancy{stage} (busy / wall of
+# the last drain) and executor_pipeline_stall_seconds_total
+# {stage} (time a stage waited on its neighbour).
+# =========================================================
+
+STAGES = ("claim", "execute", "write")
+
+_DONE = object()
+
+
+class _Failed:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+class DrainPipeline:
+    """
+    next_batch() -> intents | None (run drained); write(results);
+    close() flushes the write-backs (re-raising a failed one) and
+    returns prefetched batches that were never executed, so the
+    caller can release them.
+    """
+
+    def __init__(
+        self,
+        *,
+        claim: Callable[[], List[dict]],
+        write: Callable[[List[Any]], Any],
+        depth: int = 1,
+    ):
+        self._claim = claim
+        self._write = write
+        self.depth = max(0, int(depth))
+
+        self._stop = threading.Event()
+        self._claimed: "queue.Queue[Any]" = queue.Queue(maxsize=max(self.depth, 1))
+        self._results: "queue.Queue[Any]" = queue.Queue(maxsize=max(self.depth, 1))
+        self._threads: List[threading.Thread] = []
+        self._write_error: Optional[BaseException] = None
+        self._drained = False
+
+        self._busy: Dict[str, float] = {s: 0.0 for s in STAGES}
+        self._stall: Dict[str, float] = {s: 0.0 for s in STAGES}
+        self._lock = threading.Lock()
+        self._t0 = 0.0
+        self._exec_t: Optional[float] = None
+        self._closed = False
+
+    # --------------------------------------------------
+    # LIFECYCLE
+    # --------------------------------------------------
+
+    def start(self) -> "DrainPipeline":
+        self._t0 = time.perf_counter()
+        if self.depth > 0:
+            for name, target in (("claim", self._claim_loop), ("write", self._write_loop)):
+                t = threading.Thread(target=target, name=f"drain-{name}", daemon=True)
+                t.start()
+                self._threads.append(t)
+        return self
+
+    def close(self, *, raise_errors: bool = True) -> List[dict]:
+        """
+        Stop claiming, wait for every queued write-back and return
+        the intents claimed but never handed to execute. A failed
+        write-back is re-raised unless raise_errors=False.
+        """
+        if self._closed:
+            return []
+        self._closed = True
+        self._end_execute()
+        self._stop.set()
+
+        leftover: List[dict] = []
+        if self.depth > 0:
+            # unblock and collect the claimer
+            while True:
+                try:
+                    item = self._claimed.get(timeout=0.05)
+                except queue.Empty:
+                    if not self._threads[0].is_alive():
+                        break
+                    continue
+                if isinstance(item, list):
+                    leftover.extend(item)
+            self._threads[0].join()
+            while True:
+                try:
+                    item = self._claimed.get_nowait()
+                except queue.Empty:
+                    break
+                if isinstance(item, list):
+                    leftover.extend(item)
+
+            self._results.put(_DONE)
+            self._threads[1].join()
+
+        self._publish()
+        if self._write_error is not None:
+            if raise_errors:
+                raise self._write_error
+            print(f"[PIPELINE] ❌ result write-back failed: {self._write_error}", flush=True)
+        return leftover
+
+    # --------------------------------------------------
+    # CALLER SIDE (execute stage)
+    # --------------------------------------------------
+
+    def next_batch(self) -> Optional[List[dict]]:
+        self._end_execute()
+        if self._drained:
+            return None
+
+        if self.depth == 0:
+            batch = self._timed_claim()
+        else:
+            t = time.perf_counter()
+            item = self._claimed.get()
+            self._add("stall", "execute", time.perf_counter() - t)
+            if isinstance(item, _Failed):
+                self._drained = True
+                raise item.error
+            batch = None if item is _DONE else item
+
+        if not batch:
+            self._drained = True
+            return None
+        self._exec_t = time.perf_counter()
+        return batch
+
+    def write(self, results: List[Any]) -> None:
+        self._end_execute()
+        if self._write_error is not None:
+            raise self._write_error
+        if self.depth == 0:
+            self._timed_write(results)
+            return
+        t = time.perf_counter()
+        self._results.put(results)
+        self._add("stall", "execute", time.perf_counter() - t)
+
+    def occupancy(self) -> Dict[str, float]:
+        wall = max(time.perf_counter() - self._t0, 1e-9)
+        with self._lock:
+            return {s: round(min(self._busy[s] / wall, 1.0), 3) for s in STAGES}
+
+    # --------------------------------------------------
+    # STAGE THREADS
+    # --------------------------------------------------
+
+    def _claim_loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                batch = self._timed_claim()
+            except BaseException as e:
+                self._put(self._claimed, _Failed(e), "claim")
+                return
+            if not batch:
+                self._put(self._claimed, _DONE, "claim")
+                return
+            if not self._put(self._claimed, batch, "claim"):
+                # stopped while waiting: hand it back through close()
+                self._claimed.put(batch)
+                return
+
+    def _write_loop(self) -> None:
+        while True:
+            item = self._results.get()
+            if item is _DONE:
+                return
+            if self._write_error is not None:
+                continue
+            try:
+                self._timed_write(item)
+            except BaseException as e:
+                self._write_error = e
+
+    def _put(self, q: "queue.Queue[Any]", item: Any, stage: str) -> bool:
+        t = time.perf_counter()
+        try:
+            while True:
+                try:
+                    q.put(item, timeout=0.05)
+                    return True
+                except queue.Full:
+                    if self._stop.is_set():
+                        return False
+        finally:
+            self._add("stall", stage, time.perf_counter() - t)
+
+    # --------------------------------------------------
+    # ACCOUNTING
+    # --------------------------------------------------
+
+    def _timed_claim(self) -> List[dict]:
+        t = time.perf_counter()
+        try:
+            return self._claim()
+        finally:
+            self._add("busy", "claim", time.perf_counter() - t)
+
+    def _timed_write(self, results: List[Any]) -> None:
+        t = time.perf_counter()
+        try:
+            self._write(results)
+        finally:
+            self._add("busy", "write", time.perf_counter() - t)
+
+    def _end_execute(self) -> None:
+        if self._exec_t is not None:
+            self._add("busy", "execute", time.perf_counter() - self._exec_t)
+            self._exec_t = None
+
+    def _add(self, kind: str, stage: str, sec: float) -> None:
+        with self._lock:
+            (self._busy if kind == "busy" else self._stall)[stage] += sec
+
+    def _publish(self) -> None:
+        for stage, occ in self.occupancy().items():
+            set_gauge("executor_pipeline_occupancy", occ, stage=stage)
+        with self._lock:
+            stalls = dict(self._stall)
+        for stage, sec in stalls.items():
+            if sec > 0:
+                inc("executor_pipeline_stall_seconds_total", sec, stage=stage)
@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from executor.validate import validate_planning_context
+from executor.intents import load_pending_intents, reject_intents
+from common.metrics import record_intent_result
+
+
+# =========================================================
+# RUN PRE-VALIDATION (before any claim or broker call)
+#
+# One read loads every undispatched intent of the run, the
+# planning_context contracts are checked in memory, and every
+# reject is written back in one UPDATE. Only survivors are
+# left for the claim -> guards -> submit path.
+#
+# An optional schedule(survivors) -> rejects step (the run
+# scheduler) runs on the same read; its rejects go out in the
+# same UPDATE.
+# =========================================================
+
+
+def _bad_price(v: Any) -> bool:
+    try:
+        return float(v) <= 0
+    except Exception:
+        return True
+
+
+def check_intent(row: Dict[str, Any]) -> Tuple[bool, str]:
+    """
+    Static checks only (no account state): the validate.py contract
+    plus the fields order building would choke on.
+    """
+    symbol = str(row.get("symbol") or "").strip()
+    if not symbol:
+        return False, "missing_symbol"
+
+    pc = row.get("planning_context")
+    if pc is None:
+        pc = {}
+
+    ok, why = validate_planning_context(pc)
+    if not ok:
+        return False, why
+
+    if str(pc.get("entry_type")).strip().lower() == "limit" and _bad_price(pc.get("limit_price")):
+        return False, "invalid_limit_price"
+
+    qty = pc.get("qty")
+    if qty is not None:
+        try:
+            int(qty)
+        except Exception:
+            return False, "invalid_qty"
+
+    return True, "ok"
+
+
+def find_rejects(rows: List[Dict[str, Any]]) -> List[Tuple[str, Dict[str, Any]]]:
+    """
+    rows in claim order (priority DESC, ts ASC). The first valid
+    intent per (symbol, side) survives; later ones are duplicates.
+    """
+    rejects: List[Tuple[str, Dict[str, Any]]] = []
+    first_by_key: Dict[Tuple[str, str], str] = {}
+
+    for row in rows:
+        intent_id = str(row["intent_id"])
+
+        ok, why = check_intent(row)
+        if not ok:
+            rejects.append((intent_id, {"ok": False, "reason": why, "stage": "prevalidate"}))
+            continue
+
+        pc = row.get("planning_context") or {}
+        key = (str(row["symbol"]).upper().strip(), str(pc.get("side")).strip().lower())
+        kept = first_by_key.get(key)
+        if kept is not None:
+            rejects.append(
+                (
+                    intent_id,
+                    {
+                        "ok": False,
+                        "reason": "duplicate_symbol_in_run",
+                        "stage": "prevalidate",
+                        "kept_intent_id": kept,
+                    },
+                )
+            )
+            continue
+        first_by_key[key] = intent_id
+
+    return rejects
+
+
+def prevalidate_run(
+    *,
+    run_id: str,
+    executor: str,
+    validate: bool = True,
+    schedule: Optional[Callable[[List[Dict[str, Any]]], List[Tuple[str, Dict[str, Any]]]]] = None,
+) -> Dict[str, int]:
+    rows = load_pending_intents(run_id=run_id, executor=executor)
+    rejects = find_rejects(rows) if validate else []
+
+    extra: List[Tuple[str, Dict[str, Any]]] = []
+    if schedule is not None:
+        rejected_ids = {intent_id for intent_id, _ in rejects}
+        extra = schedule([r for r in rows if str(r["intent_id"]) not in rejected_ids])
+        rejects.extend(extra)
+
+    # a row claimed since the read is not rejected (its drain owns it):
+    # only what the UPDATE changed is counted
+    written = set(reject_intents(rejects))
+    for intent_id, detail in rejects:
+        if intent_id in written:
+            record_intent_result(detail)
+
+    return {
+        "pending": len(rows),
+        "rejected": len(written),
+        "unscheduled": sum(1 for intent_id, _ in extra if intent_id in written),
+        "survivors": len(rows) - len(written),
+    }
@@ -0,0 +1,255 @@
+from __future__ import annotations
+
+import time
+import random
+import threading
+from typing import Any, Callable, NamedTuple, Optional
+
+from common.metrics import REGISTRY, inc, observe
+
+
+# =========================================================
+# BROKER REQUEST BUDGET
+#
+# One token bucket per process shared by every TradingClient
+# call. BROKER_RATE_PER_MIN / BROKER_BURST are the ACCOUNT's
+# budget: each process gets 1 / (BROKER_REPLICAS x its
+# supervisor's worker processes) of rate, burst and reserve.
+# Order submits ("submit" priority) go first: reads may not dip
+# into the last `submit_reserve` tokens and always yield to a
+# waiting submit.
+#
+# 429 / 5xx responses are retried with jittered exponential
+# backoff (at least Retry-After when the broker sends it).
+# Submits are retried on 429 only: a 5xx can come back after
+# the order was accepted, and a resend would double it.
+# =========================================================
+
+SUBMIT = "submit"
+READ = "read"
+
+REGISTRY.describe("executor_broker_wait_seconds", "Time spent waiting for a broker request token")
+REGISTRY.describe("executor_broker_retries_total", "Broker calls retried after 429/5xx")
+
+# TradingClient methods that create / change orders or positions
+SUBMIT_METHODS = frozenset(
+    {
+        "submit_order",
+        "replace_order_by_id",
+        "cancel_order_by_id",
+        "cancel_orders",
+        "close_position",
+        "close_all_positions",
+    }
+)
+
+
+class BrokerBudget(NamedTuple):
+    """
+    A request budget: the account's (BROKER_*), or one process's
+    share of it.
+    """
+
+    rate_per_min: float
+    burst: float
+    submit_reserve: float = 0.0
+
+    def share(self, n: int) -> "BrokerBudget":
+        n = max(int(n), 1)
+        return BrokerBudget(self.rate_per_min / n, self.burst / n, self.submit_reserve / n)
+
+
+class TokenBucket:
+    def __init__(self, *, rate_per_sec: float, burst: float, submit_reserve: float = 0.0):
+        self.rate = max(float(rate_per_sec), 1e-6)
+        self.burst = max(float(burst), 1.0)
+        self.submit_reserve = min(max(float(submit_reserve), 0.0), self.burst - 1.0)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._cond = threading.Condition()
+        self._submits_waiting = 0
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _needed(self, priority: str) -> float:
+        return 1.0 if priority == SUBMIT else 1.0 + self.submit_reserve
+
+    def acquire(self, priority: str = READ) -> float:
+        """
+        Block until a token is available. Returns seconds waited.
+        """
+        t0 = time.monotonic()
+        need = self._needed(priority)
+
+        with self._cond:
+            if priority == SUBMIT:
+                self._submits_waiting += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    blocked = priority != SUBMIT and self._submits_waiting > 0
+                    if not blocked and self._tokens >= need:
+                        self._tokens -= 1.0
+                        break
+                    deficit = max(need - self._tokens, 1.0 if blocked else 0.0)
+                    self._cond.wait(timeout=max(deficit / self.rate, 0.001))
+            finally:
+                if priority == SUBMIT:
+                    self._submits_waiting -= 1
+                    self._cond.notify_all()
+
+        return time.monotonic() - t0
+
+    def try_acquire(self, priority: str = READ) -> float:
+        """
+        Non-blocking: take a token and return 0.0, or return how long
+        to wait before trying again.
+        """
+        need = self._needed(priority)
+        with self._cond:
+            self._refill(time.monotonic())
+            blocked = priority != SUBMIT and self._submits_waiting > 0
+            if not blocked and self._tokens >= need:
+                self._tokens -= 1.0
+                return 0.0
+            deficit = max(need - self._tokens, 1.0 if blocked else 0.0)
+            return max(deficit / self.rate, 0.001)
+
+    async def acquire_async(self, priority: str = READ) -> float:
+        """
+        acquire() for event-loop callers (never blocks the loop).
+        """
+        import asyncio
+
+        t0 = time.monotonic()
+        if priority == SUBMIT:
+            with self._cond:
+                self._submits_waiting += 1
+        try:
+            while True:
+                wait = self.try_acquire(priority)
+                if wait == 0.0:
+                    break
+                await asyncio.sleep(wait)
+        finally:
+            if priority == SUBMIT:
+                with self._cond:
+                    self._submits_waiting -= 1
+                    self._cond.notify_all()
+        return time.monotonic() - t0
+
+    def penalize(self, seconds: float) -> None:
+        """
+        Broker said slow down: drain the bucket so every caller waits.
+        """
+        with self._cond:
+            self._refill(time.monotonic())
+            self._tokens = min(self._tokens, -seconds * self.rate)
+
+
+def status_of(e: BaseException) -> Optional[int]:
+    try:
+        code = getattr(e, "status_code", None)
+        return int(code) if code is not None else None
+    except Exception:
+        return None
+
+
+def retry_after_of(e: BaseException) -> Optional[float]:
+    v = getattr(e, "retry_after", None)
+    if v is None:
+        try:
+            v = e.response.headers.get("Retry-After")  # alpaca APIError -> requests.Response
+        except Exception:
+            v = None
+    try:
+        return max(float(v), 0.0) if v is not None else None
+    except Exception:
+        return None
+
+
+def retryable(priority: str, status: Optional[int]) -> bool:
+    if status == 429:
+        return True
+    return priority != SUBMIT and status is not None and 500 <= status < 600
+
+
+def backoff_delay(attempt: int, e: BaseException, *, base: float, cap: float) -> float:
+    """
+    Full-jitter exponential backoff, never shorter than Retry-After.
+    """
+    delay = random.uniform(0, min(cap, base * (2 ** attempt)))
+    ra = retry_after_of(e)
+    return max(delay, ra) if ra is not None else delay
+
+
+class RateLimitedClient:
+    """
+    Wraps a TradingClient (or anything with its surface): every
+    method call takes a token first and is retried per the policy
+    above. Attribute reads pass through untouched.
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        bucket: TokenBucket,
+        *,
+        max_retries: int = 4,
+        backoff_base_sec: float = 0.25,
+        backoff_max_sec: float = 8.0,
+    ):
+        self._client = client
+        self._bucket = bucket
+        self._max_retries = max(0, int(max_retries))
+        self._backoff_base = backoff_base_sec
+        self._backoff_max = backoff_max_sec
+
+    @property
+    def wrapped(self) -> Any:
+        return self._client
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._client, name)
+        if not callable(attr) or name.startswith("_"):
+            return attr
+        return self._wrap(name, attr)
+
+    def _wrap(self, name: str, fn: Callable[..., Any]) -> Callable[..., Any]:
+        priority = SUBMIT if name in SUBMIT_METHODS else READ
+
+        def call(*args, **kwargs):
+            attempt = 0
+            while True:
+                waited = self._bucket.acquire(priority)
+                observe("executor_broker_wait_seconds", waited, priority=priority)
+
+                try:
+                    return fn(*args, **kwargs)
+                except Exception as e:
+                    status = status_of(e)
+                    if attempt >= self._max_retries or not retryable(priority, status):
+                        raise
+
+                    attempt += 1
+                    delay = backoff_delay(attempt, e, base=self._backoff_base, cap=self._backoff_max)
+
+                    inc("executor_broker_retries_total", method=name, status=str(status))
+                    print(
+                        f"[BROKER] {name} status={status} retry={attempt}/{self._max_retries} "
+                        f"in {delay:.2f}s",
+                        flush=True,
+                    )
+
+                    if status == 429:
+                        # the whole process backs off, not just this caller;
+                        # the next acquire() waits out the penalty
+                        self._bucket.penalize(delay)
+                    else:
+                        time.sleep(delay)
+
+        call.__name__ = name
+        return call
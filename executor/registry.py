@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import importlib
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+
+# =========================================================
+# JOB-TYPE HANDLER REGISTRY
+#
+# Maps job_dispatch.job_type to the intent handler that
+# executes it. Handlers are referenced as "module:function"
+# and imported on first use, so a worker only loads (and
+# only needs the config of) the job types it serves.
+#
+#   register(JobHandler("crypto", "crypto",
+#            "executor.handlers.crypto:execute_crypto_intent", "EXECUTOR-CRYPTO"))
+# =========================================================
+
+
+@dataclass(frozen=True)
+class JobHandler:
+    job_type: str
+    # strategy_intents.executor value drained for this job type
+    executor: str
+    # "module:function"; called as fn(run_id=..., intent=..., snapshot=...)
+    target: str
+    # log prefix
+    tag: str
+    # optional split phases for async submission (executor.async_broker):
+    # prepare(run_id, intent, snapshot) -> (PreparedOrder | None, failure | None)
+    # finalize(run_id, prepared, order) -> result
+    prepare: Optional[str] = None
+    finalize: Optional[str] = None
+    # caps the run scheduler fits the run to (executor.scheduler):
+    # Settings field names; pending_counts_as_position as in reserve_entry()
+    max_positions: Optional[str] = None
+    max_trades_per_day: Optional[str] = None
+    pending_counts_as_position: bool = False
+    # source_facts.run_position_cap (int > 0) lowers max_positions
+    # for the run, as the handler does
+    run_position_cap: bool = False
+
+    @property
+    def supports_async(self) -> bool:
+        return bool(self.prepare and self.finalize)
+
+
+_HANDLERS: Dict[str, JobHandler] = {}
+_resolved: Dict[str, Callable[..., Any]] = {}
+_lock = threading.Lock()
+
+
+def register(handler: JobHandler) -> None:
+    with _lock:
+        _HANDLERS[handler.job_type] = handler
+        for key in [k for k in _resolved if k.startswith(handler.job_type + ":")]:
+            _resolved.pop(key, None)
+
+
+def get_handler(job_type: str) -> Optional[JobHandler]:
+    return _HANDLERS.get(job_type)
+
+
+def job_types() -> List[str]:
+    return sorted(_HANDLERS)
+
+
+def resolve(handler: JobHandler, phase: str = "target") -> Callable[..., Any]:
+    """
+    Import (once) and return the handler's function for `phase`
+    ("target", "prepare" or "finalize").
+    """
+    key = f"{handler.job_type}:{phase}"
+    fn = _resolved.get(key)
+    if fn is not None:
+        return fn
+
+    ref = getattr(handler, phase)
+    if not ref:
+        raise LookupError(f"job_type={handler.job_type} has no {phase} phase")
+
+    with _lock:
+        fn = _resolved.get(key)
+        if fn is None:
+            module, _, attr = ref.partition(":")
+            fn = getattr(importlib.import_module(module), attr)
+            _resolved[key] = fn
+    return fn
+
+
+register(
+    JobHandler(
+        job_type="stocks",
+        executor="stocks",
+        target="executor.handlers.stocks:execute_stocks_intent",
+        tag="EXECUTOR-STOCKS",
+        prepare="executor.handlers.stocks:prepare_stocks_intent",
+        finalize="executor.handlers.stocks:finalize_stocks_intent",
+        max_positions="max_stocks_positions",
+        max_trades_per_day="max_stocks_trades_per_day",
+    )
+)
+register(
+    JobHandler(
+        job_type="penny",
+        executor="penny",
+        target="executor.executor.handlers.penny:execute_penny_intent",
+        tag="EXECUTOR-PENNY",
+        prepare="executor.executor.handlers.penny:prepare_penny_intent",
+        finalize="executor.executor.handlers.penny:finalize_penny_intent",
+        max_positions="max_penny_positions",
+        max_trades_per_day="max_penny_trades_per_day",
+        pending_counts_as_position=True,
+        run_position_cap=True,
+    )
+)
@@ -0,0 +1,830 @@
+from __future__ import annotations
+
+import os
+import time
+import socket
+import signal
+import threading
+import traceback
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from common.job_claim import claim_job, mark_done, mark_error, requeue_job
+from executor.intents import claim_next_intents, release_intents, set_intent_results
+from executor.registry import JobHandler, get_handler, resolve
+from executor.config import get_settings
+from executor.alpaca_client import get_trading_client, get_async_broker
+from executor.orders import is_duplicate_submit, submit_failed
+from executor.snapshot import AccountSnapshot
+from executor.sizing import attach_sizing
+from executor.prevalidate import prevalidate_run
+from executor.scheduler import schedule_rows
+from executor.pipeline import DrainPipeline
+from executor.lease import LeaseHeartbeat, Reaper
+from common.metrics import REGISTRY, observe, timed, record_intent_result, start_metrics_server
+
+if TYPE_CHECKING:
+    import asyncio
+
+REGISTRY.describe("executor_dispatch_queue_wait_seconds", "Time a job_dispatch row waited queued before its claim")
+
+# a failed account snapshot (broker REST) is retried, not an error:
+# requeued with 5s, 10s, 20s ... backoff, capped at 5 min
+SNAPSHOT_RETRY_BASE_SEC = 5.0
+SNAPSHOT_RETRY_MAX_SEC = 300.0
+
+
+# =========================================================
+# GENERIC INTENT RUNNER
+#
+# Claims job_dispatch rows for a set of job types and drains
+# their strategy_intents through the registered handler
+# (executor.registry). stocks_runner / penny_runner are thin
+# entry points over run_worker(); executor.supervisor runs
+# several of them as processes.
+# =========================================================
+
+
+def _log_claimed(handler: JobHandler, intent: dict) -> None:
+    print(
+        f"[{handler.tag}] intent_claimed "
+        f"intent_id={intent['intent_id']} symbol={intent.get('symbol')}",
+        flush=True,
+    )
+
+
+def _report(handler: JobHandler, intent: dict, res: dict) -> Tuple[str, bool, dict]:
+    tag = handler.tag
+    symbol = intent.get("symbol")
+
+    record_intent_result(res)
+
+    if res.get("ok"):
+        print(
+            f"[{tag}] SUCCESS "
+            f"symbol={symbol} detail={res}",
+            flush=True,
+        )
+    else:
+        print(
+            f"[{tag}] FAIL "
+            f"symbol={symbol} "
+            f"reason={res.get('reason')} "
+            f"error={res.get('error')}",
+            flush=True,
+        )
+
+    return str(intent["intent_id"]), bool(res.get("ok")), res
+
+
+def _crash(e: Exception) -> dict:
+    traceback.print_exc()
+    return {
+        "ok": False,
+        "reason": "handler_crash",
+        "error": str(e)[:300],
+    }
+
+
+def _execute_one(
+    *,
+    handler: JobHandler,
+    run_id: str,
+    intent: dict,
+    snapshot: AccountSnapshot,
+) -> Tuple[str, bool, dict]:
+    _log_claimed(handler, intent)
+
+    try:
+        with timed("intent_total"):
+            res = resolve(handler)(
+                run_id=run_id,
+                intent=intent,
+                snapshot=snapshot,
+            )
+    except Exception as e:
+        res = _crash(e)
+
+    return _report(handler, intent, res)
+
+
+async def _adopt_duplicate_async(broker: Any, prepared: Any) -> Any:
+    # async twin of executor.orders.adopt_duplicate()
+    try:
+        order = await broker.get_order_by_client_id(prepared.intent_id)
+    except Exception as e:
+        print(
+            f"[EXECUTOR] duplicate submit intent_id={prepared.intent_id} lookup failed err={e}",
+            flush=True,
+        )
+        return None
+    print(
+        f"[EXECUTOR] duplicate submit intent_id={prepared.intent_id} adopting "
+        f"order={getattr(order, 'id', None)}",
+        flush=True,
+    )
+    return order
+
+
+async def _execute_one_async(
+    *,
+    handler: JobHandler,
+    run_id: str,
+    intent: dict,
+    snapshot: AccountSnapshot,
+    broker: Any,
+    inflight: asyncio.Semaphore,
+) -> Tuple[str, bool, dict]:
+    """
+    prepare -> await submit -> finalize (DB, on a worker thread so the
+    loop keeps submitting). prepare is inline (CPU only) unless the
+    snapshot has a SharedLedger: its reservation is a DB transaction,
+    so it runs on a worker thread too.
+    """
+    import asyncio
+
+    _log_claimed(handler, intent)
+
+    try:
+        with timed("intent_total"):
+            prepare = resolve(handler, "prepare")
+            if snapshot.ledger is None:
+                prepared, res = prepare(run_id=run_id, intent=intent, snapshot=snapshot)
+            else:
+                prepared, res = await asyncio.to_thread(prepare, run_id=run_id, intent=intent, snapshot=snapshot)
+            if prepared is not None:
+                order = None
+                try:
+                    async with inflight:
+                        with timed("submit_order"):
+                            order = await broker.submit_order(prepared.request)
+                except Exception as e:
+                    if is_duplicate_submit(e):
+                        order = await _adopt_duplicate_async(broker, prepared)
+                    if order is None:
+                        res = submit_failed(prepared, e)
+                if order is not None:
+                    res = await asyncio.to_thread(
+                        resolve(handler, "finalize"),
+                        run_id=run_id,
+                        prepared=prepared,
+                        order=order,
+                    )
+    except Exception as e:
+        res = _crash(e)
+
+    return _report(handler, intent, res)
+
+
+def _execute_batch(
+    *,
+    handler: JobHandler,
+    run_id: str,
+    intents: List[dict],
+    snapshot: AccountSnapshot,
+    pool: Optional[ThreadPoolExecutor],
+) -> List[Tuple[str, bool, dict]]:
+    """
+    Serial when pool is None. Otherwise intents are grouped by symbol:
+    each symbol's intents run in order on one worker, different
+    symbols run in parallel. Caps stay exact because every handler
+    goes through the snapshot's atomic reservation ledger.
+    """
+    def _run(group: List[dict]) -> List[Tuple[str, bool, dict]]:
+        return [
+            _execute_one(handler=handler, run_id=run_id, intent=i, snapshot=snapshot)
+            for i in group
+        ]
+
+    if pool is None:
+        return _run(intents)
+
+    by_symbol: Dict[str, List[dict]] = {}
+    for intent in intents:
+        sym = str(intent.get("symbol") or "").upper().strip()
+        by_symbol.setdefault(sym, []).append(intent)
+
+    futures = [pool.submit(_run, group) for group in by_symbol.values()]
+
+    results: List[Tuple[str, bool, dict]] = []
+    for fut in futures:
+        results.extend(fut.result())
+    return results
+
+
+async def _execute_batch_async(
+    *,
+    handler: JobHandler,
+    run_id: str,
+    intents: List[dict],
+    snapshot: AccountSnapshot,
+) -> List[Tuple[str, bool, dict]]:
+    """
+    Whole batch in flight on one event loop (up to ASYNC_INFLIGHT
+    submits at once). Same per-symbol ordering as _execute_batch.
+    """
+    import asyncio
+
+    broker = get_async_broker()
+    inflight = asyncio.Semaphore(get_settings().async_inflight)
+
+    by_symbol: Dict[str, List[dict]] = {}
+    for intent in intents:
+        sym = str(intent.get("symbol") or "").upper().strip()
+        by_symbol.setdefault(sym, []).append(intent)
+
+    async def _run(group: List[dict]) -> List[Tuple[str, bool, dict]]:
+        return [
+            await _execute_one_async(
+                handler=handler,
+                run_id=run_id,
+                intent=i,
+                snapshot=snapshot,
+                broker=broker,
+                inflight=inflight,
+            )
+            for i in group
+        ]
+
+    results: List[Tuple[str, bool, dict]] = []
+    for group_results in await asyncio.gather(*(_run(g) for g in by_symbol.values())):
+        results.extend(group_results)
+    return results
+
+
+def _release_prefetched(pipe: DrainPipeline, *, lease_lost: bool = False) -> None:
+    """
+    Stop the pipeline and hand claimed-but-unexecuted intents back
+    to the run (no-op once closed). After a lost lease they are left
+    alone: the reaper has released them and a new owner may be
+    draining them.
+    """
+    leftover = pipe.close(raise_errors=False)
+    if leftover and not lease_lost:
+        release_intents(leftover)
+
+
+class DispatchDrain:
+    """
+    One claimed job_dispatch row, drained a batch at a time:
+
+        d = DispatchDrain(job, ...)
+        if d.open():
+            while d.step():
+                ...
+        d.close()
+
+    open() validates the job row and prepares the run (snapshot,
+    pre-validation + schedule, pipeline); step() executes one batch
+    and returns False once the job is settled: marked done (summary
+    set), marked error, requeued (should_stop) or left alone (lease
+    lost). close() always runs: it hands prefetched intents back and
+    stops the lease heartbeat.
+
+    drain_dispatch() runs one to completion; run_worker() with
+    EXECUTOR_MAX_DISPATCHES > 1 interleaves several (executor.fair).
+    """
+
+    def __init__(
+        self,
+        job: dict,
+        *,
+        pool: Optional[ThreadPoolExecutor] = None,
+        should_stop: Optional[Callable[[], bool]] = None,
+        use_async: Optional[bool] = None,
+        limit: Optional[int] = None,
+        snapshot: Optional[AccountSnapshot] = None,
+    ):
+        self.job = job
+        self.dispatch_id = job["dispatch_id"]
+        self.job_type = job.get("job_type") or ""
+        self.run_id = job.get("run_id")
+        self.claimed_by = job.get("claimed_by")
+        self.pool = pool
+        self.should_stop = should_stop
+        self._use_async = use_async
+        # intents claimed per batch (None: EXECUTOR_CLAIM_BATCH)
+        self._limit = limit
+
+        self.handler: Optional[JobHandler] = None
+        self.tag = "EXECUTOR"
+        self.summary: Optional[Dict[str, Any]] = None
+        self.executed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.unscheduled = 0
+
+        self._cfg = None
+        # shared by concurrent drains of one executor (executor.fair)
+        self.snapshot: Optional[AccountSnapshot] = snapshot
+        self._heartbeat: Optional[LeaseHeartbeat] = None
+        self._pipe: Optional[DrainPipeline] = None
+        self._started = time.monotonic()
+        self._settled = False
+
+    # --------------------------------------------------
+    # OPEN
+    # --------------------------------------------------
+
+    def open(self) -> bool:
+        dispatch_id = self.dispatch_id
+        claimed_by = self.claimed_by
+
+        handler = get_handler(self.job_type)
+        if handler is None:
+            print(
+                f"[EXECUTOR] ❌ no handler registered job_type={self.job_type} "
+                f"dispatch_id={dispatch_id}",
+                flush=True,
+            )
+            self._error(f"no_handler_for_job_type value={self.job_type}")
+            return False
+
+        self.handler = handler
+        self.tag = tag = handler.tag
+        self._cfg = cfg = get_settings()
+        self._use_async = (
+            cfg.async_submit if self._use_async is None else self._use_async
+        ) and handler.supports_async
+
+        # ---------------------------------------------------------
+        # RUN_ID (MANAGER-OWNED, REQUIRED)
+        # - Trust job_dispatch.run_id (top-level) — NOT payload
+        # - Avoid JSON decoding / payload-as-string issues
+        # ---------------------------------------------------------
+        run_id = self.run_id
+
+        if not run_id:
+            print(
+                f"[{tag}] ❌ missing run_id on job row "
+                f"dispatch_id={dispatch_id}",
+                flush=True,
+            )
+            self._error("missing_run_id_on_job")
+            return False
+
+        # extra guard: prevent accidental literal placeholders ever hitting DB
+        if run_id in ("run_id", "dispatch_id"):
+            self._error(f"invalid_literal_run_id value={run_id}")
+            return False
+
+        self._started = time.monotonic()
+
+        print(
+            f"[{tag}] START dispatch_id={dispatch_id} run_id={run_id}",
+            flush=True,
+        )
+        if self.job.get("queue_wait_sec") is not None:
+            observe("executor_dispatch_queue_wait_seconds", float(self.job["queue_wait_sec"]), job_type=self.job_type)
+
+        if claimed_by:
+            self._heartbeat = LeaseHeartbeat(
+                dispatch_id,
+                claimed_by=claimed_by,
+                lease_sec=int(self.job.get("lease_sec") or cfg.lease_sec),
+            ).start()
+
+        try:
+            # ---------------------------------------------------------
+            # ACCOUNT SNAPSHOT (once per dispatch; guards read from it)
+            # ---------------------------------------------------------
+            if self.snapshot is None:
+                try:
+                    with timed("guard_snapshot"):
+                        self.snapshot = AccountSnapshot.load(get_trading_client())
+                except Exception as e:
+                    self._retry_later("snapshot_failed", e)
+                    return False
+                from executor.ledger import SharedLedger, shared_ledger_enabled
+
+                if shared_ledger_enabled():
+                    # caps shared with every other process on this account
+                    self.snapshot.ledger = SharedLedger(account=cfg.alpaca_key_id, ttl_sec=cfg.ledger_ttl_sec)
+
+            # ---------------------------------------------------------
+            # PRE-VALIDATION + RUN SCHEDULE (one read + one bulk reject,
+            # no broker calls): bad contracts, duplicates, and whatever
+            # does not fit the caps / buying power by priority
+            # ---------------------------------------------------------
+            if cfg.prevalidate or cfg.schedule:
+                schedule = None
+                if cfg.schedule:
+                    schedule = partial(schedule_rows, handler=handler, snapshot=self.snapshot)
+                with timed("prevalidate"):
+                    pre = prevalidate_run(
+                        run_id=str(run_id),
+                        executor=handler.executor,
+                        validate=cfg.prevalidate,
+                        schedule=schedule,
+                    )
+                self.rejected = pre["rejected"]
+                self.unscheduled = pre["unscheduled"]
+                self.failed += self.rejected
+                if self.rejected:
+                    print(
+                        f"[{tag}] PREVALIDATE rejected={self.rejected} "
+                        f"unscheduled={self.unscheduled} survivors={pre['survivors']}",
+                        flush=True,
+                    )
+
+            # ---------------------------------------------------------
+            # DRAIN INTENTS FOR THIS RUN
+            # claim (prefetch) -> execute -> write back, overlapped
+            # ---------------------------------------------------------
+            self._pipe = DrainPipeline(claim=self._claim, write=self._write, depth=cfg.pipeline_depth).start()
+        except Exception as e:
+            self._crashed(e)
+            return False
+
+        return True
+
+    def _claim(self) -> List[dict]:
+        with timed("claim_next_intent"):
+            return claim_next_intents(
+                run_id=str(self.run_id),
+                executor=self.handler.executor,
+                limit=min(self._cfg.claim_batch, self._limit or self._cfg.claim_batch),
+            )
+
+    def _write(self, results: List[Tuple[str, bool, dict]]) -> None:
+        # one round trip for the whole batch
+        with timed("set_intent_result"):
+            set_intent_results(results)
+
+    # --------------------------------------------------
+    # STEP (one batch)
+    # --------------------------------------------------
+
+    def step(self) -> bool:
+        if self._settled:
+            return False
+        try:
+            return self._step()
+        except Exception as e:
+            self._crashed(e)
+            return False
+
+    def _step(self) -> bool:
+        if self._lease_lost():
+            self._settled = True
+            return False
+
+        if self.should_stop is not None and self.should_stop():
+            self.requeue("worker_shutdown")
+            return False
+
+        intents = self._pipe.next_batch()
+        if not intents:
+            self._finish()
+            return False
+
+        # one vectorized sizing pass (qty only; funded per reservation)
+        with timed("sizing_batch"):
+            attach_sizing(intents)
+
+        if self._use_async:
+            # asyncio / httpx are only imported by workers that use them
+            from executor.async_broker import get_async_runtime
+
+            results = get_async_runtime().run(
+                _execute_batch_async(
+                    handler=self.handler,
+                    run_id=str(self.run_id),
+                    intents=intents,
+                    snapshot=self.snapshot,
+                )
+            )
+        else:
+            results = _execute_batch(
+                handler=self.handler,
+                run_id=str(self.run_id),
+                intents=intents,
+                snapshot=self.snapshot,
+                pool=self.pool,
+            )
+
+        for _, ok, _ in results:
+            if ok:
+                self.executed += 1
+            else:
+                self.failed += 1
+
+        self._pipe.write(results)
+        return True
+
+    # --------------------------------------------------
+    # SETTLE
+    # --------------------------------------------------
+
+    def _finish(self) -> None:
+        """
+        JOB COMPLETE: every write-back lands before mark_done.
+        """
+        tag = self.tag
+        cfg = self._cfg
+
+        self._pipe.close()
+        occupancy = self._pipe.occupancy()
+
+        elapsed = max(time.monotonic() - self._started, 1e-9)
+        total = self.executed + self.failed
+        per_sec = round(total / elapsed, 2)
+
+        self._settled = True
+        if self._lease_lost():
+            return
+
+        mark_done(
+            self.dispatch_id,
+            extra={
+                "run_id": str(self.run_id),
+                "executed": self.executed,
+                "failed": self.failed,
+                "prevalidate_rejected": self.rejected,
+                "unscheduled": self.unscheduled,
+                "elapsed_sec": round(elapsed, 3),
+                "intents_per_sec": per_sec,
+                "workers": cfg.workers,
+                "pipeline_occupancy": occupancy,
+            },
+            claimed_by=self.claimed_by,
+        )
+
+        print(
+            f"[{tag}] DONE dispatch_id={self.dispatch_id} "
+            f"executed={self.executed} failed={self.failed} "
+            f"elapsed={elapsed:.2f}s throughput={per_sec}/s workers={cfg.workers}",
+            flush=True,
+        )
+
+        self.summary = {
+            "dispatch_id": self.dispatch_id,
+            "job_type": self.job_type,
+            "run_id": str(self.run_id),
+            "executed": self.executed,
+            "failed": self.failed,
+            "prevalidate_rejected": self.rejected,
+            "unscheduled": self.unscheduled,
+            "elapsed_sec": elapsed,
+            "intents_per_sec": per_sec,
+            "pipeline_occupancy": occupancy,
+        }
+
+    def requeue(self, reason: str, *, to_back: bool = False) -> None:
+        """
+        Give the job back (shutdown, or yielding its slot): remaining
+        intents are left for the next claimer. to_back: behind every
+        job queued so far (yield), not first in line again.
+        """
+        if self._settled:
+            return
+        self._settled = True
+        if self._pipe is not None:
+            _release_prefetched(self._pipe, lease_lost=self._lost())
+        requeue_job(
+            self.dispatch_id,
+            reason=reason,
+            extra={"executed": self.executed, "failed": self.failed},
+            claimed_by=self.claimed_by,
+            to_back=to_back,
+        )
+        print(
+            f"[{self.tag}] REQUEUED dispatch_id={self.dispatch_id} "
+            f"executed={self.executed} failed={self.failed} ({reason})",
+            flush=True,
+        )
+
+    def age(self) -> float:
+        return time.monotonic() - self._started
+
+    def close(self) -> None:
+        if self._pipe is not None:
+            _release_prefetched(self._pipe, lease_lost=self._lost())
+        if self._heartbeat is not None:
+            self._heartbeat.stop()
+
+    def _lost(self) -> bool:
+        return self._heartbeat is not None and self._heartbeat.lost()
+
+    def _lease_lost(self) -> bool:
+        if not self._lost():
+            return False
+        print(
+            f"[{self.tag}] LEASE LOST dispatch_id={self.dispatch_id} "
+            f"executed={self.executed} failed={self.failed} (reaped; not marking)",
+            flush=True,
+        )
+        return True
+
+    def _error(self, error: str, extra: Optional[Dict[str, Any]] = None) -> None:
+        self._settled = True
+        mark_error(self.dispatch_id, error, extra=extra, claimed_by=self.claimed_by)
+
+    def _crashed(self, e: Exception) -> None:
+        traceback.print_exc()
+        self._error(str(e), extra={"run_id": str(self.run_id)})
+
+    def _retry_later(self, reason: str, e: Exception) -> None:
+        # transient (broker down, timeout): back to the queue with backoff
+        payload = self.job.get("payload") if isinstance(self.job.get("payload"), dict) else {}
+        try:
+            retries = int(payload.get("snapshot_retries") or 0)
+        except (TypeError, ValueError):
+            retries = 0
+        delay = min(SNAPSHOT_RETRY_BASE_SEC * (2 ** min(retries, 16)), SNAPSHOT_RETRY_MAX_SEC)
+
+        self._settled = True
+        requeue_job(
+            self.dispatch_id,
+            reason=reason,
+            extra={"snapshot_retries": retries + 1, "error": str(e)[:300]},
+            claimed_by=self.claimed_by,
+            delay_sec=delay,
+        )
+        print(
+            f"[{self.tag}] RETRY dispatch_id={self.dispatch_id} in {delay:.0f}s "
+            f"attempt={retries + 1} ({reason}: {e})",
+            flush=True,
+        )
+
+
+def drain_dispatch(
+    job: dict,
+    *,
+    pool: Optional[ThreadPoolExecutor] = None,
+    should_stop: Optional[Callable[[], bool]] = None,
+    use_async: Optional[bool] = None,
+) -> Optional[Dict[str, Any]]:
+    """
+    Drain every intent of one claimed job_dispatch row and mark it
+    done/error. Returns a run summary, or None if the job failed.
+
+    If should_stop() turns true between batches the job is requeued
+    (the remaining intents are left for the next claimer).
+
+    Jobs from claim_job() carry claimed_by/lease_sec: the lease is
+    renewed while draining, and if it is lost anyway (reaped) the
+    drain stops without touching the job.
+
+    use_async (default EXECUTOR_ASYNC_SUBMIT) submits each batch
+    through the async broker adapter; pool is then unused.
+    """
+    drain = DispatchDrain(job, pool=pool, should_stop=should_stop, use_async=use_async)
+    try:
+        if drain.open():
+            while drain.step():
+                pass
+        return drain.summary
+    finally:
+        drain.close()
+
+
+# ---------------------------------------------------------
+# GRACEFUL SHUTDOWN
+# SIGTERM/SIGINT while idle exits at once; while draining, the
+# current batch finishes and the job is requeued.
+# ---------------------------------------------------------
+
+_stop = threading.Event()
+_busy = False
+
+
+def _on_signal(signum, _frame) -> None:
+    _stop.set()
+    print(f"[EXECUTOR] signal={signum} busy={_busy} → shutting down", flush=True)
+    if not _busy:
+        raise SystemExit(0)
+
+
+def stop_requested() -> bool:
+    return _stop.is_set()
+
+
+def run_worker(
+    job_types: Sequence[str],
+    *,
+    worker_name: str,
+    metrics_port: Optional[int] = None,
+) -> None:
+    global _busy
+
+    for jt in job_types:
+        if get_handler(jt) is None:
+            raise RuntimeError(f"❌ no handler registered for job_type={jt}")
+
+    signal.signal(signal.SIGTERM, _on_signal)
+    signal.signal(signal.SIGINT, _on_signal)
+
+    # lease owner: unique per process (replicas share worker_name)
+    owner = f"{worker_name}@{socket.gethostname()}:{os.getpid()}"
+
+    print(f"🚀 {worker_name} started job_types={list(job_types)} owner={owner}", flush=True)
+
+    # parsed + validated here, after the first log line
+    cfg = get_settings()
+
+    start_metrics_server(metrics_port)
+
+    # ---------------------------------------------------------
+    # LIVE ACCOUNT CHECK (CRITICAL)
+    # ---------------------------------------------------------
+    try:
+        client = get_trading_client()
+        acct = client.get_account()
+
+        print(
+            f"[EXECUTOR] CONNECTED | STATUS={acct.status} "
+            f"buying_power={acct.buying_power}",
+            flush=True,
+        )
+    except Exception as e:
+        print(f"[EXECUTOR] ❌ Failed to connect to Alpaca: {e}", flush=True)
+        raise
+
+    # ---------------------------------------------------------
+    # SCHEMA (the supervisor migrates; a standalone runner only checks)
+    # ---------------------------------------------------------
+    from common.migrations import require_migrations
+
+    require_migrations()
+
+    # ---------------------------------------------------------
+    # LIVE ORDER/POSITION BOOK (guards fall back to REST when stale)
+    # ---------------------------------------------------------
+    if cfg.trade_stream_enabled:
+        from executor.trade_stream import start_trade_stream
+
+        start_trade_stream()
+
+    # ---------------------------------------------------------
+    # WAKE-UP: LISTEN/NOTIFY (polling stays as a slow safety net)
+    # ---------------------------------------------------------
+    waiter = None
+    if cfg.wake_mode == "notify":
+        from common.notify import JobWaiter, check_notify_triggers
+
+        check_notify_triggers()
+
+        waiter = JobWaiter()
+        waiter.start()
+
+    # ---------------------------------------------------------
+    # REAPER: requeue jobs whose worker died mid-drain
+    # ---------------------------------------------------------
+    reaper = Reaper(interval=cfg.reap_sec, max_reaps=cfg.max_reaps)
+    reaper.start()
+
+    # shared across dispatches; None = serial drain
+    pool = ThreadPoolExecutor(max_workers=cfg.workers) if cfg.workers > 1 else None
+
+    last_idle = 0.0
+
+    try:
+        while not _stop.is_set():
+            # busy from claim to drain end: a signal never strands a claimed job
+            _busy = True
+            with timed("claim_job"):
+                job = claim_job(
+                    job_types=list(job_types),
+                    claimed_by=owner,
+                    lease_sec=cfg.lease_sec,
+                )
+
+            # ---------------------------------------------------------
+            # IDLE LOOP
+            # ---------------------------------------------------------
+            if not job:
+                _busy = False
+                if _stop.is_set():
+                    break
+                if time.time() - last_idle > cfg.idle_heartbeat_sec:
+                    print(f"[{worker_name}][IDLE] waiting… mode={cfg.wake_mode}", flush=True)
+                    last_idle = time.time()
+
+                if waiter is not None:
+                    waiter.wait(cfg.safety_poll_sec, fallback_sleep=cfg.poll_sec)
+                else:
+                    time.sleep(cfg.poll_sec)
+                continue
+
+            try:
+                if cfg.max_dispatches > 1:
+                    # interleave up to EXECUTOR_MAX_DISPATCHES runs
+                    from executor.fair import FairDrainer
+
+                    FairDrainer(job_types, claimed_by=owner, pool=pool, should_stop=stop_requested).run(job)
+                else:
+                    drain_dispatch(job, pool=pool, should_stop=stop_requested)
+            finally:
+                _busy = False
+
+            if not _stop.is_set():
+                time.sleep(1)
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=True)
+        if waiter is not None:
+            waiter.close()
+        reaper.close()
+        print(f"[{worker_name}] stopped", flush=True)
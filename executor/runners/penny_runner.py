@@ -0,0 +1,15 @@
+from __future__ import annotations
+
+from executor.runners.intent_runner import run_worker
+
+
+WORKER = "executor-penny"
+JOB_TYPES = ["penny"]
+
+
+def main():
+    run_worker(JOB_TYPES, worker_name=WORKER)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence, Tuple
+
+from executor.config import get_settings
+from executor.sizing import size_intents
+
+if TYPE_CHECKING:
+    from executor.registry import JobHandler
+    from executor.snapshot import AccountSnapshot
+
+
+# =========================================================
+# CAPITAL-AWARE RUN SCHEDULER
+#
+# Before the first claim, the run's pending intents (the same
+# read as pre-validation) are fitted to what the account can
+# still take:
+#   - new-entry slots (MAX_*_POSITIONS, or the run's
+#     run_position_cap if lower, minus open ones)
+#   - buys left today (MAX_*_TRADES_PER_DAY)
+#   - buying power (sized notional, executor.sizing)
+# choosing the subset with the largest total priority
+# (cardinality + budget knapsack: greedy by priority, then a
+# bounded branch and bound). Everything not chosen is rejected
+# in the same bulk UPDATE as the pre-validation rejects
+# (detail.stage="schedule", reason: the constraint that kept
+# each one out), so the drain only claims intents that fit. The handlers' guards still run on every intent.
+# =========================================================
+
+# branch-and-bound budget; the greedy answer is kept if it runs out
+MAX_NODES = 20_000
+
+
+@dataclass(frozen=True)
+class Capacity:
+    # new positions still allowed (None: unlimited)
+    slots: Optional[int]
+    # buys still allowed today (None: unlimited)
+    trades: Optional[int]
+    # None: not enforced
+    buying_power: Optional[float]
+
+    @property
+    def count(self) -> Optional[int]:
+        caps = [c for c in (self.slots, self.trades) if c is not None]
+        return max(min(caps), 0) if caps else None
+
+    def count_reason(self) -> str:
+        if self.trades is not None and (self.slots is None or self.trades < self.slots):
+            return "max_trades_per_day_reached"
+        return "max_positions_reached"
+
+
+def run_position_cap(rows: Sequence[Dict[str, Any]]) -> Optional[int]:
+    """
+    The smallest positive run_position_cap among the run's intents
+    (one per run in practice), or None.
+    """
+    caps = [
+        v for v in (row.get("run_position_cap") for row in rows)
+        if isinstance(v, int) and not isinstance(v, bool) and v > 0
+    ]
+    return min(caps) if caps else None
+
+
+def capacity(
+    handler: JobHandler,
+    snapshot: AccountSnapshot,
+    *,
+    run_cap: Optional[int] = None,
+) -> Capacity:
+    """
+    What reserve_entry() would still let through for this handler.
+    run_cap: the run's run_position_cap (handlers that honor it).
+    """
+    cfg = get_settings()
+
+    slots = None
+    if handler.max_positions:
+        cap = int(getattr(cfg, handler.max_positions))
+        if handler.run_position_cap and run_cap is not None:
+            cap = min(cap, run_cap)
+        if handler.pending_counts_as_position:
+            used = snapshot.open_positions(include_submitted=False) + snapshot.pending_buys()
+        else:
+            used = snapshot.open_positions()
+        slots = cap - used
+
+    trades = None
+    if handler.max_trades_per_day:
+        cap = int(getattr(cfg, handler.max_trades_per_day))
+        if cap > 0:
+            trades = cap - snapshot.buys_today()
+
+    return Capacity(slots=slots, trades=trades, buying_power=snapshot.available_buying_power())
+
+
+def select(
+    values: Sequence[float],
+    costs: Sequence[float],
+    *,
+    k: Optional[int],
+    budget: Optional[float],
+    max_nodes: int = MAX_NODES,
+) -> List[int]:
+    """
+    Indices (at most k, total cost <= budget) maximizing the total
+    value. Equal values: the cheaper first, then input order.
+    """
+    n = len(values)
+    k = n if k is None else max(min(k, n), 0)
+    left0 = float("inf") if budget is None else float(budget)
+    order = sorted(range(n), key=lambda i: (-values[i], costs[i]))
+    vs = [float(values[i]) for i in order]
+    cs = [max(float(costs[i]), 0.0) for i in order]
+
+    # greedy: best priority first, skip what does not fit
+    chosen: List[int] = []
+    left = left0
+    for pos in range(n):
+        if len(chosen) >= k:
+            break
+        if cs[pos] <= left:
+            chosen.append(pos)
+            left -= cs[pos]
+
+    # the top-k all fit: greedy is optimal
+    if chosen == list(range(len(chosen))) and (len(chosen) == k or len(chosen) == n):
+        return sorted(order[p] for p in chosen)
+
+    best_val = sum(vs[p] for p in chosen)
+    best = chosen
+
+    # prefix sums: optimistic bound = best remaining values, budget ignored
+    prefix = [0.0]
+    for v in vs:
+        prefix.append(prefix[-1] + v)
+
+    # (pos, value, count, budget left, chosen chain)
+    stack: List[Tuple[int, float, int, float, Any]] = [(0, 0.0, 0, left0, None)]
+    nodes = 0
+    while stack and nodes < max_nodes:
+        nodes += 1
+        pos, val, cnt, left, chain = stack.pop()
+        if val > best_val + 1e-9:
+            best_val = val
+            best = []
+            c = chain
+            while c is not None:
+                best.append(c[0])
+                c = c[1]
+        if pos >= n or cnt >= k:
+            continue
+        if val + prefix[min(n, pos + k - cnt)] - prefix[pos] <= best_val + 1e-9:
+            continue
+        stack.append((pos + 1, val, cnt, left, chain))
+        if cs[pos] <= left:
+            stack.append((pos + 1, val + vs[pos], cnt + 1, left - cs[pos], (pos, chain)))
+
+    return sorted(order[p] for p in best)
+
+
+def schedule_rows(
+    rows: List[Dict[str, Any]],
+    *,
+    handler: JobHandler,
+    snapshot: AccountSnapshot,
+) -> List[Tuple[str, Dict[str, Any]]]:
+    """
+    rows: valid pending intents in claim order (load_pending_intents).
+    Returns the rejects [(intent_id, detail), ...]; the rest are left
+    for the drain.
+    """
+    if not rows or not (handler.max_positions or handler.max_trades_per_day):
+        return []
+
+    cap = capacity(handler, snapshot, run_cap=run_position_cap(rows))
+    rejects: List[Tuple[str, Dict[str, Any]]] = []
+
+    candidates: List[Dict[str, Any]] = []
+    for row in rows:
+        symbol = str(row.get("symbol") or "")
+        if snapshot.has_position(symbol):
+            reason = "skip_already_in_position"
+        elif snapshot.has_open_buy(symbol):
+            reason = "skip_open_buy_order"
+        else:
+            candidates.append(row)
+            continue
+        rejects.append((str(row["intent_id"]), {"ok": False, "reason": reason, "stage": "schedule"}))
+
+    # unsizable intents are left to the handler (its own reject reason)
+    sized = size_intents(candidates)
+    fit = [(row, s) for row, s in zip(candidates, sized) if s.ok]
+    if not fit:
+        return rejects
+
+    # shifted to >= 1: a filled slot always beats an empty one
+    prios = [float(row.get("priority") or 0) for row, _ in fit]
+    low = min(prios)
+    values = [p - low + 1.0 for p in prios]
+    costs = [s.notional for _, s in fit]
+
+    keep = set(select(values, costs, k=cap.count, budget=cap.buying_power))
+    full = cap.count is not None and len(keep) >= cap.count
+    left = None if cap.buying_power is None else cap.buying_power - sum(costs[i] for i in keep)
+
+    for i, (row, _) in enumerate(fit):
+        if i in keep:
+            continue
+        # the binding constraint: the one that, relaxed alone, would
+        # have let this intent in (a free slot is no use without money)
+        if full and (left is None or costs[i] <= left):
+            reason = cap.count_reason()
+        else:
+            reason = "insufficient_buying_power"
+        rejects.append(
+            (
+                str(row["intent_id"]),
+                {
+                    "ok": False,
+                    "reason": reason,
+                    "stage": "schedule",
+                    "priority": prios[i],
+                },
+            )
+        )
+    return rejects
@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+import math
+from typing import Any, Dict, List, NamedTuple, Sequence, Tuple
+
+
+# =========================================================
+# BATCH POSITION SIZING (stocks + penny)
+#
+# All intents of a claimed batch are sized in ONE vectorized
+# pass (numpy, imported on first use):
+#
+#   qty given in planning_context      -> used as-is
+#   entry hint + stop_loss + max_risk  -> floor(max_risk / |entry - stop|)
+#   else entry hint + max_notional     -> floor(max_notional / entry)
+#
+# Buying power is NOT spent here: the handler funds qty * price
+# when it reserves the slot (AccountSnapshot.fund_entry), after
+# every guard, so an intent rejected later never holds budget.
+# A risk/notional-sized qty is cut to fit (requested_qty/capped
+# are recorded); an explicit qty is all or nothing.
+# =========================================================
+
+OK = "ok"
+
+# reason codes (index into REASONS)
+REASONS = (
+    OK,
+    "missing_qty_and_sizing_inputs",
+    "qty_zero_after_sizing",
+    "invalid_qty",
+)
+_OK, _MISSING, _ZERO, _INVALID = range(len(REASONS))
+
+
+class Sized(NamedTuple):
+    qty: int
+    reason: str
+    # qty * price for buys with a known price (0 otherwise)
+    notional: float = 0.0
+    # per-share price the notional is funded at (0: not funded)
+    price: float = 0.0
+    # qty came from planning_context: never resized
+    explicit: bool = False
+
+    @property
+    def ok(self) -> bool:
+        return self.reason == OK
+
+
+def _num(v: Any) -> float:
+    if v is None or isinstance(v, bool):
+        return math.nan
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def _row(intent: dict) -> Tuple[float, float, float, float, float, float, float]:
+    """
+    -> (qty, entry, stop, max_risk, max_notional, price, is_buy)
+    qty is NaN when absent and -1 when present but not an integer;
+    is_buy is 1.0 / 0.0 (one float matrix for the whole batch).
+    """
+    # claimed intents carry source_facts; load_pending_intents rows
+    # carry planning_context directly
+    sf = intent.get("source_facts")
+    pc = (sf.get("planning_context") if isinstance(sf, dict) else intent.get("planning_context")) or {}
+    if not isinstance(pc, dict):
+        pc = {}
+
+    raw_qty = pc.get("qty")
+    if raw_qty is None:
+        qty = math.nan
+    else:
+        try:
+            qty = float(int(raw_qty))
+        except (TypeError, ValueError):
+            qty = -1.0
+
+    meta = pc.get("meta")
+    entry = _num(meta.get("entry_price_hint")) if isinstance(meta, dict) else math.nan
+    price = entry if not math.isnan(entry) else _num(pc.get("limit_price"))
+
+    return (
+        qty,
+        entry,
+        _num(pc.get("stop_loss")),
+        _num(pc.get("max_risk_usd")),
+        _num(pc.get("max_notional_usd")),
+        price,
+        1.0 if str(pc.get("side") or "").strip().lower() == "buy" else 0.0,
+    )
+
+
+def size_arrays(
+    *,
+    qty,
+    entry,
+    stop,
+    max_risk,
+    max_notional,
+    price,
+    is_buy,
+):
+    """
+    Vectorized core. Float arrays use NaN for "missing"; qty < 0
+    marks an unparseable explicit qty.
+
+    -> (qty int64, reason code int8, notional float64, funded price float64,
+        explicit bool)
+    """
+    import numpy as np
+
+    qty = np.asarray(qty, dtype=np.float64)
+    entry = np.asarray(entry, dtype=np.float64)
+    stop = np.asarray(stop, dtype=np.float64)
+    max_risk = np.asarray(max_risk, dtype=np.float64)
+    max_notional = np.asarray(max_notional, dtype=np.float64)
+    price = np.asarray(price, dtype=np.float64)
+    is_buy = np.asarray(is_buy, dtype=bool)
+
+    given = ~np.isnan(qty)
+    risk_per_share = np.abs(entry - stop)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        by_risk = ~np.isnan(risk_per_share) & ~np.isnan(max_risk) & (risk_per_share > 0)
+        risk_qty = np.floor(max_risk / risk_per_share)
+        by_notional = (max_notional > 0) & (entry > 0)
+        notional_qty = np.floor(max_notional / entry)
+
+    sized = np.where(given, qty, np.where(by_risk, risk_qty, np.where(by_notional, notional_qty, np.nan)))
+
+    code = np.full(qty.shape, _OK, dtype=np.int8)
+    code[~given & ~by_risk & ~by_notional] = _MISSING
+    code[~given & (by_risk | by_notional) & ~(sized > 0)] = _ZERO
+    code[given & (qty <= 0)] = _INVALID
+
+    ok = code == _OK
+    out = np.where(ok, sized, 0.0)
+
+    # buys with a known price are funded at reservation time
+    funded = ok & is_buy & (price > 0)
+    unit = np.where(funded, price, 0.0)
+
+    return out.astype(np.int64), code, out * unit, unit, given
+
+
+def size_intents(intents: Sequence[dict]) -> List[Sized]:
+    """
+    Size a batch of intents (claim order); no buying power is spent.
+    """
+    if not intents:
+        return []
+
+    import numpy as np
+
+    m = np.array([_row(i) for i in intents], dtype=np.float64)
+    qty, code, cost, unit, given = size_arrays(
+        qty=m[:, 0],
+        entry=m[:, 1],
+        stop=m[:, 2],
+        max_risk=m[:, 3],
+        max_notional=m[:, 4],
+        price=m[:, 5],
+        is_buy=m[:, 6] > 0,
+    )
+    return [
+        Sized(qty=int(q), reason=REASONS[c], notional=float(n), price=float(u), explicit=bool(g))
+        for q, c, n, u, g in zip(qty.tolist(), code.tolist(), cost.tolist(), unit.tolist(), given.tolist())
+    ]
+
+
+def attach_sizing(intents: List[dict]) -> None:
+    """
+    Size a claimed batch and store each result on its intent
+    (intent["sizing"]).
+    """
+    for intent, sized in zip(intents, size_intents(intents)):
+        intent["sizing"] = sized
+
+
+def sizing_for(intent: dict) -> Sized:
+    """
+    The batch plan for this intent, or a one-intent sizing when the
+    handler is called outside a batch.
+    """
+    sized = intent.get("sizing")
+    if isinstance(sized, Sized):
+        return sized
+    return size_intents([intent])[0]
+
+
+def cap_detail(sized: Sized, qty: int) -> Dict[str, Any]:
+    """
+    Result / trade metadata fields for a qty cut to buying power.
+    """
+    if qty >= sized.qty:
+        return {}
+    return {"requested_qty": sized.qty, "capped": True}
@@ -0,0 +1,414 @@
+from __future__ import annotations
+
+import math
+import threading
+from typing import TYPE_CHECKING, Dict, FrozenSet, List, NamedTuple, Set, Optional, Any, Tuple
+from datetime import datetime, timezone
+
+from executor.fill_counter import get_daily_fill_counter
+from executor.order_query import iter_orders, iter_positions
+
+if TYPE_CHECKING:
+    from alpaca.trading.client import TradingClient
+    from executor.ledger import SharedLedger
+
+
+class Foreign(NamedTuple):
+    """
+    Entries by other processes (executor.ledger) this snapshot has
+    not seen at the broker.
+    """
+
+    buys: int = 0
+    symbols: FrozenSet[str] = frozenset()
+    notional: float = 0.0
+
+
+NO_FOREIGN = Foreign()
+
+
+class AccountSnapshot:
+    """
+    Broker state captured ONCE per dispatch.
+
+    Guard checks inside a run are O(1) dict/set lookups with no
+    network calls. After every successful submit the handler calls
+    record_submit() so later intents of the same run see it.
+
+    Submitted buys are counted conservatively:
+      - toward buys_today (daily trade cap)
+      - as a pending buy for the symbol (skip_open_buy_order)
+      - as an expected position (max_positions)
+
+    Thread-safe: concurrent workers go through reserve_entry(),
+    which checks every cap and takes a slot atomically. The slot is
+    then either confirm()ed after submit or release()d on failure,
+    so in-flight submits count against the caps too.
+
+    Buying power (get_account, once per load) is a ledger too: a
+    reservation may carry the order's notional, funded from what is
+    available at that moment (fund_entry() may cut the qty to fit)
+    and held until confirm() commits it or release() returns it.
+
+    The ledger above is per process. With a SharedLedger attached
+    (several processes on one account, executor.ledger) every
+    reservation is also recorded in Postgres under an account-wide
+    lock, and the caps count the other processes' in-flight / newer
+    entries too. That round trip is made outside the local lock.
+    """
+
+    def __init__(
+        self,
+        *,
+        positions: Dict[str, float],
+        open_buy_symbols: Dict[str, int],
+        filled_buys_today: int,
+        taken_at: Optional[datetime] = None,
+        buying_power: Optional[float] = None,
+    ):
+        self.positions = positions
+        self.open_buy_symbols = open_buy_symbols
+        self.filled_buys_today = filled_buys_today
+        self.submitted_symbols: Set[str] = set()
+        self.submitted_buys = 0
+        self.reserved: Dict[str, int] = {}
+        # None: unknown (not enforced)
+        self.buying_power = buying_power
+        self.committed_notional = 0.0
+        self.reserved_notional: Dict[str, List[float]] = {}
+        self.taken_at = taken_at or datetime.now(timezone.utc)
+        # load(keep_open_orders=True) only: {order_id: (symbol, side)}
+        self.open_orders: Optional[Dict[str, Tuple[str, str]]] = None
+        # cross-process entries (None: this process only)
+        self.ledger: Optional[SharedLedger] = None
+        self._lock = threading.RLock()
+
+    # --------------------------------------------------
+    # BUILD
+    # --------------------------------------------------
+
+    @classmethod
+    def load(
+        cls,
+        client: TradingClient,
+        *,
+        use_stream: bool = True,
+        keep_open_orders: bool = False,
+    ) -> "AccountSnapshot":
+        """
+        keep_open_orders: also list open sells and keep every open
+        order as open_orders {order_id: (symbol, side)} (trade book
+        seed); guards only need the buys.
+        """
+        # live trade_updates book, when connected and fresh: no order/position REST calls
+        if use_stream:
+            from executor.trade_stream import get_live_book
+
+            book = get_live_book()
+            if book is not None:
+                snap = book.to_snapshot()
+                snap.buying_power = _buying_power(client)
+                return snap
+
+        # entries submitted after this may be missing from what is read below
+        started = datetime.now(timezone.utc)
+
+        positions: Dict[str, float] = {
+            sym: qty for sym, qty in iter_positions(client) if qty != 0
+        }
+
+        # open orders: includes GTC orders submitted on earlier days
+        open_buy_symbols: Dict[str, int] = {}
+        open_orders: Optional[Dict[str, Tuple[str, str]]] = {} if keep_open_orders else None
+        for o in iter_orders(client, status="open", side=None if keep_open_orders else "buy"):
+            if open_orders is not None:
+                open_orders[o.id] = (o.symbol, o.side)
+            if o.side == "buy":
+                open_buy_symbols[o.symbol] = open_buy_symbols.get(o.symbol, 0) + 1
+
+        # today's fills: shared incremental counter (only new orders are listed)
+        filled = get_daily_fill_counter().count(client)
+
+        snap = cls(
+            positions=positions,
+            open_buy_symbols=open_buy_symbols,
+            filled_buys_today=filled,
+            taken_at=started,
+            buying_power=_buying_power(client),
+        )
+        snap.open_orders = open_orders
+        return snap
+
+    # --------------------------------------------------
+    # LOOKUPS
+    # --------------------------------------------------
+
+    def buys_today(self) -> int:
+        with self._lock:
+            return self.filled_buys_today + self.submitted_buys + self._reserved_total()
+
+    def open_positions(self, *, include_submitted: bool = True) -> int:
+        with self._lock:
+            if not include_submitted:
+                return len(self.positions)
+            expected = (self.submitted_symbols | self.reserved.keys()) - self.positions.keys()
+            return len(self.positions) + len(expected)
+
+    def pending_buys(self) -> int:
+        with self._lock:
+            return sum(self.open_buy_symbols.values()) + self._reserved_total()
+
+    def has_position(self, symbol: str) -> bool:
+        return symbol.upper() in self.positions
+
+    def has_open_buy(self, symbol: str) -> bool:
+        sym = symbol.upper()
+        with self._lock:
+            return self.open_buy_symbols.get(sym, 0) > 0 or self.reserved.get(sym, 0) > 0
+
+    def _reserved_total(self) -> int:
+        return sum(self.reserved.values())
+
+    def available_buying_power(self) -> Optional[float]:
+        with self._lock:
+            if self.buying_power is None:
+                return None
+            held = sum(sum(v) for v in self.reserved_notional.values())
+            return max(self.buying_power - self.committed_notional - held, 0.0)
+
+    # --------------------------------------------------
+    # RESERVATION LEDGER
+    # --------------------------------------------------
+
+    def reserve_entry(
+        self,
+        symbol: str,
+        *,
+        max_trades_per_day: int,
+        max_positions: int,
+        pending_counts_as_position: bool = False,
+        notional: float = 0.0,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Run every guard and take a slot in ONE critical section
+        (account-wide when a SharedLedger is attached).
+        Returns None on success, or the handler's failure dict.
+        """
+        _, denied = self._reserve(
+            symbol.upper(),
+            max_trades_per_day=max_trades_per_day,
+            max_positions=max_positions,
+            pending_counts_as_position=pending_counts_as_position,
+            notional=notional,
+            fit_price=0.0,
+        )
+        return denied
+
+    def fund_entry(
+        self,
+        symbol: str,
+        *,
+        qty: int,
+        price: float,
+        max_trades_per_day: int,
+        max_positions: int,
+        pending_counts_as_position: bool = False,
+        fit: bool = True,
+    ) -> Tuple[int, Optional[Dict[str, Any]]]:
+        """
+        reserve_entry() for a sized order: qty * price is funded from
+        the buying power left at reservation time. With fit, qty is
+        cut to what is left (at least one share) in the same critical
+        section; without it the order is funded in full or rejected
+        (insufficient_buying_power). price <= 0 (sells, unknown price)
+        is not funded.
+        Returns (qty, None) on success, or (0, failure dict).
+        """
+        notional = qty * price if price > 0 else 0.0
+        granted, denied = self._reserve(
+            symbol.upper(),
+            max_trades_per_day=max_trades_per_day,
+            max_positions=max_positions,
+            pending_counts_as_position=pending_counts_as_position,
+            notional=notional,
+            fit_price=price if fit else 0.0,
+        )
+        if denied:
+            return 0, denied
+        if granted < notional:
+            qty = int(round(granted / price))
+        return qty, None
+
+    def _reserve(
+        self,
+        sym: str,
+        *,
+        max_trades_per_day: int,
+        max_positions: int,
+        pending_counts_as_position: bool,
+        notional: float,
+        fit_price: float,
+    ) -> Tuple[float, Optional[Dict[str, Any]]]:
+        notional = max(notional, 0.0)
+
+        def check(foreign: Foreign) -> Tuple[float, Optional[Dict[str, Any]]]:
+            granted = notional
+            if fit_price > 0 and notional > 0:
+                available = self.available_buying_power()
+                if available is not None:
+                    available = max(available - foreign.notional, 0.0)
+                    if notional > available + 1e-6:
+                        shares = math.floor(available / fit_price + 1e-9)
+                        if shares >= 1:
+                            granted = shares * fit_price
+            return granted, self._check_entry(
+                sym,
+                max_trades_per_day=max_trades_per_day,
+                max_positions=max_positions,
+                pending_counts_as_position=pending_counts_as_position,
+                notional=granted,
+                foreign=foreign,
+            )
+
+        taken: List[float] = []
+
+        def take(foreign: Foreign) -> Tuple[float, Optional[Dict[str, Any]]]:
+            # check + take under the local lock (no I/O in here)
+            with self._lock:
+                granted, denied = check(foreign)
+                if not denied:
+                    self.reserved[sym] = self.reserved.get(sym, 0) + 1
+                    self.reserved_notional.setdefault(sym, []).append(granted)
+                    taken.append(granted)
+                return granted, denied
+
+        if self.ledger is None:
+            granted, denied = take(NO_FOREIGN)
+        else:
+            # The ledger's DB round trip runs WITHOUT the local lock, so
+            # other threads keep reserving meanwhile; take() re-checks
+            # the local state when the account lock is held.
+            granted, denied = self.ledger.reserve(sym, since=self.taken_at, check=take)
+            if denied and taken:
+                # taken locally, but the ledger row was not written
+                self._drop(sym)
+        if denied:
+            return 0.0, denied
+        return granted, None
+
+    def _check_entry(
+        self,
+        sym: str,
+        *,
+        max_trades_per_day: int,
+        max_positions: int,
+        pending_counts_as_position: bool,
+        notional: float,
+        foreign: Foreign,
+    ) -> Optional[Dict[str, Any]]:
+        # caller holds self._lock
+        if max_trades_per_day > 0:
+            buys_today = self.buys_today() + foreign.buys
+            if buys_today >= max_trades_per_day:
+                return {
+                    "ok": False,
+                    "reason": "max_trades_per_day_reached",
+                    "buys_today": buys_today,
+                }
+
+        if pending_counts_as_position:
+            open_pos = self.open_positions(include_submitted=False)
+            pending = self.pending_buys() + foreign.buys
+            active = open_pos + pending
+            if active >= max_positions:
+                return {
+                    "ok": False,
+                    "reason": "max_positions_reached",
+                    "open_positions": open_pos,
+                    "pending_buys": pending,
+                    "active_positions": active,
+                    "cap": max_positions,
+                }
+        else:
+            expected = (self.submitted_symbols | self.reserved.keys() | foreign.symbols) - self.positions.keys()
+            open_pos = len(self.positions) + len(expected)
+            if open_pos >= max_positions:
+                return {
+                    "ok": False,
+                    "reason": "max_positions_reached",
+                    "open_positions": open_pos,
+                }
+
+        if self.has_position(sym):
+            return {"ok": False, "reason": "skip_already_in_position"}
+
+        if self.has_open_buy(sym) or sym in foreign.symbols:
+            return {"ok": False, "reason": "skip_open_buy_order"}
+
+        if notional > 0:
+            available = self.available_buying_power()
+            if available is not None:
+                available = max(available - foreign.notional, 0.0)
+                if notional > available + 1e-6:
+                    return {
+                        "ok": False,
+                        "reason": "insufficient_buying_power",
+                        "notional": round(notional, 2),
+                        "available": round(available, 2),
+                    }
+
+        return None
+
+    def release(self, symbol: str) -> float:
+        """
+        Drop one reservation; returns the notional it held.
+        """
+        sym = symbol.upper()
+        notional = self._drop(sym)
+        if self.ledger is not None:
+            self.ledger.release(sym)
+        return notional
+
+    def _drop(self, sym: str) -> float:
+        with self._lock:
+            n = self.reserved.get(sym, 0) - 1
+            if n > 0:
+                self.reserved[sym] = n
+            else:
+                self.reserved.pop(sym, None)
+
+            held = self.reserved_notional.get(sym)
+            notional = held.pop() if held else 0.0
+            if not held:
+                self.reserved_notional.pop(sym, None)
+            return notional
+
+    def confirm(self, symbol: str, side: str = "buy") -> None:
+        sym = symbol.upper()
+        with self._lock:
+            self.committed_notional += self._drop(sym)
+            self.record_submit(symbol, side)
+        if self.ledger is not None:
+            self.ledger.confirm(sym)
+
+    # --------------------------------------------------
+    # LOCAL UPDATES
+    # --------------------------------------------------
+
+    def record_submit(self, symbol: str, side: str = "buy") -> None:
+        if str(side).lower() != "buy":
+            return
+        sym = symbol.upper()
+        with self._lock:
+            self.submitted_buys += 1
+            self.submitted_symbols.add(sym)
+            self.open_buy_symbols[sym] = self.open_buy_symbols.get(sym, 0) + 1
+
+
+def _buying_power(client: TradingClient) -> Optional[float]:
+    try:
+        return float(client.get_account().buying_power)
+    except Exception as e:
+        # sizing then runs unconstrained; the broker still rejects overspend
+        print(f"[SNAPSHOT] ⚠️ buying power unavailable (not enforced): {e}", flush=True)
+        return None
@@ -0,0 +1,291 @@
+from __future__ import annotations
+
+import os
+import sys
+import time
+import signal
+import argparse
+import multiprocessing as mp
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+
+# =========================================================
+# MULTI-PROCESS WORKER SUPERVISOR
+#
+#   EXECUTOR_PROCS="stocks:3,penny:1" python -m executor.supervisor
+#
+# Starts one worker process per slot (executor.runners.intent_runner
+# .run_worker), restarts crashed workers with backoff, and on
+# SIGTERM/SIGINT forwards the signal and waits up to
+# EXECUTOR_SHUTDOWN_GRACE_SEC before killing stragglers.
+#
+# Workers are spawned (not forked) so none inherits the parent's
+# DB pool, threads or sockets.
+# =========================================================
+
+RESTART_BACKOFF_MIN_SEC = 1.0
+RESTART_BACKOFF_MAX_SEC = 60.0
+# a worker that lived this long is "healthy": its backoff resets
+STABLE_AFTER_SEC = 60.0
+
+
+@dataclass
+class _Slot:
+    job_type: str
+    index: int
+    metrics_port: Optional[int]
+    proc: Optional[mp.process.BaseProcess] = None
+    started_at: float = 0.0
+    restarts: int = 0
+    backoff: float = RESTART_BACKOFF_MIN_SEC
+    next_start_at: float = 0.0
+
+    @property
+    def name(self) -> str:
+        return f"executor-{self.job_type}-{self.index}"
+
+
+def parse_procs(spec: str) -> Dict[str, int]:
+    """
+    "stocks:3,penny:1" -> {"stocks": 3, "penny": 1}. A bare job type
+    means one process.
+    """
+    out: Dict[str, int] = {}
+    for part in (spec or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        job_type, _, n = part.partition(":")
+        out[job_type.strip()] = max(0, int(n or 1))
+    return out
+
+
+def _worker_main(
+    job_type: str,
+    worker_name: str,
+    metrics_port: Optional[int],
+    budget: Optional[Tuple[float, float, float]] = None,
+    shared_ledger: Optional[bool] = None,
+) -> None:
+    from executor.runners.intent_runner import run_worker
+
+    if budget is not None:
+        from executor.alpaca_client import set_broker_budget
+        from executor.rate_limit import BrokerBudget
+
+        set_broker_budget(BrokerBudget(*budget))
+    if shared_ledger is not None:
+        from executor.ledger import set_shared_ledger
+
+        set_shared_ledger(shared_ledger)
+
+    run_worker(
+        [job_type],
+        worker_name=worker_name,
+        metrics_port=metrics_port,
+    )
+
+
+class Supervisor:
+    def __init__(
+        self,
+        procs: Dict[str, int],
+        *,
+        metrics_base_port: int = 0,
+        grace_sec: float = 30.0,
+        budget: Optional[Tuple[float, float, float]] = None,
+        shared_ledger: Optional[bool] = None,
+    ):
+        self.grace_sec = grace_sec
+        # each worker's broker budget (rate/min, burst, submit reserve)
+        self.budget = budget
+        # None: each worker follows EXECUTOR_SHARED_LEDGER
+        self.shared_ledger = shared_ledger
+        self.ctx = mp.get_context("spawn")
+        self.slots: List[_Slot] = []
+        self._stopping = False
+
+        port = metrics_base_port
+        for job_type, n in procs.items():
+            for i in range(n):
+                self.slots.append(
+                    _Slot(
+                        job_type=job_type,
+                        index=i,
+                        metrics_port=port if metrics_base_port > 0 else 0,
+                    )
+                )
+                port += 1
+
+    # --------------------------------------------------
+    # LIFECYCLE
+    # --------------------------------------------------
+
+    def _start(self, slot: _Slot) -> None:
+        slot.proc = self.ctx.Process(
+            target=_worker_main,
+            args=(slot.job_type, slot.name, slot.metrics_port, self.budget, self.shared_ledger),
+            name=slot.name,
+        )
+        slot.proc.start()
+        slot.started_at = time.monotonic()
+        print(f"[SUPERVISOR] started {slot.name} pid={slot.proc.pid}", flush=True)
+
+    def _reap(self, slot: _Slot, now: float) -> None:
+        proc = slot.proc
+        if proc is None or proc.is_alive():
+            return
+
+        code = proc.exitcode
+        lived = now - slot.started_at
+        slot.proc = None
+
+        if self._stopping:
+            return
+
+        if lived >= STABLE_AFTER_SEC:
+            slot.backoff = RESTART_BACKOFF_MIN_SEC
+        slot.restarts += 1
+        slot.next_start_at = now + slot.backoff
+        print(
+            f"[SUPERVISOR] {slot.name} exited code={code} lived={lived:.1f}s "
+            f"→ restart #{slot.restarts} in {slot.backoff:.0f}s",
+            flush=True,
+        )
+        slot.backoff = min(slot.backoff * 2, RESTART_BACKOFF_MAX_SEC)
+
+    def _on_signal(self, signum, _frame) -> None:
+        if not self._stopping:
+            print(f"[SUPERVISOR] signal={signum} → stopping {len(self.slots)} workers", flush=True)
+        self._stopping = True
+
+    def run(self) -> int:
+        if not self.slots:
+            print("[SUPERVISOR] ❌ no worker processes configured", flush=True)
+            return 2
+
+        signal.signal(signal.SIGTERM, self._on_signal)
+        signal.signal(signal.SIGINT, self._on_signal)
+
+        for slot in self.slots:
+            self._start(slot)
+
+        while not self._stopping:
+            time.sleep(0.5)
+            now = time.monotonic()
+            for slot in self.slots:
+                self._reap(slot, now)
+                if slot.proc is None and not self._stopping and now >= slot.next_start_at:
+                    self._start(slot)
+
+        return self._shutdown()
+
+    def _shutdown(self) -> int:
+        live = [s.proc for s in self.slots if s.proc is not None and s.proc.is_alive()]
+        for proc in live:
+            try:
+                os.kill(proc.pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+        deadline = time.monotonic() + self.grace_sec
+        for proc in live:
+            proc.join(max(0.0, deadline - time.monotonic()))
+
+        killed = 0
+        for proc in live:
+            if proc.is_alive():
+                proc.kill()
+                proc.join(5)
+                killed += 1
+
+        print(f"[SUPERVISOR] stopped workers={len(live)} killed={killed}", flush=True)
+        return 0
+
+
+def main(argv: List[str]) -> int:
+    ap = argparse.ArgumentParser(description="Run executor workers as supervised processes")
+    ap.add_argument(
+        "--procs",
+        default=os.getenv("EXECUTOR_PROCS", "stocks:1"),
+        help='processes per job type, e.g. "stocks:3,penny:1"',
+    )
+    ap.add_argument(
+        "--grace-sec",
+        type=float,
+        default=float(os.getenv("EXECUTOR_SHUTDOWN_GRACE_SEC", "30")),
+    )
+    args = ap.parse_args(argv)
+
+    from executor.registry import get_handler
+
+    procs = parse_procs(args.procs)
+    unknown = [jt for jt in procs if get_handler(jt) is None]
+    if unknown:
+        print(f"[SUPERVISOR] ❌ no handler registered for job_type={unknown}", flush=True)
+        return 2
+
+    from executor.config import get_settings
+
+    cfg = get_settings()
+
+    # per-process caps would add up across processes: share them
+    # (executor.ledger) only then, it costs a DB lock per reservation
+    shared_ledger = cfg.shared_ledger or sum(procs.values()) > 1 or cfg.broker_replicas > 1
+    if shared_ledger:
+        print("[SUPERVISOR] shared entry ledger on (caps enforced across processes)", flush=True)
+
+    # workers' claim SQL needs the current schema: migrate (or refuse)
+    # once here, under the migrations' advisory lock, not per worker
+    from common.migrations import apply_migrations, require_migrations
+
+    try:
+        if cfg.auto_migrate:
+            apply_migrations()
+        require_migrations()
+    except Exception as e:
+        print(f"[SUPERVISOR] ❌ schema not ready: {e}", flush=True)
+        return 2
+
+    # workers open their own pools
+    from common.db import close_pool
+
+    close_pool()
+
+    # the broker request budget is per account: this replica's share,
+    # split across its workers (rate, burst and submit reserve alike)
+    from executor.alpaca_client import replica_budget
+
+    budget = replica_budget().share(sum(procs.values()))
+    print(
+        f"[SUPERVISOR] broker budget per worker: {budget.rate_per_min:.1f}/min "
+        f"burst={budget.burst:.2f} (replicas={cfg.broker_replicas})",
+        flush=True,
+    )
+
+    sup = Supervisor(
+        procs,
+        metrics_base_port=int(os.getenv("EXECUTOR_METRICS_PORT", "0") or 0),
+        grace_sec=args.grace_sec,
+        budget=tuple(budget),
+        shared_ledger=shared_ledger,
+    )
+
+    # time-range partitions: premake / retire (no-op on plain tables)
+    maintainer = None
+    if cfg.partition_maint_sec > 0:
+        from common.partitions import PartitionMaintainer
+
+        maintainer = PartitionMaintainer(cfg.partition_settings())
+        maintainer.start()
+
+    try:
+        return sup.run()
+    finally:
+        if maintainer is not None:
+            maintainer.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,309 @@
+from __future__ import annotations
+
+import json
+import time
+import asyncio
+import threading
+from typing import Dict, Iterable, Optional, Any, Tuple
+from datetime import datetime
+
+from executor.config import get_settings
+from executor.fill_counter import get_daily_fill_counter, trading_day_window
+from executor.order_query import parse_ts
+from executor.snapshot import AccountSnapshot
+
+
+def _trading_day(ts: Optional[datetime] = None) -> str:
+    """
+    Trading-day key (EXECUTOR_TRADING_DAY_TZ), same boundary as the fill counter.
+    """
+    return trading_day_window(get_settings().trading_day_tz, ts)[2]
+
+
+_OPEN_EVENTS = {"new", "pending_new", "accepted", "replaced", "pending_replace", "held"}
+_CLOSE_EVENTS = {"canceled", "expired", "rejected", "done_for_day", "stopped", "suspended"}
+
+
+class TradeBook:
+    """
+    Thread-safe in-memory view of the account, kept current by the
+    trade_updates stream: open orders, positions, today's filled buys.
+
+    Seeded from REST on every (re)connect so missed events are covered.
+    Filled buys are kept as order ids, seed included: a fill that is
+    both in the seed and in the stream (it arrived between LISTEN
+    and the seed) counts once.
+    """
+
+    def __init__(self, *, stale_after_sec: float):
+        self.stale_after_sec = stale_after_sec
+        self._lock = threading.Lock()
+        self.open_orders: Dict[str, Tuple[str, str]] = {}  # order_id -> (symbol, side)
+        self.positions: Dict[str, float] = {}
+        self.filled_buy_ids: set = set()
+        self.day = _trading_day()
+        self.connected = False
+        self.seeded_at: Optional[float] = None
+        self.last_event_at: Optional[float] = None
+
+    # --------------------------------------------------
+    # STATE
+    # --------------------------------------------------
+
+    def is_fresh(self) -> bool:
+        with self._lock:
+            if not self.connected or self.seeded_at is None:
+                return False
+            if self.day != _trading_day():
+                return False
+            return (time.monotonic() - self.seeded_at) < self.stale_after_sec
+
+    def mark_disconnected(self) -> None:
+        with self._lock:
+            self.connected = False
+
+    def seed(self, snapshot: AccountSnapshot, filled_buy_ids: Iterable[str] = ()) -> None:
+        """
+        snapshot: AccountSnapshot.load(keep_open_orders=True).
+        """
+        with self._lock:
+            self.positions = dict(snapshot.positions)
+            self.open_orders = dict(snapshot.open_orders or {})
+            self.filled_buy_ids = set(filled_buy_ids)
+            self.day = _trading_day()
+            self.seeded_at = time.monotonic()
+            self.connected = True
+
+    def apply(self, data: Dict[str, Any]) -> None:
+        event = str(data.get("event") or "").lower()
+        order = data.get("order") or {}
+        order_id = str(order.get("id") or "")
+        symbol = str(order.get("symbol") or "").upper()
+        side = str(order.get("side") or "").lower()
+
+        with self._lock:
+            self.last_event_at = time.monotonic()
+
+            if self.day != _trading_day():
+                self.day = _trading_day()
+                self.filled_buy_ids = set()
+
+            if event in _OPEN_EVENTS:
+                if order_id:
+                    self.open_orders[order_id] = (symbol, side)
+
+            elif event in _CLOSE_EVENTS:
+                self.open_orders.pop(order_id, None)
+
+            elif event in ("fill", "partial_fill"):
+                if event == "fill":
+                    self.open_orders.pop(order_id, None)
+                    filled_at = parse_ts(order.get("filled_at") or data.get("timestamp"))
+                    if side == "buy" and order_id and _trading_day(filled_at) == self.day:
+                        self.filled_buy_ids.add(order_id)
+                elif order_id:
+                    self.open_orders[order_id] = (symbol, side)
+
+                pq = data.get("position_qty")
+                if pq is not None and symbol:
+                    try:
+                        q = float(pq)
+                    except Exception:
+                        q = None
+                    if q is not None:
+                        if q != 0:
+                            self.positions[symbol] = q
+                        else:
+                            self.positions.pop(symbol, None)
+
+    # --------------------------------------------------
+    # READS
+    # --------------------------------------------------
+
+    def has_position(self, symbol: str) -> bool:
+        with self._lock:
+            return symbol.upper() in self.positions
+
+    def count_positions(self) -> int:
+        with self._lock:
+            return len(self.positions)
+
+    def has_open_buy(self, symbol: str) -> bool:
+        sym = symbol.upper()
+        with self._lock:
+            return any(s == sym and sd == "buy" for s, sd in self.open_orders.values())
+
+    def count_open_buys(self) -> int:
+        with self._lock:
+            return sum(1 for _, sd in self.open_orders.values() if sd == "buy")
+
+    def filled_buys_today(self) -> int:
+        with self._lock:
+            return len(self.filled_buy_ids)
+
+    def to_snapshot(self) -> AccountSnapshot:
+        with self._lock:
+            open_buy_symbols: Dict[str, int] = {}
+            for sym, sd in self.open_orders.values():
+                if sd == "buy":
+                    open_buy_symbols[sym] = open_buy_symbols.get(sym, 0) + 1
+            return AccountSnapshot(
+                positions=dict(self.positions),
+                open_buy_symbols=open_buy_symbols,
+                filled_buys_today=len(self.filled_buy_ids),
+            )
+
+
+class TradeUpdatesConsumer:
+    """
+    Background thread: websocket -> TradeBook.
+    Reconnects with backoff and re-seeds the book from REST each time.
+    """
+
+    def __init__(
+        self,
+        *,
+        url: str,
+        key_id: str,
+        secret_key: str,
+        book: TradeBook,
+        client_factory=None,
+    ):
+        self.url = url
+        self.key_id = key_id
+        self.secret_key = secret_key
+        self.book = book
+        self.client_factory = client_factory
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name="trade-updates", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def _run(self) -> None:
+        asyncio.run(self._loop())
+
+    async def _loop(self) -> None:
+        backoff = 1.0
+        while not self._stop.is_set():
+            try:
+                await self._consume()
+                backoff = 1.0
+            except Exception as e:
+                print(f"[TRADE_STREAM] disconnected err={e}", flush=True)
+            finally:
+                self.book.mark_disconnected()
+
+            if self._stop.is_set():
+                break
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 30.0)
+
+    async def _consume(self) -> None:
+        import websockets
+
+        async with websockets.connect(self.url, ping_interval=10, ping_timeout=10) as ws:
+            await ws.send(
+                json.dumps({"action": "auth", "key": self.key_id, "secret": self.secret_key})
+            )
+            msg = _decode(await ws.recv())
+            status = ((msg or {}).get("data") or {}).get("status")
+            if status != "authorized":
+                raise RuntimeError(f"auth_failed msg={msg}")
+
+            await ws.send(json.dumps({"action": "listen", "data": {"streams": ["trade_updates"]}}))
+
+            # seed AFTER listening so nothing falls into the gap
+            await asyncio.to_thread(self._seed)
+            print(f"[TRADE_STREAM] live url={self.url}", flush=True)
+
+            while not self._stop.is_set():
+                # periodic REST resync bounds drift from any missed event
+                if not self.book.is_fresh():
+                    await asyncio.to_thread(self._seed)
+
+                try:
+                    raw = await asyncio.wait_for(ws.recv(), timeout=1.0)
+                except asyncio.TimeoutError:
+                    continue
+
+                msg = _decode(raw)
+                if (msg or {}).get("stream") == "trade_updates":
+                    self.book.apply(msg.get("data") or {})
+
+    def _seed(self) -> None:
+        if self.client_factory is None:
+            from executor.alpaca_client import get_trading_client
+
+            client = get_trading_client()
+        else:
+            client = self.client_factory()
+
+        # one paged open-orders listing, shared with the guards' snapshot code
+        snap = AccountSnapshot.load(client, use_stream=False, keep_open_orders=True)
+        # ids, not the count: the stream may replay some of these fills
+        filled = get_daily_fill_counter().filled_ids(client)
+        self.book.seed(snap, filled)
+
+
+def _decode(raw: Any) -> Optional[Dict[str, Any]]:
+    try:
+        if isinstance(raw, (bytes, bytearray)):
+            raw = raw.decode("utf-8")
+        return json.loads(raw)
+    except Exception:
+        return None
+
+
+# ---------------------------------------------------------
+# PROCESS-WIDE BOOK
+# ---------------------------------------------------------
+
+_book: Optional[TradeBook] = None
+_consumer: Optional[TradeUpdatesConsumer] = None
+
+
+def start_trade_stream(*, url: Optional[str] = None, client_factory=None) -> TradeBook:
+    global _book, _consumer
+
+    if _book is not None:
+        return _book
+
+    cfg = get_settings()
+    _book = TradeBook(stale_after_sec=cfg.trade_stream_stale_sec)
+    _consumer = TradeUpdatesConsumer(
+        url=url or cfg.trade_stream_url,
+        key_id=cfg.alpaca_key_id,
+        secret_key=cfg.alpaca_secret_key,
+        book=_book,
+        client_factory=client_factory,
+    )
+    _consumer.start()
+    return _book
+
+
+def stop_trade_stream() -> None:
+    global _book, _consumer
+    if _consumer is not None:
+        _consumer.stop()
+    _book = None
+    _consumer = None
+
+
+def get_live_book() -> Optional[TradeBook]:
+    """
+    The book if the stream is connected and fresh, else None
+    (callers then fall back to REST).
+    """
+    book = _book
+    if book is not None and book.is_fresh():
+        return book
+    return None
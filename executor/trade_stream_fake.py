@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import json
+import uuid
+import asyncio
+import argparse
+import threading
+from typing import Any, Dict, Optional, Set
+from datetime import datetime, timezone
+
+
+class FakeTradeStreamServer:
+    """
+    Local stand-in for the broker's trade_updates websocket.
+
+    Speaks the same handshake (auth -> authorization, listen -> listening)
+    and frames events as {"stream": "trade_updates", "data": {...}}.
+
+        srv = FakeTradeStreamServer(port=8765).start()
+        srv.push_fill(symbol="AAPL", side="buy", position_qty=10)
+
+    Then point TRADE_STREAM_URL at srv.url.
+    """
+
+    def __init__(self, *, host: str = "127.0.0.1", port: int = 8765, key: Optional[str] = None):
+        self.host = host
+        self.port = port
+        self.key = key
+        self._clients: Set[Any] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._ready = threading.Event()
+        self._stop: Optional[asyncio.Event] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}/stream"
+
+    # --------------------------------------------------
+    # LIFECYCLE
+    # --------------------------------------------------
+
+    def start(self) -> "FakeTradeStreamServer":
+        self._thread = threading.Thread(target=self._run, name="fake-trade-stream", daemon=True)
+        self._thread.start()
+        self._ready.wait(5)
+        return self
+
+    def stop(self) -> None:
+        if self._loop and self._stop:
+            self._loop.call_soon_threadsafe(self._stop.set)
+        if self._thread:
+            self._thread.join(5)
+
+    def _run(self) -> None:
+        asyncio.run(self._serve())
+
+    async def _serve(self) -> None:
+        import websockets
+
+        self._loop = asyncio.get_running_loop()
+        self._stop = asyncio.Event()
+        async with websockets.serve(self._handler, self.host, self.port):
+            self._ready.set()
+            await self._stop.wait()
+
+    async def _handler(self, ws, *_args) -> None:
+        try:
+            async for raw in ws:
+                msg = json.loads(raw)
+                action = msg.get("action")
+
+                if action == "auth":
+                    ok = self.key is None or msg.get("key") == self.key
+                    await ws.send(
+                        json.dumps(
+                            {
+                                "stream": "authorization",
+                                "data": {
+                                    "status": "authorized" if ok else "unauthorized",
+                                    "action": "authenticate",
+                                },
+                            }
+                        ).encode()
+                    )
+                    if not ok:
+                        return
+
+                elif action == "listen":
+                    streams = (msg.get("data") or {}).get("streams") or []
+                    await ws.send(
+                        json.dumps({"stream": "listening", "data": {"streams": streams}}).encode()
+                    )
+                    if "trade_updates" in streams:
+                        self._clients.add(ws)
+        finally:
+            self._clients.discard(ws)
+
+    # --------------------------------------------------
+    # EVENTS
+    # --------------------------------------------------
+
+    def push(self, data: Dict[str, Any]) -> None:
+        """
+        Broadcast one trade_updates payload to every listening client.
+        """
+        frame = json.dumps({"stream": "trade_updates", "data": data}).encode()
+
+        async def _send():
+            for ws in list(self._clients):
+                try:
+                    await ws.send(frame)
+                except Exception:
+                    self._clients.discard(ws)
+
+        if self._loop:
+            asyncio.run_coroutine_threadsafe(_send(), self._loop).result(5)
+
+    def push_order_event(
+        self,
+        *,
+        event: str,
+        symbol: str,
+        side: str = "buy",
+        order_id: Optional[str] = None,
+        position_qty: Optional[float] = None,
+    ) -> str:
+        order_id = order_id or str(uuid.uuid4())
+        now = datetime.now(timezone.utc).isoformat()
+        data: Dict[str, Any] = {
+            "event": event,
+            "timestamp": now,
+            "order": {
+                "id": order_id,
+                "symbol": symbol.upper(),
+                "side": side,
+                "status": event,
+                "filled_at": now if event == "fill" else None,
+            },
+        }
+        if position_qty is not None:
+            data["position_qty"] = str(position_qty)
+        self.push(data)
+        return order_id
+
+    def push_fill(self, *, symbol: str, side: str = "buy", position_qty: float, order_id: Optional[str] = None) -> str:
+        return self.push_order_event(
+            event="fill",
+            symbol=symbol,
+            side=side,
+            order_id=order_id,
+            position_qty=position_qty,
+        )
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Fake trade_updates websocket for offline runs")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--every", type=float, default=0.0, help="emit a synthetic new+fill every N sec")
+    ap.add_argument("--symbol", default="TEST")
+    args = ap.parse_args()
+
+    srv = FakeTradeStreamServer(host=args.host, port=args.port).start()
+    print(f"[FAKE_TRADE_STREAM] listening {srv.url}", flush=True)
+
+    stop = threading.Event()
+    try:
+        qty = 0
+        while not stop.wait(args.every or 3600):
+            if args.every:
+                oid = srv.push_order_event(event="new", symbol=args.symbol)
+                qty += 1
+                srv.push_fill(symbol=args.symbol, position_qty=qty, order_id=oid)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        srv.stop()
+
+
+if __name__ == "__main__":
+    main()
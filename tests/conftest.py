@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import os
+import sys
+
+import pytest
+
+# =========================================================
+# TEST ENVIRONMENT
+#
+# common.db and the executor config read their settings at
+# import time. Unit tests never open a connection (the pool is
+# lazy) or call the broker, so placeholders are enough.
+#
+# Tests that need Postgres take the `pg` fixture: it is skipped
+# unless BENCH_DATABASE_URL points at a scratch database, where
+# the bench schema plus every migration is built in
+# TEST_SCHEMA (dropped and re-created per session).
+# =========================================================
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+TEST_SCHEMA = "executor_tests"
+BENCH_DSN = os.getenv("BENCH_DATABASE_URL")
+
+if BENCH_DSN:
+    from psycopg.conninfo import make_conninfo
+
+    os.environ["DATABASE_URL"] = make_conninfo(BENCH_DSN, options=f"-c search_path={TEST_SCHEMA}")
+else:
+    os.environ.setdefault("DATABASE_URL", "postgresql://tests@localhost/tests")
+os.environ.setdefault("APCA_API_KEY_ID", "test-key")
+os.environ.setdefault("APCA_API_SECRET_KEY", "test-secret")
+
+
+@pytest.fixture(scope="session")
+def pg():
+    if not BENCH_DSN:
+        pytest.skip("BENCH_DATABASE_URL not set (scratch Postgres)")
+
+    import psycopg
+
+    from bench.run import _reset_schema
+    from common.db import close_pool
+    from common.migrations import apply_migrations
+
+    _reset_schema(BENCH_DSN, TEST_SCHEMA)
+    apply_migrations()
+    yield
+    close_pool()
+    with psycopg.connect(BENCH_DSN, autocommit=True) as conn:
+        conn.execute(f"DROP SCHEMA IF EXISTS {TEST_SCHEMA} CASCADE")
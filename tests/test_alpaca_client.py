@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import os
+import re
+
+import pytest
+
+pytest.importorskip("alpaca")
+requests = pytest.importorskip("requests")
+
+from alpaca.common.exceptions import APIError
+from alpaca.trading.client import TradingClient
+
+from executor.alpaca_client import disable_sdk_retry
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class _Throttled:
+    """requests.Session stand-in: every request answers 429."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def request(self, method, url, **opts):
+        self.calls += 1
+        resp = requests.Response()
+        resp.status_code = 429
+        resp._content = b'{"code": 42910000, "message": "rate limit exceeded"}'
+        resp.url = url
+        return resp
+
+
+def _client():
+    client = TradingClient(api_key="k", secret_key="s", url_override="http://broker.invalid")
+    client._retry_wait = 0
+    client._session = _Throttled()
+    return client
+
+
+def test_sdk_retry_is_off_after_disable():
+    client = _client()
+    disable_sdk_retry(client)
+    with pytest.raises(APIError):
+        client.get("/account")
+    assert client._session.calls == 1
+
+
+def test_sdk_retries_429_by_default():
+    # what disable_sdk_retry() turns off: if this stops holding, the
+    # pinned alpaca-py changed how it retries
+    client = _client()
+    with pytest.raises(APIError):
+        client.get("/account")
+    assert client._session.calls > 1
+
+
+def test_installed_alpaca_py_is_the_pinned_one():
+    from importlib.metadata import version
+
+    with open(os.path.join(ROOT, "requirements.txt")) as f:
+        pin = re.search(r"^alpaca-py==(\S+)$", f.read(), re.M)
+    assert pin, "alpaca-py must stay pinned (disable_sdk_retry depends on its internals)"
+    assert version("alpaca-py") == pin.group(1)
+
+
+def test_disable_refuses_a_client_without_the_attribute():
+    with pytest.raises(RuntimeError, match="_retry"):
+        disable_sdk_retry(object())
@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+
+from executor.async_broker import AsyncBrokerClient, BrokerHTTPError
+from executor.orders import is_duplicate_submit
+from executor.rate_limit import READ, SUBMIT
+
+
+class _Bucket:
+    """Records the priority of every token taken; never waits."""
+
+    def __init__(self):
+        self.taken = []
+        self.penalties = []
+
+    async def acquire_async(self, priority=READ):
+        self.taken.append(priority)
+        return 0.0
+
+    def penalize(self, sec):
+        self.penalties.append(sec)
+
+
+def _broker(handler, **kw):
+    kw.setdefault("bucket", _Bucket())
+    broker = AsyncBrokerClient(base_url="https://broker.test", key_id="k", secret_key="s", http2=False, **kw)
+    broker._http = httpx.AsyncClient(base_url=broker.base_url, transport=httpx.MockTransport(handler))
+    return broker
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+def test_order_lookup_by_client_id_is_a_read():
+    def handler(request):
+        assert request.url.path == "/v2/orders:by_client_order_id"
+        assert request.url.params["client_order_id"] == "intent-1"
+        return httpx.Response(200, json={"id": "o1", "client_order_id": "intent-1"})
+
+    broker = _broker(handler)
+    order = _run(broker.get_order_by_client_id("intent-1"))
+    assert order.id == "o1"
+    assert broker._bucket.taken == [READ]
+
+
+def test_submit_is_a_submit():
+    def handler(request):
+        return httpx.Response(200, json={"id": "o1", "status": "accepted"})
+
+    broker = _broker(handler)
+    _run(broker.submit_order({"symbol": "AAPL", "qty": 1}))
+    assert broker._bucket.taken == [SUBMIT]
+
+
+def _replies(*responses):
+    """Handler answering with `responses` in order; records each request."""
+    seen = []
+
+    def handler(request):
+        seen.append(request)
+        return responses[min(len(seen), len(responses)) - 1]
+
+    handler.seen = seen
+    return handler
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    import executor.async_broker as ab
+
+    slept = []
+
+    async def fake_sleep(sec):
+        slept.append(sec)
+
+    monkeypatch.setattr(ab.asyncio, "sleep", fake_sleep)
+    return slept
+
+
+def test_read_5xx_is_retried(sleeps):
+    handler = _replies(httpx.Response(503, text="unavailable"), httpx.Response(200, json={"id": "acct"}))
+    broker = _broker(handler)
+    assert _run(broker.get("/v2/account"))["id"] == "acct"
+    assert len(handler.seen) == 2
+    assert broker._bucket.taken == [READ, READ]
+    assert len(sleeps) == 1
+
+
+def test_submit_5xx_is_not_retried(sleeps):
+    handler = _replies(httpx.Response(503, text="unavailable"))
+    broker = _broker(handler)
+    with pytest.raises(BrokerHTTPError) as exc:
+        _run(broker.submit_order({"symbol": "AAPL", "qty": 1}))
+    assert exc.value.status_code == 503
+    assert len(handler.seen) == 1
+    assert sleeps == []
+
+
+def test_429_penalizes_the_bucket_instead_of_sleeping(sleeps):
+    handler = _replies(
+        httpx.Response(429, headers={"Retry-After": "2"}, text="rate limit exceeded"),
+        httpx.Response(200, json={"id": "o1", "status": "accepted"}),
+    )
+    broker = _broker(handler, backoff_base_sec=0.01, backoff_max_sec=0.01)
+    _run(broker.submit_order({"symbol": "AAPL", "qty": 1}))
+    assert len(handler.seen) == 2
+    assert broker._bucket.taken == [SUBMIT, SUBMIT]
+    # never below what the broker asked for
+    assert broker._bucket.penalties and broker._bucket.penalties[0] >= 2.0
+    assert sleeps == []
+
+
+def test_429_without_a_bucket_sleeps(sleeps):
+    handler = _replies(
+        httpx.Response(429, headers={"Retry-After": "1"}, text="rate limit exceeded"),
+        httpx.Response(200, json={"id": "acct"}),
+    )
+    broker = _broker(handler, bucket=None)
+    _run(broker.get("/v2/account"))
+    assert len(sleeps) == 1 and sleeps[0] >= 1.0
+
+
+def test_retries_are_bounded(sleeps):
+    handler = _replies(httpx.Response(429, text="rate limit exceeded"))
+    broker = _broker(handler, max_retries=2)
+    with pytest.raises(BrokerHTTPError) as exc:
+        _run(broker.get("/v2/account"))
+    assert exc.value.status_code == 429
+    assert len(handler.seen) == 3
+    assert len(broker._bucket.penalties) == 2
+
+
+def _duplicate_then(lookup):
+    def handler(request):
+        if request.method == "POST":
+            return httpx.Response(422, json={"code": 40010001, "message": "client_order_id must be unique"})
+        assert request.url.path == "/v2/orders:by_client_order_id"
+        return lookup(request)
+
+    return handler
+
+
+def test_duplicate_submit_adopts_the_existing_order():
+    from executor.runners.intent_runner import _adopt_duplicate_async
+
+    broker = _broker(_duplicate_then(
+        lambda request: httpx.Response(200, json={"id": "o1", "client_order_id": request.url.params["client_order_id"]}),
+    ))
+
+    async def go():
+        try:
+            await broker.submit_order({"symbol": "AAPL", "qty": 1, "client_order_id": "i1"})
+        except BrokerHTTPError as e:
+            assert is_duplicate_submit(e)
+            return await _adopt_duplicate_async(broker, SimpleNamespace(intent_id="i1"))
+        raise AssertionError("submit did not fail")
+
+    order = _run(go())
+    assert order.id == "o1" and order.client_order_id == "i1"
+    # the 422 is not retried; the lookup is a READ
+    assert broker._bucket.taken == [SUBMIT, READ]
+
+
+def test_duplicate_adoption_lookup_failure_returns_none():
+    from executor.runners.intent_runner import _adopt_duplicate_async
+
+    broker = _broker(_duplicate_then(lambda request: httpx.Response(404, text="order not found")))
+    assert _run(_adopt_duplicate_async(broker, SimpleNamespace(intent_id="i1"))) is None
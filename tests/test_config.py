@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import pytest
+
+from executor.config import ConfigError, load_settings
+
+BASE = {"APCA_API_KEY_ID": "k", "APCA_API_SECRET_KEY": "s"}
+
+
+def test_defaults_load():
+    s = load_settings(dict(BASE))
+    assert s.trading_day_tz == "UTC"
+    assert s.lease_sec == 60
+
+
+def test_unknown_trading_day_tz_is_rejected():
+    with pytest.raises(ConfigError, match="EXECUTOR_TRADING_DAY_TZ"):
+        load_settings({**BASE, "EXECUTOR_TRADING_DAY_TZ": "Mars/Olympus_Mons"})
+
+
+def test_known_trading_day_tz_is_accepted():
+    assert load_settings({**BASE, "EXECUTOR_TRADING_DAY_TZ": "America/New_York"}).trading_day_tz == "America/New_York"
+
+
+def test_below_minimum_is_an_error_not_a_clamp():
+    with pytest.raises(ConfigError, match="EXECUTOR_LEASE_SEC='1' must be >= 3"):
+        load_settings({**BASE, "EXECUTOR_LEASE_SEC": "1"})
+
+
+def test_all_errors_reported_together():
+    with pytest.raises(ConfigError) as e:
+        load_settings({**BASE, "EXECUTOR_WORKERS": "0", "EXECUTOR_POLL_SEC": "soon"})
+    assert "EXECUTOR_WORKERS" in str(e.value) and "EXECUTOR_POLL_SEC" in str(e.value)
+
+
+def test_db_pool_settings_are_validated_and_handed_to_common_db(monkeypatch):
+    import common.db
+    from executor.config import reload_settings
+
+    with pytest.raises(ConfigError, match="DB_POOL_MAX_SIZE"):
+        load_settings({**BASE, "DB_POOL_MAX_SIZE": "0"})
+
+    monkeypatch.setenv("DB_POOL_MAX_SIZE", "3")
+    try:
+        reload_settings()
+        assert common.db._pool_settings.max_size == 3
+    finally:
+        monkeypatch.undo()
+        reload_settings()
+    assert common.db._pool_settings.max_size == 10
@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+from types import SimpleNamespace
+
+import pytest
+
+from executor import fair
+from executor.fair import FairDrainer, _limit, _Slot, _weight
+
+
+def _drainer(monkeypatch, **env):
+    for k, v in env.items():
+        monkeypatch.setenv(k, str(v))
+    from executor.config import reload_settings
+
+    reload_settings()
+    return FairDrainer(["stocks"], claimed_by="test")
+
+
+@pytest.fixture(autouse=True)
+def _reset_settings():
+    yield
+    from executor.config import reload_settings
+
+    reload_settings()
+
+
+def _turns(drainer, n):
+    return [drainer._next().drain.name for _ in range(n)]
+
+
+def test_equal_weights_rotate(monkeypatch):
+    d = _drainer(monkeypatch)
+    d.slots = [_Slot(SimpleNamespace(name=x), 1.0) for x in "abc"]
+    assert _turns(d, 6) == list("abcabc")
+
+
+def test_smooth_weighted_round_robin(monkeypatch):
+    d = _drainer(monkeypatch)
+    d.slots = [_Slot(SimpleNamespace(name="a"), 5.0), _Slot(SimpleNamespace(name="b"), 1.0), _Slot(SimpleNamespace(name="c"), 1.0)]
+    # nginx's sequence: the heavy run is spread out, not bursted
+    assert _turns(d, 7) == list("aabacaa")
+
+
+def test_payload_weight_and_limit():
+    job = {"payload": {"weight": "3", "max_inflight": 4}}
+    assert _weight(job, "weight") == 3.0
+    assert _weight(job, "rr") == 1.0
+    assert _weight({"payload": {"weight": -2}}, "weight") == 1.0
+    assert _limit(job, 10) == 4
+    assert _limit({"payload": None}, 10) == 10
+    assert _limit({}, 0) is None
+
+
+class _FakeDrain:
+    """One step per batch; records whose turn it was."""
+
+    log = []
+
+    def __init__(self, job, **_kw):
+        self.job = job
+        self.job_type = job["job_type"]
+        self.left = job["batches"]
+        self.snapshot = None
+        self.summary = None
+        self.requeued = []
+
+    def open(self):
+        return True
+
+    def step(self):
+        _FakeDrain.log.append(self.job["dispatch_id"])
+        self.left -= 1
+        if self.left <= 0:
+            self.summary = {"dispatch_id": self.job["dispatch_id"]}
+            return False
+        return True
+
+    def age(self):
+        return self.job.get("age", 0.0)
+
+    def requeue(self, reason, *, to_back=False):
+        self.requeued.append((reason, to_back))
+        self.summary = {"dispatch_id": self.job["dispatch_id"], "requeued": reason}
+
+    def close(self):
+        pass
+
+
+def test_run_interleaves_and_tops_up(monkeypatch):
+    queue = [
+        {"dispatch_id": "b", "job_type": "stocks", "batches": 1},
+        {"dispatch_id": "c", "job_type": "stocks", "batches": 2},
+    ]
+    monkeypatch.setattr(fair, "DispatchDrain", _FakeDrain)
+    monkeypatch.setattr(fair, "claim_job", lambda **kw: queue.pop(0) if queue else None)
+    _FakeDrain.log = []
+
+    d = _drainer(monkeypatch, EXECUTOR_MAX_DISPATCHES=2)
+    summaries = d.run({"dispatch_id": "a", "job_type": "stocks", "batches": 4})
+
+    # the long run does not hold back the short ones
+    assert _FakeDrain.log == ["a", "b", "a", "c", "a", "c", "a"]
+    assert [s["dispatch_id"] for s in summaries] == ["b", "c", "a"]
+    assert d.slots == []
+
+
+def test_over_slice_dispatch_yields_to_a_queued_job(monkeypatch):
+    queue = [{"dispatch_id": "b", "job_type": "stocks", "batches": 1}]
+    drains = []
+
+    def make(job, **kw):
+        drains.append(_FakeDrain(job, **kw))
+        return drains[-1]
+
+    monkeypatch.setattr(fair, "DispatchDrain", make)
+    monkeypatch.setattr(fair, "claim_job", lambda **kw: queue.pop(0) if queue else None)
+    monkeypatch.setattr(fair, "TOPUP_SEC", 0.0)
+    _FakeDrain.log = []
+
+    d = _drainer(monkeypatch, EXECUTOR_MAX_DISPATCHES=1, EXECUTOR_DISPATCH_SLICE_SEC=5)
+    summaries = d.run({"dispatch_id": "a", "job_type": "stocks", "batches": 100, "age": 10.0})
+
+    assert drains[0].requeued == [("yield_slot", True)]
+    assert [s["dispatch_id"] for s in summaries] == ["a", "b"]
+    assert _FakeDrain.log == ["b"]
@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from bench.fake_broker import FakeTradingClient
+from executor.fill_counter import DailyFillCounter, trading_day_window
+
+UTC = timezone.utc
+
+
+def _add(client, order_id, *, side="buy", status="accepted", ago_sec=60.0):
+    now = datetime.now(UTC)
+    o = SimpleNamespace(
+        id=order_id, symbol="AAPL", side=side, qty="1", status=status,
+        submitted_at=now - timedelta(seconds=ago_sec),
+        filled_at=now if status == "filled" else None,
+    )
+    client.orders.append(o)
+    return o
+
+
+def _fill(o):
+    o.status = "filled"
+    o.filled_at = datetime.now(UTC)
+
+
+@pytest.fixture
+def client():
+    c = FakeTradingClient()
+    # keep every order inside today's UTC trading day
+    start, _end, _key = trading_day_window("UTC")
+    age = (datetime.now(UTC) - start).total_seconds()
+    if age < 120:
+        pytest.skip("too close to the UTC day boundary")
+    return c
+
+
+def test_counts_filled_buys_once(client):
+    counter = DailyFillCounter(page_size=2)
+    for i in range(5):
+        _add(client, f"f{i}", status="filled", ago_sec=50 - i)
+    _add(client, "s1", side="sell", status="filled", ago_sec=40)
+    _add(client, "c1", status="canceled", ago_sec=39)
+
+    assert counter.filled_ids(client) == {f"f{i}" for i in range(5)}
+    assert counter.count(client) == 5
+
+
+def test_mark_moves_past_a_resting_order_and_sees_its_fill(client):
+    counter = DailyFillCounter()
+    resting = _add(client, "rest", ago_sec=50)
+    _add(client, "f1", status="filled", ago_sec=40)
+    assert counter.count(client) == 1
+    assert counter._open == {"rest"}
+
+    # the mark is not pinned at the open order
+    newest = _add(client, "f2", status="filled", ago_sec=30)
+    assert counter.count(client) == 2
+    assert counter._hwm >= newest.submitted_at - timedelta(milliseconds=1)
+
+    # filled behind the mark: found by id, not by re-listing
+    _fill(resting)
+    before = client.calls.get("get:orders", 0)
+    assert counter.count(client) == 3
+    assert client.calls["get:orders"] - before == 2  # one empty listing + one by-id read
+    assert counter._open == set()
+    assert counter.count(client) == 3
+
+
+def test_open_sells_are_not_tracked(client):
+    counter = DailyFillCounter()
+    _add(client, "s1", side="sell", ago_sec=50)
+    counter.count(client)
+    assert counter._open == set()
+
+
+def test_vanished_order_is_dropped_and_errors_keep_it(client, monkeypatch):
+    counter = DailyFillCounter()
+    _add(client, "gone", ago_sec=50)
+    counter.count(client)
+    assert counter._open == {"gone"}
+
+    import executor.fill_counter as fc
+
+    def flaky(_client, _order_id):
+        raise RuntimeError("timeout")
+
+    monkeypatch.setattr(fc, "get_order", flaky)
+    counter.count(client)
+    assert counter._open == {"gone"}
+
+    monkeypatch.undo()
+    client.orders.clear()
+    counter.count(client)
+    assert counter._open == set()
+
+
+@pytest.mark.parametrize(
+    "now, start, end, key",
+    [
+        # spring forward (EST -> EDT): a 23-hour day
+        (datetime(2026, 3, 8, 15, tzinfo=UTC), datetime(2026, 3, 8, 5, tzinfo=UTC), datetime(2026, 3, 9, 4, tzinfo=UTC), "2026-03-08"),
+        # fall back (EDT -> EST): a 25-hour day
+        (datetime(2026, 11, 1, 15, tzinfo=UTC), datetime(2026, 11, 1, 4, tzinfo=UTC), datetime(2026, 11, 2, 5, tzinfo=UTC), "2026-11-01"),
+        # 03:30 UTC is still the previous local day
+        (datetime(2026, 7, 1, 3, 30, tzinfo=UTC), datetime(2026, 6, 30, 4, tzinfo=UTC), datetime(2026, 7, 1, 4, tzinfo=UTC), "2026-06-30"),
+    ],
+)
+def test_trading_day_window_across_dst(now, start, end, key):
+    assert trading_day_window("America/New_York", now) == (start, end, key)
+
+
+def test_trading_day_window_utc():
+    now = datetime(2026, 3, 8, 23, 59, tzinfo=UTC)
+    assert trading_day_window("UTC", now) == (
+        datetime(2026, 3, 8, tzinfo=UTC), datetime(2026, 3, 9, tzinfo=UTC), "2026-03-08",
+    )
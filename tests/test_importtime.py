@@ -0,0 +1,26 @@
+from __future__ import annotations
+
+import pytest
+
+from bench.importtime import DEFAULT_MODULES, _import_profile, check
+
+BUDGET_MS = 100.0
+
+# a stdlib import tree timed the same way: how slow this machine is
+# right now. The budget scales with it; far off, the timing is noise.
+REFERENCE = "email.parser"
+REFERENCE_MS = 15.0
+MAX_SLOWDOWN = 3.0
+
+
+def test_entry_points_import_nothing_heavy(capsys):
+    assert check(DEFAULT_MODULES, budget_ms=float("inf"), repeat=1) == 0, capsys.readouterr().out
+
+
+def test_entry_points_within_budget(capsys):
+    ref = min(_import_profile(REFERENCE)[0] for _ in range(3))
+    slowdown = max(ref / REFERENCE_MS, 1.0)
+    if slowdown > MAX_SLOWDOWN:
+        pytest.skip(f"slow environment ({REFERENCE} took {ref:.1f}ms)")
+
+    assert check(DEFAULT_MODULES, budget_ms=BUDGET_MS * slowdown, repeat=3) == 0, capsys.readouterr().out
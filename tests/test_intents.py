@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+
+@pytest.fixture
+def run(pg):
+    """
+    A fresh run: add(symbol, priority, ts_offset_sec) inserts one
+    stocks intent and returns its id.
+    """
+    from common.db import get_conn
+
+    run_id = str(uuid.uuid4())
+    t0 = datetime(2026, 3, 2, 14, 30, tzinfo=timezone.utc)
+
+    def add(symbol, priority, offset=0):
+        intent_id = str(uuid.uuid4())
+        with get_conn() as conn:
+            conn.execute(
+                "INSERT INTO strategy_intents (intent_id, run_id, executor, symbol, priority, ts) "
+                "VALUES (%s, %s, 'stocks', %s, %s, %s)",
+                (intent_id, run_id, symbol, priority, t0 + timedelta(seconds=offset)),
+            )
+        return intent_id
+
+    add.run_id = run_id
+    yield add
+    with get_conn() as conn:
+        conn.execute("DELETE FROM strategy_intents WHERE run_id = %s", (run_id,))
+
+
+def _rows(run_id):
+    from common.db import get_conn
+
+    with get_conn() as conn:
+        rows = conn.execute(
+            "SELECT intent_id, dispatched_ts, dispatched_ok, dispatched_detail FROM strategy_intents WHERE run_id = %s",
+            (run_id,),
+        ).fetchall()
+    return {str(r["intent_id"]): r for r in rows}
+
+
+def test_claim_order_is_priority_then_age(run):
+    from executor.intents import claim_next_intents
+
+    # inserted out of order on purpose
+    ids = {
+        "low_old": run("A", 1, 0),
+        "high_new": run("B", 5, 30),
+        "high_old": run("C", 5, 10),
+        "mid": run("D", 3, 20),
+        "low_new": run("E", 1, 40),
+    }
+    first = claim_next_intents(run_id=run.run_id, executor="stocks", limit=3)
+    rest = claim_next_intents(run_id=run.run_id, executor="stocks", limit=10)
+
+    order = [str(r["intent_id"]) for r in first + rest]
+    assert order == [ids[k] for k in ("high_old", "high_new", "mid", "low_old", "low_new")]
+    assert all(r["dispatched_ts"] is not None for r in first + rest)
+    assert claim_next_intents(run_id=run.run_id, executor="stocks", limit=10) == []
+
+
+def test_set_intent_results_bulk(run):
+    from executor.intents import claim_next_intents, set_intent_results
+
+    a, b = run("A", 1), run("B", 1)
+    claim_next_intents(run_id=run.run_id, executor="stocks", limit=2)
+
+    n = set_intent_results([
+        (a, True, {"ok": True, "alpaca_order_id": "o1"}),
+        (b, False, {"ok": False, "reason": "submit_error", "error": "x" * 50_000}),
+    ])
+    assert n == 2
+    rows = _rows(run.run_id)
+    assert rows[a]["dispatched_ok"] is True
+    assert rows[a]["dispatched_detail"] == {"ok": True, "alpaca_order_id": "o1"}
+    assert rows[b]["dispatched_ok"] is False
+    # bounded to EXECUTOR_DETAIL_MAX_BYTES, core keys kept
+    assert rows[b]["dispatched_detail"]["reason"] == "submit_error"
+    assert set_intent_results([]) == 0
+
+
+def test_release_matches_the_claim_stamp(run):
+    from common.db import get_conn
+    from executor.intents import claim_next_intents, release_intents, set_intent_results
+
+    ids = [run(f"S{i}", 1, i) for i in range(4)]
+    claimed = claim_next_intents(run_id=run.run_id, executor="stocks", limit=4)
+    by_id = {str(r["intent_id"]): r for r in claimed}
+
+    # ids[1]: reaped and claimed again by someone else (new stamp)
+    with get_conn() as conn:
+        conn.execute(
+            "UPDATE strategy_intents SET dispatched_ts = dispatched_ts + interval '1 second' WHERE intent_id = %s",
+            (ids[1],),
+        )
+    # ids[2]: already has a result
+    set_intent_results([(ids[2], True, {"ok": True})])
+
+    assert release_intents([by_id[i] for i in ids]) == 2
+    rows = _rows(run.run_id)
+    assert rows[ids[0]]["dispatched_ts"] is None
+    assert rows[ids[1]]["dispatched_ts"] is not None
+    assert rows[ids[2]]["dispatched_ts"] is not None
+    assert rows[ids[3]]["dispatched_ts"] is None
+    assert release_intents([]) == 0
@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import uuid
+
+import pytest
+
+
+@pytest.fixture
+def expired_job(pg):
+    """
+    A running 'stocks' job whose lease expired under worker w1, with
+    one intent per state: claimed without a result, finished, unclaimed.
+    """
+    from common.db import get_conn
+
+    dispatch_id, run_id = str(uuid.uuid4()), str(uuid.uuid4())
+    ids = {k: str(uuid.uuid4()) for k in ("orphan", "done", "pending")}
+
+    def make(reap_count: int = 0):
+        with get_conn() as conn:
+            conn.execute(
+                """
+                INSERT INTO job_dispatch (dispatch_id, job_type, run_id, status, claimed_by,
+                                          lease_expires_at, reap_count)
+                VALUES (%s, 'stocks', %s, 'running', 'w1', now() - interval '1 minute', %s)
+                """,
+                (dispatch_id, run_id, reap_count),
+            )
+            conn.execute(
+                """
+                INSERT INTO strategy_intents (intent_id, run_id, executor, symbol, dispatched_ts, dispatched_ok)
+                VALUES (%s, %s, 'stocks', 'A', now(), NULL),
+                       (%s, %s, 'stocks', 'B', now(), true),
+                       (%s, %s, 'stocks', 'C', NULL, NULL)
+                """,
+                (ids["orphan"], run_id, ids["done"], run_id, ids["pending"], run_id),
+            )
+        return dispatch_id, ids
+
+    yield make
+    with get_conn() as conn:
+        conn.execute("DELETE FROM job_dispatch WHERE dispatch_id = %s", (dispatch_id,))
+        conn.execute("DELETE FROM strategy_intents WHERE run_id = %s", (run_id,))
+
+
+def _job(dispatch_id):
+    from common.db import get_conn
+
+    with get_conn() as conn:
+        return conn.execute(
+            "SELECT status, claimed_by, reap_count, payload FROM job_dispatch WHERE dispatch_id = %s",
+            (dispatch_id,),
+        ).fetchone()
+
+
+def _intents(ids):
+    from common.db import get_conn
+
+    with get_conn() as conn:
+        rows = conn.execute(
+            "SELECT intent_id, dispatched_ts, dispatched_ok, dispatched_detail FROM strategy_intents "
+            "WHERE intent_id = ANY(%s::uuid[])",
+            (list(ids.values()),),
+        ).fetchall()
+    by_id = {str(r["intent_id"]): r for r in rows}
+    return {k: by_id[v] for k, v in ids.items()}
+
+
+def _reap(dispatch_id, **kw):
+    from executor.lease import reap_expired_jobs
+
+    return [r for r in reap_expired_jobs(**kw) if str(r["dispatch_id"]) == dispatch_id]
+
+
+def test_reap_requeues_and_releases_orphans(expired_job):
+    dispatch_id, ids = expired_job(reap_count=0)
+
+    (row,) = _reap(dispatch_id, max_reaps=3)
+    assert (row["status"], row["claimed_by"], row["released"], row["failed"]) == ("queued", "w1", 1, 0)
+
+    job = _job(dispatch_id)
+    assert (job["status"], job["claimed_by"], job["reap_count"]) == ("queued", None, 1)
+    intents = _intents(ids)
+    assert intents["orphan"]["dispatched_ts"] is None
+    assert intents["done"]["dispatched_ok"] is True
+    assert intents["pending"]["dispatched_ts"] is None
+
+    # not expired any more: a second sweep leaves it alone
+    assert _reap(dispatch_id, max_reaps=3) == []
+
+
+def test_reap_errors_after_max_reaps_and_fails_orphans(expired_job):
+    dispatch_id, ids = expired_job(reap_count=2)
+
+    (row,) = _reap(dispatch_id, max_reaps=3)
+    assert (row["status"], row["released"], row["failed"]) == ("error", 0, 1)
+
+    job = _job(dispatch_id)
+    assert job["status"] == "error"
+    assert job["payload"]["error"] == "lease_expired_max_reaps"
+
+    intents = _intents(ids)
+    orphan = intents["orphan"]
+    # not released to a queue no one drains: failed, still stamped
+    assert orphan["dispatched_ts"] is not None and orphan["dispatched_ok"] is False
+    assert orphan["dispatched_detail"]["reason"] == "lease_expired_max_reaps"
+    assert intents["done"]["dispatched_ok"] is True
+    assert intents["pending"]["dispatched_ts"] is None
+
+
+def test_stale_owner_cannot_finish_a_reclaimed_job(expired_job):
+    from common.db import get_conn
+    from common.job_claim import extend_lease, mark_done, mark_error, requeue_job
+
+    dispatch_id, _ids = expired_job()
+    _reap(dispatch_id, max_reaps=3)
+    with get_conn() as conn:
+        conn.execute(
+            "UPDATE job_dispatch SET status = 'running', claimed_by = 'w2', "
+            "lease_expires_at = now() + interval '1 minute' WHERE dispatch_id = %s",
+            (dispatch_id,),
+        )
+
+    # w1 wakes up after the reap and tries to finish its old drain
+    assert extend_lease(dispatch_id, claimed_by="w1", lease_sec=60) is False
+    mark_done(dispatch_id, claimed_by="w1")
+    mark_error(dispatch_id, "late", claimed_by="w1")
+    requeue_job(dispatch_id, reason="late", claimed_by="w1")
+    job = _job(dispatch_id)
+    assert (job["status"], job["claimed_by"]) == ("running", "w2")
+
+    assert extend_lease(dispatch_id, claimed_by="w2", lease_sec=60) is True
+    mark_done(dispatch_id, claimed_by="w2")
+    assert _job(dispatch_id)["status"] == "done"
+
+
+def test_heartbeat_reports_lost_lease(expired_job):
+    from executor.lease import LeaseHeartbeat
+
+    dispatch_id, _ids = expired_job()
+    _reap(dispatch_id, max_reaps=3)
+
+    hb = LeaseHeartbeat(dispatch_id, claimed_by="w1", lease_sec=1).start()
+    try:
+        hb._thread.join(timeout=5)
+        assert hb.lost()
+    finally:
+        hb.stop()
@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import pytest
+
+from executor.ledger import SharedLedger
+from executor.snapshot import AccountSnapshot
+
+CAPS = dict(max_trades_per_day=3, max_positions=2)
+
+
+@pytest.fixture
+def account(pg):
+    from common.db import get_conn
+
+    with get_conn() as conn:
+        conn.execute("DELETE FROM executor_entry_ledger")
+    return "test-account"
+
+
+def _snap(account: str, **kw) -> AccountSnapshot:
+    s = AccountSnapshot(positions={}, open_buy_symbols={}, filled_buys_today=0, **kw)
+    s.ledger = SharedLedger(account=account)
+    return s
+
+
+def test_caps_hold_across_snapshots(account):
+    a, b = _snap(account), _snap(account)
+    assert a.reserve_entry("AAPL", **CAPS) is None
+    assert b.reserve_entry("MSFT", **CAPS) is None
+    assert a.reserve_entry("NVDA", **CAPS)["reason"] == "max_positions_reached"
+    # another snapshot's in-flight buy of the symbol
+    assert b.reserve_entry("AAPL", max_trades_per_day=0, max_positions=9)["reason"] == "skip_open_buy_order"
+
+    a.release("AAPL")
+    assert b.reserve_entry("NVDA", **CAPS) is None
+
+
+def test_confirmed_entries_count_toward_daily_trades(account):
+    a, b = _snap(account), _snap(account)
+    for sym in ("A", "B", "C"):
+        assert a.reserve_entry(sym, max_trades_per_day=3, max_positions=9) is None
+        a.confirm(sym)
+    assert b.reserve_entry("D", max_trades_per_day=3, max_positions=9)["reason"] == "max_trades_per_day_reached"
+
+
+def test_buying_power_shared(account):
+    a, b = _snap(account, buying_power=1000.0), _snap(account, buying_power=1000.0)
+    assert a.fund_entry("A", qty=6, price=100.0, **CAPS) == (6, None)
+    # 400 left account-wide: fitted down
+    assert b.fund_entry("B", qty=6, price=100.0, **CAPS) == (4, None)
+
+
+def test_concurrent_threads_and_snapshots_share_the_cap(account):
+    import threading
+
+    snaps = [_snap(account), _snap(account)]
+    granted = []
+    start = threading.Barrier(12)
+
+    def take(i: int) -> None:
+        start.wait()
+        if snaps[i % 2].reserve_entry(f"S{i}", max_trades_per_day=0, max_positions=4) is None:
+            granted.append(i)
+
+    threads = [threading.Thread(target=take, args=(i,)) for i in range(12)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(granted) == 4
@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import pytest
+
+from common import migrations
+from common.migrations import MIGRATIONS, Migration, MigrationError
+
+
+def test_versions_unique_and_ordered():
+    versions = [m.version for m in MIGRATIONS]
+    assert versions == sorted(set(versions))
+
+
+def test_v1_is_frozen():
+    from common.notify import NOTIFY_TRIGGERS_SQL
+
+    v1 = next(m for m in MIGRATIONS if m.version == 1)
+    assert v1.statements is not NOTIFY_TRIGGERS_SQL
+    assert not any("CREATE OR REPLACE TRIGGER" in s for s in v1.statements)
+
+
+def test_applied_on_a_fresh_schema(pg):
+    assert migrations.pending_versions() == []
+    from common.db import get_conn
+
+    with get_conn() as conn:
+        names = {
+            r["indexname"]
+            for r in conn.execute("SELECT indexname FROM pg_indexes WHERE schemaname = current_schema() AND tablename = 'trades'").fetchall()
+        }
+    assert "trades_alpaca_order_id_uniq" in names
+    assert "trades_alpaca_order_id_idx" not in names
+
+
+@pytest.fixture
+def scratch(pg):
+    from common.db import get_conn
+
+    with get_conn() as conn:
+        conn.execute("DROP TABLE IF EXISTS migration_test_t")
+        conn.execute("CREATE TABLE migration_test_t (a int)")
+        conn.execute("INSERT INTO migration_test_t VALUES (1), (1), (2)")
+        conn.execute("DELETE FROM executor_schema_migrations WHERE version >= 900")
+    yield
+    with get_conn() as conn:
+        conn.execute("DROP TABLE IF EXISTS migration_test_t")
+        conn.execute("DELETE FROM executor_schema_migrations WHERE version >= 900")
+
+
+def test_precheck_refuses_and_lists_rows(scratch, monkeypatch):
+    m = Migration(
+        version=900,
+        name="test_precheck",
+        precheck="SELECT a, count(*) AS n FROM migration_test_t GROUP BY a HAVING count(*) > 1",
+        precheck_message="duplicates",
+        statements=["CREATE UNIQUE INDEX migration_test_uniq ON migration_test_t (a)"],
+    )
+    monkeypatch.setattr(migrations, "MIGRATIONS", [m])
+    with pytest.raises(MigrationError, match=r"duplicates\. Found: a=1, n=2"):
+        migrations.apply_migrations()
+    assert migrations.pending_versions() == [900]
+
+
+def test_failed_concurrent_build_leaves_no_invalid_index(scratch, monkeypatch):
+    from common.db import get_conn
+
+    m = Migration(
+        version=901,
+        name="test_invalid_index",
+        statements=["CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS migration_test_uniq ON migration_test_t (a)"],
+        transactional=False,
+    )
+    monkeypatch.setattr(migrations, "MIGRATIONS", [m])
+    with pytest.raises(Exception):
+        migrations.apply_migrations()
+
+    with get_conn() as conn:
+        assert conn.execute("SELECT to_regclass('migration_test_uniq') AS ix").fetchone()["ix"] is None
+        conn.execute("DELETE FROM migration_test_t WHERE a = 1")
+    assert migrations.apply_migrations() == [901]
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from executor.order_query import iter_orders, parse_ts
+
+T0 = datetime(2026, 3, 2, 14, 30, tzinfo=timezone.utc)
+
+
+class PagingClient:
+    """
+    GET /orders with the broker's paging rules: after/until are
+    exclusive bounds on submitted_at, `direction` sorts, `limit`
+    truncates. Ties keep insertion order, like an index would.
+    """
+
+    def __init__(self, orders):
+        self.orders = orders
+        self.calls = 0
+
+    def get(self, path, params):
+        assert path == "/orders"
+        self.calls += 1
+        assert self.calls < 1000, "paging does not terminate"
+        after = parse_ts(params.get("after"))
+        until = parse_ts(params.get("until"))
+        rows = [
+            o for o in self.orders
+            if (after is None or parse_ts(o["submitted_at"]) > after)
+            and (until is None or parse_ts(o["submitted_at"]) < until)
+            and (not params.get("side") or o["side"] == params["side"])
+        ]
+        rows.sort(key=lambda o: parse_ts(o["submitted_at"]), reverse=params["direction"] == "desc")
+        return rows[: params["limit"]]
+
+
+def _order(i, ts, side="buy"):
+    return {
+        "id": f"o{i}",
+        "symbol": "aapl",
+        "side": side,
+        "status": "filled",
+        "submitted_at": ts.strftime("%Y-%m-%dT%H:%M:%S.%fZ"),
+        "filled_at": None,
+    }
+
+
+def _ids(client, **kw):
+    return [r.id for r in iter_orders(client, status="all", **kw)]
+
+
+def test_pages_past_the_limit_without_duplicates():
+    orders = [_order(i, T0 + timedelta(seconds=i)) for i in range(23)]
+    ids = _ids(PagingClient(orders), page_size=5)
+    assert ids == [f"o{i}" for i in range(23)]
+
+
+def test_rows_projected_and_side_filtered():
+    orders = [_order(i, T0 + timedelta(seconds=i), side="buy" if i % 2 else "sell") for i in range(10)]
+    rows = list(iter_orders(PagingClient(orders), status="all", side="BUY", page_size=3))
+    assert [r.id for r in rows] == ["o1", "o3", "o5", "o7", "o9"]
+    assert rows[0].symbol == "AAPL"
+
+
+def test_overlap_rows_not_repeated_across_pages():
+    # several orders inside one cursor overlap, straddling page boundaries
+    orders = [_order(i, T0 + timedelta(microseconds=100 * i)) for i in range(12)]
+    ids = _ids(PagingClient(orders), page_size=4)
+    assert sorted(ids) == sorted(f"o{i}" for i in range(12))
+    assert len(ids) == len(set(ids))
+
+
+def test_more_than_a_page_inside_one_overlap_does_not_end_early():
+    # 9 orders within one millisecond, pages of 4
+    burst = [_order(i, T0 + timedelta(microseconds=10 * i)) for i in range(9)]
+    later = [_order(100 + i, T0 + timedelta(seconds=1 + i)) for i in range(3)]
+    ids = _ids(PagingClient(burst + later), page_size=4)
+    assert ids == [o["id"] for o in burst + later]
+
+
+def test_orders_tied_at_a_page_boundary_are_read():
+    # a full page ends inside a group sharing one submitted_at
+    head = [_order(i, T0 + timedelta(microseconds=i)) for i in range(2)]
+    ties = [_order(10 + i, T0 + timedelta(microseconds=5)) for i in range(3)]
+    tail = [_order(20, T0 + timedelta(seconds=2))]
+    ids = _ids(PagingClient(head + ties + tail), page_size=4)
+    assert sorted(ids) == sorted(o["id"] for o in head + ties + tail)
+    assert len(ids) == len(set(ids))
+
+
+@pytest.mark.parametrize("page_size", [1, 2, 3, 10])
+def test_dense_burst_then_tail(page_size):
+    orders = [_order(i, T0 + timedelta(microseconds=i)) for i in range(6)]
+    orders += [_order(50 + i, T0 + timedelta(minutes=1, seconds=i)) for i in range(4)]
+    ids = _ids(PagingClient(orders), page_size=page_size)
+    assert ids == [o["id"] for o in orders]
@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import gzip
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from common.partitions import (
+    PartitionError,
+    PartitionedTable,
+    _check_archive_dir,
+    _parse_bound,
+    partition_name,
+    period_end,
+    period_start,
+)
+
+UTC = timezone.utc
+
+
+@pytest.mark.parametrize(
+    "ts, interval, start, end",
+    [
+        (datetime(2026, 3, 4, 15, 30, tzinfo=UTC), "day", datetime(2026, 3, 4, tzinfo=UTC), datetime(2026, 3, 5, tzinfo=UTC)),
+        # weeks start on Monday
+        (datetime(2026, 3, 8, 23, 59, tzinfo=UTC), "week", datetime(2026, 3, 2, tzinfo=UTC), datetime(2026, 3, 9, tzinfo=UTC)),
+        (datetime(2026, 3, 9, 0, 0, tzinfo=UTC), "week", datetime(2026, 3, 9, tzinfo=UTC), datetime(2026, 3, 16, tzinfo=UTC)),
+        (datetime(2026, 2, 28, 12, tzinfo=UTC), "month", datetime(2026, 2, 1, tzinfo=UTC), datetime(2026, 3, 1, tzinfo=UTC)),
+        (datetime(2026, 12, 31, 23, tzinfo=UTC), "month", datetime(2026, 12, 1, tzinfo=UTC), datetime(2027, 1, 1, tzinfo=UTC)),
+        # periods are UTC whatever the input's zone
+        (datetime(2026, 3, 31, 22, tzinfo=timezone(timedelta(hours=-5))), "month", datetime(2026, 4, 1, tzinfo=UTC), datetime(2026, 5, 1, tzinfo=UTC)),
+    ],
+)
+def test_period_bounds(ts, interval, start, end):
+    assert period_start(ts, interval) == start
+    assert period_end(start, interval) == end
+
+
+@pytest.mark.parametrize("interval", ["day", "week", "month"])
+def test_periods_tile_without_gaps(interval):
+    start = period_start(datetime(2025, 11, 17, 8, tzinfo=UTC), interval)
+    for _ in range(40):
+        end = period_end(start, interval)
+        assert end > start
+        assert period_start(end, interval) == end
+        assert period_start(end - timedelta(microseconds=1), interval) == start
+        start = end
+
+
+def test_settings_come_from_the_executor_config(monkeypatch):
+    from executor.config import load_settings
+
+    monkeypatch.setenv("PARTITION_INTERVAL", "week")
+    monkeypatch.setenv("PARTITION_PREMAKE", "5")
+    ps = load_settings().partition_settings()
+    assert (ps.interval, ps.premake, ps.retire) == ("week", 5, "detach")
+    assert period_start(datetime(2026, 3, 8, tzinfo=UTC), ps.interval) == datetime(2026, 3, 2, tzinfo=UTC)
+    # without settings: monthly, whatever the environment says
+    assert period_start(datetime(2026, 3, 8, tzinfo=UTC)) == datetime(2026, 3, 1, tzinfo=UTC)
+
+
+def test_common_does_not_import_the_executor():
+    import subprocess
+    import sys
+
+    code = "import sys, common.partitions; print(any(m.startswith('executor') for m in sys.modules))"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "False"
+
+
+def test_bad_interval():
+    with pytest.raises(PartitionError):
+        period_start(datetime(2026, 1, 1, tzinfo=UTC), "year")
+    with pytest.raises(PartitionError):
+        period_end(datetime(2026, 1, 1, tzinfo=UTC), "year")
+
+
+def test_names_and_bounds():
+    assert partition_name("trade_events", datetime(2026, 3, 2, tzinfo=UTC)) == "trade_events_p20260302"
+    assert _parse_bound("MINVALUE") is None
+    assert _parse_bound("'2026-03-02 00:00:00+00'") == datetime(2026, 3, 2, tzinfo=UTC)
+
+
+def test_archive_dir_must_be_absolute(tmp_path):
+    _check_archive_dir(str(tmp_path))
+    for bad in ("", "archive", "./archive"):
+        with pytest.raises(PartitionError):
+            _check_archive_dir(bad)
+
+
+# ---------------------------------------------------------
+# Postgres (BENCH_DATABASE_URL)
+# ---------------------------------------------------------
+
+SPEC = PartitionedTable(name="partition_test_events", key=("id",))
+
+
+@pytest.fixture
+def events(pg):
+    from common.db import get_conn
+
+    with get_conn() as conn:
+        conn.execute(f"DROP TABLE IF EXISTS {SPEC.name} CASCADE")
+        conn.execute(f"CREATE TABLE {SPEC.name} (id bigint, ts timestamptz NOT NULL) PARTITION BY RANGE (ts)")
+        conn.execute(
+            f"CREATE TABLE {SPEC.name}_p20200101 PARTITION OF {SPEC.name} "
+            "FOR VALUES FROM ('2020-01-01') TO ('2020-02-01')"
+        )
+        conn.execute(f"INSERT INTO {SPEC.name} VALUES (1, '2020-01-15'), (2, '2020-01-16')")
+    yield SPEC
+    with get_conn() as conn:
+        conn.execute(f"DROP TABLE IF EXISTS {SPEC.name} CASCADE")
+        conn.execute(f"DROP TABLE IF EXISTS {SPEC.name}_p20200101")
+
+
+def test_ensure_creates_current_and_ahead(events):
+    from common.db import get_conn
+    from common.partitions import ensure_partitions, list_partitions
+
+    created = ensure_partitions(events, interval="month", premake=2)
+    assert len(created) == 3
+    assert ensure_partitions(events, interval="month", premake=2) == []
+
+    with get_conn() as conn:
+        parts = list_partitions(conn, events.name)
+        conn.execute(f"INSERT INTO {events.name} VALUES (3, now())")
+    assert {p["name"] for p in parts} >= set(created)
+
+
+def test_retire_detaches_past_retention(events):
+    from common.db import get_conn
+    from common.partitions import ensure_partitions, list_partitions, retire_partitions
+
+    ensure_partitions(events, interval="month", premake=0)
+    assert retire_partitions(events, retention_days=30, mode="detach") == [f"{events.name}_p20200101"]
+
+    with get_conn() as conn:
+        names = {p["name"] for p in list_partitions(conn, events.name)}
+        kept = conn.execute(f"SELECT count(*) AS n FROM {events.name}_p20200101").fetchone()["n"]
+    assert f"{events.name}_p20200101" not in names
+    assert kept == 2
+
+
+def test_retire_archives_to_absolute_dir(events, tmp_path):
+    from common.db import get_conn
+    from common.partitions import retire_partitions
+
+    assert retire_partitions(events, retention_days=30, mode="archive", archive_dir=str(tmp_path))
+
+    path = tmp_path / events.name / f"{events.name}_p20200101.csv.gz"
+    with gzip.open(path, "rt") as f:
+        lines = f.read().splitlines()
+    assert lines[0] == "id,ts" and len(lines) == 3
+    with get_conn() as conn:
+        assert conn.execute("SELECT to_regclass(%s) AS t", (f"{events.name}_p20200101",)).fetchone()["t"] is None
+
+
+def test_archive_refuses_relative_dir(events):
+    from common.partitions import retire_partitions
+
+    with pytest.raises(PartitionError):
+        retire_partitions(events, retention_days=30, mode="archive", archive_dir="archive")
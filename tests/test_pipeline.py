@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import threading
+import time
+
+import pytest
+
+from executor.pipeline import DrainPipeline
+
+
+class _Source:
+    def __init__(self, batches: int, size: int = 3):
+        self.batches = [[{"intent_id": f"{b}-{i}"} for i in range(size)] for b in range(batches)]
+        self.claimed = []
+        self._lock = threading.Lock()
+
+    def claim(self):
+        with self._lock:
+            if not self.batches:
+                return []
+            batch = self.batches.pop(0)
+            self.claimed.extend(i["intent_id"] for i in batch)
+            return batch
+
+
+@pytest.mark.parametrize("depth", [0, 1, 3])
+def test_drains_everything_in_order(depth):
+    src = _Source(5)
+    written = []
+    pipe = DrainPipeline(claim=src.claim, write=written.extend, depth=depth).start()
+
+    while (batch := pipe.next_batch()) is not None:
+        pipe.write([i["intent_id"] for i in batch])
+    assert pipe.close() == []
+
+    assert written == src.claimed
+    assert len(written) == 15
+    assert set(pipe.occupancy()) == {"claim", "execute", "write"}
+
+
+@pytest.mark.parametrize("depth", [1, 2])
+def test_close_returns_prefetched_batches(depth):
+    src = _Source(10)
+    written = []
+    pipe = DrainPipeline(claim=src.claim, write=written.extend, depth=depth).start()
+
+    pipe.write([i["intent_id"] for i in pipe.next_batch()])
+    time.sleep(0.1)  # let the claimer run ahead
+    leftover = [i["intent_id"] for i in pipe.close()]
+
+    assert leftover
+    # every claimed intent was either executed or handed back, once
+    assert sorted(written + leftover) == sorted(src.claimed)
+    assert pipe.close() == []
+
+
+def test_failed_write_back_is_raised_on_close():
+    src = _Source(2)
+
+    def write(results):
+        raise RuntimeError("db down")
+
+    pipe = DrainPipeline(claim=src.claim, write=write, depth=1).start()
+    pipe.write(pipe.next_batch())
+    with pytest.raises(RuntimeError, match="db down"):
+        pipe.close()
+
+
+def test_failed_write_back_can_be_logged_instead():
+    src = _Source(3)
+
+    def write(results):
+        raise RuntimeError("db down")
+
+    pipe = DrainPipeline(claim=src.claim, write=write, depth=1).start()
+    pipe.write(pipe.next_batch())
+    time.sleep(0.1)
+    leftover = pipe.close(raise_errors=False)
+    assert all(isinstance(i, dict) for i in leftover)
+
+
+def test_claim_error_surfaces_in_next_batch():
+    def claim():
+        raise ValueError("lease lost")
+
+    pipe = DrainPipeline(claim=claim, write=lambda r: None, depth=1).start()
+    with pytest.raises(ValueError, match="lease lost"):
+        pipe.next_batch()
+    assert pipe.next_batch() is None
+    pipe.close()
+
+
+def test_release_prefetched_hands_back_only_this_claim(pg):
+    import uuid
+
+    from common.db import get_conn
+    from executor.intents import claim_next_intents
+    from executor.runners.intent_runner import _release_prefetched
+
+    run_id = str(uuid.uuid4())
+    with get_conn() as conn:
+        for i in range(6):
+            conn.execute(
+                "INSERT INTO strategy_intents (intent_id, run_id, executor, symbol, priority) VALUES (%s, %s, 'stocks', %s, %s)",
+                (str(uuid.uuid4()), run_id, f"S{i}", 6 - i),
+            )
+
+    batches = [claim_next_intents(run_id=run_id, executor="stocks", limit=2) for _ in range(3)]
+    executed, prefetched = batches[0], batches[1] + batches[2]
+
+    pipe = DrainPipeline(claim=lambda: batches.pop(0) if batches else [], write=lambda r: None, depth=2).start()
+    assert pipe.next_batch() == executed
+    time.sleep(0.1)
+
+    # one prefetched intent was reaped and claimed again meanwhile
+    stolen = str(prefetched[0]["intent_id"])
+    with get_conn() as conn:
+        conn.execute(
+            "UPDATE strategy_intents SET dispatched_ts = now() + interval '1 second' WHERE intent_id = %s",
+            (stolen,),
+        )
+
+    _release_prefetched(pipe)
+
+    with get_conn() as conn:
+        rows = conn.execute(
+            "SELECT intent_id FROM strategy_intents WHERE run_id = %s AND dispatched_ts IS NULL",
+            (run_id,),
+        ).fetchall()
+    assert {str(r["intent_id"]) for r in rows} == {str(i["intent_id"]) for i in prefetched[1:]}
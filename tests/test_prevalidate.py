@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import uuid
+
+import pytest
+
+from executor.prevalidate import check_intent, find_rejects, prevalidate_run
+
+GOOD = {"side": "buy", "entry_type": "market", "time_in_force": "day"}
+
+
+def _row(intent_id, symbol="AAPL", **pc):
+    return {"intent_id": intent_id, "symbol": symbol, "planning_context": {**GOOD, **pc}}
+
+
+@pytest.mark.parametrize(
+    "row, reason",
+    [
+        ({"symbol": " ", "planning_context": GOOD}, "missing_symbol"),
+        ({"symbol": "A", "planning_context": None}, "missing_or_bad_side"),
+        ({"symbol": "A", "planning_context": ["buy"]}, "planning_context_not_object"),
+        (_row("x", side="hold"), "missing_or_bad_side"),
+        (_row("x", entry_type="stop"), "missing_or_bad_entry_type"),
+        (_row("x", time_in_force="ioc"), "missing_or_bad_time_in_force"),
+        (_row("x", entry_type="limit"), "limit_missing_limit_price"),
+        (_row("x", entry_type="limit", limit_price="0"), "invalid_limit_price"),
+        (_row("x", entry_type="limit", limit_price="abc"), "invalid_limit_price"),
+        (_row("x", qty="1.5"), "invalid_qty"),
+    ],
+)
+def test_check_intent_reasons(row, reason):
+    assert check_intent(row) == (False, reason)
+
+
+def test_check_intent_ok():
+    assert check_intent(_row("x", entry_type="limit", limit_price="12.5", qty=3)) == (True, "ok")
+
+
+def test_duplicates_per_symbol_and_side():
+    rows = [
+        _row("a1", "aapl"),
+        _row("a2", "AAPL "),            # same symbol + side: duplicate of a1
+        _row("a3", "AAPL", side="sell"),  # other side: kept
+        _row("b1", "MSFT", side="hold"),  # invalid: rejected, does not claim the key
+        _row("b2", "MSFT"),
+        _row("b3", "MSFT"),
+    ]
+    rejects = dict(find_rejects(rows))
+    assert set(rejects) == {"a2", "b1", "b3"}
+    assert rejects["a2"] == {
+        "ok": False, "reason": "duplicate_symbol_in_run", "stage": "prevalidate", "kept_intent_id": "a1",
+    }
+    assert rejects["b1"]["reason"] == "missing_or_bad_side"
+    assert rejects["b3"]["kept_intent_id"] == "b2"
+
+
+def test_only_rows_still_unclaimed_are_counted(pg):
+    from common.db import get_conn
+
+    run_id = str(uuid.uuid4())
+    ids = [str(uuid.uuid4()) for _ in range(3)]
+    with get_conn() as conn:
+        for i, intent_id in enumerate(ids):
+            conn.execute(
+                "INSERT INTO strategy_intents (intent_id, run_id, executor, symbol, priority, source_facts) "
+                "VALUES (%s, %s, 'stocks', 'DUP', %s, jsonb_build_object('planning_context', %s::jsonb))",
+                (intent_id, run_id, 3 - i, '{"side": "buy", "entry_type": "market", "time_in_force": "day"}'),
+            )
+
+    # a drain claims one of the duplicates between the read and the UPDATE
+    def schedule(survivors):
+        with get_conn() as conn:
+            conn.execute("UPDATE strategy_intents SET dispatched_ts = now() WHERE intent_id = %s", (ids[2],))
+        return []
+
+    out = prevalidate_run(run_id=run_id, executor="stocks", schedule=schedule)
+    assert out == {"pending": 3, "rejected": 1, "unscheduled": 0, "survivors": 2}
+
+    with get_conn() as conn:
+        rows = conn.execute(
+            "SELECT intent_id, dispatched_ok FROM strategy_intents WHERE run_id = %s", (run_id,)
+        ).fetchall()
+    assert {str(r["intent_id"]): r["dispatched_ok"] for r in rows} == {ids[0]: None, ids[1]: False, ids[2]: None}
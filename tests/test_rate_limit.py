@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import pytest
+
+from executor.rate_limit import (
+    READ,
+    SUBMIT,
+    BrokerBudget,
+    RateLimitedClient,
+    TokenBucket,
+    retryable,
+)
+
+
+def test_burst_then_wait():
+    b = TokenBucket(rate_per_sec=10.0, burst=3)
+    assert [b.try_acquire(SUBMIT) for _ in range(3)] == [0.0, 0.0, 0.0]
+    wait = b.try_acquire(SUBMIT)
+    assert 0.05 < wait <= 0.1
+
+
+def test_reads_leave_the_submit_reserve():
+    b = TokenBucket(rate_per_sec=0.001, burst=4, submit_reserve=2)
+    assert b.try_acquire(READ) == 0.0
+    assert b.try_acquire(READ) == 0.0
+    # two tokens left: reads may not take them, submits may
+    assert b.try_acquire(READ) > 0
+    assert b.try_acquire(SUBMIT) == 0.0
+    assert b.try_acquire(SUBMIT) == 0.0
+    assert b.try_acquire(SUBMIT) > 0
+
+
+def test_small_burst_keeps_one_usable_token():
+    b = TokenBucket(rate_per_sec=1.0, burst=0.4, submit_reserve=3)
+    assert b.burst == 1.0
+    assert b.submit_reserve == 0.0
+    assert b.try_acquire(READ) == 0.0
+
+
+def test_penalize_drains_the_bucket():
+    b = TokenBucket(rate_per_sec=10.0, burst=5)
+    b.penalize(0.5)
+    assert b.try_acquire(SUBMIT) == pytest.approx(0.6, abs=0.02)
+
+
+def test_budget_share():
+    account = BrokerBudget(200.0, 10.0, 3.0)
+    assert account.share(4) == BrokerBudget(50.0, 2.5, 0.75)
+    assert account.share(0) == account
+
+
+def test_retry_policy():
+    assert retryable(SUBMIT, 429)
+    assert not retryable(SUBMIT, 503)
+    assert retryable(READ, 503)
+    assert not retryable(READ, 404)
+    assert not retryable(READ, None)
+
+
+class _Err(Exception):
+    def __init__(self, status_code: int):
+        super().__init__(status_code)
+        self.status_code = status_code
+
+
+class _Client:
+    def __init__(self, fail: int, status: int):
+        self.fail = fail
+        self.status = status
+        self.calls = 0
+
+    def get_account(self):
+        self.calls += 1
+        if self.calls <= self.fail:
+            raise _Err(self.status)
+        return "ok"
+
+    def submit_order(self, order):
+        self.calls += 1
+        raise _Err(self.status)
+
+
+def _wrapped(client):
+    bucket = TokenBucket(rate_per_sec=1000.0, burst=100)
+    return RateLimitedClient(client, bucket, max_retries=3, backoff_base_sec=0.001, backoff_max_sec=0.002)
+
+
+def test_reads_retried_on_5xx():
+    c = _Client(fail=2, status=502)
+    assert _wrapped(c).get_account() == "ok"
+    assert c.calls == 3
+
+
+def test_submit_not_resent_after_5xx():
+    c = _Client(fail=1, status=500)
+    with pytest.raises(_Err):
+        _wrapped(c).submit_order(object())
+    assert c.calls == 1
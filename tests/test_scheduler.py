@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import itertools
+import random
+
+import pytest
+
+from executor.registry import get_handler
+from executor.scheduler import Capacity, capacity, run_position_cap, schedule_rows, select
+from executor.snapshot import AccountSnapshot
+
+
+def _brute(values, costs, k, budget):
+    n = len(values)
+    k = n if k is None else min(k, n)
+    best = 0.0
+    for r in range(k + 1):
+        for combo in itertools.combinations(range(n), r):
+            if budget is None or sum(costs[i] for i in combo) <= budget + 1e-9:
+                best = max(best, sum(values[i] for i in combo))
+    return best
+
+
+def _check(values, costs, k, budget):
+    picked = select(values, costs, k=k, budget=budget)
+    assert picked == sorted(set(picked))
+    if k is not None:
+        assert len(picked) <= k
+    if budget is not None:
+        assert sum(costs[i] for i in picked) <= budget + 1e-9
+    assert sum(values[i] for i in picked) == pytest.approx(_brute(values, costs, k, budget))
+
+
+@pytest.mark.parametrize("seed", range(60))
+def test_select_is_optimal_against_brute_force(seed):
+    rng = random.Random(seed)
+    n = rng.randint(0, 10)
+    values = [float(rng.randint(0, 9)) for _ in range(n)]
+    costs = [float(rng.choice([0, 50, 100, 150, 300, 700])) for _ in range(n)]
+    k = rng.choice([None, 0, 1, 2, 3, 5, n])
+    budget = rng.choice([None, 0.0, 120.0, 400.0, 1000.0])
+    _check(values, costs, k, budget)
+
+
+def test_greedy_is_not_enough():
+    # top priority alone eats the budget; the next two together are worth more
+    values = [10.0, 7.0, 6.0]
+    costs = [900.0, 500.0, 500.0]
+    assert select(values, costs, k=None, budget=1000.0) == [1, 2]
+
+
+def test_ties_prefer_cheaper_then_input_order():
+    assert select([5.0, 5.0, 5.0], [300.0, 100.0, 100.0], k=2, budget=None) == [1, 2]
+
+
+def test_capacity_count():
+    assert Capacity(slots=3, trades=1, buying_power=None).count == 1
+    assert Capacity(slots=None, trades=None, buying_power=None).count is None
+    assert Capacity(slots=-2, trades=None, buying_power=None).count == 0
+    assert Capacity(slots=3, trades=1, buying_power=None).count_reason() == "max_trades_per_day_reached"
+    assert Capacity(slots=1, trades=4, buying_power=None).count_reason() == "max_positions_reached"
+
+
+@pytest.fixture
+def settings(monkeypatch):
+    from executor.config import reload_settings
+
+    def apply(**env):
+        for k, v in env.items():
+            monkeypatch.setenv(k, str(v))
+        reload_settings()
+
+    yield apply
+    monkeypatch.undo()
+    reload_settings()
+
+
+def _snap(buying_power=None, positions=()):
+    return AccountSnapshot(
+        positions={s: 1.0 for s in positions}, open_buy_symbols={}, filled_buys_today=0,
+        buying_power=buying_power,
+    )
+
+
+def _intent(i, priority, notional, run_cap=None):
+    return {
+        "intent_id": f"i{i}",
+        "symbol": f"S{i}",
+        "priority": priority,
+        "planning_context": {"side": "buy", "qty": 1, "limit_price": notional},
+        "run_position_cap": run_cap,
+    }
+
+
+def _reasons(rejects):
+    return {intent_id: d["reason"] for intent_id, d in rejects}
+
+
+def test_unchosen_rows_get_their_binding_reason(settings):
+    pytest.importorskip("numpy")
+    settings(MAX_STOCKS_POSITIONS=2, MAX_STOCKS_TRADES_PER_DAY=0)
+    rows = [
+        _intent(0, 9, 400.0),
+        _intent(1, 8, 400.0),
+        _intent(2, 7, 100.0),  # fits the money left, not the slots
+        _intent(3, 6, 900.0),  # would not fit even with a free slot
+    ]
+    rejects = schedule_rows(rows, handler=get_handler("stocks"), snapshot=_snap(buying_power=1000.0))
+    assert _reasons(rejects) == {"i2": "max_positions_reached", "i3": "insufficient_buying_power"}
+
+
+def test_free_slots_left_means_buying_power(settings):
+    pytest.importorskip("numpy")
+    settings(MAX_STOCKS_POSITIONS=5, MAX_STOCKS_TRADES_PER_DAY=0)
+    rows = [_intent(0, 9, 800.0), _intent(1, 8, 800.0)]
+    rejects = schedule_rows(rows, handler=get_handler("stocks"), snapshot=_snap(buying_power=1000.0))
+    assert _reasons(rejects) == {"i1": "insufficient_buying_power"}
+
+
+def test_penny_capacity_honors_run_position_cap(settings):
+    settings(MAX_PENNY_POSITIONS=5, MAX_PENNY_TRADES_PER_DAY=0)
+    rows = [_intent(0, 1, 10.0, run_cap=2), _intent(1, 1, 10.0, run_cap=2), _intent(2, 1, 10.0, run_cap=True)]
+    assert run_position_cap(rows) == 2
+    assert run_position_cap([_intent(0, 1, 10.0)]) is None
+
+    snap = _snap(positions=["HELD"])
+    assert capacity(get_handler("penny"), snap, run_cap=2).count == 1
+    assert capacity(get_handler("penny"), snap).count == 4
+    # stocks does not read run_position_cap
+    settings(MAX_STOCKS_POSITIONS=5)
+    assert capacity(get_handler("stocks"), snap, run_cap=2).count == 4
+
+
+def test_penny_schedule_rejects_past_run_position_cap(settings):
+    pytest.importorskip("numpy")
+    settings(MAX_PENNY_POSITIONS=5, MAX_PENNY_TRADES_PER_DAY=0)
+    rows = [_intent(i, 5 - i, 10.0, run_cap=2) for i in range(4)]
+    rejects = schedule_rows(rows, handler=get_handler("penny"), snapshot=_snap())
+    assert _reasons(rejects) == {"i2": "max_positions_reached", "i3": "max_positions_reached"}
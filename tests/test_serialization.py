@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+import json
+from decimal import Decimal
+
+from common.serialization import bounded, dumps, dumps_str, loads
+
+
+def test_roundtrip_and_str_fallback():
+    obj = {"a": 1, "b": [1.5, None, True], "price": Decimal("1.25")}
+    assert loads(dumps(obj)) == {"a": 1, "b": [1.5, None, True], "price": "1.25"}
+    assert json.loads(dumps_str(obj))["price"] == "1.25"
+
+
+def test_bounded_small_detail_unchanged():
+    detail = {"ok": True, "reason": "submitted", "n": 3}
+    assert json.loads(bounded(detail, 1024)) == detail
+
+
+def test_bounded_zero_means_unbounded():
+    detail = {"ok": False, "blob": "x" * 10_000}
+    assert json.loads(bounded(detail, 0)) == detail
+
+
+def test_bounded_keeps_core_keys_as_valid_json():
+    detail = {
+        "ok": False,
+        "reason": "broker_error",
+        "error": "e" * 2000,
+        "alpaca_order_id": "abc",
+        "response": {"body": "y" * 10_000},
+    }
+    out = bounded(detail, 512)
+    assert len(out) <= 512
+    parsed = json.loads(out)
+    assert parsed["truncated"] is True
+    assert parsed["bytes"] == len(dumps(detail))
+    assert parsed["reason"] == "broker_error"
+    assert parsed["alpaca_order_id"] == "abc"
+    assert parsed["error"] == "e" * 300
+    assert "response" not in parsed
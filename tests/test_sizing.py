@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import math
+import random
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from executor.sizing import OK, REASONS, Sized, cap_detail, size_arrays, size_intents, sizing_for
+from executor.snapshot import AccountSnapshot
+
+NAN = math.nan
+
+
+def _one(qty, entry, stop, max_risk, max_notional, price, is_buy):
+    """Scalar reference for one row of size_arrays."""
+    if not math.isnan(qty):
+        return (int(qty), OK, qty * price if is_buy and price > 0 else 0.0) if qty > 0 else (0, "invalid_qty", 0.0)
+    rps = abs(entry - stop)
+    if not math.isnan(rps) and not math.isnan(max_risk) and rps > 0:
+        q = math.floor(max_risk / rps)
+    elif max_notional > 0 and entry > 0:
+        q = math.floor(max_notional / entry)
+    else:
+        return 0, "missing_qty_and_sizing_inputs", 0.0
+    if not q > 0:
+        return 0, "qty_zero_after_sizing", 0.0
+    return q, OK, q * price if is_buy and price > 0 else 0.0
+
+
+def test_size_arrays_matches_scalar_reference():
+    rng = random.Random(7)
+
+    def maybe(v):
+        return NAN if rng.random() < 0.3 else v
+
+    rows = []
+    for _ in range(400):
+        entry = maybe(round(rng.uniform(0.5, 300), 2))
+        rows.append(
+            (
+                maybe(float(rng.choice([-1, 0, 1, 5, 40]))),
+                entry,
+                maybe(round(entry * rng.uniform(0.8, 1.0), 2) if not math.isnan(entry) else 10.0),
+                maybe(rng.choice([0.0, 25.0, 500.0])),
+                maybe(rng.choice([0.0, 100.0, 5000.0])),
+                entry,
+                rng.random() < 0.7,
+            )
+        )
+
+    cols = list(zip(*rows))
+    qty, code, notional, unit, given = size_arrays(
+        qty=cols[0], entry=cols[1], stop=cols[2], max_risk=cols[3],
+        max_notional=cols[4], price=cols[5], is_buy=cols[6],
+    )
+    for i, row in enumerate(rows):
+        q, reason, n = _one(*row)
+        assert (int(qty[i]), REASONS[code[i]]) == (q, reason), row
+        assert notional[i] == pytest.approx(n), row
+        assert bool(given[i]) == (not math.isnan(row[0]))
+
+
+def _intent(**pc):
+    return {"source_facts": {"planning_context": pc}}
+
+
+def test_size_intents_from_planning_context():
+    sized = size_intents(
+        [
+            _intent(side="buy", qty=7, limit_price=10),
+            _intent(side="buy", stop_loss=95, max_risk_usd=50, meta={"entry_price_hint": 100}),
+            _intent(side="sell", max_notional_usd=1000, meta={"entry_price_hint": 30}),
+            _intent(side="buy", qty="seven"),
+            _intent(side="buy"),
+        ]
+    )
+    assert sized[0] == Sized(qty=7, reason=OK, notional=70.0, price=10.0, explicit=True)
+    assert (sized[1].qty, sized[1].notional, sized[1].explicit) == (10, 1000.0, False)
+    assert (sized[2].qty, sized[2].price) == (33, 0.0)
+    assert sized[3].reason == "invalid_qty"
+    assert sized[4].reason == "missing_qty_and_sizing_inputs"
+
+
+def test_sizing_for_uses_the_batch_plan():
+    intent = _intent(side="buy", qty=3, limit_price=2)
+    assert sizing_for(intent).qty == 3
+    intent["sizing"] = Sized(qty=9, reason=OK)
+    assert sizing_for(intent).qty == 9
+
+
+def test_cap_detail():
+    s = Sized(qty=10, reason=OK, notional=1000.0, price=100.0)
+    assert cap_detail(s, 10) == {}
+    assert cap_detail(s, 4) == {"requested_qty": 10, "capped": True}
+
+
+CAPS = dict(max_trades_per_day=0, max_positions=9)
+
+
+def _snap(buying_power):
+    return AccountSnapshot(positions={}, open_buy_symbols={}, filled_buys_today=0, buying_power=buying_power)
+
+
+def test_fund_entry_fits_to_buying_power():
+    s = _snap(1000.0)
+    assert s.fund_entry("A", qty=6, price=100.0, **CAPS) == (6, None)
+    assert s.available_buying_power() == pytest.approx(400.0)
+    assert s.fund_entry("B", qty=6, price=100.0, **CAPS) == (4, None)
+    qty, denied = s.fund_entry("C", qty=1, price=100.0, **CAPS)
+    assert (qty, denied["reason"]) == (0, "insufficient_buying_power")
+
+
+def test_fund_entry_without_fit_is_all_or_nothing():
+    s = _snap(500.0)
+    qty, denied = s.fund_entry("A", qty=6, price=100.0, fit=False, **CAPS)
+    assert (qty, denied["reason"]) == (0, "insufficient_buying_power")
+    assert s.fund_entry("A", qty=5, price=100.0, fit=False, **CAPS) == (5, None)
+
+
+def test_release_returns_and_confirm_commits_the_notional():
+    s = _snap(1000.0)
+    s.fund_entry("A", qty=3, price=100.0, **CAPS)
+    s.fund_entry("B", qty=3, price=100.0, **CAPS)
+    assert s.release("A") == pytest.approx(300.0)
+    s.confirm("B")
+    assert s.committed_notional == pytest.approx(300.0)
+    assert s.available_buying_power() == pytest.approx(700.0)
+
+
+def test_unpriced_entry_not_funded():
+    s = _snap(0.0)
+    assert s.fund_entry("A", qty=5, price=0.0, **CAPS) == (5, None)
@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import threading
+
+from executor.snapshot import NO_FOREIGN, AccountSnapshot
+
+
+def _snap(**kw) -> AccountSnapshot:
+    kw.setdefault("positions", {})
+    kw.setdefault("open_buy_symbols", {})
+    kw.setdefault("filled_buys_today", 0)
+    return AccountSnapshot(**kw)
+
+
+CAPS = dict(max_trades_per_day=10, max_positions=3)
+
+
+def test_reserve_counts_toward_every_cap_until_released():
+    s = _snap()
+    assert s.reserve_entry("aapl", **CAPS) is None
+    assert s.buys_today() == 1
+    assert s.open_positions() == 1
+    assert s.has_open_buy("AAPL")
+
+    # same symbol again: the reservation is a pending buy
+    assert s.reserve_entry("AAPL", **CAPS)["reason"] == "skip_open_buy_order"
+
+    s.release("AAPL")
+    assert s.buys_today() == 0
+    assert s.open_positions() == 0
+    assert not s.has_open_buy("AAPL")
+
+
+def test_confirm_turns_the_reservation_into_a_submit():
+    s = _snap()
+    assert s.reserve_entry("AAPL", **CAPS) is None
+    s.confirm("AAPL")
+    assert s.reserved == {}
+    assert s.submitted_buys == 1
+    assert s.buys_today() == 1
+    assert s.has_open_buy("AAPL")
+
+
+def test_caps():
+    s = _snap(positions={"MSFT": 1.0}, filled_buys_today=1)
+    assert s.reserve_entry("MSFT", **CAPS)["reason"] == "skip_already_in_position"
+    assert s.reserve_entry("A", max_trades_per_day=2, max_positions=9) is None
+    assert s.reserve_entry("B", max_trades_per_day=2, max_positions=9)["reason"] == "max_trades_per_day_reached"
+    assert s.reserve_entry("C", max_trades_per_day=0, max_positions=2)["reason"] == "max_positions_reached"
+
+
+def test_pending_counts_as_position():
+    s = _snap(open_buy_symbols={"X": 1})
+    denied = s.reserve_entry("A", max_trades_per_day=0, max_positions=1, pending_counts_as_position=True)
+    assert denied["reason"] == "max_positions_reached"
+    assert denied["pending_buys"] == 1
+
+
+def test_concurrent_reservations_never_exceed_the_cap():
+    s = _snap()
+    granted = []
+    start = threading.Barrier(16)
+
+    def take(i: int) -> None:
+        start.wait()
+        if s.reserve_entry(f"S{i}", max_trades_per_day=0, max_positions=5) is None:
+            granted.append(i)
+
+    threads = [threading.Thread(target=take, args=(i,)) for i in range(16)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(granted) == 5
+    assert s.open_positions() == 5
+
+
+class _FakeLedger:
+    """SharedLedger stand-in: runs check() like the real one."""
+
+    def __init__(self, *, fail_insert: bool = False, during=None):
+        self.fail_insert = fail_insert
+        self.during = during
+        self.released = []
+        self.confirmed = []
+
+    def reserve(self, symbol, *, since, check):
+        during, self.during = self.during, None
+        if during is not None:
+            during()
+        notional, denied = check(NO_FOREIGN)
+        if denied:
+            return 0.0, denied
+        if self.fail_insert:
+            return 0.0, {"ok": False, "reason": "ledger_unavailable"}
+        return notional, None
+
+    def release(self, symbol):
+        self.released.append(symbol)
+
+    def confirm(self, symbol):
+        self.confirmed.append(symbol)
+
+
+def test_ledger_round_trip_runs_without_the_local_lock():
+    s = _snap()
+    seen = []
+
+    def other_thread_reserves():
+        t = threading.Thread(target=lambda: seen.append(s.reserve_entry("MSFT", **CAPS)))
+        t.start()
+        t.join(2)
+        assert not t.is_alive(), "local lock held across the ledger call"
+
+    s.ledger = _FakeLedger(during=other_thread_reserves)
+    assert s.reserve_entry("AAPL", **CAPS) is None
+    assert seen == [None]
+    assert s.open_positions() == 2
+
+
+def test_failed_ledger_write_gives_the_local_slot_back():
+    s = _snap(buying_power=1000.0)
+    s.ledger = _FakeLedger(fail_insert=True)
+    qty, denied = s.fund_entry("AAPL", qty=5, price=100.0, **CAPS)
+    assert (qty, denied["reason"]) == (0, "ledger_unavailable")
+    assert s.reserved == {} and s.reserved_notional == {}
+    assert s.available_buying_power() == 1000.0
+
+
+def test_release_and_confirm_reach_the_ledger():
+    s = _snap()
+    s.ledger = _FakeLedger()
+    s.reserve_entry("A", **CAPS)
+    s.reserve_entry("B", **CAPS)
+    s.release("A")
+    s.confirm("B")
+    assert (s.ledger.released, s.ledger.confirmed) == (["A"], ["B"])
+    assert s.buys_today() == 1
+
+
+def test_shared_ledger_override(monkeypatch):
+    from executor import ledger
+
+    monkeypatch.setattr(ledger, "_enabled", None)
+    assert ledger.shared_ledger_enabled() is False  # default off
+    ledger.set_shared_ledger(True)
+    assert ledger.shared_ledger_enabled() is True
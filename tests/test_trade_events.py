@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+
+import psycopg
+import pytest
+
+from common import logging as trade_events
+from common.metrics import REGISTRY
+
+
+class _Cursor:
+    def __init__(self, db):
+        self.db = db
+
+    @contextmanager
+    def copy(self, sql):
+        self.db.calls.append("copy")
+        if self.db.copy_error is not None:
+            raise self.db.copy_error
+        yield self
+
+    def write_row(self, row):
+        pass
+
+    def execute(self, sql, row):
+        self.db.calls.append("insert")
+        if row[2] == "BAD":
+            raise psycopg.DataError("bad row")
+        if self.db.insert_error is not None:
+            raise self.db.insert_error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class _DB:
+    """
+    Stands in for common.db.get_conn(): every borrow is a context
+    manager whose connection hands out _Cursor.
+    """
+
+    def __init__(self, copy_error=None, insert_error=None):
+        self.copy_error = copy_error
+        self.insert_error = insert_error
+        self.calls = []
+
+    @contextmanager
+    def conn(self):
+        yield self
+
+    def cursor(self):
+        return _Cursor(self)
+
+
+def _rows(*symbols):
+    return [(None, None, s, "submit", "test", None, {}) for s in symbols]
+
+
+@pytest.fixture
+def db(monkeypatch):
+    def install(**kw):
+        fake = _DB(**kw)
+        monkeypatch.setattr(trade_events, "_get_conn", fake.conn)
+        return fake
+
+    return install
+
+
+def test_copy_writes_the_batch(db):
+    fake = db()
+    assert trade_events._write_rows(_rows("A", "B")) == 2
+    assert fake.calls == ["copy"]
+
+
+def test_rejected_copy_retries_row_by_row(db):
+    fake = db(copy_error=psycopg.DataError("bad row"))
+    assert trade_events._write_rows(_rows("A", "BAD", "C")) == 2
+    assert fake.calls == ["copy", "insert", "insert", "insert"]
+
+
+@pytest.mark.parametrize("err", [psycopg.OperationalError("connection lost"), RuntimeError("pool timeout")])
+def test_connection_error_gives_up_on_the_batch(db, err):
+    fake = db(copy_error=err)
+    assert trade_events._write_rows(_rows("A", "B", "C")) == 0
+    assert fake.calls == ["copy"]
+
+
+def test_connection_lost_during_row_retry_stops(db):
+    fake = db(copy_error=psycopg.IntegrityError("dup"), insert_error=psycopg.OperationalError("gone"))
+    assert trade_events._write_rows(_rows("A", "B", "C")) == 0
+    assert fake.calls == ["copy", "insert"]
+
+
+def test_full_queue_drop_is_counted():
+    def dropped():
+        return sum(REGISTRY._counters.get("executor_trade_events_dropped_total", {}).values())
+
+    w = trade_events.TradeEventWriter(flush_sec=1, batch_size=1, queue_max=1)
+    before = dropped()
+    assert w.put(_rows("A")[0])
+    assert not w.put(_rows("B")[0])
+    assert w.stats()["dropped"] == 1
+    assert dropped() == before + 1
+    assert "# HELP executor_trade_events_dropped_total" in REGISTRY.render()
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import socket
+import time
+
+import pytest
+
+from executor import fill_counter
+from executor.snapshot import AccountSnapshot
+from executor.trade_stream import TradeBook, TradeUpdatesConsumer
+
+
+def _snapshot(filled: int = 0, open_orders=None) -> AccountSnapshot:
+    snap = AccountSnapshot(positions={"MSFT": 5.0}, open_buy_symbols={}, filled_buys_today=filled)
+    snap.open_orders = open_orders
+    return snap
+
+
+def _fill(order_id: str, symbol: str = "AAPL", position_qty: str = "1") -> dict:
+    return {
+        "event": "fill",
+        "order": {"id": order_id, "symbol": symbol, "side": "buy"},
+        "position_qty": position_qty,
+    }
+
+
+def test_fill_already_in_seed_counts_once():
+    book = TradeBook(stale_after_sec=60)
+    book.seed(_snapshot(filled=1, open_orders={"o1": ("AAPL", "buy")}), ["o1"])
+
+    book.apply(_fill("o1"))
+    assert book.filled_buys_today() == 1
+    assert not book.has_open_buy("AAPL")
+    assert book.has_position("AAPL")
+
+    book.apply(_fill("o2"))
+    assert book.filled_buys_today() == 2
+    assert book.to_snapshot().filled_buys_today == 2
+
+
+def test_reseed_replaces_stream_fills():
+    book = TradeBook(stale_after_sec=60)
+    book.seed(_snapshot())
+    book.apply(_fill("o1"))
+    book.seed(_snapshot(), ["o1", "o2"])
+    assert book.filled_buys_today() == 2
+
+
+def test_seed_snapshot_pages_every_open_order(monkeypatch):
+    from datetime import datetime, timedelta, timezone
+    from types import SimpleNamespace
+
+    from bench.fake_broker import FakeTradingClient
+
+    monkeypatch.setattr(fill_counter, "_counter", None)
+    client = FakeTradingClient()
+    t0 = datetime.now(timezone.utc) - timedelta(hours=1)
+    # more than one 500-row page, both sides
+    for i in range(620):
+        client.orders.append(SimpleNamespace(
+            id=f"o{i}", symbol=f"S{i % 7}", side="buy" if i % 2 else "sell", qty="1",
+            status="accepted", submitted_at=t0 + timedelta(milliseconds=i), filled_at=None,
+        ))
+
+    snap = AccountSnapshot.load(client, use_stream=False, keep_open_orders=True)
+    assert len(snap.open_orders) == 620
+    assert snap.open_orders["o3"] == ("S3", "buy")
+    assert sum(snap.open_buy_symbols.values()) == 310
+
+    book = TradeBook(stale_after_sec=60)
+    book.seed(snap)
+    assert book.open_orders == snap.open_orders
+    assert book.has_open_buy("S1")
+
+    # the guards' load does not keep the listing
+    assert AccountSnapshot.load(client, use_stream=False).open_orders is None
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait(cond, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if cond():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def test_consumer_against_fake_stream(monkeypatch):
+    pytest.importorskip("websockets")
+    from bench.sim_broker import SimulatedBroker
+    from executor.trade_stream_fake import FakeTradeStreamServer
+
+    monkeypatch.setattr(fill_counter, "_counter", None)
+    broker = SimulatedBroker()
+    broker.seed_state(filled_buys_today=["NVDA"])
+    seeded_id = str(broker.orders[-1].id)
+
+    srv = FakeTradeStreamServer(port=_free_port()).start()
+    book = TradeBook(stale_after_sec=60)
+    consumer = TradeUpdatesConsumer(
+        url=srv.url, key_id="k", secret_key="s", book=book, client_factory=lambda: broker,
+    )
+    consumer.start()
+    try:
+        assert _wait(book.is_fresh)
+        assert book.filled_buys_today() == 1
+
+        # replayed fill of a seeded order, then a new one
+        srv.push_fill(symbol="NVDA", position_qty=1, order_id=seeded_id)
+        srv.push_fill(symbol="AAPL", position_qty=3)
+        assert _wait(lambda: book.has_position("AAPL"))
+        assert book.filled_buys_today() == 2
+    finally:
+        consumer.stop()
+        srv.stop()